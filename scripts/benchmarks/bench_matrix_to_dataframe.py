@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: Prometheus matrix -> DataFrame conversion.
+
+Compares the columnar builder (core.timeseries.matrix_to_dataframe) against
+the previous per-sample dict path on a synthetic query_range result.
+
+Usage:
+    # Default: 24h window at 30s step across 50 series
+    python scripts/benchmarks/bench_matrix_to_dataframe.py
+
+    # Custom shape
+    python scripts/benchmarks/bench_matrix_to_dataframe.py --series 100 --points 5000 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.timeseries import matrix_to_dataframe  # noqa: E402
+
+
+def legacy_rows_to_dataframe(result):
+    """Previous implementation: one dict per sample."""
+    rows = []
+    for series in result:
+        for val in series["values"]:
+            ts = datetime.fromtimestamp(float(val[0]))
+            value = float(val[1])
+            if pd.isna(value) or value != value:
+                value = 0.0
+            row = dict(series["metric"])
+            row["timestamp"] = ts
+            row["value"] = value
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def make_result(n_series: int, n_points: int, step: int = 30):
+    start = 1_700_000_000
+    return [
+        {
+            "metric": {
+                "__name__": "vllm:num_requests_running",
+                "namespace": f"ns-{i % 5}",
+                "pod": f"pod-{i}",
+                "model_name": f"model-{i % 3}",
+                "instance": f"10.0.0.{i}:8080",
+                "job": "vllm",
+            },
+            "values": [[start + j * step, str(random.random() * 100)] for j in range(n_points)],
+        }
+        for i in range(n_series)
+    ]
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--points", type=int, default=2880, help="samples per series (24h at 30s = 2880)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = make_result(args.series, args.points)
+    legacy = best_of(legacy_rows_to_dataframe, result, args.repeat)
+    columnar = best_of(matrix_to_dataframe, result, args.repeat)
+
+    legacy_mem = legacy_rows_to_dataframe(result).memory_usage(deep=True).sum()
+    columnar_mem = matrix_to_dataframe(result).memory_usage(deep=True).sum()
+
+    print(f"samples:   {args.series * args.points:,} ({args.series} series x {args.points} points)")
+    print(f"legacy:    {legacy * 1000:9.1f} ms  {legacy_mem / 1e6:8.1f} MB")
+    print(f"columnar:  {columnar * 1000:9.1f} ms  {columnar_mem / 1e6:8.1f} MB")
+    print(f"speedup:   {legacy / columnar:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
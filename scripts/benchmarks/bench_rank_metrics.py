@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: semantic metric ranking over a large metric catalog.
+
+Compares the inverted-index ranking (core.metric_ranking.MetricRankingIndex)
+against scoring every metric name on every question.
+
+Usage:
+    # Default: 50k synthetic metric names
+    python scripts/benchmarks/bench_rank_metrics.py
+
+    # Custom catalog size
+    python scripts/benchmarks/bench_rank_metrics.py --metrics 20000 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.metric_ranking import (  # noqa: E402
+    MetricRankingIndex,
+    calculate_semantic_score,
+    calculate_specificity_score,
+    calculate_type_relevance,
+    tokenize,
+)
+
+QUESTIONS = [
+    "What is the GPU temperature?",
+    "How many pods are failing?",
+    "p95 latency of requests",
+    "memory usage by namespace",
+    "network packets dropped",
+]
+
+
+def full_scan_rank(search_term, all_metrics):
+    """Previous implementation: score every metric on every call."""
+    scored = []
+    intent_lower = search_term.lower()
+    for metric in all_metrics:
+        metric_lower = metric.lower()
+        score = len(tokenize(intent_lower) & tokenize(metric_lower)) * 10
+        score += calculate_semantic_score(intent_lower, metric_lower)
+        score += calculate_type_relevance(intent_lower, metric_lower)
+        score += calculate_specificity_score(metric_lower)
+        if score > 0:
+            scored.append((metric, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return [metric for metric, _score in scored]
+
+
+def make_metrics(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    prefixes = ["vllm:", "DCGM_FI_DEV_", "kube_pod_", "kube_node_", "node_", "container_",
+                "apiserver_", "etcd_", "go_", "process_", "http_", "grpc_server_"]
+    words = ["gpu", "temp", "memory", "bytes", "total", "count", "latency", "seconds", "bucket",
+             "error", "util", "usage", "network", "packets", "ready", "info", "cpu", "time",
+             "status", "requests", "queue", "cache", "disk", "io", "alloc", "sum"]
+    return [
+        rng.choice(prefixes) + "_".join(rng.sample(words, rng.randint(1, 4))) + f"_{i}"
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metrics", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    metrics = make_metrics(args.metrics)
+
+    t0 = time.perf_counter()
+    index = MetricRankingIndex(metrics)
+    build = time.perf_counter() - t0
+
+    scan = best_of(lambda: [full_scan_rank(q, metrics) for q in QUESTIONS], args.repeat) / len(QUESTIONS)
+    indexed = best_of(lambda: [index.rank(q) for q in QUESTIONS], args.repeat) / len(QUESTIONS)
+
+    for q in QUESTIONS:
+        assert index.rank(q) == full_scan_rank(q, metrics), q
+
+    print(f"catalog:      {args.metrics:,} metric names")
+    print(f"index build:  {build * 1000:9.1f} ms (once per catalog refresh)")
+    print(f"full scan:    {scan * 1000:9.1f} ms per question")
+    print(f"indexed:      {indexed * 1000:9.1f} ms per question")
+    print(f"speedup:      {scan / indexed:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: query_range body -> SeriesSet decoding.
+
+Compares response.json() followed by SeriesSet.from_matrix against the
+incremental stream decoder (core.stream_decode) on a synthetic body, and
+reports the peak Python heap of each path via tracemalloc.
+
+Usage:
+    # Default: 90 days at 15m step across 200 series
+    python scripts/benchmarks/bench_stream_decode.py
+
+    # Custom shape
+    python scripts/benchmarks/bench_stream_decode.py --series 500 --points 8640 --chunk 65536
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.stream_decode import decode_matrix_stream  # noqa: E402
+from core.timeseries import SeriesSet  # noqa: E402
+
+
+def make_body(n_series: int, n_points: int, step: int = 900) -> bytes:
+    start = 1_700_000_000
+    result = [
+        {
+            "metric": {
+                "__name__": "container_cpu_usage_seconds_total",
+                "namespace": f"ns-{i % 20}",
+                "pod": f"pod-{i}",
+                "container": "main",
+                "instance": f"10.0.{i // 250}.{i % 250}:10250",
+            },
+            "values": [[start + j * step, repr(random.random() * 100)] for j in range(n_points)],
+        }
+        for i in range(n_series)
+    ]
+    return json.dumps({"status": "success", "data": {"resultType": "matrix", "result": result}}).encode()
+
+
+def json_path(body: bytes, _chunk: int, _points: int) -> SeriesSet:
+    return SeriesSet.from_matrix(json.loads(body)["data"]["result"])
+
+
+def stream_path(body: bytes, chunk: int, points: int) -> SeriesSet:
+    return decode_matrix_stream((body[i:i + chunk] for i in range(0, len(body), chunk)), points)
+
+
+def measure(fn, body: bytes, chunk: int, points: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(body, chunk, points)
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(body, chunk, points)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--points", type=int, default=8640, help="samples per series (90d at 15m = 8640)")
+    parser.add_argument("--chunk", type=int, default=256 * 1024, help="stream chunk size in bytes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    body = make_body(args.series, args.points)
+    json_time, json_peak = measure(json_path, body, args.chunk, args.points, args.repeat)
+    stream_time, stream_peak = measure(stream_path, body, args.chunk, args.points, args.repeat)
+
+    print(f"body:      {len(body) / 1e6:8.1f} MB ({args.series} series x {args.points} points)")
+    print(f"json:      {json_time * 1000:9.1f} ms  peak {json_peak / 1e6:8.1f} MB")
+    print(f"stream:    {stream_time * 1000:9.1f} ms  peak {stream_peak / 1e6:8.1f} MB")
+    print(f"speedup:   {json_time / stream_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ from typing import Dict, Any, Optional, List, Tuple
 from common.pylogger import get_python_logger
 from .metrics import choose_prometheus_step
 
-from .config import PROMETHEUS_URL, THANOS_TOKEN, VERIFY_SSL
+from .http_client import get_prometheus_client
 
 # Initialize structured logger once - other modules should use logging.getLogger(__name__)
 get_python_logger()
@@ -36,27 +36,12 @@ def fetch_alerts_from_prometheus(
     Returns:
         Tuple of (promql_query, alerts_data_list)
     """
-    headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
     promql_query = f'ALERTS{{namespace="{namespace}"}}' if namespace else "ALERTS"
     step = choose_prometheus_step(start_ts, end_ts)
-    params = {
-        "query": promql_query,
-        "start": start_ts,
-        "end": end_ts,
-        "step": step,
-    }
     logger.debug("Fetching Prometheus alerts, query: %s, start: %s, end: %s: step: %s", promql_query, start_ts, end_ts, step)
 
     try:
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/query_range",
-            headers=headers,
-            params=params,
-            verify=VERIFY_SSL,
-            timeout=30,  # Add timeout
-        )
-        response.raise_for_status()
-        result = response.json()["data"]["result"]
+        result = get_prometheus_client().query_range(promql_query, start_ts, end_ts, step)["data"]["result"]
     except requests.exceptions.ConnectionError as e:
         logger.warning("Prometheus connection error for alerts query '%s': %s", promql_query, e)
         return promql_query, []  # Return empty alerts on connection error
@@ -114,13 +99,7 @@ def fetch_all_rule_definitions() -> Dict[str, Dict[str, Any]]:
     definitions = {}
     
     try:
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/rules", 
-            verify=VERIFY_SSL,
-            timeout=30
-        )
-        response.raise_for_status()
-        groups = response.json()["data"]["groups"]
+        groups = get_prometheus_client().get_sync("/api/v1/rules")["data"]["groups"]
         
         for group in groups:
             for rule in group.get("rules", []):
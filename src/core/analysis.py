@@ -4,11 +4,29 @@ Data analysis and statistical functions for metrics processing.
 This module contains pure functions for analyzing metrics data,
 detecting anomalies, computing health scores, and trend analysis.
 All functions are framework-agnostic and operate on pandas DataFrames.
+
+analyze_metrics is the batch variant used by the prompt builders: it aligns
+every series of an analysis into one (series x timestamps) numpy matrix and
+computes per-series slope, 90th percentile, z-score of the latest sample and
+spike/low flags in one vectorized pass, then combines them per metric.
+Metrics summarized server-side (MetricStats) get the same rules applied to
+their pushed-down p90/stddev/slope.
 """
 
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 from scipy.stats import linregress
-from typing import Dict, Tuple, List
+
+from .timeseries import MetricStats, SeriesSet, summarize_metric
+
+# Slope (units per second) above which a metric is "increasing"/"decreasing"
+TREND_SLOPE_THRESHOLD = 0.01
+
+# A latest sample above this quantile of its series is a spike
+SPIKE_QUANTILE = 0.9
 
 
 def detect_anomalies(df: pd.DataFrame, label: str) -> str:
@@ -27,7 +45,7 @@ def detect_anomalies(df: pd.DataFrame, label: str) -> str:
     
     mean = df["value"].mean()
     std = df["value"].std()
-    p90 = df["value"].quantile(0.9)
+    p90 = df["value"].quantile(SPIKE_QUANTILE)
     latest_val = df["value"].iloc[-1]
     
     if latest_val > p90:
@@ -59,21 +77,198 @@ def describe_trend(df: pd.DataFrame) -> str:
         return "flat"
     
     slope, *_ = linregress(x, y)
-    
-    if slope > 0.01:
+    return _trend(slope)
+
+
+def _trend(slope: Optional[float]) -> str:
+    if slope is None or np.isnan(slope):
+        return "not enough data"
+    if slope > TREND_SLOPE_THRESHOLD:
         return "increasing"
-    elif slope < -0.01:
+    elif slope < -TREND_SLOPE_THRESHOLD:
         return "decreasing"
-    
     return "stable"
 
 
-def compute_health_score(metric_dfs: Dict[str, pd.DataFrame]) -> Tuple[int, List[str]]:
+@dataclass(frozen=True)
+class MetricInsight:
+    """Trend and anomaly lines of one metric for analysis prompts."""
+
+    trend: str
+    anomaly: str
+
+
+def _frame_to_series(df: pd.DataFrame) -> SeriesSet:
+    """Convert a long-format DataFrame (timestamp, value, label columns) to a SeriesSet."""
+    if df.empty or "value" not in df.columns or "timestamp" not in df.columns:
+        return SeriesSet.empty_set()
+    stamps = pd.to_datetime(df["timestamp"])
+    seconds = stamps.min().timestamp() + (stamps - stamps.min()).dt.total_seconds().to_numpy()
+    values = df["value"].to_numpy(dtype=np.float64)
+    label_columns = [col for col in df.columns if col not in ("timestamp", "value")]
+    if not label_columns:
+        return SeriesSet.from_arrays([{}], [seconds], [values])
+    groups = df.groupby(label_columns, sort=False, dropna=False).indices
+    return SeriesSet.from_arrays(
+        [dict(zip(label_columns, key if isinstance(key, tuple) else (key,))) for key in groups],
+        [seconds[rows] for rows in groups.values()],
+        [values[rows] for rows in groups.values()],
+    )
+
+
+def _align(sets: List[SeriesSet]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stack every series of every set onto one timestamp axis.
+
+    Returns (seconds, matrix, metric index of each row).
+    """
+    timestamps = np.unique(np.concatenate([part.timestamps for part in sets]))
+    rows = sum(part.values.shape[0] for part in sets)
+    matrix = np.full((rows, timestamps.size), np.nan, dtype=np.float64)
+    owner = np.empty(rows, dtype=np.intp)
+    row = 0
+    for index, part in enumerate(sets):
+        count = part.values.shape[0]
+        matrix[row:row + count, np.searchsorted(timestamps, part.timestamps)] = part.values
+        owner[row:row + count] = index
+        row += count
+    return (timestamps - timestamps.min()) / 1000.0, matrix, owner
+
+
+def series_statistics(seconds: np.ndarray, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-series statistics of a (series x timestamps) matrix with NaN gaps.
+
+    Returns arrays (one entry per row) of count, mean, population stddev,
+    least-squares slope per second, 90th percentile, latest sample, z-score
+    of the latest sample and the spike (latest > p90) / low (latest < mean -
+    stddev) flags. Rows need at least one sample.
+    """
+    present = ~np.isnan(matrix)
+    count = present.sum(axis=1)
+    y = np.where(present, matrix, 0.0)
+    mean = y.sum(axis=1) / count
+    dev = np.where(present, matrix - mean[:, None], 0.0)
+    stddev = np.sqrt((dev ** 2).sum(axis=1) / count)
+
+    x = np.where(present, seconds[None, :], 0.0)
+    x_dev = np.where(present, seconds[None, :] - (x.sum(axis=1) / count)[:, None], 0.0)
+    x_var = (x_dev ** 2).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(x_var > 0, (x_dev * dev).sum(axis=1) / x_var, np.nan)
+    last = matrix.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    latest = matrix[np.arange(matrix.shape[0]), last]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscore = np.where(stddev > 0, (latest - mean) / stddev, 0.0)
+    p90 = np.nanquantile(matrix, SPIKE_QUANTILE, axis=1)
+    return {
+        "count": count,
+        "mean": mean,
+        "stddev": stddev,
+        "slope": slope,
+        "p90": p90,
+        "latest": latest,
+        "zscore": zscore,
+        "spike": latest > p90,
+        "low": zscore < -1,
+    }
+
+
+def _anomaly(latest: float, mean: float, p90: Optional[float], stddev: Optional[float]) -> str:
+    if p90 is not None and latest > p90:
+        return f"⚠️ spike (latest={latest:.2f}, >90th pct={p90:.2f})"
+    if stddev and latest < mean - stddev:
+        return f"⚠️ unusually low (latest={latest:.2f}, mean={mean:.2f})"
+    return "normal"
+
+
+def _stats_insight(stats: MetricStats) -> MetricInsight:
+    if stats.empty or stats.latest is None or stats.avg is None:
+        return MetricInsight("not enough data", "No data")
+    return MetricInsight(_trend(stats.slope), _anomaly(stats.latest, stats.avg, stats.p90, stats.stddev))
+
+
+def _batch_insights(sets: Dict[str, SeriesSet]) -> Dict[str, MetricInsight]:
+    """Insights of many metrics from one aligned matrix."""
+    insights = {label: MetricInsight("not enough data", "No data") for label in sets}
+    # Keep only series with samples so every matrix row has data
+    kept: Dict[str, SeriesSet] = {}
+    for label, part in sets.items():
+        keep = ~np.isnan(part.values).all(axis=1)
+        if keep.any():
+            kept[label] = SeriesSet(part.timestamps, part.values[keep], [part.labels[row] for row in np.flatnonzero(keep)])
+    labels = list(kept)
+    if not labels:
+        return insights
+    seconds, matrix, owner = _align(list(kept.values()))
+    per_series = series_statistics(seconds, matrix)
+
+    groups = len(labels)
+    weights = per_series["count"].astype(np.float64)
+    total = np.bincount(owner, weights, groups)
+    mean = np.bincount(owner, weights * per_series["mean"], groups) / total
+    second_moment = np.bincount(owner, weights * (per_series["stddev"] ** 2 + per_series["mean"] ** 2), groups) / total
+    stddev = np.sqrt(np.maximum(second_moment - mean ** 2, 0.0))
+    has_slope = ~np.isnan(per_series["slope"])
+    slope_weights = np.bincount(owner[has_slope], weights[has_slope], groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.bincount(owner[has_slope], (weights * per_series["slope"])[has_slope], groups) / slope_weights
+    spikes = np.bincount(owner, per_series["spike"], groups).astype(int)
+    lows = np.bincount(owner, per_series["low"], groups).astype(int)
+    series = np.bincount(owner, minlength=groups)
+    last_row = np.searchsorted(owner, np.arange(groups), side="right") - 1
+
+    for index, label in enumerate(labels):
+        row = last_row[index]
+        if series[index] == 1:
+            anomaly = _anomaly(per_series["latest"][row], mean[index], per_series["p90"][row], stddev[index])
+        elif spikes[index]:
+            anomaly = f"⚠️ spike in {spikes[index]} of {series[index]} series (latest >90th pct)"
+        elif lows[index]:
+            anomaly = f"⚠️ unusually low in {lows[index]} of {series[index]} series (latest < mean - stddev)"
+        else:
+            anomaly = "normal"
+        insights[label] = MetricInsight(_trend(float(slope[index]) if slope_weights[index] else None), anomaly)
+    return insights
+
+
+def analyze_metrics(metrics: Mapping[str, Any]) -> Dict[str, MetricInsight]:
+    """Compute the trend and anomaly of every metric of an analysis in one batch.
+
+    Args:
+        metrics: Metric label -> SeriesSet, long-format DataFrame or MetricStats
+
+    Returns:
+        Metric label -> MetricInsight. Series-backed metrics are flagged per
+        series (a multi-series metric reports how many series spike or are
+        unusually low); MetricStats use their pushed-down p90/stddev/slope.
+    """
+    insights: Dict[str, MetricInsight] = {}
+    sets: Dict[str, SeriesSet] = {}
+    for label, data in metrics.items():
+        if isinstance(data, MetricStats):
+            insights[label] = _stats_insight(data)
+        elif isinstance(data, SeriesSet):
+            sets[label] = data
+        elif isinstance(data, pd.DataFrame):
+            sets[label] = _frame_to_series(data)
+        else:
+            insights[label] = MetricInsight("not enough data", "No data")
+    insights.update(_batch_insights(sets))
+    return {label: insights[label] for label in metrics}
+
+
+def _mean(data) -> Optional[float]:
+    """Mean of a metric held as a DataFrame, SeriesSet or MetricStats (None if empty)."""
+    stats = summarize_metric(data)
+    return stats["avg"] if stats else None
+
+
+def compute_health_score(metric_dfs: Dict[str, Any]) -> Tuple[int, List[str]]:
     """
     Compute an overall health score based on key performance metrics.
     
     Args:
-        metric_dfs: Dictionary mapping metric names to DataFrames with 'value' column
+        metric_dfs: Dictionary mapping metric names to DataFrames with 'value' column,
+            SeriesSets, or MetricStats (only the means are used)
         
     Returns:
         Tuple of (health_score, list_of_issues)
@@ -83,24 +278,21 @@ def compute_health_score(metric_dfs: Dict[str, pd.DataFrame]) -> Tuple[int, List
     score, reasons = 0, []
     
     # Check P95 Latency
-    if "P95 Latency (s)" in metric_dfs and not metric_dfs["P95 Latency (s)"].empty:
-        mean = metric_dfs["P95 Latency (s)"]["value"].mean()
-        if mean > 2:
-            score -= 2
-            reasons.append(f"High Latency (avg={mean:.2f}s)")
+    mean = _mean(metric_dfs.get("P95 Latency (s)"))
+    if mean is not None and mean > 2:
+        score -= 2
+        reasons.append(f"High Latency (avg={mean:.2f}s)")
     
     # Check GPU Utilization
-    if "GPU Usage (%)" in metric_dfs and not metric_dfs["GPU Usage (%)"].empty:
-        mean = metric_dfs["GPU Usage (%)"]["value"].mean()
-        if mean < 10:
-            score -= 1
-            reasons.append(f"Low GPU Utilization (avg={mean:.2f}%)")
+    mean = _mean(metric_dfs.get("GPU Usage (%)"))
+    if mean is not None and mean < 10:
+        score -= 1
+        reasons.append(f"Low GPU Utilization (avg={mean:.2f}%)")
     
     # Check Request Queue
-    if "Requests Running" in metric_dfs and not metric_dfs["Requests Running"].empty:
-        mean = metric_dfs["Requests Running"]["value"].mean()
-        if mean > 10:
-            score -= 1
-            reasons.append(f"Too many requests (avg={mean:.2f})")
+    mean = _mean(metric_dfs.get("Requests Running"))
+    if mean is not None and mean > 10:
+        score -= 1
+        reasons.append(f"Too many requests (avg={mean:.2f})")
     
-    return score, reasons 
\ No newline at end of file
+    return score, reasons
@@ -18,7 +18,16 @@ import requests
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
-from .config import PROMETHEUS_URL, THANOS_TOKEN, VERIFY_SSL
+from .http_client import get_prometheus_client
+from .metric_catalog import get_metric_catalog, get_metric_metadata_map
+from .metric_ranking import (
+    calculate_semantic_score,
+    calculate_specificity_score,
+    calculate_type_relevance,
+    get_ranking_index,
+)
+from .promql_eval import evaluate_or_fetch
+from .query_guard import plan_query
 from .llm_client import summarize_with_llm
 from .response_validator import ResponseType
 
@@ -31,30 +40,37 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 
 def make_prometheus_request(endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-    """Make authenticated request to Prometheus/Thanos."""
-    url = f"{PROMETHEUS_URL}{endpoint}"
-    headers = {}
-    
-    if THANOS_TOKEN:
-        headers["Authorization"] = f"Bearer {THANOS_TOKEN}"
-    
+    """Make authenticated request to Prometheus/Thanos over the shared pooled client.
+
+    Range queries go through the client's query_range so repeated chat
+    iterations are served from the range-query cache; ``step`` defaults to
+    query_range's 15m. Range requests missing query/start/end are passed
+    through, so Prometheus rejects them with a RequestException as before.
+    """
     try:
-        from .config import REQUEST_TIMEOUT_SECONDS
-
-        response = requests.get(
-            url, 
-            params=params, 
-            headers=headers, 
-            verify=VERIFY_SSL,
-            timeout=REQUEST_TIMEOUT_SECONDS
-        )
-        response.raise_for_status()
-        return response.json()
+        client = get_prometheus_client()
+        if endpoint == "/api/v1/query_range" and params and all(k in params for k in ("query", "start", "end")):
+            return client.query_range(params["query"], params["start"], params["end"], params.get("step", "15m"))
+        return client.get_sync(endpoint, params=params)
     except requests.exceptions.RequestException as e:
         logger.error(f"Prometheus request failed: {e}")
         raise
 
 
+def _fetch_raw_series(query: str, at: float) -> Dict[str, Any]:
+    """Run a range-vector instant query for raw samples (local evaluation priming)."""
+    return get_prometheus_client().query_instant(query, time=at)
+
+
+def _bulk_metadata() -> Dict[str, List[Dict[str, Any]]]:
+    """Return the shared bulk metadata map, or {} if it cannot be loaded."""
+    try:
+        return get_metric_metadata_map()
+    except Exception as e:
+        logger.warning(f"Failed to load metric metadata: {e}")
+        return {}
+
+
 # =============================================================================
 # Metric Discovery and Search Functions
 # =============================================================================
@@ -69,9 +85,8 @@ def search_metrics_by_pattern(pattern: str = "", limit: int = 50) -> Dict[str, A
     Returns:
         Dict with total_found, metrics list, pattern, and limit
     """
-    # Get all metric names
-    response = make_prometheus_request("/api/v1/label/__name__/values")
-    all_metrics = response.get("data", [])
+    # Get all metric names from the shared catalog
+    all_metrics = list(get_metric_catalog().names)
     
     # Use semantic search if pattern provided
     if pattern:
@@ -80,15 +95,12 @@ def search_metrics_by_pattern(pattern: str = "", limit: int = 50) -> Dict[str, A
     else:
         matching_metrics = all_metrics[:limit]
     
-    # Get basic info for each metric
+    # Get basic info for each metric from the bulk metadata map
+    all_metadata = _bulk_metadata()
     metrics_info = []
     for metric in matching_metrics:
         try:
-            metadata_response = make_prometheus_request(
-                "/api/v1/metadata", 
-                {"metric": metric}
-            )
-            metadata = metadata_response.get("data", {}).get(metric, [])
+            metadata = all_metadata.get(metric, [])
             
             if metadata:
                 metric_info = {
@@ -132,12 +144,14 @@ def get_metric_metadata(metric_name: str) -> Dict[str, Any]:
     Returns:
         Detailed metadata including type, help text, unit, and available labels
     """
-    # Get metric metadata
-    metadata_response = make_prometheus_request(
-        "/api/v1/metadata", 
-        {"metric": metric_name}
-    )
-    metadata = metadata_response.get("data", {}).get(metric_name, [])
+    # Get metric metadata (ask upstream only for metrics newer than the bulk map)
+    metadata = _bulk_metadata().get(metric_name, [])
+    if not metadata:
+        metadata_response = make_prometheus_request(
+            "/api/v1/metadata", 
+            {"metric": metric_name}
+        )
+        metadata = metadata_response.get("data", {}).get(metric_name, [])
     
     if not metadata:
         raise ValueError(f"Metric '{metric_name}' not found")
@@ -205,7 +219,9 @@ def execute_promql_query(
         end_time: End time (ISO format, defaults to now)
     
     Returns:
-        Structured query results with metadata
+        Structured query results with metadata. ``plan`` records the
+        cardinality guard's decisions (estimated series, step, topk
+        wrapping); refused queries return status "refused" without running.
     """
     # Parse time parameters
     if start_time:
@@ -233,30 +249,63 @@ def execute_promql_query(
     else:
         end_timestamp = datetime.utcnow().timestamp()
     
-    # Execute query - use instant query if no time range specified
-    if start_time or end_time:
+    is_range = bool(start_time or end_time)
+    structured = {
+        "query": query,
+        "start_time": start_time or f"{int((datetime.utcnow() - timedelta(hours=1)).timestamp())}",
+        "end_time": end_time or f"{int(datetime.utcnow().timestamp())}",
+    }
+
+    # Estimate the result size first; over-budget queries are bounded or refused
+    plan = plan_query(query, start_timestamp if is_range else None, end_timestamp if is_range else None)
+    if plan.refused:
+        return {
+            **structured,
+            "status": "refused",
+            "result_type": None,
+            "results": [],
+            "execution_time": "0",
+            "plan": plan.to_dict(),
+        }
+
+    # Execute query - use instant query if no time range specified.
+    # Supported expressions over cached raw series are evaluated locally;
+    # raw samples of topk-bounded queries are never primed, since their inner
+    # selectors are exactly what the guard kept from being fetched.
+    prime = plan.action != "topk"
+    if is_range:
         # Range query
         params = {
-            "query": query,
+            "query": plan.query,
             "start": start_timestamp,
             "end": end_timestamp,
-            "step": "60s"  # 1 minute resolution
+            "step": f"{plan.step_seconds}s"
         }
-        response = make_prometheus_request("/api/v1/query_range", params)
+        response = evaluate_or_fetch(
+            plan.query,
+            lambda: make_prometheus_request("/api/v1/query_range", params),
+            _fetch_raw_series,
+            start=start_timestamp,
+            end=end_timestamp,
+            step_seconds=plan.step_seconds,
+            prime=prime,
+        )
     else:
         # Instant query
-        params = {"query": query}
-        response = make_prometheus_request("/api/v1/query", params)
-    
+        params = {"query": plan.query}
+        response = evaluate_or_fetch(
+            plan.query, lambda: make_prometheus_request("/api/v1/query", params), _fetch_raw_series,
+            prime=prime,
+        )
+
     # Structure the response
     return {
-        "query": query,
-        "start_time": start_time or f"{int((datetime.utcnow() - timedelta(hours=1)).timestamp())}",
-        "end_time": end_time or f"{int(datetime.utcnow().timestamp())}",
+        **structured,
         "status": response.get("status"),
         "result_type": response.get("data", {}).get("resultType"),
         "results": response.get("data", {}).get("result", []),
-        "execution_time": response.get("data", {}).get("stats", {}).get("timings", {}).get("evalTotalTime", "unknown")
+        "execution_time": response.get("data", {}).get("stats", {}).get("timings", {}).get("evalTotalTime", "unknown"),
+        "plan": plan.to_dict(),
     }
 
 
@@ -333,32 +382,12 @@ Keep the explanation concise but informative."""
 # =============================================================================
 
 def rank_metrics_by_relevance(search_term: str, all_metrics: List[str]) -> List[str]:
-    """Rank all metrics by relevance using semantic scoring + Prometheus metadata."""
-    scored_metrics = []
-    
-    for metric in all_metrics:
-        intent_lower = search_term.lower()
-        metric_lower = metric.lower()
-        
-        score = 0
-        
-        # 1. Direct word matches (metric name)
-        intent_words = set(intent_lower.replace('-', ' ').replace('_', ' ').replace(':', ' ').split())
-        metric_words = set(metric_lower.replace('-', ' ').replace('_', ' ').replace(':', ' ').split())
-        direct_matches = intent_words.intersection(metric_words)
-        score += len(direct_matches) * 10
-        
-        # 2. Semantic scoring based on metric name
-        score += calculate_semantic_score(intent_lower, metric_lower)
-        score += calculate_type_relevance(intent_lower, metric_lower)
-        score += calculate_specificity_score(metric_lower)
-        
-        if score > 0:  # Only include metrics with some relevance
-            scored_metrics.append((metric, score))
-    
-    # Sort by score (descending) and return metric names
-    scored_metrics.sort(key=lambda x: x[1], reverse=True)
-    return [metric for metric, score in scored_metrics]
+    """Rank all metrics by relevance using semantic scoring of metric names.
+
+    Uses a cached inverted index over the metric list, so only metrics that
+    share a word or a scoring rule with the search term are scored.
+    """
+    return get_ranking_index(all_metrics).rank(search_term)
 
 
 def select_best_metric_for_question(
@@ -410,8 +439,7 @@ def find_best_metric_with_metadata(
     concepts = extract_key_concepts(question_lower)
     
     # STEP 2: Search for candidate metrics using semantic ranking
-    response = make_prometheus_request("/api/v1/label/__name__/values")
-    all_metrics = response.get("data", [])
+    all_metrics = list(get_metric_catalog().names)
     
     # Get top candidates using our enhanced ranking
     candidates = rank_metrics_by_relevance(user_question, all_metrics)[:max_candidates]
@@ -445,105 +473,6 @@ def find_best_metric_with_metadata(
     }
 
 
-# =============================================================================
-# Semantic Analysis and Scoring Functions
-# =============================================================================
-
-def calculate_semantic_score(intent: str, metric: str) -> int:
-    """Calculate semantic relevance score between user intent and metric name."""
-    score = 0
-    
-    # GPU/Hardware patterns
-    if any(gpu_term in intent for gpu_term in ["gpu", "graphics", "cuda", "nvidia"]):
-        if any(gpu_term in metric.lower() for gpu_term in ["gpu", "dcgm", "nvidia", "cuda"]):
-            score += 15
-    
-    # Temperature patterns
-    if any(temp_term in intent for temp_term in ["temperature", "temp", "heat", "thermal"]):
-        if any(temp_term in metric.lower() for temp_term in ["temp", "thermal", "heat"]):
-            score += 15
-    
-    # Memory patterns
-    if any(mem_term in intent for mem_term in ["memory", "mem", "ram"]):
-        if any(mem_term in metric for mem_term in ["memory", "mem", "ram", "bytes"]):
-            score += 12
-    
-    # Network patterns
-    if any(net_term in intent for net_term in ["network", "bandwidth", "traffic", "bytes", "packets"]):
-        if any(net_term in metric for net_term in ["network", "net_", "bytes", "packets", "bandwidth"]):
-            score += 12
-    
-    # CPU patterns
-    if any(cpu_term in intent for cpu_term in ["cpu", "processor", "utilization"]):
-        if any(cpu_term in metric for cpu_term in ["cpu", "processor", "util"]):
-            score += 12
-    
-    # Latency/Performance patterns
-    if any(lat_term in intent for lat_term in ["latency", "response", "time", "duration", "performance"]):
-        if any(lat_term in metric for lat_term in ["latency", "duration", "time", "seconds", "response"]):
-            score += 10
-    
-    # Error patterns
-    if any(err_term in intent for err_term in ["error", "fail", "exception", "problem"]):
-        if any(err_term in metric for err_term in ["error", "fail", "exception", "problem"]):
-            score += 10
-    
-    # Kubernetes patterns
-    if any(k8s_term in intent for k8s_term in ["pod", "container", "node", "deployment", "service"]):
-        if any(k8s_term in metric for k8s_term in ["pod", "container", "node", "kube_", "deployment"]):
-            score += 8
-    
-    return score
-
-
-def calculate_type_relevance(intent: str, metric: str) -> int:
-    """Calculate relevance based on metric type patterns."""
-    score = 0
-    
-    # Counter metrics (rates, totals)
-    if any(counter_term in intent for counter_term in ["rate", "total", "count", "increase"]):
-        if any(counter_term in metric for counter_term in ["total", "count", "rate"]):
-            score += 8
-    
-    # Gauge metrics (current values)
-    if any(gauge_term in intent for gauge_term in ["current", "usage", "utilization", "percentage"]):
-        if any(gauge_term in metric for gauge_term in ["usage", "util", "current", "percent"]):
-            score += 8
-    
-    # Histogram metrics (percentiles, latency)
-    if any(hist_term in intent for hist_term in ["percentile", "p95", "p99", "histogram", "distribution"]):
-        if any(hist_term in metric for hist_term in ["bucket", "percentile", "histogram"]):
-            score += 8
-    
-    return score
-
-
-def calculate_specificity_score(metric: str) -> int:
-    """Calculate specificity score - more specific metrics get higher scores."""
-    score = 0
-    
-    # Bonus for specific subsystems
-    specific_prefixes = ["vllm:", "dcgm_", "nvidia_", "openshift_", "kube_pod_", "container_"]
-    for prefix in specific_prefixes:
-        if metric.startswith(prefix):
-            score += 5
-            break
-    
-    # Bonus for detailed metric names (more components)
-    components = metric.replace('-', '_').split('_')
-    if len(components) >= 4:
-        score += 3
-    elif len(components) >= 3:
-        score += 2
-    
-    # Penalty for very generic metrics
-    generic_terms = ["total", "count", "info", "up", "ready"]
-    if any(term in metric.lower() for term in generic_terms):
-        score -= 2
-    
-    return score
-
-
 # =============================================================================
 # Advanced Analysis Functions
 # =============================================================================
@@ -606,12 +535,8 @@ def analyze_metric_with_metadata(
 ) -> Dict[str, Any]:
     """Analyze a metric using its metadata and user concepts."""
     try:
-        # Get metric metadata
-        metadata_response = make_prometheus_request(
-            "/api/v1/metadata", 
-            {"metric": metric_name}
-        )
-        metadata = metadata_response.get("data", {}).get(metric_name, [{}])[0]
+        # Get metric metadata from the bulk map
+        metadata = (_bulk_metadata().get(metric_name) or [{}])[0]
         
         # Calculate relevance scores
         name_score = calculate_semantic_score(question, metric_name)
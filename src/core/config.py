@@ -8,7 +8,7 @@ that are shared across FastAPI, Streamlit UI, and MCP servers.
 import os
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from common.pylogger import get_python_logger
 
 # Initialize structured logger once - other modules should use logging.getLogger(__name__)
@@ -76,6 +76,119 @@ DEFAULT_CHAT_QUERY_LIMIT = 50  # Default limit for chat tool queries
 DEFAULT_QUERY_LIMIT = 20  # Default limit for regular queries
 REQUEST_TIMEOUT_SECONDS = 30.0  # HTTP request timeout
 
+# Prometheus/Thanos connection pool sizing (shared keep-alive session)
+PROMETHEUS_POOL_CONNECTIONS: int = int(os.getenv("PROMETHEUS_POOL_CONNECTIONS", "4"))
+PROMETHEUS_POOL_MAXSIZE: int = int(os.getenv("PROMETHEUS_POOL_MAXSIZE", "32"))
+
+# Maximum in-flight queries per upstream (Prometheus/Thanos) across the process
+PROMETHEUS_MAX_CONCURRENCY: int = int(os.getenv("PROMETHEUS_MAX_CONCURRENCY", "8"))
+
+# Resilience layer of the shared Prometheus client: latency tracking, adaptive
+# timeouts (p99 x factor + per-day-of-window allowance, clamped), hedged requests
+# after the endpoint's tail latency, and a consecutive-failure circuit breaker
+PROMETHEUS_LATENCY_WINDOW: int = int(os.getenv("PROMETHEUS_LATENCY_WINDOW", "256"))
+PROMETHEUS_LATENCY_MIN_SAMPLES: int = int(os.getenv("PROMETHEUS_LATENCY_MIN_SAMPLES", "20"))
+PROMETHEUS_TIMEOUT_P99_FACTOR: float = float(os.getenv("PROMETHEUS_TIMEOUT_P99_FACTOR", "3.0"))
+PROMETHEUS_TIMEOUT_MIN_SECONDS: float = float(os.getenv("PROMETHEUS_TIMEOUT_MIN_SECONDS", "5"))
+PROMETHEUS_TIMEOUT_MAX_SECONDS: float = float(os.getenv("PROMETHEUS_TIMEOUT_MAX_SECONDS", "120"))
+PROMETHEUS_TIMEOUT_PER_DAY_SECONDS: float = float(os.getenv("PROMETHEUS_TIMEOUT_PER_DAY_SECONDS", "1.0"))
+PROMETHEUS_HEDGE_ENABLED: bool = os.getenv("PROMETHEUS_HEDGE_ENABLED", "true").lower() == "true"
+PROMETHEUS_HEDGE_QUANTILE: float = float(os.getenv("PROMETHEUS_HEDGE_QUANTILE", "0.95"))
+PROMETHEUS_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("PROMETHEUS_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+PROMETHEUS_HEDGE_MAX_IN_FLIGHT: int = int(os.getenv("PROMETHEUS_HEDGE_MAX_IN_FLIGHT", "4"))
+PROMETHEUS_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("PROMETHEUS_CIRCUIT_FAILURE_THRESHOLD", "5"))
+PROMETHEUS_CIRCUIT_RESET_SECONDS: float = float(os.getenv("PROMETHEUS_CIRCUIT_RESET_SECONDS", "30"))
+
+# Process-wide query_range result cache
+QUERY_CACHE_ENABLED: bool = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_MAX_BYTES: int = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# TTLs (seconds) by how recent the window end is: touching "now", within the last day, older
+QUERY_CACHE_LIVE_TTL_SECONDS: int = int(os.getenv("QUERY_CACHE_LIVE_TTL_SECONDS", "30"))
+QUERY_CACHE_RECENT_TTL_SECONDS: int = int(os.getenv("QUERY_CACHE_RECENT_TTL_SECONDS", "300"))
+QUERY_CACHE_HISTORICAL_TTL_SECONDS: int = int(os.getenv("QUERY_CACHE_HISTORICAL_TTL_SECONDS", "86400"))
+
+# Step-aligned series store used for incremental (tail-only) range fetches
+SERIES_STORE_MAX_ENTRIES: int = int(os.getenv("SERIES_STORE_MAX_ENTRIES", "256"))
+SERIES_STORE_MAX_BYTES: int = int(os.getenv("SERIES_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+SERIES_STORE_OVERLAP_STEPS: int = int(os.getenv("SERIES_STORE_OVERLAP_STEPS", "2"))
+
+# Range queries expected to return at least this many points per series are
+# stream-decoded straight into numpy arrays instead of via response.json()
+STREAM_DECODE_MIN_POINTS: int = int(os.getenv("STREAM_DECODE_MIN_POINTS", "2000"))
+STREAM_DECODE_CHUNK_BYTES: int = int(os.getenv("STREAM_DECODE_CHUNK_BYTES", str(256 * 1024)))
+
+# Time-sharded execution of long range queries: windows of at least
+# QUERY_SHARD_MIN_WINDOW_SECONDS are split on QUERY_SHARD_SECONDS boundaries
+QUERY_SHARD_SECONDS: int = int(os.getenv("QUERY_SHARD_SECONDS", str(24 * 3600)))
+QUERY_SHARD_MIN_WINDOW_SECONDS: int = int(os.getenv("QUERY_SHARD_MIN_WINDOW_SECONDS", str(2 * 24 * 3600)))
+QUERY_SHARD_MAX_SHARDS: int = int(os.getenv("QUERY_SHARD_MAX_SHARDS", "32"))
+QUERY_SHARD_CONCURRENCY: int = int(os.getenv("QUERY_SHARD_CONCURRENCY", "4"))
+QUERY_SHARD_RETRIES: int = int(os.getenv("QUERY_SHARD_RETRIES", "2"))
+
+# Thanos downsampled-resolution routing: allow 5m/1h source resolution once the
+# step and every range selector span 5 samples of it and the window is at least this long.
+# THANOS_PARTIAL_RESPONSE/THANOS_DEDUP: "auto" (only for downsampled reads), "true", "false" or "off"
+# (omitted); partial responses are opt-in
+THANOS_DOWNSAMPLING_ENABLED: bool = os.getenv("THANOS_DOWNSAMPLING_ENABLED", "true").lower() == "true"
+THANOS_RESOLUTION_5M_MIN_WINDOW_SECONDS: int = int(os.getenv("THANOS_RESOLUTION_5M_MIN_WINDOW_SECONDS", str(3 * 24 * 3600)))
+THANOS_RESOLUTION_1H_MIN_WINDOW_SECONDS: int = int(os.getenv("THANOS_RESOLUTION_1H_MIN_WINDOW_SECONDS", str(14 * 24 * 3600)))
+THANOS_PARTIAL_RESPONSE: str = os.getenv("THANOS_PARTIAL_RESPONSE", "off")
+THANOS_DEDUP: str = os.getenv("THANOS_DEDUP", "auto")
+
+# Optional Prometheus remote-read endpoint (e.g. http://prometheus:9090/api/v1/read).
+# When set, raw selectors over windows of at least REMOTE_READ_MIN_WINDOW_SECONDS
+# are read as snappy protobuf (streamed XOR chunks when REMOTE_READ_STREAMED)
+REMOTE_READ_URL: str = os.getenv("REMOTE_READ_URL", "")
+REMOTE_READ_MIN_WINDOW_SECONDS: int = int(os.getenv("REMOTE_READ_MIN_WINDOW_SECONDS", str(7 * 24 * 3600)))
+REMOTE_READ_LOOKBACK_SECONDS: int = int(os.getenv("REMOTE_READ_LOOKBACK_SECONDS", "300"))
+REMOTE_READ_STREAMED: bool = os.getenv("REMOTE_READ_STREAMED", "true").lower() == "true"
+
+# Analysis prompts use server-side stats; their charts are fetched with at most
+# this many points per series
+CHART_MAX_POINTS: int = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+# Latency percentiles derived client-side from one vllm:e2e_request_latency_seconds_bucket fetch
+LATENCY_QUANTILES: List[float] = [
+    float(q) for q in os.getenv("LATENCY_QUANTILES", "0.5,0.95,0.99").split(",") if q.strip()
+]
+
+# Memoized AST rewrites (label injection, generated-PromQL repair) per process
+PROMQL_REWRITE_CACHE_SIZE: int = int(os.getenv("PROMQL_REWRITE_CACHE_SIZE", "4096"))
+
+# Local PromQL evaluation over cached raw samples (opt-in). The raw sample
+# store is filled only by priming: misses fetch raw samples (plus
+# PRIME_HISTORY of extra history) alongside the upstream query, after a
+# count_over_time() probe keeps them under MAX_SAMPLES. Priming follows
+# ENABLED unless PRIME_ON_MISS is set explicitly
+LOCAL_EVAL_ENABLED: bool = os.getenv("LOCAL_EVAL_ENABLED", "false").lower() == "true"
+LOCAL_EVAL_PRIME_ON_MISS: bool = os.getenv(
+    "LOCAL_EVAL_PRIME_ON_MISS", str(LOCAL_EVAL_ENABLED)
+).lower() == "true"
+LOCAL_EVAL_PRIME_HISTORY_SECONDS: int = int(os.getenv("LOCAL_EVAL_PRIME_HISTORY_SECONDS", "3600"))
+LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS: int = int(os.getenv("LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS", str(24 * 3600)))
+LOCAL_EVAL_MAX_SAMPLES: int = int(os.getenv("LOCAL_EVAL_MAX_SAMPLES", "500000"))
+LOCAL_EVAL_MAX_STALENESS_SECONDS: int = int(os.getenv("LOCAL_EVAL_MAX_STALENESS_SECONDS", "60"))
+LOCAL_EVAL_MAX_BYTES: int = int(os.getenv("LOCAL_EVAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Pre-execution cardinality guard for ad-hoc (LLM-generated) PromQL: a count()
+# probe estimates the result size; queries above MAX_SERIES are wrapped in
+# topk(TOPK, ...) and queries above REFUSE_SERIES are refused with a suggestion
+QUERY_GUARD_ENABLED: bool = os.getenv("QUERY_GUARD_ENABLED", "true").lower() == "true"
+QUERY_GUARD_MAX_SERIES: int = int(os.getenv("QUERY_GUARD_MAX_SERIES", "500"))
+QUERY_GUARD_REFUSE_SERIES: int = int(os.getenv("QUERY_GUARD_REFUSE_SERIES", "20000"))
+QUERY_GUARD_TOPK: int = int(os.getenv("QUERY_GUARD_TOPK", "50"))
+QUERY_GUARD_MAX_POINTS: int = int(os.getenv("QUERY_GUARD_MAX_POINTS", "100000"))
+QUERY_GUARD_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("QUERY_GUARD_PROBE_TIMEOUT_SECONDS", "5"))
+
+# In-memory vLLM series discovery index (models/namespaces) and its refresh cadence
+DISCOVERY_REFRESH_INTERVAL_SECONDS: int = int(os.getenv("DISCOVERY_REFRESH_INTERVAL_SECONDS", "60"))
+DISCOVERY_WINDOW_SECONDS: int = int(os.getenv("DISCOVERY_WINDOW_SECONDS", str(7 * 24 * 3600)))
+
+# Process-wide metric-name catalog: served stale and revalidated in the background after this age
+METRIC_CATALOG_TTL_SECONDS: int = int(os.getenv("METRIC_CATALOG_TTL_SECONDS", "300"))
+# Bulk metric metadata (type/help/unit) map, refreshed the same way
+METRIC_METADATA_TTL_SECONDS: int = int(os.getenv("METRIC_METADATA_TTL_SECONDS", "600"))
+
 # Load complex configurations
 MODEL_CONFIG = load_model_config()
 THANOS_TOKEN = load_thanos_token()
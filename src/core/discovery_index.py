@@ -0,0 +1,146 @@
+"""
+In-memory index of vLLM deployments discovered from Prometheus series.
+
+Listing models and namespaces used to scan /api/v1/series once per metric and
+time window on every tool call. The index instead issues a single series
+request (one combined ``match[]`` selector over the widest window), derives
+the (namespace, model_name) pairs both listings need, and refreshes them in
+a background thread. Tool calls read from memory; only the very first call
+waits for the initial load.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+from .config import DISCOVERY_REFRESH_INTERVAL_SECONDS, DISCOVERY_WINDOW_SECONDS
+from .http_client import PrometheusClient, get_prometheus_client
+
+logger = logging.getLogger(__name__)
+
+# vLLM metrics whose series carry namespace/model_name labels
+VLLM_DISCOVERY_METRICS = [
+    "vllm:request_prompt_tokens_created",
+    "vllm:request_prompt_tokens_total",
+    "vllm:avg_generation_throughput_toks_per_s",
+    "vllm:num_requests_running",
+    "vllm:gpu_cache_usage_perc",
+]
+
+DeploymentPair = Tuple[str, str]
+
+
+def build_discovery_selector(metric_names: List[str]) -> str:
+    """Return one series selector matching any of the metrics with both labels set."""
+    names = "|".join(metric_names)
+    return f'{{__name__=~"{names}",namespace!="",model_name!=""}}'
+
+
+class SeriesDiscoveryIndex:
+    """Background-refreshed set of (namespace, model_name) pairs."""
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], PrometheusClient]] = None,
+        metric_names: Optional[List[str]] = None,
+        window_seconds: int = DISCOVERY_WINDOW_SECONDS,
+        refresh_interval: float = DISCOVERY_REFRESH_INTERVAL_SECONDS,
+        background: bool = True,
+    ):
+        self.client_factory = client_factory
+        self.metric_names = list(metric_names or VLLM_DISCOVERY_METRICS)
+        self.window_seconds = window_seconds
+        self.refresh_interval = refresh_interval
+        self.background = background
+        self._pairs: Optional[FrozenSet[DeploymentPair]] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.refreshes = 0
+
+    def refresh(self) -> FrozenSet[DeploymentPair]:
+        """Fetch series once and rebuild the pair set.
+
+        On failure the previous pairs are kept; the error is re-raised only
+        when nothing has been loaded yet.
+        """
+        end = int(time.time())
+        try:
+            client = (self.client_factory or get_prometheus_client)()
+            series = client.series(
+                build_discovery_selector(self.metric_names),
+                start=end - self.window_seconds,
+                end=end,
+            ).get("data", [])
+        except Exception as e:
+            if self._pairs is None:
+                raise
+            logger.warning("Series discovery refresh failed, keeping previous index: %s", e)
+            return self._pairs
+
+        pairs = set()
+        for entry in series or []:
+            namespace = (entry.get("namespace") or "").strip()
+            model = (entry.get("model_name") or "").strip()
+            if namespace and model:
+                pairs.add((namespace, model))
+        with self._lock:
+            self._pairs = frozenset(pairs)
+            self._refreshed_at = time.time()
+            self.refreshes += 1
+        logger.debug("Series discovery index refreshed: %d deployment(s)", len(pairs))
+        return self._pairs
+
+    def pairs(self) -> FrozenSet[DeploymentPair]:
+        """Return the indexed pairs, loading synchronously on first use."""
+        stale = time.time() - self._refreshed_at >= self.refresh_interval
+        if self._pairs is None or (stale and not self.background):
+            self.refresh()
+        self._ensure_refresher()
+        return self._pairs or frozenset()
+
+    def models(self) -> List[str]:
+        """Return "namespace | model_name" entries, sorted."""
+        return sorted(f"{namespace} | {model}" for namespace, model in self.pairs())
+
+    def namespaces(self) -> List[str]:
+        """Return namespaces with at least one vLLM model, sorted."""
+        return sorted({namespace for namespace, _model in self.pairs()})
+
+    def _ensure_refresher(self) -> None:
+        if not self.background or (self._refresher is not None and self._refresher.is_alive()):
+            return
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="series-discovery-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Series discovery refresh failed: %s", e)
+
+    def clear(self) -> None:
+        """Stop background refreshes and drop the index."""
+        self._stop.set()
+        with self._lock:
+            self._pairs = None
+            self._refreshed_at = 0.0
+            self._refresher = None
+            self.refreshes = 0
+
+
+_discovery_index = SeriesDiscoveryIndex()
+
+
+def get_discovery_index() -> SeriesDiscoveryIndex:
+    """Return the process-wide series discovery index."""
+    return _discovery_index
@@ -0,0 +1,250 @@
+"""
+Group-by fan-in of per-entity PromQL queries.
+
+Fleet views ask the same question once per namespace or model
+(``sum(rate(vllm:x{model_name="a"}[5m]))``, then ``...="b"``, ...). This
+module rewrites such a query family into one query that keeps the entity
+labels in every aggregation (``sum by (namespace, model_name) (...)``),
+scoped to the wanted entities with regex matchers, and splits the result
+back into one SeriesSet per entity. A fleet of N deployments then costs one
+query per metric instead of N.
+
+These are building blocks: no view fetches a fleet of models yet, so no
+production path calls them.
+
+Series that carry none of the entity labels (e.g. cluster-wide GPU metrics
+summed with ``by ()``) are shared: they are attributed to every entity, just
+like the per-entity query would have returned them.
+
+An entity may leave a label open (None), e.g. a model selected without its
+namespace. Its per-entity query aggregates across that label, while the
+grouped query returns one row per value; split_series re-aggregates those
+rows with the query's outer aggregation. Only sum, count, min, max and group
+combine that way, and only without a nested aggregation underneath, so
+fan_in_query refuses other queries for such entities.
+"""
+
+import re
+from dataclasses import replace
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import PROMQL_REWRITE_CACHE_SIZE
+from .promql_parser import (
+    SET_OPS,
+    Aggregation,
+    BinaryOp,
+    Call,
+    LabelMatcher,
+    Node,
+    Paren,
+    VectorSelector,
+    children,
+    format_promql,
+    iter_selectors,
+    parse_promql,
+    transform,
+)
+from .timeseries import SeriesSet
+
+# One entity per label of ``by``; None matches any value of that label
+Entity = Tuple[Optional[str], ...]
+
+# Functions whose result drops all labels, so per-entity results can't be split
+_LABEL_DROPPING_FUNCTIONS = frozenset({"scalar", "vector", "absent", "absent_over_time"})
+
+# Outer aggregation -> how to combine its per-group results into one
+_REAGGREGATE = {
+    "sum": np.nansum, "count": np.nansum, "min": np.fmin.reduce, "max": np.fmax.reduce, "group": np.fmax.reduce,
+}
+
+
+class FanInUnsupported(ValueError):
+    """Raised when a query cannot be grouped by entity labels."""
+
+
+def _carries(node: Node, metric_prefix: Optional[str]) -> bool:
+    """Whether a sub-expression selects entity-labelled series."""
+    return any(
+        not metric_prefix or (selector.name or "").startswith(metric_prefix)
+        for selector in iter_selectors(node)
+    )
+
+
+@lru_cache(maxsize=PROMQL_REWRITE_CACHE_SIZE)
+def _group(query: str, by: Tuple[str, ...], metric_prefix: Optional[str]) -> str:
+    def widen(node: Node) -> Node:
+        if isinstance(node, Call) and node.func in _LABEL_DROPPING_FUNCTIONS:
+            raise FanInUnsupported(f"{node.func}() drops the entity labels")
+        if isinstance(node, Aggregation) and _carries(node.expr, metric_prefix):
+            if node.without:
+                grouping = tuple(name for name in node.grouping if name not in by)
+            else:
+                grouping = node.grouping + tuple(name for name in by if name not in node.grouping)
+            return replace(node, grouping=grouping, has_grouping=bool(grouping) or node.without)
+        if not isinstance(node, BinaryOp):
+            return node
+        if node.matching == "on":
+            labels = node.matching_labels + tuple(name for name in by if name not in node.matching_labels)
+            return replace(node, matching_labels=labels)
+        if node.matching == "ignoring":
+            return replace(node, matching_labels=tuple(name for name in node.matching_labels if name not in by))
+        lhs, rhs = _carries(node.lhs, metric_prefix), _carries(node.rhs, metric_prefix)
+        lhs_vector, rhs_vector = _carries(node.lhs, None), _carries(node.rhs, None)
+        if node.op not in SET_OPS and lhs_vector and rhs_vector and lhs != rhs:
+            # Only one side is per entity: match the shared side to every entity
+            return replace(node, matching="on", matching_labels=(), group="group_left" if lhs else "group_right")
+        return node
+
+    return format_promql(transform(parse_promql(query), widen))
+
+
+def _aggregations(node: Node, metric_prefix: Optional[str]) -> Iterable[Aggregation]:
+    """Yield the aggregations over entity-labelled series, outermost first."""
+    if isinstance(node, Aggregation) and _carries(node.expr, metric_prefix):
+        yield node
+    for child in children(node):
+        yield from _aggregations(child, metric_prefix)
+
+
+@lru_cache(maxsize=PROMQL_REWRITE_CACHE_SIZE)
+def _reaggregation(query: str, by: Tuple[str, ...], metric_prefix: Optional[str]) -> Tuple[FrozenSet[str], Optional[str]]:
+    """Return the ``by`` labels grouping adds, and the outer aggregation that can recombine them."""
+    root = parse_promql(query)
+    aggregations = list(_aggregations(root, metric_prefix))
+    added = set()
+    for node in aggregations:
+        if node.without:
+            added.update(name for name in by if name in node.grouping)
+        else:
+            added.update(name for name in by if name not in node.grouping)
+    while isinstance(root, Paren):
+        root = root.expr
+    combinable = (
+        len(aggregations) == 1 and aggregations[0] is root
+        and root.op in _REAGGREGATE and root.param is None
+    )
+    return frozenset(added), root.op if combinable else None
+
+
+def _open_labels(entity: Entity, by: Sequence[str], added: FrozenSet[str]) -> FrozenSet[str]:
+    """Labels left open by an entity that the grouped query splits on."""
+    return frozenset(name for name, value in zip(by, entity) if value is None and name in added)
+
+
+def group_query(query: str, by: Sequence[str], metric_prefix: Optional[str] = None) -> str:
+    """Rewrite a query so every aggregation and vector match keeps the ``by`` labels.
+
+    With ``metric_prefix``, only aggregations over matching metrics are
+    grouped; the other sides of binary expressions are treated as shared.
+
+    Raises:
+        PromQLSyntaxError: If the query does not parse
+        FanInUnsupported: If the query drops all labels (scalar(), absent(), ...)
+    """
+    return _group(query, tuple(by), metric_prefix)
+
+
+def _alternation(values: Iterable[str]) -> str:
+    return "|".join(re.escape(value) for value in sorted(set(values)))
+
+
+def scope_query(query: str, values: Mapping[str, Iterable[str]], metric_prefix: Optional[str] = None) -> str:
+    """Restrict every selector to the given label values with ``=~`` matchers.
+
+    Existing matchers on those labels are replaced. Labels without values are
+    left unscoped.
+
+    Args:
+        query: PromQL expression
+        values: Label name -> values to allow
+        metric_prefix: Only scope selectors whose metric name starts with this
+    """
+    scoped = {name: _alternation(vals) for name, vals in values.items()}
+    scoped = {name: pattern for name, pattern in scoped.items() if pattern}
+    if not scoped:
+        return query
+    matchers = tuple(LabelMatcher(name, "=~", pattern) for name, pattern in scoped.items())
+
+    def scope(node: Node) -> Node:
+        if not isinstance(node, VectorSelector):
+            return node
+        if metric_prefix and not (node.name or "").startswith(metric_prefix):
+            return node
+        kept = tuple(m for m in node.matchers if m.name not in scoped)
+        return replace(node, matchers=kept + matchers)
+
+    return format_promql(transform(parse_promql(query), scope))
+
+
+def fan_in_query(query: str, by: Sequence[str], entities: Sequence[Entity], metric_prefix: Optional[str] = None) -> str:
+    """Build the single grouped query answering ``query`` for all entities.
+
+    Raises:
+        PromQLSyntaxError: If the query does not parse
+        FanInUnsupported: If the query drops all labels, or an entity leaves
+            a label open and the grouped rows cannot be re-aggregated
+    """
+    grouped = group_query(query, by, metric_prefix)
+    added, op = _reaggregation(query, tuple(by), metric_prefix)
+    if op is None and any(_open_labels(entity, by, added) for entity in entities):
+        raise FanInUnsupported("cannot re-aggregate the rows of entities without a value for every label")
+    values: Dict[str, List[str]] = {name: [] for name in by}
+    unscoped = set()
+    for entity in entities:
+        for name, value in zip(by, entity):
+            if value is None:
+                unscoped.add(name)  # some entity spans every value of this label
+            else:
+                values[name].append(value)
+    scoped = {name: vals for name, vals in values.items() if name not in unscoped}
+    return scope_query(grouped, scoped, metric_prefix)
+
+
+def _combine(series: SeriesSet, rows: List[int], open_labels: FrozenSet[str], op: str) -> Tuple[np.ndarray, list]:
+    """Re-aggregate rows that differ only in open labels; shared rows are kept as is."""
+    groups: Dict[tuple, List[int]] = {}
+    for row in rows:
+        labels = series.labels[row]
+        if any(name in open_labels for name, _ in labels):
+            labels = tuple(pair for pair in labels if pair[0] not in open_labels)
+        groups.setdefault(labels, []).append(row)
+    values = np.empty((len(groups), series.values.shape[1]))
+    for index, members in enumerate(groups.values()):
+        block = series.values[members]
+        values[index] = np.where(np.isnan(block).all(axis=0), np.nan, _REAGGREGATE[op](block, axis=0))
+    return values, list(groups)
+
+
+def split_series(
+    series: SeriesSet, query: str, by: Sequence[str], entities: Sequence[Entity], metric_prefix: Optional[str] = None,
+) -> Dict[Entity, SeriesSet]:
+    """Split the result of fan_in_query(query, ...) into one SeriesSet per entity.
+
+    A series belongs to an entity when every ``by`` label it carries equals
+    the entity's value (None in the entity matches any value); series
+    without any ``by`` label belong to every entity. For entities with open
+    labels, the rows that grouping split apart are combined with the
+    query's outer aggregation.
+    """
+    added, op = _reaggregation(query, tuple(by), metric_prefix)
+    keys = [tuple(dict(labels).get(name) for name in by) for labels in series.labels]
+    result: Dict[Entity, SeriesSet] = {}
+    for entity in entities:
+        rows = [
+            row for row, key in enumerate(keys)
+            if all(have is None or want is None or have == want for have, want in zip(key, entity))
+        ]
+        if not rows:
+            result[entity] = SeriesSet.empty_set()
+            continue
+        open_labels = _open_labels(entity, by, added)
+        if open_labels and op is not None:
+            values, labels = _combine(series, rows, open_labels, op)
+        else:
+            values, labels = series.values[rows], [series.labels[row] for row in rows]
+        keep = ~np.isnan(values).all(axis=0)
+        result[entity] = SeriesSet(series.timestamps[keep], values[:, keep], labels)
+    return result
@@ -0,0 +1,124 @@
+"""
+Bounded-concurrency fetch engine for Prometheus/Thanos queries.
+
+Analyses issue one range query per metric. Running them one after another
+makes latency the sum of all queries, so this module fans them out over a
+thread pool while capping how many requests are in flight against each
+upstream across the whole process.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from .config import PROMETHEUS_URL, PROMETHEUS_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_upstream_slots: Dict[str, threading.BoundedSemaphore] = {}
+_upstream_slots_lock = threading.Lock()
+_held = threading.local()
+
+
+def _get_upstream_slots(upstream: str) -> threading.BoundedSemaphore:
+    """Return the process-wide semaphore limiting in-flight calls to an upstream."""
+    with _upstream_slots_lock:
+        slots = _upstream_slots.get(upstream)
+        if slots is None:
+            slots = threading.BoundedSemaphore(max(1, PROMETHEUS_MAX_CONCURRENCY))
+            _upstream_slots[upstream] = slots
+        return slots
+
+
+def _held_slots() -> Dict[str, int]:
+    """Return the number of slots the current thread holds per upstream."""
+    held = getattr(_held, "slots", None)
+    if held is None:
+        held = _held.slots = {}
+    return held
+
+
+@contextmanager
+def upstream_slot(upstream: str = PROMETHEUS_URL) -> Iterator[None]:
+    """Hold one concurrency slot for the given upstream while the block runs."""
+    slots = _get_upstream_slots(upstream)
+    slots.acquire()
+    held = _held_slots()
+    held[upstream] = held.get(upstream, 0) + 1
+    try:
+        yield
+    finally:
+        held[upstream] -= 1
+        slots.release()
+
+
+@contextmanager
+def lend_upstream_slot(upstream: str = PROMETHEUS_URL) -> Iterator[None]:
+    """Give up this thread's slot for an upstream while the block runs.
+
+    A logical query holding a slot that fans out into sub-requests (e.g.
+    time shards) lends its slot for the duration, so the sub-requests take
+    slots of their own without being counted twice or waiting on the
+    caller's slot. The slot is re-acquired afterwards.
+    """
+    held = _held_slots()
+    if not held.get(upstream):
+        yield
+        return
+    slots = _get_upstream_slots(upstream)
+    held[upstream] -= 1
+    slots.release()
+    try:
+        yield
+    finally:
+        slots.acquire()
+        held[upstream] += 1
+
+
+def fetch_concurrently(
+    calls: Dict[str, Callable[[], T]],
+    max_workers: Optional[int] = None,
+    upstream: str = PROMETHEUS_URL,
+) -> Dict[str, T]:
+    """Run fetch callables in parallel and return their results by key.
+
+    Results keep the key order of ``calls``. Error semantics are those of the
+    callables: if one raises, the pending calls are cancelled and the first
+    exception (in key order) is re-raised to the caller.
+
+    Args:
+        calls: Mapping of label -> zero-argument callable performing one fetch
+        max_workers: Thread pool size (defaults to the per-upstream cap)
+        upstream: Upstream identifier used for the shared concurrency cap
+
+    Returns:
+        Mapping of label -> callable result
+    """
+    if not calls:
+        return {}
+    if len(calls) == 1:
+        label, call = next(iter(calls.items()))
+        with upstream_slot(upstream):
+            return {label: call()}
+
+    def _run(call: Callable[[], T]) -> T:
+        with upstream_slot(upstream):
+            return call()
+
+    workers = min(len(calls), max_workers or PROMETHEUS_MAX_CONCURRENCY)
+    logger.debug("Fetching %d queries with %d workers", len(calls), workers)
+    results: Dict[str, T] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {label: executor.submit(_run, call) for label, call in calls.items()}
+        try:
+            for label, future in futures.items():
+                results[label] = future.result()
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+    return results
@@ -0,0 +1,166 @@
+"""
+Client-side histogram quantiles over classic Prometheus bucket series.
+
+A server-side ``histogram_quantile(0.95, ...)`` answers exactly one
+percentile for exactly one grouping, so asking for p50/p90/p99 or a per-pod
+breakdown repeats the full range query. LatencyHistogram instead keeps the
+bucket rates of one ``sum(rate(..._bucket[5m])) by (le, ...)`` fetch as a
+(groups, buckets, timestamps) array, and evaluates any set of quantiles,
+for any coarser grouping, with vectorized numpy interpolation that follows
+Prometheus' own bucketQuantile rules.
+"""
+
+import math
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .timeseries import SeriesSet
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _parse_le(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def bucket_quantiles(quantiles: Sequence[float], upper_bounds: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Evaluate quantiles over cumulative bucket counts.
+
+    Args:
+        quantiles: Quantiles to compute (0..1; outside yields -Inf/+Inf)
+        upper_bounds: Sorted bucket upper bounds ending with +Inf, shape (B,)
+        counts: Cumulative counts per bucket, shape (B, N); NaN marks no data
+
+    Returns:
+        Array of shape (Q, N); NaN where there is no data or no observations.
+    """
+    q = np.asarray(quantiles, dtype=np.float64)
+    n = counts.shape[1] if counts.ndim == 2 else 0
+    out = np.full((q.size, n), np.nan)
+    if n == 0 or upper_bounds.size < 2 or not np.isposinf(upper_bounds[-1]):
+        return out
+
+    missing = np.isnan(counts).all(axis=0)
+    counts = np.maximum.accumulate(np.nan_to_num(counts, nan=0.0), axis=0)  # ensure monotonic
+    total = counts[-1]
+    rank = q[:, None] * total[None, :]  # (Q, N)
+
+    # First bucket (excluding +Inf) whose cumulative count reaches the rank
+    reached = counts[None, :-1, :] >= rank[:, None, :]  # (Q, B-1, N)
+    b = np.where(reached.any(axis=1), reached.argmax(axis=1), upper_bounds.size - 1)
+
+    cols = np.broadcast_to(np.arange(n), b.shape)
+    below = np.where(b > 0, counts[np.maximum(b - 1, 0), cols], 0.0)
+    in_bucket = counts[np.minimum(b, upper_bounds.size - 1), cols] - below
+    start = np.where(b > 0, upper_bounds[np.maximum(b - 1, 0)], 0.0)
+    end = upper_bounds[np.minimum(b, upper_bounds.size - 1)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = start + (end - start) * ((rank - below) / in_bucket)
+    out = np.where(b == upper_bounds.size - 1, upper_bounds[-2], out)
+    out = np.where((b == 0) & (upper_bounds[0] <= 0), upper_bounds[0], out)
+    out = np.where((total == 0)[None, :] | missing[None, :], np.nan, out)
+    out[q < 0] = -np.inf
+    out[q > 1] = np.inf
+    out[np.isnan(q)] = np.nan
+    return out
+
+
+class LatencyHistogram:
+    """Bucket rates of one histogram fetch, grouped by a set of labels.
+
+    ``rates`` has shape (groups, buckets, timestamps); NaN marks timestamps
+    where a group has no bucket data.
+    """
+
+    __slots__ = ("timestamps", "upper_bounds", "rates", "groups", "by")
+
+    def __init__(self, timestamps: np.ndarray, upper_bounds: np.ndarray, rates: np.ndarray,
+                 groups: Sequence[Labels], by: Sequence[str]):
+        self.timestamps = timestamps
+        self.upper_bounds = upper_bounds
+        self.rates = rates
+        self.groups = tuple(groups)
+        self.by = tuple(by)
+
+    @classmethod
+    def from_series(cls, series: SeriesSet, by: Iterable[str] = ()) -> "LatencyHistogram":
+        """Sum bucket series into groups of ``by`` labels (like ``sum by (le, ...)``)."""
+        by = tuple(by)
+        bounds: Dict[float, int] = {}
+        group_index: Dict[Labels, int] = {}
+        keys: List[Tuple[int, int]] = []
+        for labels in series.labels:
+            label_map = dict(labels)
+            le = _parse_le(label_map.get("le"))
+            if math.isnan(le):
+                keys.append((-1, -1))
+                continue
+            group = tuple((name, label_map[name]) for name in by if name in label_map)
+            keys.append((group_index.setdefault(group, len(group_index)), bounds.setdefault(le, len(bounds))))
+
+        upper_bounds = np.array(sorted(bounds), dtype=np.float64)
+        order = np.searchsorted(upper_bounds, np.array(list(bounds), dtype=np.float64))
+        rates = np.zeros((len(group_index), upper_bounds.size, series.timestamps.size))
+        present = np.zeros(rates.shape, dtype=bool)
+        for (group, bucket), row in zip(keys, series.values):
+            if group < 0:
+                continue
+            slot = order[bucket]
+            has = ~np.isnan(row)
+            rates[group, slot, has] += row[has]
+            present[group, slot] |= has
+        rates[~present] = np.nan
+        return cls(series.timestamps, upper_bounds, rates, list(group_index), by)
+
+    def regroup(self, by: Iterable[str] = ()) -> "LatencyHistogram":
+        """Aggregate into a coarser grouping (e.g. per-pod -> per-model) without refetching."""
+        by = tuple(name for name in by if name in self.by)
+        group_index: Dict[Labels, int] = {}
+        targets = [
+            group_index.setdefault(tuple(item for item in labels if item[0] in by), len(group_index))
+            for labels in self.groups
+        ]
+        shape = (len(group_index),) + self.rates.shape[1:]
+        rates = np.zeros(shape)
+        present = np.zeros(shape, dtype=bool)
+        for source, target in enumerate(targets):
+            has = ~np.isnan(self.rates[source])
+            rates[target][has] += self.rates[source][has]
+            present[target] |= has
+        rates[~present] = np.nan
+        return LatencyHistogram(self.timestamps, self.upper_bounds, rates, list(group_index), by)
+
+    @property
+    def empty(self) -> bool:
+        return not self.groups or self.timestamps.size == 0
+
+    def quantile_matrix(self, quantiles: Sequence[float]) -> np.ndarray:
+        """Return quantile values with shape (Q, groups, timestamps)."""
+        groups, buckets, steps = self.rates.shape
+        counts = self.rates.transpose(1, 0, 2).reshape(buckets, groups * steps)
+        return bucket_quantiles(quantiles, self.upper_bounds, counts).reshape(len(quantiles), groups, steps)
+
+    def quantiles(self, quantiles: Sequence[float]) -> Dict[float, SeriesSet]:
+        """Return one SeriesSet per quantile with a series per group.
+
+        Like the server-side result after JSON decoding, timestamps without
+        observations yield 0.0 and timestamps without bucket data are absent.
+        """
+        if self.empty:
+            return {q: SeriesSet.empty_set() for q in quantiles}
+        matrix = self.quantile_matrix(quantiles)
+        no_data = np.isnan(self.rates).all(axis=1)  # (groups, timestamps)
+        result: Dict[float, SeriesSet] = {}
+        for q, values in zip(quantiles, matrix):
+            values = np.where(np.isnan(values), 0.0, values)  # NaN can't be JSON serialized
+            values[no_data] = np.nan
+            result[q] = SeriesSet(self.timestamps, values, self.groups)
+        return result
+
+    def quantile(self, q: float) -> SeriesSet:
+        """Return the q-quantile per group as a SeriesSet."""
+        return self.quantiles([q])[q]
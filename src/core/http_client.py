@@ -7,11 +7,30 @@ to various observability services (Tempo, Prometheus, Thanos, etc.).
 
 import httpx
 import requests
+import threading
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 import logging
 
-from .config import VERIFY_SSL, K8S_SERVICE_ACCOUNT_TOKEN_PATH, DEV_FALLBACK_TOKEN
+from .config import (
+    VERIFY_SSL,
+    K8S_SERVICE_ACCOUNT_TOKEN_PATH,
+    DEV_FALLBACK_TOKEN,
+    PROMETHEUS_URL,
+    THANOS_TOKEN,
+    REQUEST_TIMEOUT_SECONDS,
+    PROMETHEUS_POOL_CONNECTIONS,
+    PROMETHEUS_POOL_MAXSIZE,
+    STREAM_DECODE_CHUNK_BYTES,
+)
+from .query_cache import get_query_cache
+from .resilience import ResilientCaller
+from .series_store import step_to_seconds
+from .singleflight import SingleFlight
+from .stream_decode import MatrixStreamDecoder, StreamDecodeError
+from .thanos_routing import get_routing_policy
+from .timeseries import SeriesSet
 
 logger = logging.getLogger(__name__)
 
@@ -240,10 +259,36 @@ class TempoClient(HTTPClient):
             raise
 
 
+def _window_seconds(params: Optional[Dict]) -> float:
+    """Return end - start of a query's parameters, or 0 when not a range."""
+    try:
+        return max(0.0, float(params["end"]) - float(params["start"]))
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
 class PrometheusClient(HTTPClient):
-    """Specialized HTTP client for Prometheus/Thanos APIs."""
+    """Specialized HTTP client for Prometheus/Thanos APIs.
+
+    All requests go through one keep-alive ``requests.Session`` with a sized
+    connection pool, so repeated queries reuse TCP/TLS connections instead of
+    paying a fresh handshake per call. Responses are requested gzip-encoded.
+    Concurrent identical requests are coalesced into one upstream call whose
+    result every caller shares (see ``coalescing_stats``). Each upstream call
+    goes through the resilience layer: adaptive timeouts, hedging of slow
+    requests and a circuit breaker that fails fast with PrometheusError
+    (see ``resilience_stats``).
+    """
     
-    def __init__(self, prometheus_url: str, token: Optional[str] = None, timeout: float = 30.0):
+    def __init__(
+        self,
+        prometheus_url: str,
+        token: Optional[str] = None,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+        verify_ssl: Union[bool, str] = VERIFY_SSL,
+        pool_connections: int = PROMETHEUS_POOL_CONNECTIONS,
+        pool_maxsize: int = PROMETHEUS_POOL_MAXSIZE,
+    ):
         """
         Initialize Prometheus client.
         
@@ -251,65 +296,285 @@ class PrometheusClient(HTTPClient):
             prometheus_url: Base URL for Prometheus/Thanos service
             token: Optional authentication token
             timeout: Request timeout in seconds
+            verify_ssl: Whether to verify SSL certificates (or a CA bundle path)
+            pool_connections: Number of per-host connection pools to cache
+            pool_maxsize: Maximum keep-alive connections per pool
         """
-        super().__init__(prometheus_url, timeout)
+        super().__init__(prometheus_url, timeout, verify_ssl)
         self.token = token
+        self.session = self._build_session(pool_connections, pool_maxsize)
+        self.inflight = SingleFlight()
+        self.resilience = ResilientCaller(self.base_url, default_timeout=timeout, max_workers=pool_maxsize)
+    
+    def _build_session(self, pool_connections: int, pool_maxsize: int) -> requests.Session:
+        """Create the pooled keep-alive session used for every request."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        return session
     
     def _get_prometheus_headers(self) -> Dict[str, str]:
-        """Get headers specific to Prometheus API requests."""
+        """Get headers specific to Prometheus API requests.
+
+        A token that looks like a filesystem path (an unresolved THANOS_TOKEN
+        default) is not sent, since local Prometheus rejects it.
+        """
         headers = {}
-        
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
+        token = (self.token or "").strip()
+        if token and not token.startswith("/") and not token.lower().startswith("file:"):
+            headers["Authorization"] = f"Bearer {token}"
         
         return headers
     
-    def query_range(self, query: str, start: int, end: int, step: str = "15m") -> Dict[str, Any]:
+    def get_sync(self, endpoint: str, params: Optional[Dict] = None,
+                headers: Optional[Dict] = None, use_auth: bool = True,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Make synchronous GET request over the pooled session.
+        
+        Args:
+            endpoint: API endpoint (without base URL)
+            params: Query parameters
+            headers: Additional headers
+            use_auth: Whether to include authentication
+            timeout: Optional per-request timeout overriding the adaptive one
+            
+        Returns:
+            Response data as dictionary (shared with coalesced callers; do not mutate)
+
+        Raises:
+            PrometheusError: While the circuit breaker is open
+            requests.exceptions.RequestException: On connection, timeout or HTTP errors
+        """
+        url = f"{self.base_url}{endpoint}"
+        request_headers = self._get_prometheus_headers() if use_auth else {}
+        
+        if headers:
+            request_headers.update(headers)
+
+        def _send(request_timeout: float) -> Dict[str, Any]:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=request_headers,
+                verify=self.verify_ssl,
+                timeout=request_timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+
+        def _fetch() -> Dict[str, Any]:
+            return self.resilience.call(endpoint, _send, _window_seconds(params), timeout)
+
+        return self.inflight.do(self._request_key(url, params, request_headers), _fetch)
+
+    @staticmethod
+    def _request_key(url: str, params: Optional[Dict], headers: Dict[str, str], *extra: Any) -> tuple:
+        """Identity of a request for coalescing: URL, parameters and headers."""
+        param_items = tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+        return (url, param_items, tuple(sorted(headers.items()))) + extra
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Return counters for requests deduplicated by in-flight coalescing."""
+        return self.inflight.stats()
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Return per-endpoint latency percentiles, circuit state and hedging counters."""
+        return self.resilience.stats()
+    
+    def _range_params(self, query: str, start: int, end: int, step: str,
+                      window_seconds: Optional[int]) -> Dict[str, Any]:
+        """Build query_range parameters including Thanos resolution routing."""
+        params: Dict[str, Any] = {
+            "query": query,
+            "start": start,
+            "end": end,
+            "step": step
+        }
+        params.update(get_routing_policy().params_for(start, end, step, window_seconds, query))
+        return params
+
+    @staticmethod
+    def _range_cache_key(cache, params: Dict[str, Any]) -> tuple:
+        routing = tuple(sorted((k, v) for k, v in params.items() if k not in ("query", "start", "end", "step")))
+        return cache.make_key(params["query"], params["start"], params["end"], params["step"]) + routing
+
+    def query_range(self, query: str, start: int, end: int, step: str = "15m",
+                    timeout: Optional[float] = None,
+                    window_seconds: Optional[int] = None) -> Dict[str, Any]:
         """
         Execute PromQL range query.
+
+        Successful results are served from and stored in the process-wide
+        range-query cache; the returned payload must not be mutated.
         
         Args:
             query: PromQL query string
             start: Start timestamp
             end: End timestamp
             step: Query step interval
+            timeout: Optional per-request timeout
+            window_seconds: Length of the logical window when this request is
+                one shard of a longer query (drives Thanos resolution routing)
             
         Returns:
             Query response data
         """
+        cache = get_query_cache()
+        params = self._range_params(query, start, end, step, window_seconds)
+        cache_key = self._range_cache_key(cache, params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        data = self.get_sync("/api/v1/query_range", params=params, timeout=timeout)
+        if isinstance(data, dict) and data.get("status") == "success":
+            cache.put(cache_key, data, cache.ttl_for_window(end))
+        return data
+    
+    def query_range_series(self, query: str, start: int, end: int, step: str = "15m",
+                           timeout: Optional[float] = None,
+                           window_seconds: Optional[int] = None) -> SeriesSet:
+        """
+        Execute PromQL range query, stream-decoding the body into a SeriesSet.
+
+        The response is read in chunks and parsed incrementally into numpy
+        arrays, so no JSON object graph of the full body is ever built. Use
+        this for long windows; decoded results share the range-query cache.
+        
+        Args:
+            query: PromQL query string
+            start: Start timestamp
+            end: End timestamp
+            step: Query step interval
+            timeout: Optional per-request timeout
+            window_seconds: Length of the logical window when this request is
+                one shard of a longer query (drives Thanos resolution routing)
+            
+        Returns:
+            Decoded series (must not be mutated)
+
+        Raises:
+            requests.exceptions.RequestException: On connection, timeout or HTTP
+                errors, and InvalidJSONError for malformed bodies
+        """
+        cache = get_query_cache()
+        params = self._range_params(query, start, end, step, window_seconds)
+        cache_key = self._range_cache_key(cache, params) + ("series",)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            endpoint = "/api/v1/query_range"
-            params = {
-                "query": query,
-                "start": start,
-                "end": end,
-                "step": step
-            }
-            response = self.get_sync(endpoint, params=params, headers=self._get_prometheus_headers())
-            return response
-        except Exception as e:
-            logger.error(f"Error executing PromQL range query: {e}")
-            raise
+            expected_points = (int(end) - int(start)) // step_to_seconds(step) + 1
+        except ValueError:
+            expected_points = 0
+        url = f"{self.base_url}/api/v1/query_range"
+        headers = self._get_prometheus_headers()
+
+        def _send(request_timeout: float) -> SeriesSet:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                verify=self.verify_ssl,
+                timeout=request_timeout,
+                stream=True,
+            )
+            try:
+                response.raise_for_status()
+                decoder = MatrixStreamDecoder(expected_points)
+                for chunk in response.iter_content(chunk_size=STREAM_DECODE_CHUNK_BYTES):
+                    decoder.feed(chunk)
+                decoded = decoder.finish()
+            except StreamDecodeError as e:
+                raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+            finally:
+                response.close()
+            logger.debug("Stream-decoded %d bytes into %d series", decoder.bytes_read, len(decoded.labels))
+            return decoded
+
+        def _fetch() -> SeriesSet:
+            # Streamed bodies are not hedged: a duplicate would double the transfer
+            decoded = self.resilience.call(
+                "/api/v1/query_range", _send, _window_seconds(params), timeout, hedge=False
+            )
+            cache.put(cache_key, decoded, cache.ttl_for_window(end))
+            return decoded
+
+        return self.inflight.do(self._request_key(url, params, headers, "series"), _fetch)
     
-    def query_instant(self, query: str, time: Optional[int] = None) -> Dict[str, Any]:
+    def query_instant(self, query: str, time: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Execute PromQL instant query.
         
         Args:
             query: PromQL query string
             time: Optional timestamp for instant query
+            timeout: Optional per-request timeout
             
         Returns:
             Query response data
         """
-        try:
-            endpoint = "/api/v1/query"
-            params = {"query": query}
-            if time:
-                params["time"] = time
+        params = {"query": query}
+        if time:
+            params["time"] = time
+        
+        return self.get_sync("/api/v1/query", params=params, timeout=timeout)
+    
+    def series(self, match: Union[str, List[str]], start: Optional[int] = None,
+               end: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Find series matching one or more selectors via /api/v1/series.
+        
+        Args:
+            match: Series selector or list of selectors (sent as match[])
+            start: Optional start timestamp
+            end: Optional end timestamp
             
-            response = self.get_sync(endpoint, params=params, headers=self._get_prometheus_headers())
-            return response
-        except Exception as e:
-            logger.error(f"Error executing PromQL instant query: {e}")
-            raise
+        Returns:
+            Query response data
+        """
+        params: Dict[str, Any] = {"match[]": match}
+        if start is not None:
+            params["start"] = start
+        if end is not None:
+            params["end"] = end
+        return self.get_sync("/api/v1/series", params=params)
+    
+    def label_values(self, label: str) -> Dict[str, Any]:
+        """
+        Get all values of a label via /api/v1/label/<label>/values.
+        
+        Args:
+            label: Label name (e.g. "__name__" or "namespace")
+            
+        Returns:
+            Query response data
+        """
+        return self.get_sync(f"/api/v1/label/{label}/values")
+
+
+_prometheus_client: Optional[PrometheusClient] = None
+_prometheus_client_lock = threading.Lock()
+
+
+def get_prometheus_client() -> PrometheusClient:
+    """Return the process-wide pooled Prometheus/Thanos client.
+
+    Every core module shares this instance so connections stay warm across
+    analyses, chat turns and tool calls.
+    """
+    global _prometheus_client
+    if _prometheus_client is None:
+        with _prometheus_client_lock:
+            if _prometheus_client is None:
+                _prometheus_client = PrometheusClient(PROMETHEUS_URL, token=THANOS_TOKEN)
+    return _prometheus_client
@@ -22,6 +22,9 @@ get_python_logger()
 
 logger = logging.getLogger(__name__)
 from .response_validator import ResponseValidator, ResponseType
+from .promql_rewrite import inject_matchers, repair_promql
+from .timeseries import summarize_metric
+from .analysis import analyze_metrics
 
 # LLM Generation Configuration Constants
 DETERMINISTIC_TEMPERATURE = 0  # Zero temperature for consistent, deterministic output
@@ -355,15 +358,16 @@ Current Analysis Time: {current_time}
 METRICS DATA:
 """
     
-    for metric_name, df in metric_dfs.items():
-        if df is not None and not df.empty:
+    for metric_name, data in metric_dfs.items():
+        stats = summarize_metric(data)
+        if stats is not None:
             prompt += f"\n=== {metric_name.upper()} ===\n"
-            # Add DataFrame summary
-            prompt += f"Data points: {len(df)}\n"
-            if 'value' in df.columns:
-                prompt += f"Latest value: {df['value'].iloc[-1] if len(df) > 0 else 'N/A'}\n"
-                prompt += f"Average: {df['value'].mean():.2f}\n"
-                prompt += f"Min: {df['value'].min():.2f}, Max: {df['value'].max():.2f}\n"
+            # Add series summary
+            prompt += f"Data points: {stats['count']}\n"
+            if stats["avg"] is not None:
+                prompt += f"Latest value: {stats['latest']}\n"
+                prompt += f"Average: {stats['avg']:.2f}\n"
+                prompt += f"Min: {stats['min']:.2f}, Max: {stats['max']:.2f}\n"
     
     prompt += f"""
 
@@ -386,14 +390,31 @@ Please provide a clear, structured analysis that would be useful for both techni
     return prompt.strip()
 
 
+def _metric_summary_lines(metric_dfs) -> List[str]:
+    """One "Avg/Latest/Trend/anomaly" bullet per metric, analyzed in one batch."""
+    insights = analyze_metrics(metric_dfs)
+    lines = []
+    for label, data in metric_dfs.items():
+        stats = summarize_metric(data)
+        if stats is None or stats["avg"] is None:
+            lines.append(f"- {label}: No data")
+            continue
+        insight = insights[label]
+        lines.append(
+            f"- {label}: Avg={stats['avg']:.2f}, Latest={stats['latest']:.2f}, "
+            f"Trend={insight.trend}, {insight.anomaly}"
+        )
+    return lines
+
+
 def build_openshift_prompt(
     metric_dfs, metric_category, namespace=None, scope_description=None, log_trace_data: str = ""
 ):
     """
     Build prompt for OpenShift metrics analysis
-    
-    Note: This function depends on describe_trend() and detect_anomalies() 
-    which will be moved to core/metrics.py later.
+
+    Trend and anomaly lines come from one batch analyze_metrics() pass over
+    all metrics (SeriesSets, DataFrames or MetricStats).
     """
     if scope_description:
         scope = scope_description
@@ -403,21 +424,7 @@ def build_openshift_prompt(
     header = f"You are an expert in OpenShift platform monitoring and operations. You are evaluating OpenShift **{metric_category}** metrics and logs/traces for {scope}.\n\n📊 **Metrics**:\n"
     analysis_focus = f"{metric_category.lower()} performance and health"
 
-    lines = []
-    for label, df in metric_dfs.items():
-        if df.empty:
-            lines.append(f"- {label}: No data")
-            continue
-        avg = df["value"].mean()
-        latest = df["value"].iloc[-1] if not df.empty else 0
-        # TODO: Import these functions from core.metrics when available
-        # trend = describe_trend(df)
-        # anomaly = detect_anomalies(df, label)
-        trend = "stable"  # Placeholder
-        anomaly = "normal"  # Placeholder
-        lines.append(
-            f"- {label}: Avg={avg:.2f}, Latest={latest:.2f}, Trend={trend}, {anomaly}"
-        )
+    lines = _metric_summary_lines(metric_dfs)
 
     analysis_questions = f"""🔍 Please analyze:
 1. What's the current state of {analysis_focus}?
@@ -461,18 +468,7 @@ def build_openshift_metrics_context(
         f"📊 **Metrics**:\n"
     )
 
-    lines = []
-    for label, df in metric_dfs.items():
-        if df.empty:
-            lines.append(f"- {label}: No data")
-            continue
-        avg = df["value"].mean()
-        latest = df["value"].iloc[-1] if not df.empty else 0
-        trend = "stable"  # Placeholder until describe_trend is available
-        anomaly = "normal"  # Placeholder until detect_anomalies is available
-        lines.append(
-            f"- {label}: Avg={avg:.2f}, Latest={latest:.2f}, Trend={trend}, {anomaly}"
-        )
+    lines = _metric_summary_lines(metric_dfs)
 
     return f"""{header}
 {chr(10).join(lines)}
@@ -882,17 +878,9 @@ def extract_time_range(
 
 def add_namespace_filter(promql: str, namespace: str) -> str:
     """
-    Adds or enforces a `namespace="..."` filter in the PromQL query.
+    Adds or enforces a `namespace="..."` filter on every selector of the PromQL query.
     """
-    if f'namespace="{namespace}"' in promql:
-        return promql  # Already included
-
-    # If there's a label filter (e.g., `{job="vllm"}`), insert namespace
-    if "{" in promql:
-        return promql.replace("{", f'{{namespace="{namespace}", ', 1)
-    else:
-        # No label filter at all, add one
-        return f'{promql}{{namespace="{namespace}"}}'
+    return inject_matchers(promql, {"namespace": namespace})
 
 
 def fix_promql_syntax(promql: str, time_range_syntax: str = FALLBACK_RATE_SYNTAX) -> str:
@@ -901,56 +889,7 @@ def fix_promql_syntax(promql: str, time_range_syntax: str = FALLBACK_RATE_SYNTAX
     """
     if not promql:
         return promql
-    
-    # Fix trailing commas in label selectors
-    promql = re.sub(r',\s*}', '}', promql)
-    promql = re.sub(r'{\s*,', '{', promql)
-    
-    # Fix double commas
-    promql = re.sub(r',,+', ',', promql)
-    
-    # Fix incomplete time range brackets (like [15m without closing bracket)
-    promql = re.sub(r'\[(\d+[smhd])\s*$', r'[\1]', promql)
-    
-    # Ensure proper time range syntax for specific metric types
-    if 'latency' in promql.lower() and 'histogram_quantile' not in promql:
-        # For latency metrics that should use histogram_quantile
-        if 'vllm:e2e_request_latency_seconds_bucket' not in promql:
-            if 'vllm:e2e_request_latency_seconds' in promql:
-                promql = promql.replace(
-                    'vllm:e2e_request_latency_seconds_sum',
-                    f'histogram_quantile(0.95, sum(rate(vllm:e2e_request_latency_seconds_bucket[{time_range_syntax}])) by (le))'
-                )
-    
-    # Add time range syntax to rate functions if missing
-    if 'rate(' in promql and '[' not in promql:
-        promql = re.sub(r'rate\(([^)]+)\)', f'rate(\\1[{time_range_syntax}])', promql)
-    
-    # For metrics that have time ranges but aren't in rate() functions, convert to rate()
-    if '[' in promql and 'rate(' not in promql and 'histogram_quantile' not in promql:
-        # Extract the metric and its labels
-        pattern = r'([a-zA-Z_:][a-zA-Z0-9_:]*(?:{[^}]*})?)\[([^]]+)\]'
-        match = re.search(pattern, promql)
-        if match:
-            metric_with_labels = match.group(1)
-            time_range = match.group(2)
-            # Convert to rate() function
-            promql = re.sub(pattern, f'rate({metric_with_labels}[{time_range}])', promql)
-    
-    # Fix namespace label formatting issues
-    promql = re.sub(r"namespace='([^']*)'", r'namespace="\1"', promql)
-    
-    # Ensure proper closing of metric queries
-    if promql.endswith('[') or promql.endswith('{'):
-        promql = promql.rstrip('[{')
-    
-    # Balance parentheses - count and add missing closing parentheses
-    open_parens = promql.count('(')
-    close_parens = promql.count(')')
-    if open_parens > close_parens:
-        promql += ')' * (open_parens - close_parens)
-    
-    return promql
+    return repair_promql(promql, time_range_syntax)
 
 
 def format_alerts_for_ui(
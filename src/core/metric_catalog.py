@@ -0,0 +1,192 @@
+"""
+Process-wide catalogs of metric names and metadata with background refresh.
+
+``/api/v1/label/__name__/values`` returns every metric name in the cluster
+(20k+ on a large Thanos) and takes seconds, yet discovery, PromQL generation
+and chat search all need it. The catalog loads the list once, indexes it
+for membership and prefix lookups, and refreshes it with stale-while-
+revalidate semantics: after the TTL the current catalog keeps being served
+while a single background thread fetches the new one.
+
+Metric metadata (type/help/unit) is handled the same way: one bulk
+``/api/v1/metadata`` call replaces a request per metric.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .config import METRIC_CATALOG_TTL_SECONDS, METRIC_METADATA_TTL_SECONDS
+from .http_client import get_prometheus_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def metric_family(name: str) -> str:
+    """Return the family prefix of a metric name ("vllm:", "kube_", "DCGM_")."""
+    for i, ch in enumerate(name):
+        if ch in "_:":
+            return name[: i + 1]
+    return name
+
+
+class MetricNameCatalog:
+    """Immutable, indexed snapshot of metric names."""
+
+    __slots__ = ("names", "name_set", "_families")
+
+    def __init__(self, names: Iterable[str]):
+        self.names: Tuple[str, ...] = tuple(sorted(set(names)))
+        self.name_set: FrozenSet[str] = frozenset(self.names)
+        families: Dict[str, List[str]] = {}
+        for name in self.names:
+            families.setdefault(metric_family(name), []).append(name)
+        self._families: Dict[str, Tuple[str, ...]] = {k: tuple(v) for k, v in families.items()}
+
+    def with_prefix(self, prefix: str) -> Tuple[str, ...]:
+        """Return all names starting with prefix, in sorted order."""
+        if prefix[-1:] in ("_", ":") and metric_family(prefix) == prefix:
+            return self._families.get(prefix, ())
+        lo = bisect.bisect_left(self.names, prefix)
+        hi = lo
+        while hi < len(self.names) and self.names[hi].startswith(prefix):
+            hi += 1
+        return self.names[lo:hi]
+
+    def families(self) -> List[str]:
+        """Return the known family prefixes, sorted."""
+        return sorted(self._families)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.name_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MetricNameCatalog) and other.names == self.names
+
+    def __hash__(self) -> int:
+        return hash(self.names)
+
+
+class StaleWhileRevalidate(Generic[T]):
+    """Holds a lazily loaded value refreshed in the background once stale.
+
+    The first get() loads synchronously (and raises on failure). Afterwards a
+    stale value is returned immediately while one background thread reloads
+    it; failed reloads keep the previous value. ``version`` increases each
+    time a reload produces a different value.
+    """
+
+    def __init__(self, loader: Callable[[], T], ttl: float, name: str = "catalog"):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._value: Optional[T] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.version = 0
+        self.loads = 0
+
+    def get(self) -> T:
+        """Return the current value, loading or revalidating as needed."""
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._set(self.loader())
+        elif time.time() - self._loaded_at >= self.ttl:
+            self._revalidate()
+        return self._value
+
+    def refresh(self) -> T:
+        """Reload synchronously and return the new value."""
+        value = self.loader()
+        with self._lock:
+            self._set(value)
+        return value
+
+    def _set(self, value: T) -> None:
+        if self._value is None or value != self._value:
+            self.version += 1
+        self._value = value
+        self._loaded_at = time.time()
+        self.loads += 1
+
+    def _revalidate(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("Refreshing %s failed, serving stale data: %s", self.name, e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def clear(self) -> None:
+        """Drop the cached value so the next get() reloads it."""
+        with self._lock:
+            self._value = None
+            self._loaded_at = 0.0
+            self.loads = 0
+
+
+def _load_metric_names() -> MetricNameCatalog:
+    names = get_prometheus_client().label_values("__name__").get("data", [])
+    logger.debug("Loaded %d metric names into catalog", len(names))
+    return MetricNameCatalog(names)
+
+
+_metric_names: StaleWhileRevalidate[MetricNameCatalog] = StaleWhileRevalidate(
+    _load_metric_names, METRIC_CATALOG_TTL_SECONDS, name="metric-name-catalog"
+)
+
+
+def get_metric_names_holder() -> StaleWhileRevalidate[MetricNameCatalog]:
+    """Return the process-wide holder of the metric-name catalog."""
+    return _metric_names
+
+
+def get_metric_catalog() -> MetricNameCatalog:
+    """Return the current metric-name catalog (loaded on first use)."""
+    return _metric_names.get()
+
+
+MetadataMap = Dict[str, List[Dict[str, Any]]]
+
+
+def _load_metric_metadata() -> MetadataMap:
+    data = get_prometheus_client().get_sync("/api/v1/metadata", params={"limit_per_metric": 1}).get("data", {})
+    if not isinstance(data, dict):
+        data = {}
+    logger.debug("Loaded metadata for %d metrics", len(data))
+    return data
+
+
+_metric_metadata: StaleWhileRevalidate[MetadataMap] = StaleWhileRevalidate(
+    _load_metric_metadata, METRIC_METADATA_TTL_SECONDS, name="metric-metadata"
+)
+
+
+def get_metric_metadata_holder() -> StaleWhileRevalidate[MetadataMap]:
+    """Return the process-wide holder of the bulk metadata map."""
+    return _metric_metadata
+
+
+def get_metric_metadata_map() -> MetadataMap:
+    """Return metric name -> metadata entries ({"type", "help", "unit"})."""
+    return _metric_metadata.get()
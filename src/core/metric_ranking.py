@@ -0,0 +1,179 @@
+"""
+Rule tables and an inverted index for semantic metric ranking.
+
+Ranking a question against the metric catalog used to re-tokenize every
+metric name and run each substring rule on every name per question. The
+rules are now data (``SEMANTIC_SCORE_RULES`` / ``TYPE_SCORE_RULES``), and a
+``MetricRankingIndex`` precomputes per metric:
+
+- its name tokens (token -> posting list of metric positions),
+- which rules its name satisfies (rule -> posting list),
+- its specificity score.
+
+A question then only activates the rules whose intent terms it contains,
+walks the matching postings and scores candidates by table lookups. The
+scores are identical to applying the rule functions to every name.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+# (intent terms, metric terms, weight, match metric case-insensitively)
+ScoreRule = Tuple[Tuple[str, ...], Tuple[str, ...], int, bool]
+
+SEMANTIC_SCORE_RULES: Tuple[ScoreRule, ...] = (
+    # GPU/Hardware patterns
+    (("gpu", "graphics", "cuda", "nvidia"), ("gpu", "dcgm", "nvidia", "cuda"), 15, True),
+    # Temperature patterns
+    (("temperature", "temp", "heat", "thermal"), ("temp", "thermal", "heat"), 15, True),
+    # Memory patterns
+    (("memory", "mem", "ram"), ("memory", "mem", "ram", "bytes"), 12, False),
+    # Network patterns
+    (("network", "bandwidth", "traffic", "bytes", "packets"), ("network", "net_", "bytes", "packets", "bandwidth"), 12, False),
+    # CPU patterns
+    (("cpu", "processor", "utilization"), ("cpu", "processor", "util"), 12, False),
+    # Latency/Performance patterns
+    (("latency", "response", "time", "duration", "performance"), ("latency", "duration", "time", "seconds", "response"), 10, False),
+    # Error patterns
+    (("error", "fail", "exception", "problem"), ("error", "fail", "exception", "problem"), 10, False),
+    # Kubernetes patterns
+    (("pod", "container", "node", "deployment", "service"), ("pod", "container", "node", "kube_", "deployment"), 8, False),
+)
+
+TYPE_SCORE_RULES: Tuple[ScoreRule, ...] = (
+    # Counter metrics (rates, totals)
+    (("rate", "total", "count", "increase"), ("total", "count", "rate"), 8, False),
+    # Gauge metrics (current values)
+    (("current", "usage", "utilization", "percentage"), ("usage", "util", "current", "percent"), 8, False),
+    # Histogram metrics (percentiles, latency)
+    (("percentile", "p95", "p99", "histogram", "distribution"), ("bucket", "percentile", "histogram"), 8, False),
+)
+
+SPECIFIC_PREFIXES = ("vllm:", "dcgm_", "nvidia_", "openshift_", "kube_pod_", "container_")
+GENERIC_TERMS = ("total", "count", "info", "up", "ready")
+
+# Score added per word shared by the question and the metric name
+DIRECT_MATCH_WEIGHT = 10
+
+
+def _rule_matches_metric(rule: ScoreRule, metric: str) -> bool:
+    _intent_terms, metric_terms, _weight, case_insensitive = rule
+    target = metric.lower() if case_insensitive else metric
+    return any(term in target for term in metric_terms)
+
+
+def _rule_matches_intent(rule: ScoreRule, intent: str) -> bool:
+    return any(term in intent for term in rule[0])
+
+
+def _apply_rules(rules: Sequence[ScoreRule], intent: str, metric: str) -> int:
+    return sum(
+        rule[2] for rule in rules
+        if _rule_matches_intent(rule, intent) and _rule_matches_metric(rule, metric)
+    )
+
+
+def calculate_semantic_score(intent: str, metric: str) -> int:
+    """Calculate semantic relevance score between user intent and metric name."""
+    return _apply_rules(SEMANTIC_SCORE_RULES, intent, metric)
+
+
+def calculate_type_relevance(intent: str, metric: str) -> int:
+    """Calculate relevance based on metric type patterns."""
+    return _apply_rules(TYPE_SCORE_RULES, intent, metric)
+
+
+def calculate_specificity_score(metric: str) -> int:
+    """Calculate specificity score - more specific metrics get higher scores."""
+    score = 0
+
+    # Bonus for specific subsystems
+    if metric.startswith(SPECIFIC_PREFIXES):
+        score += 5
+
+    # Bonus for detailed metric names (more components)
+    components = metric.replace('-', '_').split('_')
+    if len(components) >= 4:
+        score += 3
+    elif len(components) >= 3:
+        score += 2
+
+    # Penalty for very generic metrics
+    if any(term in metric.lower() for term in GENERIC_TERMS):
+        score -= 2
+
+    return score
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Split text into lowercase words on whitespace, '-', '_' and ':'."""
+    return frozenset(text.lower().replace('-', ' ').replace('_', ' ').replace(':', ' ').split())
+
+
+_ALL_RULES: Tuple[ScoreRule, ...] = SEMANTIC_SCORE_RULES + TYPE_SCORE_RULES
+
+
+class MetricRankingIndex:
+    """Precomputed postings and per-metric scores for one list of metric names."""
+
+    def __init__(self, metrics: Sequence[str]):
+        self.metrics: Tuple[str, ...] = tuple(metrics)
+        self.specificity: List[int] = []
+        self.token_postings: Dict[str, List[int]] = {}
+        self.rule_postings: List[List[int]] = [[] for _ in _ALL_RULES]
+        for position, metric in enumerate(self.metrics):
+            metric_lower = metric.lower()
+            self.specificity.append(calculate_specificity_score(metric_lower))
+            for token in tokenize(metric_lower):
+                self.token_postings.setdefault(token, []).append(position)
+            for rule_id, rule in enumerate(_ALL_RULES):
+                if _rule_matches_metric(rule, metric_lower):
+                    self.rule_postings[rule_id].append(position)
+        # Metrics that rank even without matching the question
+        self.positive_baseline: List[int] = [p for p, s in enumerate(self.specificity) if s > 0]
+
+    def rank(self, search_term: str) -> List[str]:
+        """Return metrics with a positive score, best first (ties keep input order)."""
+        intent_lower = search_term.lower()
+        scores: Dict[int, int] = dict.fromkeys(self.positive_baseline, 0)
+
+        for token in tokenize(intent_lower):
+            for position in self.token_postings.get(token, ()):
+                scores[position] = scores.get(position, 0) + DIRECT_MATCH_WEIGHT
+
+        for rule_id, rule in enumerate(_ALL_RULES):
+            if _rule_matches_intent(rule, intent_lower):
+                weight = rule[2]
+                for position in self.rule_postings[rule_id]:
+                    scores[position] = scores.get(position, 0) + weight
+
+        specificity = self.specificity
+        ranked = [
+            (score + specificity[position], position)
+            for position, score in scores.items()
+            if score + specificity[position] > 0
+        ]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [self.metrics[position] for _score, position in ranked]
+
+
+_INDEX_CACHE_SIZE = 4
+_index_cache: "OrderedDict[Tuple[str, ...], MetricRankingIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_ranking_index(metrics: Sequence[str]) -> MetricRankingIndex:
+    """Return a (cached) ranking index for a list of metric names."""
+    key = tuple(metrics)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = MetricRankingIndex(key)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -13,6 +13,7 @@ import re
 import logging
 import math
 from datetime import datetime
+from functools import partial
 from typing import List, Dict, Any, Optional, Tuple, Set
 from dataclasses import dataclass
 
@@ -24,7 +25,19 @@ get_python_logger()
 
 logger = logging.getLogger(__name__)
 
-from .config import PROMETHEUS_URL, THANOS_TOKEN, VERIFY_SSL, MODEL_CONFIG
+from .config import CHART_MAX_POINTS, MODEL_CONFIG, STREAM_DECODE_MIN_POINTS, LATENCY_QUANTILES
+from .http_client import get_prometheus_client
+from .fetch_engine import fetch_concurrently
+from .series_store import get_series_store, align_window, step_to_seconds
+from .query_planner import query_range_series_sharded, should_shard
+from .remote_read import get_remote_read_client, use_remote_read
+from .promql_rewrite import inject_matchers
+from .timeseries import MetricStats, SeriesSet
+from .stats_pushdown import fetch_metric_stats
+from .histogram import LatencyHistogram
+from .snapshot import fetch_snapshot
+from .discovery_index import get_discovery_index
+from .metric_catalog import get_metric_catalog
 from fastapi import HTTPException
 from .llm_client import summarize_with_llm
 from .response_validator import ResponseType
@@ -52,12 +65,19 @@ def extract_namespace_pod_pairs_from_metrics(
 ) -> Set[NamespacePodPair]:
     """Extract all unique (namespace, pod) pairs from provided metrics.
 
-    Uses DataFrame label columns when available and falls back to parsing
+    Uses SeriesSet/DataFrame label columns when available and falls back to parsing
     namespace from model name formatted as "namespace | model". Deduplicates pairs.
     """
     pairs: Set[NamespacePodPair] = set()
     try:
         for _label, df in metric_dfs.items():
+            if isinstance(df, SeriesSet):
+                for labels in df.label_dicts():
+                    ns_val = (labels.get("namespace") or "").strip() or None
+                    pod_val = (labels.get("pod") or "").strip() or None
+                    if ("namespace" in labels or "pod" in labels) and (ns_val or pod_val):
+                        pairs.add(NamespacePodPair(namespace=ns_val or "", pod=pod_val))
+                continue
             if df is None or not isinstance(df, pd.DataFrame) or df.empty:
                 continue
             has_ns = "namespace" in df.columns
@@ -195,23 +215,27 @@ def choose_prometheus_step(
         return f"{max(min_step_seconds, 30)}s"
 
 
+def choose_aligned_prometheus_window(
+    start_ts: int,
+    end_ts: int,
+    max_points_per_series: int = 11000,
+    min_step_seconds: int = 30,
+) -> Tuple[int, int, str]:
+    """Select a step via choose_prometheus_step and snap the window to it.
 
-def _auth_headers() -> Dict[str, str]:
-    """Create Authorization headers only when a plausible token is present.
+    Both ends are floored to a multiple of the step so repeated sliding-window
+    requests share one evaluation grid (enabling delta fetches and Thanos
+    query-frontend cache hits).
 
-    Avoid sending a default file path or empty string as a token to local
-    Prometheus, which can cause request failures in some setups.
+    Returns (aligned_start, aligned_end, step).
     """
+    step = choose_prometheus_step(start_ts, end_ts, max_points_per_series, min_step_seconds)
     try:
-        token = (THANOS_TOKEN or "").strip()
-        if not token:
-            return {}
-        # Heuristic: if token looks like a filesystem path, skip auth header
-        if token.startswith("/") or token.lower().startswith("file:"):
-            return {}
-        return {"Authorization": f"Bearer {token}"}
+        aligned_start, aligned_end = align_window(start_ts, end_ts, step_to_seconds(step))
     except Exception:
-        return {}
+        return int(start_ts), int(end_ts), step
+    return aligned_start, aligned_end, step
+
 
 
 def extract_first_json_object_from_text(text: str) -> Optional[Dict[str, Any]]:
@@ -298,66 +322,24 @@ def extract_first_json_object_from_text(text: str) -> Optional[Dict[str, Any]]:
     best = max(candidates, key=_score)
     return best[1]
 
+LATENCY_BUCKET_METRIC = "vllm:e2e_request_latency_seconds_bucket"
+P95_LATENCY_QUERY = f"histogram_quantile(0.95, sum(rate({LATENCY_BUCKET_METRIC}[5m])) by (le))"
+
+
 def get_models_helper() -> List[str]:
     """
     Get list of available vLLM models from Prometheus metrics.
+
+    Reads from the shared series discovery index, which scans vLLM series
+    once over the widest window and refreshes in the background.
     
     Returns:
         List of model names in format "namespace | model_name"
     """
     try:
-        headers = _auth_headers()
-
-        # Try multiple vLLM metrics with longer time windows
-        vllm_metrics_to_check = [
-            "vllm:request_prompt_tokens_created",
-            "vllm:request_prompt_tokens_total",
-            "vllm:avg_generation_throughput_toks_per_s",
-            "vllm:num_requests_running",
-            "vllm:gpu_cache_usage_perc",
-        ]
-
-        model_set = set()
-
-        # Try different time windows: 7 days, 24 hours, 1 hour
-        time_windows = [7 * 24 * 3600, 24 * 3600, 3600]  # 7 days, 24 hours, 1 hour
-
-        for time_window in time_windows:
-            for metric_name in vllm_metrics_to_check:
-                try:
-                    response = requests.get(
-                        f"{PROMETHEUS_URL}/api/v1/series",
-                        headers=headers,
-                        params={
-                            "match[]": metric_name,
-                            "start": int((datetime.now().timestamp()) - time_window),
-                            "end": int(datetime.now().timestamp()),
-                        },
-                        verify=VERIFY_SSL,
-                    )
-                    response.raise_for_status()
-                    series = response.json()["data"]
-
-                    for entry in series:
-                        model = entry.get("model_name", "").strip()
-                        namespace = entry.get("namespace", "").strip()
-                        if model and namespace:
-                            model_set.add(f"{namespace} | {model}")
-                            logger.debug(f"Found model: {namespace} | {model} in metric: {metric_name}")
-
-                except Exception as e:
-                    logger.warning(
-                        f"Error checking {metric_name} with {time_window}s window: {e}"
-                    )
-                    continue
-            
-            # If we found models in this time window, log but continue checking
-            # to ensure we get ALL models across all time windows and metrics
-            if model_set:
-                logger.info(f"Found {len(model_set)} model(s) in {time_window}s window, continuing to check other windows...")
-
-        logger.info(f"Total models discovered: {len(model_set)}")
-        return sorted(list(model_set))
+        models = get_discovery_index().models()
+        logger.info(f"Total models discovered: {len(models)}")
+        return models
     except Exception as e:
         logger.error("Error getting models", exc_info=e)
         return []
@@ -368,65 +350,16 @@ def get_vllm_namespaces_helper() -> List[str]:
     Get list of namespaces that have vLLM metrics available.
 
     Mirrors the logic used in the FastAPI /namespaces endpoint to ensure
-    consistent behavior across API and MCP tools.
+    consistent behavior across API and MCP tools. Only namespaces with a
+    model_name label are returned, to ensure properly configured deployments.
 
     Returns:
         Sorted list of namespace names
     """
     try:
-        headers = _auth_headers()
-
-        # Try multiple vLLM metrics with longer time windows
-        vllm_metrics_to_check = [
-            "vllm:request_prompt_tokens_created",
-            "vllm:request_prompt_tokens_total",
-            "vllm:avg_generation_throughput_toks_per_s",
-            "vllm:num_requests_running",
-            "vllm:gpu_cache_usage_perc",
-        ]
-
-        namespace_set = set()
-
-        # Try different time windows: 7 days, 24 hours, 1 hour
-        time_windows = [7 * 24 * 3600, 24 * 3600, 3600]
-
-        for time_window in time_windows:
-            for metric_name in vllm_metrics_to_check:
-                try:
-                    response = requests.get(
-                        f"{PROMETHEUS_URL}/api/v1/series",
-                        headers=headers,
-                        params={
-                            "match[]": metric_name,
-                            "start": int((datetime.now().timestamp()) - time_window),
-                            "end": int(datetime.now().timestamp()),
-                        },
-                        verify=VERIFY_SSL,
-                    )
-                    response.raise_for_status()
-                    series = response.json()["data"]
-
-                    for entry in series:
-                        namespace = entry.get("namespace", "").strip()
-                        model = entry.get("model_name", "").strip()
-                        # Require both namespace and model_name to ensure properly configured deployments
-                        if namespace and model:
-                            namespace_set.add(namespace)
-                            logger.debug(f"Found namespace: {namespace} with model: {model} in metric: {metric_name}")
-
-                except Exception as e:
-                    logger.warning(
-                        f"Error checking {metric_name} with {time_window}s window: {e}"
-                    )
-                    continue
-            
-            # If we found namespaces in this time window, log but continue checking
-            # to ensure we get ALL namespaces across all time windows and metrics
-            if namespace_set:
-                logger.info(f"Found {len(namespace_set)} namespace(s) in {time_window}s window, continuing to check other windows...")
-
-        logger.info(f"Total namespaces discovered: {len(namespace_set)}")
-        return sorted(list(namespace_set))
+        namespaces = get_discovery_index().namespaces()
+        logger.info(f"Total namespaces discovered: {len(namespaces)}")
+        return namespaces
     except Exception as e:
         logger.error("Error getting namespaces", exc_info=e)
         return []
@@ -442,14 +375,7 @@ def get_openshift_namespaces_helper() -> List[str]:
         Sorted list of namespace names
     """
     try:
-        headers = _auth_headers()
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/namespace/values",
-            headers=headers,
-            verify=VERIFY_SSL,
-        )
-        response.raise_for_status()
-        values = response.json().get("data", [])
+        values = get_prometheus_client().label_values("namespace").get("data", [])
         if not isinstance(values, list):
             return []
         namespaces = sorted({str(v).strip() for v in values if v})
@@ -488,15 +414,7 @@ def calculate_metric_stats(data):
 def discover_vllm_metrics():
     """Dynamically discover available vLLM metrics from Prometheus, including GPU metrics"""
     try:
-        headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/__name__/values",
-            headers=headers,
-            verify=VERIFY_SSL,
-            timeout=30,  # Add timeout
-        )
-        response.raise_for_status()
-        all_metrics = response.json()["data"]
+        all_metrics = get_metric_catalog()
 
         # Create friendly names for metrics
         metric_mapping = {}
@@ -564,7 +482,7 @@ def discover_vllm_metrics():
             #     metric_mapping["GPU Usage (%)"] = "avg(amd_smi_utilization)"
 
         # Build vLLM-derived queries based on available metrics
-        vllm_metrics = set(m for m in all_metrics if m.startswith("vllm:"))
+        vllm_metrics = set(all_metrics.with_prefix("vllm:"))
 
         # Tokens - For dashboard display, prefer current totals over increases
         # This shows accumulated tokens rather than recent activity
@@ -600,9 +518,7 @@ def discover_vllm_metrics():
 
         # P95 latency from histogram buckets
         if "vllm:e2e_request_latency_seconds_bucket" in vllm_metrics:
-            metric_mapping["P95 Latency (s)"] = (
-                "histogram_quantile(0.95, sum(rate(vllm:e2e_request_latency_seconds_bucket[5m])) by (le))"
-            )
+            metric_mapping["P95 Latency (s)"] = P95_LATENCY_QUERY
 
         # Inference time average = sum(rate(sum)) / sum(rate(count))
         if (
@@ -645,7 +561,7 @@ def discover_vllm_metrics():
             "Prompt Tokens Created": "vllm:request_prompt_tokens_sum",
             "Output Tokens Created": "vllm:request_generation_tokens_sum",
             "Requests Running": "vllm:num_requests_running",
-            "P95 Latency (s)": "histogram_quantile(0.95, sum(rate(vllm:e2e_request_latency_seconds_bucket[5m])) by (le))",
+            "P95 Latency (s)": P95_LATENCY_QUERY,
             "Inference Time (s)": "sum(rate(vllm:request_inference_time_seconds_sum[5m])) / sum(rate(vllm:request_inference_time_seconds_count[5m]))",
         }
 
@@ -653,18 +569,10 @@ def discover_vllm_metrics():
 def discover_dcgm_metrics():
     """Dynamically discover available GPU metrics (DCGM, nvidia_smi, or alternatives)"""
     try:
-        headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/__name__/values",
-            headers=headers,
-            verify=VERIFY_SSL,
-            timeout=30,  # Add timeout
-        )
-        response.raise_for_status()
-        all_metrics = response.json()["data"]
+        all_metrics = get_metric_catalog()
 
         # Filter for different types of GPU metrics
-        dcgm_metrics = [metric for metric in all_metrics if metric.startswith("DCGM_")]
+        dcgm_metrics = list(all_metrics.with_prefix("DCGM_"))
         nvidia_metrics = [metric for metric in all_metrics if "nvidia" in metric.lower()]
         gpu_metrics = [metric for metric in all_metrics if "gpu" in metric.lower() and not metric.startswith("vllm:")]
 
@@ -758,18 +666,10 @@ def discover_intel_gaudi_metrics():
     following the same pattern used here.
     """
     try:
-        headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/__name__/values",
-            headers=headers,
-            verify=VERIFY_SSL,
-            timeout=30,
-        )
-        response.raise_for_status()
-        all_metrics = response.json()["data"]
+        all_metrics = get_metric_catalog()
 
         # Filter for Intel Gaudi (habanalabs) metrics
-        gaudi_metrics = [metric for metric in all_metrics if metric.startswith("habanalabs_")]
+        gaudi_metrics = list(all_metrics.with_prefix("habanalabs_"))
 
         logger.info("Found %d Intel Gaudi (habanalabs) metrics", len(gaudi_metrics))
 
@@ -998,25 +898,17 @@ def get_openshift_metrics():
 def discover_cluster_metrics_dynamically():
     """Dynamically discover cluster metrics from Prometheus"""
     try:
-        headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/__name__/values",
-            headers=headers,
-            verify=VERIFY_SSL,
-            timeout=30,
-        )
-        response.raise_for_status()
-        all_metrics = response.json()["data"]
+        all_metrics = get_metric_catalog()
 
         # Filter for Kubernetes/OpenShift metrics
         cluster_metrics = {}
         kube_prefixes = ["kube_", "node_", "container_", "apiserver_", "etcd_", "scheduler_", "kubelet_"]
         
-        for metric in all_metrics:
-            if any(metric.startswith(prefix) for prefix in kube_prefixes):
-                # Create a friendly name
-                friendly_name = metric.replace("_", " ").title()
-                cluster_metrics[friendly_name] = f"sum({metric})"
+        kube_metrics = sorted({m for prefix in kube_prefixes for m in all_metrics.with_prefix(prefix)})
+        for metric in kube_metrics:
+            # Create a friendly name
+            friendly_name = metric.replace("_", " ").title()
+            cluster_metrics[friendly_name] = f"sum({metric})"
 
         # Limit to first 50 metrics to avoid overwhelming UI
         limited_metrics = dict(list(cluster_metrics.items())[:50])
@@ -1142,17 +1034,16 @@ def analyze_openshift_metrics(
     metrics_to_fetch, namespace_for_query = _select_openshift_metrics_for_scope(
         metric_category, scope, namespace
     )
-    # Fetch metrics; if Prometheus fails, raise immediately so MCP tool can surface PROMETHEUS_ERROR
-    metric_dfs: Dict[str, Any] = {}
+    # Fetch chart series at CHART_MAX_POINTS resolution; the prompt statistics are
+    # computed from them rather than from a second, server-side stats query.
+    # If Prometheus fails, raise immediately so MCP tool can surface PROMETHEUS_ERROR
     try:
-        for label, query in metrics_to_fetch.items():
-            df = fetch_openshift_metrics(
-                query,
-                start_ts,
-                end_ts,
-                namespace_for_query,
+        metric_dfs: Dict[str, Any] = fetch_concurrently({
+            label: partial(
+                fetch_openshift_series, query, start_ts, end_ts, namespace_for_query, max_points=CHART_MAX_POINTS
             )
-            metric_dfs[label] = df
+            for label, query in metrics_to_fetch.items()
+        })
     except requests.exceptions.RequestException:
         # Bubble up Prometheus errors unchanged; MCP layer maps them to PrometheusError
         raise
@@ -1187,14 +1078,10 @@ def analyze_openshift_metrics(
         # Re-raise so MCP layer can classify as LLM service error
         raise
  
-    # Serialize metric DataFrames
-    serialized_metrics: Dict[str, Any] = {}
-    for label, df in metric_dfs.items():
-            if "timestamp" not in df.columns:
-                df["timestamp"] = pd.Series(dtype="datetime64[ns]")
-            if "value" not in df.columns:
-                df["value"] = pd.Series(dtype="float")
-            serialized_metrics[label] = df[["timestamp", "value"]].to_dict(orient="records")
+    # Serialize metric series
+    serialized_metrics: Dict[str, Any] = {
+        label: series.to_records() for label, series in metric_dfs.items()
+    }
 
     return {
         "metric_category": metric_category,
@@ -1228,16 +1115,17 @@ def chat_openshift_metrics(
     metrics_to_fetch, namespace_for_query = _select_openshift_metrics_for_scope(
         metric_category, scope, namespace
     )
-    metric_dfs: Dict[str, Any] = {}
-    for label, query in metrics_to_fetch.items():
-        # Allow Prometheus connectivity/request exceptions to propagate so callers
-        # (e.g., MCP tools) can surface structured PROMETHEUS_ERROR instead of
-        # falling back to a generic "no data" message.
-        df = fetch_openshift_metrics(query, start_ts, end_ts, namespace_for_query)
-        metric_dfs[label] = df
+    # Allow Prometheus connectivity/request exceptions to propagate so callers
+    # (e.g., MCP tools) can surface structured PROMETHEUS_ERROR instead of
+    # falling back to a generic "no data" message.
+    # The chat prompt only needs summary statistics, computed server-side
+    metric_dfs: Dict[str, Any] = fetch_concurrently({
+        label: partial(fetch_openshift_stats, query, start_ts, end_ts, namespace_for_query)
+        for label, query in metrics_to_fetch.items()
+    })
 
     # If no data at all, avoid LLM call and return helpful message
-    has_any_data = any(isinstance(df, pd.DataFrame) and not df.empty for df in metric_dfs.values())
+    has_any_data = any(not series.empty for series in metric_dfs.values())
     if not has_any_data:
         return {
             "promql": "",
@@ -1283,12 +1171,9 @@ def chat_openshift_metrics(
             promql = ""
         summary = (parsed.get("summary") or llm_response).strip()
 
-        # Add namespace filter when needed
-        if promql and namespace and "namespace=" not in promql:
-            if "{" in promql:
-                promql = promql.replace("{", f'{{namespace="{namespace}", ', 1)
-            else:
-                promql = f'{promql}{{namespace="{namespace}"}}'
+        # Scope every selector of the suggested query to the namespace
+        if promql and namespace:
+            promql = inject_matchers(promql, {"namespace": namespace})
     return {
         "promql": promql,
         "summary": summary,
@@ -1296,142 +1181,143 @@ def chat_openshift_metrics(
 
 # --- Metric Fetching Functions ---
 
-def fetch_metrics(query, model_name, start, end, namespace=None):
-    """Fetch metrics from Prometheus for vLLM models"""
-    promql_query = query
+def _query_range_series(query: str, start: int, end: int, step: str) -> SeriesSet:
+    """Run an aligned range query and return it as a SeriesSet.
 
-    # Inject labels for vLLM metrics inside rate()/histogram_quantile expressions
-    def _inject_labels(expr: str, model: str, ns: Optional[str]) -> str:
-        # Helper to build label matcher
-        if "|" in model:
-            model_ns, actual_model = map(str.strip, model.split("|", 1))
-        else:
-            model_ns, actual_model = None, model.strip()
+    Multi-day windows are split into time shards fetched in parallel; other
+    long windows are stream-decoded straight into numpy arrays; shorter ones
+    go through the series store so sliding windows only fetch their tail.
+    Raw selectors over long windows use remote read when it is configured,
+    falling back to query_range if the remote-read request fails.
+    """
+    if use_remote_read(query, start, end):
+        try:
+            return get_remote_read_client().query_range_series(query, start, end, step)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Remote read failed for '%s', falling back to query_range: %s", query, e)
+    client = get_prometheus_client()
+    if should_shard(start, end):
+        return query_range_series_sharded(client, query, start, end, step)
+    if (end - start) // step_to_seconds(step) + 1 >= STREAM_DECODE_MIN_POINTS:
+        return client.query_range_series(query, start, end, step)
+    result = get_series_store().query_range(client, query, start, end, step)["data"]["result"]
+    return SeriesSet.from_matrix(result)
 
-        ns_value = (ns or model_ns or "").strip()
-        label_clause = f'model_name="{actual_model}"' + (f', namespace="{ns_value}"' if ns_value else "")
 
-        # Match complete vllm metric names that don't already have labels
-        # Use inline lambda to make the dependency on label_clause explicit
-        expr = re.sub(
-            r"\b(vllm:[\w:]+)(?!\{)",
-            lambda m: f"{m.group(1)}{{{label_clause}}}",
-            expr,
-        )
-        
-        return expr
+def fetch_metrics(query, model_name, start, end, namespace=None):
+    """Fetch metrics from Prometheus for vLLM models as a long-format DataFrame"""
+    return fetch_metric_series(query, model_name, start, end, namespace).to_dataframe()
 
-    # GPU metrics are global; inject only for vLLM metrics
+
+def fetch_metric_series(query, model_name, start, end, namespace=None) -> SeriesSet:
+    """Fetch metrics from Prometheus for vLLM models as a SeriesSet"""
+    promql_query = query
+
+    # GPU metrics are global; scope only vLLM selectors to the model (and namespace)
     if "vllm:" in promql_query:
-        promql_query = _inject_labels(promql_query, model_name, namespace)
+        if "|" in model_name:
+            model_ns, actual_model = map(str.strip, model_name.split("|", 1))
+        else:
+            model_ns, actual_model = None, model_name.strip()
+        labels = {"model_name": actual_model}
+        ns_value = (namespace or model_ns or "").strip()
+        if ns_value:
+            labels["namespace"] = ns_value
+        promql_query = inject_matchers(promql_query, labels, metric_prefix="vllm:")
 
-    headers = _auth_headers()
     try:
-        step = choose_prometheus_step(start, end)
+        start, end, step = choose_aligned_prometheus_window(start, end)
         logger.debug("Fetching Prometheus metrics for vLLM, query: %s, start: %s, end: %s: step: %s", query, start, end, step)
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/query_range",
-            headers=headers,
-            params={"query": promql_query, "start": start, "end": end, "step": step},
-            verify=VERIFY_SSL,
-            timeout=30,  # Add timeout
-        )
-        response.raise_for_status()
-        result = response.json()["data"]["result"]
+        series = _query_range_series(promql_query, start, end, step)
 
     except requests.exceptions.ConnectionError as e:
         logger.warning("Prometheus connection error for query '%s': %s", promql_query, e)
-        return pd.DataFrame()  # Return empty DataFrame on connection error
+        return SeriesSet.empty_set()  # Return empty series on connection error
     except requests.exceptions.Timeout as e:
         logger.warning("Prometheus timeout for query '%s': %s", promql_query, e)
-        return pd.DataFrame()  # Return empty DataFrame on timeout
+        return SeriesSet.empty_set()  # Return empty series on timeout
     except requests.exceptions.RequestException as e:
         logger.warning("Prometheus request error for query '%s': %s", promql_query, e)
-        return pd.DataFrame()  # Return empty DataFrame on other request errors
+        return SeriesSet.empty_set()  # Return empty series on other request errors
 
-    rows = []
-    for series in result:
-        for val in series["values"]:
-            ts = datetime.fromtimestamp(float(val[0]))
-            value = float(val[1])
+    return series
 
-            # Handle NaN values that can't be JSON serialized
-            if pd.isna(value) or value != value:  # Check for NaN
-                value = 0.0  # Convert NaN to 0 for JSON compatibility
 
-            row = dict(series["metric"])
-            row["timestamp"] = ts
-            row["value"] = value
-            rows.append(row)
+def latency_quantile_label(q: float) -> str:
+    """Return the metric label for a latency quantile, e.g. 0.95 -> "P95 Latency (s)"."""
+    return f"P{q * 100:g} Latency (s)"
 
-    return pd.DataFrame(rows)
+
+def fetch_latency_histogram(
+    model_name, start, end, namespace=None, by: Tuple[str, ...] = (), rate_interval: str = "5m",
+    fetch=None,
+) -> LatencyHistogram:
+    """Fetch vLLM e2e latency bucket rates once, grouped by ``le`` and ``by`` labels.
+
+    Any quantile, and any coarser grouping, can then be computed client-side
+    via LatencyHistogram.quantiles()/regroup() without another query.
+    """
+    by_clause = ", ".join(("le",) + tuple(by))
+    query = f"sum(rate({LATENCY_BUCKET_METRIC}[{rate_interval}])) by ({by_clause})"
+    fetch = fetch or fetch_metric_series
+    return LatencyHistogram.from_series(fetch(query, model_name, start, end, namespace), by)
+
+
+def fetch_vllm_metric_series(vllm_metrics, model_name, start, end, namespace=None, fetch=None) -> Dict[str, SeriesSet]:
+    """Fetch a discovered vLLM metric set concurrently.
+
+    The latency percentiles (LATENCY_QUANTILES, replacing the server-side
+    "P95 Latency (s)" query) are all derived from a single bucket fetch.
+    ``fetch`` defaults to fetch_metric_series.
+    """
+    fetch = fetch or fetch_metric_series
+    calls = {
+        label: partial(fetch, query, model_name, start, end, namespace)
+        for label, query in vllm_metrics.items()
+        if query != P95_LATENCY_QUERY
+    }
+    derive_latency = P95_LATENCY_QUERY in vllm_metrics.values()
+    if derive_latency:
+        calls[LATENCY_BUCKET_METRIC] = partial(fetch_latency_histogram, model_name, start, end, namespace, fetch=fetch)
+    fetched = fetch_concurrently(calls)
+
+    quantiles = sorted(set(LATENCY_QUANTILES) | {0.95})
+    latency = fetched[LATENCY_BUCKET_METRIC].quantiles(quantiles) if derive_latency else {}
+    results: Dict[str, SeriesSet] = {}
+    for label, query in vllm_metrics.items():
+        if query != P95_LATENCY_QUERY:
+            results[label] = fetched[label]
+            continue
+        for q in quantiles:
+            results[label if q == 0.95 else latency_quantile_label(q)] = latency[q]
+    return results
 
 
 def fetch_openshift_metrics(query, start, end, namespace=None):
-    """Fetch OpenShift metrics with optional namespace filtering.
+    """Fetch OpenShift metrics as a long-format DataFrame.
+
+    See fetch_openshift_series for filtering and error semantics.
+    """
+    return fetch_openshift_series(query, start, end, namespace).to_dataframe()
+
+
+def fetch_openshift_series(query, start, end, namespace=None, max_points: Optional[int] = None) -> SeriesSet:
+    """Fetch OpenShift metrics as a SeriesSet with optional namespace filtering.
 
+    ``max_points`` caps the points per series (coarser step), e.g. for charts.
     Network/request exceptions are raised to allow callers (e.g., MCP tools)
     to convert them into structured errors for the UI.
     """
-    headers = _auth_headers()
-    # Add namespace filter to the query if specified
     if namespace:
-        # Skip if namespace already exists in the query
-        if f'namespace="{namespace}"' in query:
-            pass  # Already has the correct namespace
-        else:
-            # Simple string replacements for common patterns
-
-            # Pattern 1: sum(metric_name)
-            pattern1 = r"sum\(([a-zA-Z_:][a-zA-Z0-9_:]*)\)"
-            if re.search(pattern1, query):
-                query = re.sub(pattern1, f'sum(\\1{{namespace="{namespace}"}})', query)
-
-            # Pattern 2: sum(rate(metric_name[5m]))
-            elif re.search(r"sum\(rate\([a-zA-Z_:][a-zA-Z0-9_:]*\[[^\]]+\]\)\)", query):
-                pattern2 = r"sum\(rate\(([a-zA-Z_:][a-zA-Z0-9_:]*)\[([^\]]+)\]\)\)"
-                query = re.sub(
-                    pattern2, f'sum(rate(\\1{{namespace="{namespace}"}}[\\2]))', query
-                )
-
-            # Pattern 3: rate(metric_name[5m])
-            elif re.search(r"rate\([a-zA-Z_:][a-zA-Z0-9_:]*\[[^\]]+\]\)", query):
-                pattern3 = r"rate\(([a-zA-Z_:][a-zA-Z0-9_:]*)\[([^\]]+)\]\)"
-                query = re.sub(
-                    pattern3, f'rate(\\1{{namespace="{namespace}"}}[\\2])', query
-                )
-
-            # Pattern 4: metric_name{existing_labels}
-            elif re.search(r"[a-zA-Z_:][a-zA-Z0-9_:]*\{[^}]*\}", query):
-                pattern4 = r"([a-zA-Z_:][a-zA-Z0-9_:]*)\{([^}]*)\}"
-                query = re.sub(pattern4, f'\\1{{namespace="{namespace}",\\2}}', query)
-
-            # Pattern 5: simple metric_name (no labels)
-            elif re.search(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$", query):
-                query = f'{query}{{namespace="{namespace}"}}'
-
-            # Pattern 6: handle other aggregations (avg, count, etc.)
-            else:
-                for func in ["avg", "count", "max", "min"]:
-                    pattern = f"{func}\\(([a-zA-Z_:][a-zA-Z0-9_:]*)\\)"
-                    if re.search(pattern, query):
-                        query = re.sub(
-                            pattern, f'{func}(\\1{{namespace="{namespace}"}})', query
-                        )
-                        break
+        query = inject_matchers(query, {"namespace": namespace})
 
     try:
-        step = choose_prometheus_step(start, end)
+        if max_points:
+            start, end, step = choose_aligned_prometheus_window(start, end, max_points_per_series=max_points)
+        else:
+            start, end, step = choose_aligned_prometheus_window(start, end)
         logger.debug("Fetching Prometheus metrics for OpenShift, query: %s, start: %s, end: %s: step: %s", query, start, end, step)
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/query_range",
-            headers=headers,
-            params={"query": query, "start": start, "end": end, "step": step},
-            verify=VERIFY_SSL,
-            timeout=30,  # Add timeout
-        )
-        response.raise_for_status()
-        result = response.json()["data"]["result"]
+        series = _query_range_series(query, start, end, step)
         logger.debug("Metrics fetched successfully")
     except requests.exceptions.ConnectionError as e:
         logger.warning("Prometheus connection error for OpenShift query '%s': %s", query, e)
@@ -1443,22 +1329,24 @@ def fetch_openshift_metrics(query, start, end, namespace=None):
         logger.warning("Prometheus request error for OpenShift query '%s': %s", query, e)
         raise
 
-    rows = []
-    for series in result:
-        for val in series["values"]:
-            ts = datetime.fromtimestamp(float(val[0]))
-            value = float(val[1])
+    return series
 
-            # Handle NaN values that can't be JSON serialized
-            if pd.isna(value) or value != value:  # Check for NaN
-                value = 0.0  # Convert NaN to 0 for JSON compatibility
 
-            row = dict(series["metric"])
-            row["timestamp"] = ts
-            row["value"] = value
-            rows.append(row)
+def fetch_openshift_stats(query, start, end, namespace=None) -> MetricStats:
+    """Fetch summary statistics of an OpenShift metric without its samples.
 
-    return pd.DataFrame(rows) 
+    Uses the step fetch_openshift_series would use, so the numbers match the
+    full-resolution series. Request exceptions are raised like
+    fetch_openshift_series.
+    """
+    if namespace:
+        query = inject_matchers(query, {"namespace": namespace})
+    start, end, step = choose_aligned_prometheus_window(start, end)
+    try:
+        return fetch_metric_stats(query, end, end - start, step)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Prometheus request error for OpenShift stats query '%s': %s", query, e)
+        raise
 
 
 # --- Business logic for MCP tools (moved from tools module) ---
@@ -1488,7 +1376,7 @@ def build_log_trace_context_for_pod_issues(
             "max by (namespace, pod) ((kube_pod_status_phase{phase=\"Failed\"} == 1) "
             "or (kube_pod_container_status_waiting_reason{reason=\"CrashLoopBackOff\"} == 1))"
         )
-        pairs_df = fetch_openshift_metrics(
+        pairs_df = fetch_openshift_series(
             pod_issue_query,
             start_ts,
             end_ts,
@@ -1521,18 +1409,26 @@ def get_summarization_models() -> List[str]:
         return []
 
 
+# Per-vendor temperature metric used to detect GPUs/accelerators:
+# vendor display name -> (temperature metric, model display name)
+GPU_VENDOR_TEMP_METRICS: Dict[str, Tuple[str, str]] = {
+    "NVIDIA": ("DCGM_FI_DEV_GPU_TEMP", "GPU"),
+    "Intel Gaudi": ("habanalabs_temperature_onchip", "Gaudi Accelerator"),
+    # TODO: AMD - Add AMD support:
+    # "AMD": ("GPU_JUNCTION_TEMPERATURE", "Instinct"),
+}
+
+
 def _fetch_vendor_gpu_info(
-    headers: Dict[str, str],
-    temp_metric: str,
+    result: List[Dict[str, Any]],
     vendor_name: str,
     model_name: str,
     info: Dict[str, Any]
 ) -> int:
-    """Helper function to fetch GPU info for a specific vendor.
+    """Helper function to record GPU info for a specific vendor.
     
     Args:
-        headers: Authentication headers for Prometheus
-        temp_metric: Temperature metric query (e.g., "DCGM_FI_DEV_GPU_TEMP")
+        result: Instant-vector result of the vendor's temperature metric
         vendor_name: Vendor display name (e.g., "NVIDIA")
         model_name: Model display name (e.g., "GPU")
         info: Dictionary to populate with vendor data
@@ -1541,15 +1437,6 @@ def _fetch_vendor_gpu_info(
         Count of GPUs/accelerators found for this vendor
     """
     try:
-        resp = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/query",
-            headers=headers,
-            params={"query": temp_metric},
-            verify=VERIFY_SSL,
-            timeout=30,
-        )
-        resp.raise_for_status()
-        result = resp.json().get("data", {}).get("result", [])
         count = len(result)
         if count > 0:
             temps = [float(series.get("value", [None, None])[1]) for series in result if series.get("value")]
@@ -1566,11 +1453,12 @@ def get_cluster_gpu_info() -> Dict[str, Any]:
 
     Returns a dict with total_gpus, vendors, models, temperatures, power_usage.
     
-    To add AMD support: Add a call to _fetch_vendor_gpu_info() with AMD-specific parameters
-    (e.g., temp_metric="GPU_JUNCTION_TEMPERATURE", vendor_name="AMD", model_name="Instinct")
+    All vendor temperature metrics are read with one batched instant query.
+
+    To add AMD support: Add an entry to GPU_VENDOR_TEMP_METRICS
+    (e.g., "AMD": ("GPU_JUNCTION_TEMPERATURE", "Instinct"))
     and update the mixed vendor logic to include AMD.
     """
-    headers = _auth_headers()
     info: Dict[str, Any] = {
         "total_gpus": 0,
         "vendors": [],
@@ -1579,17 +1467,19 @@ def get_cluster_gpu_info() -> Dict[str, Any]:
         "power_usage": [],
     }
     
-    # Fetch info for each vendor
-    nvidia_count = _fetch_vendor_gpu_info(
-        headers, "DCGM_FI_DEV_GPU_TEMP", "NVIDIA", "GPU", info
-    )
-    intel_count = _fetch_vendor_gpu_info(
-        headers, "habanalabs_temperature_onchip", "Intel Gaudi", "Gaudi Accelerator", info
-    )
-    # TODO: AMD - Add AMD support:
-    # amd_count = _fetch_vendor_gpu_info(
-    #     headers, "GPU_JUNCTION_TEMPERATURE", "AMD", "Instinct", info
-    # )
+    # Fetch all vendors in one round trip
+    try:
+        snapshot = fetch_snapshot({
+            vendor: temp_metric for vendor, (temp_metric, _model) in GPU_VENDOR_TEMP_METRICS.items()
+        })
+    except Exception:
+        snapshot = {}
+    counts = {
+        vendor: _fetch_vendor_gpu_info(snapshot.get(vendor, []), vendor, model, info)
+        for vendor, (_metric, model) in GPU_VENDOR_TEMP_METRICS.items()
+    }
+    nvidia_count = counts["NVIDIA"]
+    intel_count = counts["Intel Gaudi"]
     
     # Set total count and handle mixed vendor scenarios
     info["total_gpus"] = nvidia_count + intel_count
@@ -1605,19 +1495,11 @@ def get_cluster_gpu_info() -> Dict[str, Any]:
 
 def get_namespace_model_deployment_info(namespace: str, model: str) -> Dict[str, Any]:
     """Heuristic deployment info by probing kube_pod_info and vLLM cache timeline."""
-    headers = _auth_headers()
+    client = get_prometheus_client()
     try:
         # Probe pods in namespace
         query = f'kube_pod_info{{namespace="{namespace}"}}'
-        r = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/query",
-            headers=headers,
-            params={"query": query},
-            verify=VERIFY_SSL,
-            timeout=30,
-        )
-        r.raise_for_status()
-        result = r.json().get("data", {}).get("result", [])
+        result = client.query_instant(query).get("data", {}).get("result", [])
     except Exception:
         result = []
 
@@ -1630,15 +1512,12 @@ def get_namespace_model_deployment_info(namespace: str, model: str) -> Dict[str,
         try:
             one_week_ago = int((now - _td(days=7)).timestamp())
             vq = f'vllm:cache_config_info{{namespace="{namespace}"}}'
-            vr = requests.get(
-                f"{PROMETHEUS_URL}/api/v1/query_range",
-                headers=headers,
-                params={"query": vq, "start": one_week_ago, "end": int(now.timestamp()), "step": "1h"},
-                verify=VERIFY_SSL,
-                timeout=30,
-            )
-            if vr.status_code == 200:
-                vres = vr.json().get("data", {}).get("result", [])
+            try:
+                vr = client.query_range(vq, one_week_ago, int(now.timestamp()), "1h")
+            except requests.exceptions.HTTPError:
+                vr = None
+            if vr is not None:
+                vres = vr.get("data", {}).get("result", [])
                 if not vres:
                     is_new = True
                     deploy_date = now.strftime("%Y-%m-%d")
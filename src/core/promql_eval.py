@@ -0,0 +1,742 @@
+"""
+Local PromQL evaluation over cached raw series.
+
+Chat iterations often re-ask Prometheus/Thanos about the same underlying
+series with a different aggregation: ``sum by (pod)``, then ``max``, then a
+``rate`` over another window or a ``topk``. Each is a full upstream query.
+This module keeps the raw samples of recently used selectors in a
+process-wide RawSeriesStore and evaluates the common PromQL subset locally:
+
+- vector selectors (with ``offset``) and ``rate``/``increase``/``delta``
+- ``avg/min/max/sum/count/last_over_time``
+- ``sum/avg/min/max/count/group/stddev/stdvar/quantile`` and
+  ``topk``/``bottomk`` with ``by``/``without``
+- arithmetic and comparisons between vectors and scalars (one-to-one
+  matching with ``on``/``ignoring``), unary minus, a few math functions
+
+Anything else raises UnsupportedExpression, and selectors without cached
+raw samples raise CacheMiss; callers then fall back to the upstream query.
+evaluate_or_fetch implements that fallback and, with LOCAL_EVAL_PRIME_ON_MISS,
+fetches the raw samples of the expression's selectors alongside the upstream
+query so that follow-up re-aggregations are answered locally. A
+``count_over_time`` probe runs first so oversized selectors are never
+downloaded.
+
+Local evaluation is opt-in (LOCAL_EVAL_ENABLED, off by default). Upstream
+query results are evaluated at step boundaries, not raw samples, so priming
+is the only way the store is filled; enabling the evaluator therefore
+enables priming too unless LOCAL_EVAL_PRIME_ON_MISS says otherwise.
+
+Raw samples are read with range-vector instant queries, which do not return
+staleness markers. mark_stale synthesizes one scrape interval after the last
+sample of every series that ended before the fetched window, so vanished
+series drop out as they do in Prometheus instead of lingering for the 5m
+lookback.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    LOCAL_EVAL_ENABLED,
+    LOCAL_EVAL_MAX_BYTES,
+    LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS,
+    LOCAL_EVAL_MAX_SAMPLES,
+    LOCAL_EVAL_MAX_STALENESS_SECONDS,
+    LOCAL_EVAL_PRIME_HISTORY_SECONDS,
+    LOCAL_EVAL_PRIME_ON_MISS,
+)
+from .promql_parser import (
+    COMPARISON_OPS,
+    Aggregation,
+    BinaryOp,
+    Call,
+    Node,
+    NumberLiteral,
+    Paren,
+    PromQLSyntaxError,
+    Unary,
+    VectorSelector,
+    duration_seconds,
+    format_promql,
+    iter_selectors,
+    parse_promql,
+)
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK_MS = 5 * 60 * 1000
+
+# Bit pattern Prometheus uses for staleness markers (a NaN payload)
+STALE_NAN_BITS = np.uint64(0x7FF0000000000002)
+STALE_NAN = np.array([STALE_NAN_BITS], dtype=np.uint64).view(np.float64)[0]
+
+Labels = Tuple[Tuple[str, str], ...]
+RawSeries = Tuple[Labels, np.ndarray, np.ndarray]
+
+_RANGE_FUNCTIONS = frozenset({
+    "rate", "increase", "delta",
+    "avg_over_time", "min_over_time", "max_over_time", "sum_over_time", "count_over_time", "last_over_time",
+})
+_MATH_FUNCTIONS = {
+    "abs": np.abs, "ceil": np.ceil, "floor": np.floor, "sqrt": np.sqrt, "exp": np.exp,
+    "ln": np.log, "log2": np.log2, "log10": np.log10, "round": np.round,
+}
+_AGGREGATIONS = frozenset({"sum", "avg", "min", "max", "count", "group", "stddev", "stdvar", "quantile", "topk", "bottomk"})
+_ARITHMETIC = {
+    "+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide,
+    "%": np.fmod, "^": np.power, "atan2": np.arctan2,
+}
+_COMPARISONS = {
+    "==": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+
+
+class UnsupportedExpression(Exception):
+    """Raised for expressions outside the locally evaluated subset."""
+
+
+class CacheMiss(Exception):
+    """Raised when a selector's raw samples are not cached for the needed window."""
+
+    def __init__(self, selector: str):
+        super().__init__(selector)
+        self.selector = selector
+
+
+# --- Raw series store ---
+
+def selector_key(selector: VectorSelector) -> str:
+    """Canonical PromQL for a selector without range/offset (the store key)."""
+    matchers = tuple(sorted(selector.matchers, key=lambda m: (m.name, m.op, m.value)))
+    return format_promql(VectorSelector(selector.name, matchers))
+
+
+class _RawEntry:
+    __slots__ = ("from_ms", "to_ms", "series", "nbytes")
+
+    def __init__(self, from_ms: int, to_ms: int, series: List[RawSeries]):
+        self.from_ms = from_ms
+        self.to_ms = to_ms
+        self.series = series
+        self.nbytes = 256 + sum(64 * len(labels) + ts.nbytes + values.nbytes for labels, ts, values in series)
+
+
+class RawSeriesStore:
+    """Byte-bounded LRU of raw samples per selector and covered time range."""
+
+    def __init__(self, max_bytes: int = LOCAL_EVAL_MAX_BYTES,
+                 max_staleness_seconds: float = LOCAL_EVAL_MAX_STALENESS_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_staleness_ms = int(max_staleness_seconds * 1000)
+        self._entries: "OrderedDict[str, _RawEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, from_ms: int, to_ms: int) -> Optional[List[RawSeries]]:
+        """Return raw series covering [from_ms, to_ms], or None.
+
+        An entry ending slightly before to_ms (at most max_staleness) still
+        counts, so a window ending at "now" is served for a short while.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.from_ms > from_ms or entry.to_ms + self.max_staleness_ms < to_ms:
+                return None
+            self._entries.move_to_end(key)
+            return entry.series
+
+    def put(self, key: str, from_ms: int, to_ms: int, series: List[RawSeries]) -> None:
+        entry = _RawEntry(from_ms, to_ms, series)
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_raw_series_store = RawSeriesStore()
+_counters = {"local": 0, "misses": 0, "unsupported": 0}
+_counters_lock = threading.Lock()
+
+
+def get_raw_series_store() -> RawSeriesStore:
+    """Return the process-wide raw series store."""
+    return _raw_series_store
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def local_eval_stats() -> Dict[str, Any]:
+    """Return local-evaluation counters and raw store usage."""
+    with _counters_lock:
+        counters = dict(_counters)
+    return {**counters, "store": _raw_series_store.stats()}
+
+
+def parse_raw_matrix(result: List[Dict[str, Any]]) -> List[RawSeries]:
+    """Convert a range-vector ``data.result`` into raw series arrays."""
+    series: List[RawSeries] = []
+    for item in result or []:
+        values = item.get("values") or []
+        if not values:
+            continue
+        pairs = np.asarray(values, dtype=object)
+        ts = np.rint(pairs[:, 0].astype(np.float64) * 1000).astype(np.int64)
+        series.append((tuple(sorted((item.get("metric") or {}).items())), ts, pairs[:, 1].astype(np.float64)))
+    return series
+
+
+def is_stale(values: np.ndarray) -> np.ndarray:
+    """Boolean mask of staleness markers in a float64 sample array."""
+    return np.ascontiguousarray(values, dtype=np.float64).view(np.uint64) == STALE_NAN_BITS
+
+
+def mark_stale(series: List[RawSeries], to_ms: int) -> List[RawSeries]:
+    """Append a staleness marker to series that ended before ``to_ms``.
+
+    A series whose newest sample is more than two scrape intervals older
+    than the end of the fetched window has disappeared; Prometheus would
+    have written a marker at its next scrape, one interval after the last
+    sample.
+    """
+    marked: List[RawSeries] = []
+    for labels, ts, values in series:
+        if ts.size >= 2 and not is_stale(values[-1:])[0]:
+            interval = int(np.median(np.diff(ts)))
+            if interval > 0 and to_ms - ts[-1] > 2 * interval:
+                ts = np.append(ts, ts[-1] + interval)
+                values = np.append(values, STALE_NAN)
+        marked.append((labels, ts, values))
+    return marked
+
+
+# --- Evaluation ---
+
+class _Vector:
+    """Instant vector over the step grid: values/present have shape (series, steps)."""
+
+    __slots__ = ("labels", "values", "present")
+
+    def __init__(self, labels: List[Labels], values: np.ndarray, present: np.ndarray):
+        self.labels = labels
+        self.values = values
+        self.present = present
+
+
+class _Scalar:
+    __slots__ = ("values",)
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+
+def _drop_name(labels: Labels) -> Labels:
+    return tuple(item for item in labels if item[0] != "__name__")
+
+
+def _window_bounds(ts: np.ndarray, grid: np.ndarray, range_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sample index range [lo, hi) within [t - range, t] for each grid point."""
+    return np.searchsorted(ts, grid - range_ms, side="left"), np.searchsorted(ts, grid, side="right")
+
+
+def _extrapolated_delta(ts, values, lo, hi, grid, range_ms, is_counter, is_rate):
+    """Prometheus' extrapolatedRate for rate/increase/delta over each window."""
+    count = hi - lo
+    valid = count >= 2
+    first = np.minimum(lo, ts.size - 1)
+    last = np.clip(hi - 1, 0, ts.size - 1)
+    if is_counter:
+        drops = np.concatenate([[0.0], np.where(values[1:] < values[:-1], values[:-1], 0.0)])
+        corrected = values + np.cumsum(drops)
+        result = corrected[last] - corrected[first]
+    else:
+        result = values[last] - values[first]
+
+    range_start = (grid - range_ms) / 1000.0
+    range_end = grid / 1000.0
+    first_t = ts[first] / 1000.0
+    last_t = ts[last] / 1000.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sampled = last_t - first_t
+        average = sampled / (count - 1)
+        to_start = first_t - range_start
+        to_end = range_end - last_t
+        if is_counter:
+            to_zero = sampled * (values[first] / result)
+            use_zero = (result > 0) & (values[first] >= 0) & (to_zero < to_start)
+            to_start = np.where(use_zero, to_zero, to_start)
+        threshold = average * 1.1
+        interval = sampled + np.where(to_start < threshold, to_start, average / 2)
+        interval = interval + np.where(to_end < threshold, to_end, average / 2)
+        result = result * (interval / sampled)
+        if is_rate:
+            result = result / (range_ms / 1000.0)
+    return result, valid
+
+
+def _over_time(func: str, ts, values, lo, hi):
+    count = hi - lo
+    valid = count > 0
+    if func == "count_over_time":
+        return count.astype(np.float64), valid
+    if func == "last_over_time":
+        return values[np.clip(hi - 1, 0, ts.size - 1)], valid
+    if func in ("sum_over_time", "avg_over_time"):
+        csum = np.concatenate([[0.0], np.cumsum(values)])
+        total = csum[hi] - csum[lo]
+        if func == "sum_over_time":
+            return total, valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / count, valid
+    ufunc = np.fmin if func == "min_over_time" else np.fmax
+    padded = np.append(values, np.nan)
+    bounds = np.column_stack([np.minimum(lo, values.size), np.minimum(hi, values.size)]).ravel()
+    return ufunc.reduceat(padded, bounds)[::2], valid
+
+
+class _Evaluator:
+    def __init__(self, grid_ms: np.ndarray, lookup: Callable[[VectorSelector, int, int], List[RawSeries]]):
+        self.grid = grid_ms
+        self.lookup = lookup
+
+    def eval(self, node: Node):
+        if isinstance(node, NumberLiteral):
+            return _Scalar(np.full(self.grid.size, node.value))
+        if isinstance(node, Paren):
+            return self.eval(node.expr)
+        if isinstance(node, VectorSelector):
+            if node.range:
+                raise UnsupportedExpression("Range vectors are only supported as function arguments")
+            return self.instant_selector(node)
+        if isinstance(node, Call):
+            return self.call(node)
+        if isinstance(node, Aggregation):
+            return self.aggregate(node)
+        if isinstance(node, Unary):
+            operand = self.eval(node.expr)
+            if node.op == "+":
+                return operand
+            if isinstance(operand, _Scalar):
+                return _Scalar(-operand.values)
+            return _Vector([_drop_name(labels) for labels in operand.labels], -operand.values, operand.present)
+        if isinstance(node, BinaryOp):
+            return self.binary(node)
+        raise UnsupportedExpression(type(node).__name__)
+
+    def _selection(self, node: VectorSelector, range_ms: int) -> Tuple[List[RawSeries], np.ndarray]:
+        if node.at:
+            raise UnsupportedExpression("@ modifier")
+        grid = self.grid - int(duration_seconds(node.offset) * 1000 if node.offset else 0)
+        return self.lookup(node, int(grid[0]) - range_ms, int(grid[-1])), grid
+
+    def instant_selector(self, node: VectorSelector) -> _Vector:
+        series, grid = self._selection(node, LOOKBACK_MS)
+        labels, rows, masks = [], [], []
+        for series_labels, ts, values in series:
+            idx = np.searchsorted(ts, grid, side="right") - 1
+            safe = np.clip(idx, 0, None)
+            labels.append(series_labels)
+            rows.append(values[safe])
+            masks.append((idx >= 0) & (grid - ts[safe] <= LOOKBACK_MS) & ~is_stale(values[safe]))
+        return self._vector(labels, rows, masks)
+
+    def _vector(self, labels, rows, masks) -> _Vector:
+        if not labels:
+            return _Vector([], np.empty((0, self.grid.size)), np.zeros((0, self.grid.size), dtype=bool))
+        return _Vector(labels, np.vstack(rows), np.vstack(masks))
+
+    def call(self, node: Call):
+        func = node.func
+        if func in _RANGE_FUNCTIONS:
+            if len(node.args) != 1 or not isinstance(node.args[0], VectorSelector) or not node.args[0].range:
+                raise UnsupportedExpression(f"{func} needs a range-vector selector")
+            selector = node.args[0]
+            range_ms = int(duration_seconds(selector.range) * 1000)
+            series, grid = self._selection(selector, range_ms)
+            labels, rows, masks = [], [], []
+            for series_labels, ts, values in series:
+                live = ~is_stale(values)
+                ts, values = ts[live], values[live]
+                lo, hi = _window_bounds(ts, grid, range_ms)
+                if func in ("rate", "increase", "delta"):
+                    result, valid = _extrapolated_delta(
+                        ts, values, lo, hi, grid, range_ms, is_counter=func != "delta", is_rate=func == "rate"
+                    )
+                else:
+                    result, valid = _over_time(func, ts, values, lo, hi)
+                labels.append(series_labels if func == "last_over_time" else _drop_name(series_labels))
+                rows.append(result)
+                masks.append(valid)
+            return self._vector(labels, rows, masks)
+        if func in _MATH_FUNCTIONS and len(node.args) == 1:
+            vector = self._expect_vector(self.eval(node.args[0]))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = _MATH_FUNCTIONS[func](vector.values)
+            return _Vector([_drop_name(labels) for labels in vector.labels], values, vector.present)
+        if func in ("clamp_min", "clamp_max") and len(node.args) == 2:
+            vector = self._expect_vector(self.eval(node.args[0]))
+            bound = self._expect_scalar(self.eval(node.args[1]))
+            clamp = np.maximum if func == "clamp_min" else np.minimum
+            return _Vector([_drop_name(labels) for labels in vector.labels],
+                           clamp(vector.values, bound[None, :]), vector.present)
+        if func == "time" and not node.args:
+            return _Scalar(self.grid / 1000.0)
+        if func == "vector" and len(node.args) == 1:
+            values = self._expect_scalar(self.eval(node.args[0]))
+            return _Vector([()], values[None, :], np.ones((1, self.grid.size), dtype=bool))
+        raise UnsupportedExpression(f"function {func}")
+
+    @staticmethod
+    def _expect_vector(value) -> _Vector:
+        if not isinstance(value, _Vector):
+            raise UnsupportedExpression("expected an instant vector")
+        return value
+
+    @staticmethod
+    def _expect_scalar(value) -> np.ndarray:
+        if not isinstance(value, _Scalar):
+            raise UnsupportedExpression("expected a scalar")
+        return value.values
+
+    def aggregate(self, node: Aggregation) -> _Vector:
+        if node.op not in _AGGREGATIONS:
+            raise UnsupportedExpression(f"aggregation {node.op}")
+        vector = self._expect_vector(self.eval(node.expr))
+        param = self._expect_scalar(self.eval(node.param)) if node.param is not None else None
+
+        groups: Dict[Labels, List[int]] = {}
+        for row, labels in enumerate(vector.labels):
+            if node.without:
+                excluded = set(node.grouping) | {"__name__"}
+                key = tuple(item for item in labels if item[0] not in excluded)
+            else:
+                wanted = set(node.grouping)
+                key = tuple(item for item in labels if item[0] in wanted)
+            groups.setdefault(key, []).append(row)
+
+        labels_out, rows_out, masks_out = [], [], []
+        for key, rows in groups.items():
+            values = vector.values[rows]
+            present = vector.present[rows]
+            if node.op in ("topk", "bottomk"):
+                k = max(int(param[0]), 0)
+                ranked = values if node.op == "topk" else -values
+                scores = np.where(present & ~np.isnan(values), ranked, -np.inf)
+                order = np.argsort(-scores, axis=0, kind="stable")[:k]
+                selected = np.zeros_like(present)
+                np.put_along_axis(selected, order, True, axis=0)
+                selected &= present
+                for offset, row in enumerate(rows):
+                    if selected[offset].any():
+                        labels_out.append(vector.labels[row])
+                        rows_out.append(vector.values[row])
+                        masks_out.append(selected[offset])
+                continue
+            any_present = present.any(axis=0)
+            count = present.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                if node.op == "sum":
+                    result = np.where(present, values, 0.0).sum(axis=0)
+                elif node.op == "count":
+                    result = count.astype(np.float64)
+                elif node.op == "group":
+                    result = np.ones(self.grid.size)
+                elif node.op == "avg":
+                    result = np.where(present, values, 0.0).sum(axis=0) / count
+                elif node.op == "min":
+                    result = np.where(present, values, np.inf).min(axis=0)
+                elif node.op == "max":
+                    result = np.where(present, values, -np.inf).max(axis=0)
+                elif node.op == "quantile":
+                    phi = float(param[0])
+                    result = np.full(self.grid.size, -np.inf if phi < 0 else np.inf if phi > 1 else np.nan)
+                    cols = np.flatnonzero(any_present)
+                    if cols.size and 0 <= phi <= 1:
+                        result[cols] = np.nanquantile(np.where(present, values, np.nan)[:, cols], phi, axis=0)
+                else:  # stddev / stdvar
+                    mean = np.where(present, values, 0.0).sum(axis=0) / count
+                    variance = np.where(present, (values - mean) ** 2, 0.0).sum(axis=0) / count
+                    result = np.sqrt(variance) if node.op == "stddev" else variance
+            labels_out.append(key)
+            rows_out.append(result)
+            masks_out.append(any_present)
+        return self._vector(labels_out, rows_out, masks_out)
+
+    def binary(self, node: BinaryOp):
+        if node.op not in _ARITHMETIC and node.op not in _COMPARISONS:
+            raise UnsupportedExpression(f"operator {node.op}")
+        if node.group:
+            raise UnsupportedExpression("group_left/group_right")
+        lhs, rhs = self.eval(node.lhs), self.eval(node.rhs)
+        comparison = node.op in COMPARISON_OPS
+        func = _COMPARISONS[node.op] if comparison else _ARITHMETIC[node.op]
+
+        def apply(a, b):
+            with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+                return func(a, b)
+
+        if isinstance(lhs, _Scalar) and isinstance(rhs, _Scalar):
+            if comparison and not node.return_bool:
+                raise UnsupportedExpression("comparison between scalars requires bool")
+            return _Scalar(apply(lhs.values, rhs.values).astype(np.float64))
+
+        keep_name = comparison and not node.return_bool
+        if isinstance(lhs, _Scalar) or isinstance(rhs, _Scalar):
+            vector = rhs if isinstance(lhs, _Scalar) else lhs
+            a = lhs.values[None, :] if isinstance(lhs, _Scalar) else lhs.values
+            b = rhs.values[None, :] if isinstance(rhs, _Scalar) else rhs.values
+            result = apply(a, b)
+            present = vector.present
+            if comparison:
+                if node.return_bool:
+                    values = result.astype(np.float64)
+                else:
+                    values, present = vector.values, present & result
+            else:
+                values = result
+            labels = vector.labels if keep_name else [_drop_name(labels) for labels in vector.labels]
+            return _Vector(labels, values, present)
+
+        def signature(labels: Labels) -> Labels:
+            if node.matching == "on":
+                wanted = set(node.matching_labels)
+                return tuple(item for item in labels if item[0] in wanted)
+            excluded = set(node.matching_labels) | {"__name__"}
+            return tuple(item for item in labels if item[0] not in excluded)
+
+        rhs_rows: Dict[Labels, int] = {}
+        for row, labels in enumerate(rhs.labels):
+            if rhs_rows.setdefault(signature(labels), row) != row:
+                raise UnsupportedExpression("many-to-many matching")
+        seen: Dict[Labels, int] = {}
+        labels_out, rows_out, masks_out = [], [], []
+        for row, labels in enumerate(lhs.labels):
+            sig = signature(labels)
+            match = rhs_rows.get(sig)
+            if match is None:
+                continue
+            if seen.setdefault(sig, row) != row:
+                raise UnsupportedExpression("many-to-one matching without group_left")
+            result = apply(lhs.values[row], rhs.values[match])
+            present = lhs.present[row] & rhs.present[match]
+            if comparison and not node.return_bool:
+                values, present = lhs.values[row], present & result
+            else:
+                values = result.astype(np.float64)
+            out = labels if keep_name else _drop_name(labels)
+            if node.matching == "on":
+                wanted = set(node.matching_labels)
+                out = tuple(item for item in out if item[0] in wanted)
+            elif node.matching == "ignoring":
+                excluded = set(node.matching_labels)
+                out = tuple(item for item in out if item[0] not in excluded)
+            labels_out.append(out)
+            rows_out.append(values)
+            masks_out.append(present)
+        return self._vector(labels_out, rows_out, masks_out)
+
+
+def _store_lookup(store: RawSeriesStore) -> Callable[[VectorSelector, int, int], List[RawSeries]]:
+    def lookup(selector: VectorSelector, from_ms: int, to_ms: int) -> List[RawSeries]:
+        key = selector_key(selector)
+        series = store.get(key, from_ms, to_ms)
+        if series is None:
+            raise CacheMiss(key)
+        return series
+
+    return lookup
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return np.format_float_positional(value, trim="-")
+
+
+def _format_time(ms: int) -> Any:
+    return ms // 1000 if ms % 1000 == 0 else ms / 1000.0
+
+
+def evaluate(node: Node, grid_ms: np.ndarray, store: Optional[RawSeriesStore] = None):
+    """Evaluate an expression on a step grid (epoch ms) from the raw series store.
+
+    Returns the internal vector/scalar result.
+
+    Raises:
+        UnsupportedExpression: For expressions outside the local subset
+        CacheMiss: When a selector's raw samples are not cached
+    """
+    return _Evaluator(np.asarray(grid_ms, dtype=np.int64), _store_lookup(store or _raw_series_store)).eval(node)
+
+
+def evaluate_range(query: str, start: float, end: float, step_seconds: float,
+                   store: Optional[RawSeriesStore] = None) -> Dict[str, Any]:
+    """Evaluate a range query locally; returns a query_range-style response."""
+    start_ms, end_ms = int(round(start * 1000)), int(round(end * 1000))
+    grid = np.arange(start_ms, end_ms + 1, max(1, int(step_seconds * 1000)), dtype=np.int64)
+    result = evaluate(parse_promql(query), grid, store)
+    series: List[Dict[str, Any]] = []
+    if isinstance(result, _Scalar):
+        rows = [((), result.values, np.ones(grid.size, dtype=bool))]
+    else:
+        rows = sorted(zip(result.labels, result.values, result.present), key=lambda row: row[0])
+    for labels, values, present in rows:
+        points = [[_format_time(int(t)), _format_value(float(v))] for t, v, p in zip(grid, values, present) if p]
+        if points:
+            series.append({"metric": dict(labels), "values": points})
+    return {"status": "success", "data": {"resultType": "matrix", "result": series}}
+
+
+def evaluate_instant(query: str, time_seconds: float, store: Optional[RawSeriesStore] = None) -> Dict[str, Any]:
+    """Evaluate an instant query locally; returns a /api/v1/query-style response."""
+    t = int(round(time_seconds * 1000))
+    result = evaluate(parse_promql(query), np.array([t], dtype=np.int64), store)
+    if isinstance(result, _Scalar):
+        data = {"resultType": "scalar", "result": [_format_time(t), _format_value(float(result.values[0]))]}
+    else:
+        data = {"resultType": "vector", "result": [
+            {"metric": dict(labels), "value": [_format_time(t), _format_value(float(values[0]))]}
+            for labels, values, present in sorted(zip(result.labels, result.values, result.present),
+                                                  key=lambda row: row[0])
+            if present[0]
+        ]}
+    return {"status": "success", "data": data}
+
+
+def _raw_window(node: Node, start_ms: int, end_ms: int) -> Dict[str, Tuple[int, int]]:
+    """Return the raw-sample window each selector of an expression needs."""
+    windows: Dict[str, Tuple[int, int]] = {}
+    for selector in iter_selectors(node):
+        range_ms = int(duration_seconds(selector.range) * 1000) if selector.range else LOOKBACK_MS
+        offset_ms = int(duration_seconds(selector.offset) * 1000) if selector.offset else 0
+        key = selector_key(selector)
+        lo, hi = windows.get(key, (start_ms, end_ms))
+        windows[key] = (min(lo, start_ms - offset_ms - range_ms), max(hi, end_ms - offset_ms))
+    return windows
+
+
+def _sample_count(response: Dict[str, Any]) -> Optional[int]:
+    """Read the scalar result of a ``sum(count_over_time(...))`` probe."""
+    data = (response or {}).get("data") or {}
+    result = data.get("result") or []
+    if data.get("resultType") != "vector":
+        return None
+    try:
+        return int(float(result[0]["value"][1])) if result else 0
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def prime_raw_series(
+    query: str, start: float, end: float, fetch_raw: Callable[[str, float], Dict[str, Any]],
+    store: Optional[RawSeriesStore] = None,
+) -> int:
+    """Fetch and store raw samples for every selector of an expression.
+
+    Extra history (LOCAL_EVAL_PRIME_HISTORY_SECONDS) is fetched so follow-up
+    queries with longer ranges are covered too. Windows longer than
+    LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS are skipped, and each selector's sample
+    count is probed with ``count_over_time`` first so selectors above
+    LOCAL_EVAL_MAX_SAMPLES are never downloaded. Returns the number of
+    selectors stored; never raises.
+
+    Args:
+        fetch_raw: Runs an instant query (query, time in seconds) and returns the response
+    """
+    store = store or _raw_series_store
+    stored = 0
+    try:
+        node = parse_promql(query)
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        for key, (lo, hi) in _raw_window(node, start_ms, end_ms).items():
+            lo -= LOCAL_EVAL_PRIME_HISTORY_SECONDS * 1000
+            window_seconds = math.ceil((hi - lo) / 1000)
+            if window_seconds > LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS:
+                continue
+            samples = _sample_count(fetch_raw(f"sum(count_over_time({key}[{window_seconds}s]))", hi / 1000.0))
+            if samples is None or samples > LOCAL_EVAL_MAX_SAMPLES:
+                logger.debug("Not priming %s: %s samples", key, samples)
+                continue
+            response = fetch_raw(f"{key}[{window_seconds}s]", hi / 1000.0)
+            data = (response or {}).get("data") or {}
+            if data.get("resultType") != "matrix":
+                continue
+            series = parse_raw_matrix(data.get("result"))
+            if sum(ts.size for _, ts, _ in series) > LOCAL_EVAL_MAX_SAMPLES:
+                continue
+            store.put(key, hi - window_seconds * 1000, hi, mark_stale(series, hi))
+            stored += 1
+    except Exception as e:
+        logger.debug("Priming raw series for %r failed: %s", query, e)
+    return stored
+
+
+def evaluate_or_fetch(
+    query: str,
+    fetch: Callable[[], Dict[str, Any]],
+    fetch_raw: Callable[[str, float], Dict[str, Any]],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    step_seconds: Optional[float] = None,
+    prime: bool = True,
+) -> Dict[str, Any]:
+    """Answer a query locally when possible, otherwise via ``fetch``.
+
+    Range queries pass start/end/step_seconds; instant queries pass only
+    end (the evaluation time, default now). On a cache miss for a supported
+    expression the raw samples are fetched alongside the upstream query when
+    LOCAL_EVAL_PRIME_ON_MISS is set and ``prime`` is true.
+    """
+    if not LOCAL_EVAL_ENABLED:
+        return fetch()
+    is_range = start is not None and step_seconds is not None
+    end = time.time() if end is None else end
+    try:
+        if is_range:
+            response = evaluate_range(query, start, end, step_seconds)
+        else:
+            response = evaluate_instant(query, end)
+        _count("local")
+        return response
+    except (UnsupportedExpression, PromQLSyntaxError, ValueError):
+        _count("unsupported")
+        return fetch()
+    except CacheMiss:
+        _count("misses")
+    if not (LOCAL_EVAL_PRIME_ON_MISS and prime):
+        return fetch()
+
+    from .fetch_engine import fetch_concurrently
+
+    results = fetch_concurrently({
+        "response": fetch,
+        "prime": lambda: prime_raw_series(query, start if is_range else end, end, fetch_raw),
+    })
+    return results["response"]
@@ -0,0 +1,517 @@
+"""
+PromQL tokenizer, parser and printer.
+
+Parses the PromQL grammar used by dashboards and LLM-generated queries into a
+small immutable AST: vector selectors (with ranges, offsets and ``@``),
+subqueries, function calls, aggregations (with ``by``/``without`` before or
+after the body and optional parameter), unary and binary expressions with
+Prometheus' operator precedence and vector-matching modifiers, and number or
+string literals. ``format_promql`` prints an AST back to equivalent PromQL.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+AGGREGATION_OPS = frozenset({
+    "sum", "avg", "count", "min", "max", "group", "stddev", "stdvar",
+    "topk", "bottomk", "quantile", "count_values", "limitk", "limit_ratio",
+})
+PARAMETERIZED_AGGREGATIONS = frozenset({"topk", "bottomk", "quantile", "count_values", "limitk", "limit_ratio"})
+
+# Binary operator precedence (higher binds tighter); "^" is right-associative
+_PRECEDENCE = {
+    "or": 1,
+    "and": 2, "unless": 2,
+    "==": 3, "!=": 3, "<=": 3, "<": 3, ">=": 3, ">": 3,
+    "+": 4, "-": 4,
+    "*": 5, "/": 5, "%": 5, "atan2": 5,
+    "^": 6,
+}
+COMPARISON_OPS = frozenset({"==", "!=", "<=", "<", ">=", ">"})
+SET_OPS = frozenset({"and", "or", "unless"})
+_KEYWORD_OPS = frozenset({"and", "or", "unless", "atan2"})
+
+
+class PromQLSyntaxError(ValueError):
+    """Raised when an expression cannot be parsed."""
+
+
+# --- AST ---
+
+@dataclass(frozen=True)
+class NumberLiteral:
+    value: float
+    text: str
+
+
+@dataclass(frozen=True)
+class StringLiteral:
+    value: str
+
+
+@dataclass(frozen=True)
+class LabelMatcher:
+    name: str
+    op: str
+    value: str
+
+
+@dataclass(frozen=True)
+class VectorSelector:
+    name: Optional[str]
+    matchers: Tuple[LabelMatcher, ...] = ()
+    range: Optional[str] = None
+    offset: Optional[str] = None
+    at: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Subquery:
+    expr: "Node"
+    range: str
+    step: Optional[str] = None
+    offset: Optional[str] = None
+    at: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Call:
+    func: str
+    args: Tuple["Node", ...] = ()
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    op: str
+    expr: "Node"
+    param: Optional["Node"] = None
+    grouping: Tuple[str, ...] = ()
+    without: bool = False
+    has_grouping: bool = False
+
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    expr: "Node"
+
+
+@dataclass(frozen=True)
+class BinaryOp:
+    op: str
+    lhs: "Node"
+    rhs: "Node"
+    return_bool: bool = False
+    matching: Optional[str] = None  # "on" or "ignoring"
+    matching_labels: Tuple[str, ...] = ()
+    group: Optional[str] = None  # "group_left" or "group_right"
+    group_labels: Tuple[str, ...] = field(default=())
+
+
+@dataclass(frozen=True)
+class Paren:
+    expr: "Node"
+
+
+Node = Union[NumberLiteral, StringLiteral, VectorSelector, Subquery, Call, Aggregation, Unary, BinaryOp, Paren]
+
+
+# --- Tokenizer ---
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<duration>(?:\d+(?:ms|s|m|h|d|w|y))+(?!\w))
+  | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|`[^`]*`)
+  | (?P<ident>[a-zA-Z_:][a-zA-Z0-9_:]*)
+  | (?P<op>=~|!~|==|!=|<=|>=|[-+*/%^<>=])
+  | (?P<punct>[(){}\[\],:@])
+""", re.VERBOSE)
+
+_ESCAPES = {"a": "\a", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v",
+            "\\": "\\", "'": "'", '"': '"'}
+_ESCAPE_RE = re.compile(r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|[0-7]{3}|.)", re.S)
+
+
+def _unquote(text: str) -> str:
+    body = text[1:-1]
+    if text[0] == "`":
+        return body
+
+    def _replace(match: "re.Match[str]") -> str:
+        esc = match.group(1)
+        if esc[0] in "xuU":
+            return chr(int(esc[1:], 16))
+        if esc[0].isdigit():
+            return chr(int(esc, 8))
+        if esc in _ESCAPES:
+            return _ESCAPES[esc]
+        raise PromQLSyntaxError(f"Unknown escape sequence \\{esc}")
+
+    return _ESCAPE_RE.sub(_replace, body)
+
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    """Split an expression into (kind, text, position) tokens."""
+    tokens: List[Tuple[str, str, int]] = []
+    pos = 0
+    in_brackets = False
+    while pos < len(text):
+        if in_brackets and text[pos] == ":":  # subquery separator, not a metric name
+            tokens.append(("punct", ":", pos))
+            pos += 1
+            continue
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise PromQLSyntaxError(f"Unexpected character {text[pos]!r} at position {pos}")
+        kind = match.lastgroup
+        if kind == "punct" and match.group() in "[]":
+            in_brackets = match.group() == "["
+        if kind != "ws":
+            tokens.append((kind, match.group(), pos))
+        pos = match.end()
+    tokens.append(("eof", "", pos))
+    return tokens
+
+
+# --- Parser ---
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str, int]:
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Tuple[str, str, int]:
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def error(self, message: str) -> PromQLSyntaxError:
+        kind, text, pos = self.peek()
+        found = "end of input" if kind == "eof" else repr(text)
+        return PromQLSyntaxError(f"{message} at position {pos} (found {found})")
+
+    def accept(self, text: str) -> bool:
+        if self.peek()[1] == text and self.peek()[0] in ("punct", "op"):
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            raise self.error(f"Expected {text!r}")
+
+    def keyword(self, *words: str) -> Optional[str]:
+        kind, text, _ = self.peek()
+        if kind == "ident" and text.lower() in words:
+            self.index += 1
+            return text.lower()
+        return None
+
+    def parse(self) -> Node:
+        node = self.parse_expr(0)
+        if self.peek()[0] != "eof":
+            raise self.error("Unexpected token")
+        return node
+
+    def binary_operator(self) -> Optional[str]:
+        kind, text, _ = self.peek()
+        if kind == "op" and text in _PRECEDENCE:
+            return text
+        if kind == "ident" and text.lower() in _KEYWORD_OPS:
+            return text.lower()
+        return None
+
+    def parse_expr(self, min_precedence: int) -> Node:
+        lhs = self.parse_unary()
+        while True:
+            op = self.binary_operator()
+            if op is None or _PRECEDENCE[op] < min_precedence:
+                return lhs
+            self.next()
+            return_bool = self.keyword("bool") is not None
+            matching = self.keyword("on", "ignoring")
+            matching_labels = self.label_list() if matching else ()
+            group = self.keyword("group_left", "group_right")
+            group_labels = self.label_list() if group and self.peek()[1] == "(" else ()
+            next_min = _PRECEDENCE[op] if op == "^" else _PRECEDENCE[op] + 1
+            rhs = self.parse_expr(next_min)
+            lhs = BinaryOp(op, lhs, rhs, return_bool, matching, matching_labels, group, group_labels)
+
+    def parse_unary(self) -> Node:
+        kind, text, _ = self.peek()
+        if kind == "op" and text in ("+", "-"):
+            self.next()
+            return Unary(text, self.parse_expr(_PRECEDENCE["^"]))
+        return self.parse_postfix(self.parse_primary())
+
+    def parse_postfix(self, node: Node) -> Node:
+        while True:
+            if self.peek()[1] == "[":
+                self.next()
+                range_ = self.duration()
+                if self.accept(":"):
+                    step = None if self.peek()[1] == "]" else self.duration()
+                    self.expect("]")
+                    node = Subquery(node, range_, step)
+                else:
+                    self.expect("]")
+                    if not isinstance(node, VectorSelector) or node.range or node.offset or node.at:
+                        raise self.error("Ranges are only allowed on vector selectors")
+                    node = VectorSelector(node.name, node.matchers, range_)
+            elif self.keyword("offset"):
+                sign = "-" if self.accept("-") else ""
+                offset = sign + self.duration()
+                node = self._with(node, offset=offset)
+            elif self.accept("@"):
+                kind, text, _ = self.next()
+                if kind == "ident" and text in ("start", "end"):
+                    self.expect("(")
+                    self.expect(")")
+                    text += "()"
+                elif kind == "op" and text in "+-" and self.peek()[0] == "number":
+                    text += self.next()[1]
+                elif kind != "number":
+                    raise self.error("Expected timestamp after @")
+                node = self._with(node, at=text)
+            else:
+                return node
+
+    def _with(self, node: Node, **changes: str) -> Node:
+        if isinstance(node, VectorSelector):
+            return VectorSelector(node.name, node.matchers, node.range,
+                                  changes.get("offset", node.offset), changes.get("at", node.at))
+        if isinstance(node, Subquery):
+            return Subquery(node.expr, node.range, node.step,
+                            changes.get("offset", node.offset), changes.get("at", node.at))
+        raise self.error("offset/@ modifiers must follow a selector or subquery")
+
+    def duration(self) -> str:
+        kind, text, _ = self.next()
+        if kind == "duration" or (kind == "number" and re.fullmatch(r"\d+", text)):
+            return text
+        self.index -= 1
+        raise self.error("Expected duration")
+
+    def label_list(self) -> Tuple[str, ...]:
+        self.expect("(")
+        labels: List[str] = []
+        while not self.accept(")"):
+            kind, text, _ = self.next()
+            if kind == "string":
+                text = _unquote(text)
+            elif kind != "ident":
+                self.index -= 1
+                raise self.error("Expected label name")
+            labels.append(text)
+            if not self.accept(","):
+                self.expect(")")
+                break
+        return tuple(labels)
+
+    def parse_primary(self) -> Node:
+        kind, text, _ = self.peek()
+        if kind == "number":
+            self.next()
+            return NumberLiteral(float.fromhex(text) if text[:2].lower() == "0x" else float(text), text)
+        if kind == "string":
+            self.next()
+            return StringLiteral(_unquote(text))
+        if kind == "punct" and text == "(":
+            self.next()
+            node = self.parse_expr(0)
+            self.expect(")")
+            return Paren(node)
+        if kind == "punct" and text == "{":
+            return VectorSelector(None, self.matchers())
+        if kind != "ident":
+            raise self.error("Expected expression")
+
+        lower = text.lower()
+        following = self.peek(1)[1]
+        if lower in AGGREGATION_OPS and (following == "(" or following.lower() in ("by", "without")):
+            return self.aggregation()
+        if lower in ("inf", "nan") and following != "{":
+            self.next()
+            return NumberLiteral(float(lower), text)
+        self.next()
+        if following == "(":
+            return Call(text, self.call_args())
+        if self.peek()[1] == "{":
+            return VectorSelector(text, self.matchers())
+        return VectorSelector(text)
+
+    def call_args(self) -> Tuple[Node, ...]:
+        self.expect("(")
+        args: List[Node] = []
+        while not self.accept(")"):
+            args.append(self.parse_expr(0))
+            if not self.accept(","):
+                self.expect(")")
+                break
+        return tuple(args)
+
+    def aggregation(self) -> Aggregation:
+        op = self.next()[1].lower()
+        grouping: Tuple[str, ...] = ()
+        without = has_grouping = False
+        modifier = self.keyword("by", "without")
+        if modifier:
+            grouping, without, has_grouping = self.label_list(), modifier == "without", True
+        args = self.call_args()
+        modifier = self.keyword("by", "without")
+        if modifier:
+            if has_grouping:
+                raise self.error("Duplicate grouping clause")
+            grouping, without, has_grouping = self.label_list(), modifier == "without", True
+        expected = 2 if op in PARAMETERIZED_AGGREGATIONS else 1
+        if len(args) != expected:
+            raise PromQLSyntaxError(f"{op} expects {expected} argument(s), got {len(args)}")
+        param, expr = (args[0], args[1]) if expected == 2 else (None, args[0])
+        return Aggregation(op, expr, param, grouping, without, has_grouping)
+
+    def matchers(self) -> Tuple[LabelMatcher, ...]:
+        self.expect("{")
+        result: List[LabelMatcher] = []
+        while not self.accept("}"):
+            kind, name, _ = self.next()
+            if kind != "ident":
+                self.index -= 1
+                raise self.error("Expected label name")
+            op_kind, op, _ = self.next()
+            if op_kind != "op" or op not in ("=", "!=", "=~", "!~"):
+                self.index -= 1
+                raise self.error("Expected label matching operator")
+            value_kind, value, _ = self.next()
+            if value_kind != "string":
+                self.index -= 1
+                raise self.error("Expected string label value")
+            result.append(LabelMatcher(name, op, _unquote(value)))
+            if not self.accept(","):
+                self.expect("}")
+                break
+        return tuple(result)
+
+
+def parse_promql(text: str) -> Node:
+    """Parse a PromQL expression into an AST.
+
+    Raises:
+        PromQLSyntaxError: If the expression is not valid PromQL
+    """
+    return _Parser(text).parse()
+
+
+# --- Traversal and printing ---
+
+def children(node: Node) -> Tuple[Node, ...]:
+    """Return the direct sub-expressions of a node."""
+    if isinstance(node, (Subquery, Unary, Paren)):
+        return (node.expr,)
+    if isinstance(node, Call):
+        return node.args
+    if isinstance(node, Aggregation):
+        return (node.param, node.expr) if node.param is not None else (node.expr,)
+    if isinstance(node, BinaryOp):
+        return (node.lhs, node.rhs)
+    return ()
+
+
+def iter_selectors(node: Node) -> Iterator[VectorSelector]:
+    """Yield every vector selector of an expression, left to right."""
+    if isinstance(node, VectorSelector):
+        yield node
+    for child in children(node):
+        yield from iter_selectors(child)
+
+
+def transform(node: Node, fn: Callable[[Node], Node]) -> Node:
+    """Rebuild an expression bottom-up, replacing every node with ``fn(node)``."""
+    if isinstance(node, (Subquery, Unary, Paren)):
+        node = replace(node, expr=transform(node.expr, fn))
+    elif isinstance(node, Call):
+        node = replace(node, args=tuple(transform(arg, fn) for arg in node.args))
+    elif isinstance(node, Aggregation):
+        param = transform(node.param, fn) if node.param is not None else None
+        node = replace(node, expr=transform(node.expr, fn), param=param)
+    elif isinstance(node, BinaryOp):
+        node = replace(node, lhs=transform(node.lhs, fn), rhs=transform(node.rhs, fn))
+    return fn(node)
+
+
+def quote(value: str) -> str:
+    """Quote a string as a PromQL double-quoted literal."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _labels(names: Tuple[str, ...]) -> str:
+    return "(" + ", ".join(names) + ")"
+
+
+def format_promql(node: Node) -> str:
+    """Print an AST as PromQL."""
+    if isinstance(node, NumberLiteral):
+        return node.text
+    if isinstance(node, StringLiteral):
+        return quote(node.value)
+    if isinstance(node, VectorSelector):
+        text = node.name or ""
+        if node.matchers or not node.name:
+            text += "{" + ", ".join(f"{m.name}{m.op}{quote(m.value)}" for m in node.matchers) + "}"
+        if node.range:
+            text += f"[{node.range}]"
+        if node.offset:
+            text += f" offset {node.offset}"
+        if node.at:
+            text += f" @ {node.at}"
+        return text
+    if isinstance(node, Subquery):
+        text = f"{format_promql(node.expr)}[{node.range}:{node.step or ''}]"
+        if node.offset:
+            text += f" offset {node.offset}"
+        if node.at:
+            text += f" @ {node.at}"
+        return text
+    if isinstance(node, Call):
+        return f"{node.func}(" + ", ".join(format_promql(arg) for arg in node.args) + ")"
+    if isinstance(node, Aggregation):
+        text = node.op
+        if node.has_grouping:
+            text += (" without " if node.without else " by ") + _labels(node.grouping) + " "
+        args = ([format_promql(node.param)] if node.param is not None else []) + [format_promql(node.expr)]
+        return text + "(" + ", ".join(args) + ")"
+    if isinstance(node, Unary):
+        return node.op + format_promql(node.expr)
+    if isinstance(node, BinaryOp):
+        text = f"{format_promql(node.lhs)} {node.op}"
+        if node.return_bool:
+            text += " bool"
+        if node.matching:
+            text += f" {node.matching}{_labels(node.matching_labels)}"
+        if node.group:
+            text += f" {node.group}" + (_labels(node.group_labels) if node.group_labels else "")
+        return f"{text} {format_promql(node.rhs)}"
+    if isinstance(node, Paren):
+        return f"({format_promql(node.expr)})"
+    raise TypeError(f"Unknown PromQL node {node!r}")
+
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+_DURATION_PART_RE = re.compile(r"(\d+)(ms|s|m|h|d|w|y)")
+
+
+def duration_seconds(text: str) -> float:
+    """Convert a PromQL duration ("5m", "1h30m", "-5m", or plain seconds) to seconds."""
+    sign = -1 if text.startswith("-") else 1
+    text = text.lstrip("+-")
+    if text.isdigit():
+        return sign * float(text)
+    parts = _DURATION_PART_RE.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise PromQLSyntaxError(f"Invalid duration {text!r}")
+    return sign * sum(int(n) * _DURATION_UNITS[u] for n, u in parts)
@@ -0,0 +1,218 @@
+"""
+AST-based PromQL rewrites with a per-process rewrite cache.
+
+Label scoping (``namespace``/``model_name`` injection) and the clean-up of
+LLM-generated PromQL used to be regex surgery on the query text, repeated on
+every call and limited to the first matching pattern (e.g. only the first
+aggregation of ``sum(a) / sum(b)`` got scoped). These helpers parse the
+expression once, rewrite every vector selector on the AST and print it back.
+Results are memoized per (expression, label set), so the hot dashboard
+queries are rewritten once per process.
+
+Scoping fails closed: valid PromQL the parser does not know (newer syntax,
+Grafana ``$__rate_interval`` variables) is scoped with a text scanner that
+adds the matchers to every metric name and bare ``{...}`` selector instead
+of being sent upstream unscoped.
+"""
+
+import logging
+import re
+from dataclasses import replace
+from functools import lru_cache
+from typing import Iterator, Mapping, Optional, Set, Tuple
+
+from .config import PROMQL_REWRITE_CACHE_SIZE
+from .promql_parser import (
+    Aggregation,
+    BinaryOp,
+    Call,
+    LabelMatcher,
+    Node,
+    Paren,
+    PromQLSyntaxError,
+    Unary,
+    VectorSelector,
+    children,
+    format_promql,
+    iter_selectors,
+    parse_promql,
+    quote,
+    transform,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SUM_METRIC = "vllm:e2e_request_latency_seconds_sum"
+LATENCY_BUCKET_METRIC = "vllm:e2e_request_latency_seconds_bucket"
+_RANGE_REQUIRED_FUNCTIONS = frozenset({"rate", "irate", "increase"})
+
+# Text fallback: strings, label matchers, ranges, numbers/durations and
+# dashboard variables are copied as-is; identifiers are scoped unless they
+# are keywords or function/aggregation names
+_QUOTED = r"""(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|`[^`]*`)"""
+_TEXT_TOKEN_RE = re.compile(rf"""
+    (?P<string>{_QUOTED})
+  | (?P<braces>\{{(?:{_QUOTED}|[^}}"'`])*\}})
+  | (?P<brackets>\[[^\]]*\])
+  | (?P<labels>(?i:by|without|on|ignoring|group_left|group_right)\s*\([^)]*\))
+  | (?P<literal>\d[\w.]*|\$\{{[^}}]*\}}|\$\w+)
+  | (?P<ident>[a-zA-Z_:][a-zA-Z0-9_:]*)
+""", re.VERBOSE)
+_GROUPING_RE = re.compile(r"(?i:by|without)\s*\(")  # "sum by (...)": sum is an aggregation
+_MATCHER_ITEM_RE = re.compile(rf"""(?:{_QUOTED}|[^,"'`])+""")
+_TEXT_KEYWORDS = frozenset({
+    "by", "without", "on", "ignoring", "group_left", "group_right", "bool", "offset",
+    "and", "or", "unless", "atan2", "inf", "nan",
+})
+
+
+def _scope_braces(text: str, names: Set[str], injected: str) -> str:
+    """Replace matchers on the injected label names inside a ``{...}`` block."""
+    kept = [
+        item.strip() for item in _MATCHER_ITEM_RE.findall(text[1:-1])
+        if item.strip() and re.match(r"\s*([a-zA-Z_]\w*)", item).group(1) not in names
+    ]
+    return "{" + ", ".join(kept + [injected]) + "}"
+
+
+def _inject_text(query: str, labels: Tuple[Tuple[str, str], ...], metric_prefix: Optional[str]) -> str:
+    """Scope every selector of a query the parser rejects, on the query text."""
+    names = {name for name, _ in labels}
+    injected = ", ".join(f"{name}={quote(value)}" for name, value in labels)
+    out = []
+    pos = 0
+    while pos < len(query):
+        match = _TEXT_TOKEN_RE.match(query, pos)
+        if not match:
+            out.append(query[pos])
+            pos += 1
+            continue
+        text, pos = match.group(), match.end()
+        if match.lastgroup == "braces" and metric_prefix is None:
+            text = _scope_braces(text, names, injected)
+        elif match.lastgroup == "ident":
+            rest = query[pos:].lstrip()
+            is_metric = not (
+                text.lower() in _TEXT_KEYWORDS or rest.startswith("(") or _GROUPING_RE.match(rest)
+            )
+            if is_metric and (not metric_prefix or text.startswith(metric_prefix)):
+                braces = _TEXT_TOKEN_RE.match(query, len(query) - len(rest))
+                if braces is not None and braces.lastgroup == "braces":
+                    text += _scope_braces(braces.group(), names, injected)
+                    pos = braces.end()
+                else:
+                    text += "{" + injected + "}"
+        out.append(text)
+    return "".join(out)
+
+
+@lru_cache(maxsize=PROMQL_REWRITE_CACHE_SIZE)
+def _inject(query: str, labels: Tuple[Tuple[str, str], ...], metric_prefix: Optional[str]) -> str:
+    try:
+        tree = parse_promql(query)
+    except PromQLSyntaxError as e:
+        logger.warning("Scoping unparseable PromQL %r on its text: %s", query, e)
+        return _inject_text(query, labels, metric_prefix)
+    names = {name for name, _ in labels}
+    injected = tuple(LabelMatcher(name, "=", value) for name, value in labels)
+
+    def scope(node: Node) -> Node:
+        if not isinstance(node, VectorSelector):
+            return node
+        if metric_prefix and not (node.name or "").startswith(metric_prefix):
+            return node
+        kept = tuple(m for m in node.matchers if m.name not in names)
+        return replace(node, matchers=kept + injected)
+
+    return format_promql(transform(tree, scope))
+
+
+def inject_matchers(query: str, labels: Mapping[str, str], metric_prefix: Optional[str] = None) -> str:
+    """Scope every vector selector of a query to the given label values.
+
+    Existing matchers on the injected label names are replaced, so the
+    result can never select outside the requested scope. Queries that do not
+    parse are scoped on their text instead (and logged once).
+
+    Args:
+        query: PromQL expression
+        labels: Label name -> value to enforce as equality matchers
+        metric_prefix: Only scope selectors whose metric name starts with this
+    """
+    if not query or not labels:
+        return query
+    return _inject(query, tuple(labels.items()), metric_prefix)
+
+
+def _repair_text(promql: str) -> str:
+    """Best-effort text fixes for generated PromQL that does not parse."""
+    promql = re.sub(r"{\s*,", "{", promql)
+    promql = re.sub(r",,+", ",", promql)
+    promql = re.sub(r"\[(\d+[smhd])\s*$", r"[\1]", promql)
+    if promql.endswith("[") or promql.endswith("{"):
+        promql = promql.rstrip("[{")
+    open_parens, close_parens = promql.count("("), promql.count(")")
+    if open_parens > close_parens:
+        promql += ")" * (open_parens - close_parens)
+    return promql
+
+
+def _walk(node: Node) -> Iterator[Node]:
+    yield node
+    for child in children(node):
+        yield from _walk(child)
+
+
+def _wrap_range(node: Node) -> Node:
+    if isinstance(node, VectorSelector) and node.range:
+        return Call("rate", (node,))
+    return node
+
+
+@lru_cache(maxsize=PROMQL_REWRITE_CACHE_SIZE)
+def repair_promql(promql: str, range_syntax: str) -> str:
+    """Fix common mistakes in LLM-generated PromQL.
+
+    - Trailing/double commas, unclosed brackets and parentheses
+    - ``rate``/``irate``/``increase`` over a selector without a range gets ``[range_syntax]``
+    - A bare range selector outside a function is wrapped in ``rate()``
+    - A latency ``_sum`` series becomes a p95 ``histogram_quantile`` over the buckets
+    - Label values are printed double-quoted
+
+    Expressions that still do not parse after the text fixes are returned
+    with just those fixes applied.
+    """
+    try:
+        tree = parse_promql(promql)
+    except PromQLSyntaxError:
+        promql = _repair_text(promql)
+        try:
+            tree = parse_promql(promql)
+        except PromQLSyntaxError:
+            return promql
+
+    names = {selector.name for selector in iter_selectors(tree)}
+    has_quantile = any(
+        isinstance(node, Call) and node.func == "histogram_quantile"
+        for node in _walk(tree)
+    )
+    latency_quantile = None
+    if LATENCY_SUM_METRIC in names and LATENCY_BUCKET_METRIC not in names and not has_quantile:
+        latency_quantile = parse_promql(
+            f"histogram_quantile(0.95, sum(rate({LATENCY_BUCKET_METRIC}[{range_syntax}])) by (le))"
+        )
+
+    def fix(node: Node) -> Node:
+        if isinstance(node, VectorSelector) and node.name == LATENCY_SUM_METRIC and latency_quantile is not None:
+            return latency_quantile
+        if isinstance(node, Call) and node.func in _RANGE_REQUIRED_FUNCTIONS and len(node.args) == 1:
+            arg = node.args[0]
+            if isinstance(arg, VectorSelector) and not arg.range:
+                return replace(node, args=(replace(arg, range=range_syntax),))
+        if isinstance(node, (Unary, Paren, Aggregation)):
+            return replace(node, expr=_wrap_range(node.expr))
+        if isinstance(node, BinaryOp):
+            return replace(node, lhs=_wrap_range(node.lhs), rhs=_wrap_range(node.rhs))
+        return node
+
+    return format_promql(_wrap_range(transform(tree, fix)))
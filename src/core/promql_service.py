@@ -6,9 +6,10 @@ Moved from metrics_api.py to separate business logic
 
 import os
 import re
-from typing import Dict, List, Optional, Any, Tuple
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Any, Sequence, Tuple
 from datetime import datetime, timedelta
-import requests
 
 import logging
 from common.pylogger import get_python_logger
@@ -19,7 +20,8 @@ get_python_logger()
 logger = logging.getLogger(__name__)
 
 # Import configuration
-from .config import PROMETHEUS_URL, THANOS_TOKEN, VERIFY_SSL as verify, CHAT_SCOPE_FLEET_WIDE, FLEET_WIDE_DISPLAY
+from .config import CHAT_SCOPE_FLEET_WIDE, FLEET_WIDE_DISPLAY
+from .metric_catalog import get_metric_catalog, get_metric_names_holder
 
 def generate_promql_from_question(question: str, namespace: Optional[str], model_name: str, start_ts: int, end_ts: int, is_fleet_wide: bool = False) -> List[str]:
     """
@@ -324,27 +326,19 @@ def discover_available_metrics_from_thanos(namespace: Optional[str], model_name:
     3. Return comprehensive categorized list
     """
     try:
-        headers = {"Authorization": f"Bearer {THANOS_TOKEN}"}
-        
         # Step 1: Get ALL available metric names from cluster
-        response = requests.get(
-            f"{PROMETHEUS_URL}/api/v1/label/__name__/values",
-            headers=headers,
-            verify=verify,
-            timeout=30
-        )
-        response.raise_for_status()
-        all_metric_names = response.json()["data"]
+        all_metric_names = get_metric_catalog().names
         
         logger.debug("Found %d total metrics in Thanos", len(all_metric_names))
         
-        # Step 2: Categorize ALL metrics (not just filtered subset)
-        categorized_metrics = []
-        
-        for metric_name in all_metric_names:
-            metric_info = categorize_any_metric(metric_name, namespace, model_name, is_fleet_wide)
-            if metric_info:  # Only add if we can categorize it
-                categorized_metrics.append(metric_info)
+        # Step 2: Categorize ALL metrics (only names not seen before are processed)
+        categorized_metrics = get_categorization_cache().categorize_all(
+            all_metric_names,
+            namespace,
+            model_name,
+            is_fleet_wide,
+            catalog_version=get_metric_names_holder().version,
+        )
         
         logger.debug("Categorized %d metrics into types", len(categorized_metrics))
         return categorized_metrics
@@ -354,63 +348,146 @@ def discover_available_metrics_from_thanos(namespace: Optional[str], model_name:
         return []
 
 
-def categorize_any_metric(metric_name: str, namespace: Optional[str], model_name: str, is_fleet_wide: bool) -> Optional[Dict[str, Any]]:
-    """
-    Comprehensive categorization of ANY metric from the cluster
-    """
-    # Convert to lowercase for pattern matching
-    name_lower = metric_name.lower()
-    
+def _categorize_alert_metric(metric_name: str) -> Optional[Dict[str, Any]]:
+    """Categorize alerting metrics"""
+    return {
+        "name": metric_name,
+        "type": "alerts",
+        "category": "alerting",
+        "description": "System alerts and notifications"
+    }
+
+
+def _keyword_matcher(*keywords: str) -> "re.Pattern[str]":
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+_NETWORK_KEYWORDS = _keyword_matcher("network", "net_", "tcp_", "udp_", "http_")
+_STORAGE_KEYWORDS = _keyword_matcher("disk_", "filesystem_", "storage_", "volume_")
+_APPLICATION_KEYWORDS = _keyword_matcher("request", "response", "latency", "error", "rate", "duration")
+
+# Ordered dispatch table: (matches(metric_name, name_lower), categorize(metric_name, namespace, model_name, is_fleet_wide)).
+# The first matching row wins, so order encodes priority.
+_CATEGORY_DISPATCH: Tuple[Tuple[Callable[[str, str], Any], Callable[..., Optional[Dict[str, Any]]]], ...] = (
     # === vLLM/LLM Metrics (HIGHEST PRIORITY) ===
-    if metric_name.startswith("vllm:") or "llm" in name_lower:
-        return categorize_vllm_metric(metric_name, namespace, model_name, is_fleet_wide)
-    
+    (lambda name, lower: name.startswith("vllm:") or "llm" in lower,
+     lambda name, ns, model, fleet: categorize_vllm_metric(name, ns, model, fleet)),
     # === Prometheus/Monitoring Metrics (HIGH PRIORITY - before generic latency) ===
-    elif metric_name.startswith("prometheus_") or metric_name.startswith("alertmanager_"):
-        return categorize_monitoring_metric(metric_name)
-    
+    (lambda name, lower: name.startswith(("prometheus_", "alertmanager_")),
+     lambda name, ns, model, fleet: categorize_monitoring_metric(name)),
     # === Alerting Metrics ===
-    elif metric_name == "ALERTS" or "alert" in name_lower:
-        return {
-            "name": metric_name,
-            "type": "alerts",
-            "category": "alerting",
-            "description": "System alerts and notifications"
-        }
-    
+    (lambda name, lower: name == "ALERTS" or "alert" in lower,
+     lambda name, ns, model, fleet: _categorize_alert_metric(name)),
     # === Kubernetes/OpenShift Metrics ===
-    elif metric_name.startswith("kube_") or metric_name.startswith("openshift_"):
-        return categorize_k8s_metric(metric_name, namespace, is_fleet_wide)
-    
+    (lambda name, lower: name.startswith(("kube_", "openshift_")),
+     lambda name, ns, model, fleet: categorize_k8s_metric(name, ns, fleet)),
     # === GPU/Hardware Metrics (multi-vendor: NVIDIA + Intel Gaudi) ===
     # Only categorize metrics with known GPU exporter prefixes (DCGM for NVIDIA, habanalabs for Intel Gaudi)
     # TODO: Add AMD support by adding "amd_smi_" to the tuple when AMD metrics are available
-    elif metric_name.startswith(("DCGM_", "habanalabs_")):
-        return categorize_gpu_metric(metric_name)
-    
+    (lambda name, lower: name.startswith(("DCGM_", "habanalabs_")),
+     lambda name, ns, model, fleet: categorize_gpu_metric(name)),
     # === Container/Docker Metrics ===
-    elif metric_name.startswith("container_"):
-        return categorize_container_metric(metric_name)
-    
+    (lambda name, lower: name.startswith("container_"),
+     lambda name, ns, model, fleet: categorize_container_metric(name)),
     # === Node/System Metrics ===
-    elif metric_name.startswith("node_"):
-        return categorize_node_metric(metric_name)
-    
+    (lambda name, lower: name.startswith("node_"),
+     lambda name, ns, model, fleet: categorize_node_metric(name)),
     # === Network Metrics ===
-    elif any(net_keyword in name_lower for net_keyword in ["network", "net_", "tcp_", "udp_", "http_"]):
-        return categorize_network_metric(metric_name)
-    
+    (lambda name, lower: _NETWORK_KEYWORDS.search(lower),
+     lambda name, ns, model, fleet: categorize_network_metric(name)),
     # === Storage/Disk Metrics ===
-    elif any(storage_keyword in name_lower for storage_keyword in ["disk_", "filesystem_", "storage_", "volume_"]):
-        return categorize_storage_metric(metric_name)
-    
+    (lambda name, lower: _STORAGE_KEYWORDS.search(lower),
+     lambda name, ns, model, fleet: categorize_storage_metric(name)),
     # === Application/Custom Metrics (LOWER PRIORITY) ===
-    elif any(app_keyword in name_lower for app_keyword in ["request", "response", "latency", "error", "rate", "duration"]):
-        return categorize_application_metric(metric_name)
-    
+    (lambda name, lower: _APPLICATION_KEYWORDS.search(lower),
+     lambda name, ns, model, fleet: categorize_application_metric(name)),
+)
+
+
+def categorize_any_metric(metric_name: str, namespace: Optional[str], model_name: str, is_fleet_wide: bool) -> Optional[Dict[str, Any]]:
+    """
+    Comprehensive categorization of ANY metric from the cluster
+    """
+    # Convert to lowercase for pattern matching
+    name_lower = metric_name.lower()
+    for matches, categorize in _CATEGORY_DISPATCH:
+        if matches(metric_name, name_lower):
+            return categorize(metric_name, namespace, model_name, is_fleet_wide)
     # === Generic/Unknown Metrics ===
-    else:
-        return categorize_generic_metric(metric_name)
+    return categorize_generic_metric(metric_name)
+
+
+class MetricCategorizationCache:
+    """Memoizes categorize_any_metric for the metric catalog.
+
+    Categories depend only on the metric name (no categorizer reads the
+    namespace, model or fleet flag), so they are cached per name. The
+    per-context result lists are kept in a small LRU. When the metric
+    catalog version changes, names that left the catalog are dropped; names
+    already categorized are reused, so only newly seen names are processed.
+    """
+
+    max_results = 16
+
+    def __init__(self):
+        self._entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._results: "OrderedDict[Tuple[Optional[str], str, bool], List[Dict[str, Any]]]" = OrderedDict()
+        self._catalog_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.categorized = 0
+
+    def categorize_all(
+        self,
+        metric_names: Sequence[str],
+        namespace: Optional[str],
+        model_name: str,
+        is_fleet_wide: bool,
+        catalog_version: int,
+    ) -> List[Dict[str, Any]]:
+        """Return categorized metrics for the whole catalog (uncategorizable names skipped)."""
+        context = (namespace, model_name, is_fleet_wide)
+        with self._lock:
+            if catalog_version != self._catalog_version:
+                current = set(metric_names)
+                self._entries = {name: info for name, info in self._entries.items() if name in current}
+                self._results.clear()
+                self._catalog_version = catalog_version
+            cached = self._results.get(context)
+            if cached is not None:
+                self._results.move_to_end(context)
+                return cached
+
+            categorized: List[Dict[str, Any]] = []
+            for metric_name in metric_names:
+                if metric_name in self._entries:
+                    metric_info = self._entries[metric_name]
+                else:
+                    metric_info = categorize_any_metric(metric_name, namespace, model_name, is_fleet_wide)
+                    self._entries[metric_name] = metric_info
+                    self.categorized += 1
+                if metric_info:  # Only add if we can categorize it
+                    categorized.append(metric_info)
+
+            self._results[context] = categorized
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return categorized
+
+    def clear(self) -> None:
+        """Drop all memoized categorizations."""
+        with self._lock:
+            self._entries.clear()
+            self._results.clear()
+            self._catalog_version = None
+            self.categorized = 0
+
+
+_categorization_cache = MetricCategorizationCache()
+
+
+def get_categorization_cache() -> MetricCategorizationCache:
+    """Return the process-wide metric categorization cache."""
+    return _categorization_cache
 
 
 def categorize_container_metric(metric_name: str) -> Optional[Dict[str, Any]]:
@@ -495,6 +572,47 @@ def categorize_generic_metric(metric_name: str) -> Optional[Dict[str, Any]]:
     }
 
 
+# vLLM metric families and how to aggregate them
+VLLM_METRIC_CATEGORIES: Dict[str, Dict[str, Any]] = {
+    "num_requests_running": {
+        "type": "gauge",
+        "description": "Number of requests currently running",
+        "aggregation": "avg",
+        "priority": 1
+    },
+    "num_requests_total": {
+        "type": "counter", 
+        "description": "Total number of requests processed",
+        "aggregation": "rate",
+        "priority": 1
+    },
+    "e2e_request_latency_seconds": {
+        "type": "histogram",
+        "description": "End-to-end request latency",
+        "aggregation": "histogram_quantile",
+        "priority": 1
+    },
+    "num_prompt_tokens_total": {
+        "type": "counter",
+        "description": "Total number of prompt tokens processed",
+        "aggregation": "rate", 
+        "priority": 2
+    },
+    "num_generation_tokens_total": {
+        "type": "counter",
+        "description": "Total number of generation tokens produced",
+        "aggregation": "rate",
+        "priority": 2
+    },
+    "num_requests_waiting": {
+        "type": "gauge",
+        "description": "Number of requests waiting in queue",
+        "aggregation": "avg",
+        "priority": 2
+    }
+}
+
+
 def categorize_vllm_metric(metric_name: str, namespace: Optional[str], model_name: str, is_fleet_wide: bool) -> Optional[Dict[str, Any]]:
     """
     Categorize vLLM-specific metrics with enhanced context
@@ -505,48 +623,8 @@ def categorize_vllm_metric(metric_name: str, namespace: Optional[str], model_nam
     # Extract metric family
     metric_family = metric_name.split(":")[1] if ":" in metric_name else metric_name
     
-    # Define vLLM metric categories
-    vllm_categories = {
-        "num_requests_running": {
-            "type": "gauge",
-            "description": "Number of requests currently running",
-            "aggregation": "avg",
-            "priority": 1
-        },
-        "num_requests_total": {
-            "type": "counter", 
-            "description": "Total number of requests processed",
-            "aggregation": "rate",
-            "priority": 1
-        },
-        "e2e_request_latency_seconds": {
-            "type": "histogram",
-            "description": "End-to-end request latency",
-            "aggregation": "histogram_quantile",
-            "priority": 1
-        },
-        "num_prompt_tokens_total": {
-            "type": "counter",
-            "description": "Total number of prompt tokens processed",
-            "aggregation": "rate", 
-            "priority": 2
-        },
-        "num_generation_tokens_total": {
-            "type": "counter",
-            "description": "Total number of generation tokens produced",
-            "aggregation": "rate",
-            "priority": 2
-        },
-        "num_requests_waiting": {
-            "type": "gauge",
-            "description": "Number of requests waiting in queue",
-            "aggregation": "avg",
-            "priority": 2
-        }
-    }
-    
     # Find matching category
-    for pattern, category_info in vllm_categories.items():
+    for pattern, category_info in VLLM_METRIC_CATEGORIES.items():
         if pattern in metric_family:
             return {
                 "name": metric_name,
@@ -592,134 +670,135 @@ def categorize_k8s_metric(metric_name: str, namespace: Optional[str], is_fleet_w
     return None
 
 
+# Define GPU metric categories for NVIDIA DCGM
+DCGM_METRIC_CATEGORIES: Dict[str, Dict[str, Any]] = {
+    "DCGM_FI_DEV_GPU_TEMP": {
+        "type": "gauge",
+        "description": "GPU temperature",
+        "aggregation": "avg",
+        "unit": "celsius"
+    },
+    "DCGM_FI_DEV_GPU_UTIL": {
+        "type": "gauge", 
+        "description": "GPU utilization",
+        "aggregation": "avg",
+        "unit": "percent"
+    },
+    "DCGM_FI_DEV_MEM_COPY_UTIL": {
+        "type": "gauge",
+        "description": "GPU memory copy utilization", 
+        "aggregation": "avg",
+        "unit": "percent"
+    },
+    "DCGM_FI_DEV_GPU_MEM_COPY_THROUGHPUT_UTIL": {
+        "type": "gauge",
+        "description": "GPU memory copy throughput utilization",
+        "aggregation": "avg", 
+        "unit": "percent"
+    },
+    "DCGM_FI_DEV_POWER_USAGE": {
+        "type": "gauge",
+        "description": "GPU power usage",
+        "aggregation": "avg",
+        "unit": "watts"
+    },
+    "DCGM_FI_DEV_FB_USED": {
+        "type": "gauge",
+        "description": "GPU framebuffer memory used",
+        "aggregation": "avg",
+        "unit": "bytes"
+    },
+    "DCGM_FI_DEV_SM_CLOCK": {
+        "type": "gauge",
+        "description": "GPU SM clock frequency",
+        "aggregation": "avg",
+        "unit": "mhz"
+    },
+    "DCGM_FI_DEV_MEM_CLOCK": {
+        "type": "gauge",
+        "description": "GPU memory clock frequency",
+        "aggregation": "avg",
+        "unit": "mhz"
+    }
+}
+
+# Define GPU metric categories for Intel Gaudi
+GAUDI_METRIC_CATEGORIES: Dict[str, Dict[str, Any]] = {
+    "habanalabs_temperature_onchip": {
+        "type": "gauge",
+        "description": "Intel Gaudi on-chip temperature",
+        "aggregation": "avg",
+        "unit": "celsius"
+    },
+    "habanalabs_temperature_onboard": {
+        "type": "gauge",
+        "description": "Intel Gaudi board temperature",
+        "aggregation": "avg",
+        "unit": "celsius"
+    },
+    "habanalabs_utilization": {
+        "type": "gauge",
+        "description": "Intel Gaudi accelerator utilization",
+        "aggregation": "avg",
+        "unit": "percent"
+    },
+    "habanalabs_power_mW": {
+        "type": "gauge",
+        "description": "Intel Gaudi power usage (converted to Watts in queries)",
+        "aggregation": "avg",
+        "unit": "milliwatts"
+    },
+    "habanalabs_memory_used_bytes": {
+        "type": "gauge",
+        "description": "Intel Gaudi memory used",
+        "aggregation": "avg",
+        "unit": "bytes"
+    },
+    "habanalabs_memory_total_bytes": {
+        "type": "gauge",
+        "description": "Intel Gaudi total memory",
+        "aggregation": "avg",
+        "unit": "bytes"
+    },
+    "habanalabs_clock_soc_mhz": {
+        "type": "gauge",
+        "description": "Intel Gaudi SoC clock frequency",
+        "aggregation": "avg",
+        "unit": "mhz"
+    },
+    "habanalabs_energy": {
+        "type": "counter",
+        "description": "Intel Gaudi energy consumption",
+        "aggregation": "avg",
+        "unit": "joules"
+    },
+    "habanalabs_pcie_rx": {
+        "type": "counter",
+        "description": "Intel Gaudi PCIe receive traffic",
+        "aggregation": "rate",
+        "unit": "bytes"
+    },
+    "habanalabs_pcie_tx": {
+        "type": "counter",
+        "description": "Intel Gaudi PCIe transmit traffic",
+        "aggregation": "rate",
+        "unit": "bytes"
+    }
+}
+
+
 def categorize_gpu_metric(metric_name: str) -> Optional[Dict[str, Any]]:
     """
     Categorize GPU-specific metrics (multi-vendor: NVIDIA DCGM + Intel Gaudi)
     
-    To add AMD support: Add "amd_smi_" check to the guard below and create amd_categories dict
-    following the same pattern as dcgm_categories and gaudi_categories.
+    To add AMD support: Add "amd_smi_" check to the guard below and create AMD_METRIC_CATEGORIES
+    following the same pattern as DCGM_METRIC_CATEGORIES and GAUDI_METRIC_CATEGORIES.
     """
     if not (metric_name.startswith("DCGM_") or metric_name.startswith("habanalabs_")):
         return None
     
-    # Define GPU metric categories for NVIDIA DCGM
-    dcgm_categories = {
-        "DCGM_FI_DEV_GPU_TEMP": {
-            "type": "gauge",
-            "description": "GPU temperature",
-            "aggregation": "avg",
-            "unit": "celsius"
-        },
-        "DCGM_FI_DEV_GPU_UTIL": {
-            "type": "gauge", 
-            "description": "GPU utilization",
-            "aggregation": "avg",
-            "unit": "percent"
-        },
-        "DCGM_FI_DEV_MEM_COPY_UTIL": {
-            "type": "gauge",
-            "description": "GPU memory copy utilization", 
-            "aggregation": "avg",
-            "unit": "percent"
-        },
-        "DCGM_FI_DEV_GPU_MEM_COPY_THROUGHPUT_UTIL": {
-            "type": "gauge",
-            "description": "GPU memory copy throughput utilization",
-            "aggregation": "avg", 
-            "unit": "percent"
-        },
-        "DCGM_FI_DEV_POWER_USAGE": {
-            "type": "gauge",
-            "description": "GPU power usage",
-            "aggregation": "avg",
-            "unit": "watts"
-        },
-        "DCGM_FI_DEV_FB_USED": {
-            "type": "gauge",
-            "description": "GPU framebuffer memory used",
-            "aggregation": "avg",
-            "unit": "bytes"
-        },
-        "DCGM_FI_DEV_SM_CLOCK": {
-            "type": "gauge",
-            "description": "GPU SM clock frequency",
-            "aggregation": "avg",
-            "unit": "mhz"
-        },
-        "DCGM_FI_DEV_MEM_CLOCK": {
-            "type": "gauge",
-            "description": "GPU memory clock frequency",
-            "aggregation": "avg",
-            "unit": "mhz"
-        }
-    }
-    
-    # Define GPU metric categories for Intel Gaudi
-    gaudi_categories = {
-        "habanalabs_temperature_onchip": {
-            "type": "gauge",
-            "description": "Intel Gaudi on-chip temperature",
-            "aggregation": "avg",
-            "unit": "celsius"
-        },
-        "habanalabs_temperature_onboard": {
-            "type": "gauge",
-            "description": "Intel Gaudi board temperature",
-            "aggregation": "avg",
-            "unit": "celsius"
-        },
-        "habanalabs_utilization": {
-            "type": "gauge",
-            "description": "Intel Gaudi accelerator utilization",
-            "aggregation": "avg",
-            "unit": "percent"
-        },
-        "habanalabs_power_mW": {
-            "type": "gauge",
-            "description": "Intel Gaudi power usage (converted to Watts in queries)",
-            "aggregation": "avg",
-            "unit": "milliwatts"
-        },
-        "habanalabs_memory_used_bytes": {
-            "type": "gauge",
-            "description": "Intel Gaudi memory used",
-            "aggregation": "avg",
-            "unit": "bytes"
-        },
-        "habanalabs_memory_total_bytes": {
-            "type": "gauge",
-            "description": "Intel Gaudi total memory",
-            "aggregation": "avg",
-            "unit": "bytes"
-        },
-        "habanalabs_clock_soc_mhz": {
-            "type": "gauge",
-            "description": "Intel Gaudi SoC clock frequency",
-            "aggregation": "avg",
-            "unit": "mhz"
-        },
-        "habanalabs_energy": {
-            "type": "counter",
-            "description": "Intel Gaudi energy consumption",
-            "aggregation": "avg",
-            "unit": "joules"
-        },
-        "habanalabs_pcie_rx": {
-            "type": "counter",
-            "description": "Intel Gaudi PCIe receive traffic",
-            "aggregation": "rate",
-            "unit": "bytes"
-        },
-        "habanalabs_pcie_tx": {
-            "type": "counter",
-            "description": "Intel Gaudi PCIe transmit traffic",
-            "aggregation": "rate",
-            "unit": "bytes"
-        }
-    }
-    
     # Check NVIDIA DCGM metrics
-    for pattern, category_info in dcgm_categories.items():
+    for pattern, category_info in DCGM_METRIC_CATEGORIES.items():
         if pattern in metric_name:
             return {
                 "name": metric_name,
@@ -731,7 +810,7 @@ def categorize_gpu_metric(metric_name: str) -> Optional[Dict[str, Any]]:
             }
     
     # Check Intel Gaudi metrics
-    for pattern, category_info in gaudi_categories.items():
+    for pattern, category_info in GAUDI_METRIC_CATEGORIES.items():
         if pattern in metric_name:
             return {
                 "name": metric_name,
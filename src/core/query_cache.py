@@ -0,0 +1,192 @@
+"""
+Process-wide cache for Prometheus/Thanos query_range results.
+
+Entries are keyed by (normalized PromQL, start, end, step). How long an entry
+lives depends on how recent its window is: a window that ends at "now" can
+still change, so it expires quickly, while a fully historical window is
+immutable and can be kept for a long time. The cache is LRU-evicted against
+a byte budget and keeps hit/miss counters.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .config import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_LIVE_TTL_SECONDS,
+    QUERY_CACHE_RECENT_TTL_SECONDS,
+    QUERY_CACHE_HISTORICAL_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# A window whose end lies within this many seconds of now is considered "live"
+LIVE_WINDOW_SECONDS = 120
+# A window whose end lies within this many seconds of now is considered "recent"
+RECENT_WINDOW_SECONDS = 24 * 3600
+
+_PUNCTUATION = set("(){}[],")
+
+CacheKey = Tuple[Hashable, ...]
+
+
+def normalize_promql(query: str) -> str:
+    """Canonicalize PromQL whitespace so equivalent queries share a cache key.
+
+    Collapses whitespace runs and drops whitespace next to brackets and commas.
+    Quoted label values are left untouched.
+    """
+    out = []
+    quote: Optional[str] = None
+    pending_space = False
+    i = 0
+    while i < len(query):
+        ch = query[i]
+        if quote:
+            out.append(ch)
+            if ch == "\\" and i + 1 < len(query):
+                out.append(query[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch.isspace():
+            pending_space = True
+        else:
+            if pending_space and out and out[-1] not in _PUNCTUATION and ch not in _PUNCTUATION:
+                out.append(" ")
+            pending_space = False
+            out.append(ch)
+            if ch in ("'", '"', "`"):
+                quote = ch
+        i += 1
+    return "".join(out)
+
+
+def estimate_size(payload: Any) -> int:
+    """Roughly estimate the in-memory size of a decoded query_range payload."""
+    nbytes = getattr(payload, "nbytes", None)
+    if isinstance(nbytes, int):
+        return 256 + nbytes
+    try:
+        result = payload.get("data", {}).get("result", [])
+        size = 256
+        for series in result:
+            size += 128 + sum(len(k) + len(str(v)) + 100 for k, v in series.get("metric", {}).items())
+            size += 150 * len(series.get("values", []) or [])
+        return size
+    except Exception:
+        return 1024
+
+
+class RangeQueryCache:
+    """Thread-safe LRU cache for query_range payloads with recency-based TTLs."""
+
+    def __init__(
+        self,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        live_ttl: float = QUERY_CACHE_LIVE_TTL_SECONDS,
+        recent_ttl: float = QUERY_CACHE_RECENT_TTL_SECONDS,
+        historical_ttl: float = QUERY_CACHE_HISTORICAL_TTL_SECONDS,
+        enabled: bool = QUERY_CACHE_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.recent_ttl = recent_ttl
+        self.historical_ttl = historical_ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(query: str, start: Any, end: Any, step: Any) -> CacheKey:
+        """Build the cache key for a range query."""
+        return (normalize_promql(query), float(start), float(end), str(step))
+
+    def ttl_for_window(self, end: Any, now: Optional[float] = None) -> float:
+        """Return the TTL for a window based on how close its end is to now."""
+        now = time.time() if now is None else now
+        age = now - float(end)
+        if age <= LIVE_WINDOW_SECONDS:
+            return self.live_ttl
+        if age <= RECENT_WINDOW_SECONDS:
+            return self.recent_ttl
+        return self.historical_ttl
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return a cached payload, or None on miss/expiry.
+
+        Cached payloads are shared between callers and must not be mutated.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: CacheKey, payload: Any, ttl: float) -> None:
+        """Store a payload, evicting least-recently-used entries over budget."""
+        if not self.enabled or ttl <= 0:
+            return
+        size = estimate_size(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.time() + ttl, size, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _key, (_exp, evicted_size, _payload) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_query_cache = RangeQueryCache()
+
+
+def get_query_cache() -> RangeQueryCache:
+    """Return the process-wide range-query cache."""
+    return _query_cache
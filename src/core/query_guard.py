@@ -0,0 +1,228 @@
+"""
+Pre-execution cardinality guard for ad-hoc PromQL.
+
+Chatbots run whatever PromQL the model produces. A fleet-wide
+``sum by (pod) (container_memory_usage_bytes)`` can return tens of thousands
+of series, which are then serialized into the conversation. Before such a
+query runs, plan_query estimates its result cardinality with a cheap
+``count(<expr>)`` instant probe and then:
+
+- picks the range-query step so series x points stays under a budget
+- wraps queries above QUERY_GUARD_MAX_SERIES in ``topk`` (for range
+  queries, the top series at the end of the range, kept stable over time)
+- refuses queries above QUERY_GUARD_REFUSE_SERIES with a suggestion
+
+Every decision is recorded in the returned QueryPlan so callers can report
+what was actually executed and why.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    QUERY_GUARD_ENABLED,
+    QUERY_GUARD_MAX_POINTS,
+    QUERY_GUARD_MAX_SERIES,
+    QUERY_GUARD_PROBE_TIMEOUT_SECONDS,
+    QUERY_GUARD_REFUSE_SERIES,
+    QUERY_GUARD_TOPK,
+)
+from .http_client import get_prometheus_client
+from .metrics import choose_prometheus_step
+from .promql_parser import (
+    Aggregation,
+    BinaryOp,
+    Call,
+    Node,
+    NumberLiteral,
+    Paren,
+    PromQLSyntaxError,
+    StringLiteral,
+    Subquery,
+    Unary,
+    VectorSelector,
+    duration_seconds,
+    format_promql,
+    parse_promql,
+)
+
+logger = logging.getLogger(__name__)
+
+# Default step of ad-hoc range queries, also the finest step the guard picks
+DEFAULT_STEP_SECONDS = 60
+
+# Prometheus rejects range queries above this many points per series
+_MAX_POINTS_PER_SERIES = 11000
+
+_SCALAR_FUNCTIONS = frozenset({"scalar", "time", "pi"})
+
+
+@dataclass
+class QueryPlan:
+    """What the guard decided for one query.
+
+    ``action`` is "execute" (run unchanged), "topk" (run the wrapped query),
+    "refuse" (do not run) or "unchecked" (the estimate was unavailable).
+    """
+
+    original_query: str
+    query: str
+    action: str = "execute"
+    estimated_series: Optional[int] = None
+    step_seconds: Optional[int] = None
+    decisions: List[str] = field(default_factory=list)
+    suggestion: Optional[str] = None
+
+    @property
+    def refused(self) -> bool:
+        return self.action == "refuse"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _kind(node: Node) -> str:
+    """Result type of an expression: "scalar", "matrix" or "vector"."""
+    if isinstance(node, (NumberLiteral, StringLiteral)):
+        return "scalar"
+    if isinstance(node, (Paren, Unary)):
+        return _kind(node.expr)
+    if isinstance(node, Call) and node.func in _SCALAR_FUNCTIONS:
+        return "scalar"
+    if isinstance(node, BinaryOp):
+        return "scalar" if _kind(node.lhs) == _kind(node.rhs) == "scalar" else "vector"
+    if isinstance(node, Subquery) or (isinstance(node, VectorSelector) and node.range):
+        return "matrix"
+    return "vector"
+
+
+def _probe_query(node: Node, kind: str) -> str:
+    expr = format_promql(node)
+    if kind == "matrix":
+        expr = f"last_over_time({expr})"
+    return f"count({expr})"
+
+
+def estimate_series(node: Node, kind: str, at: Optional[float] = None) -> Optional[int]:
+    """Estimate how many series an expression returns with a count() probe.
+
+    Returns None when the probe fails or times out.
+    """
+    try:
+        response = get_prometheus_client().query_instant(
+            _probe_query(node, kind),
+            time=int(at) if at else None,
+            timeout=QUERY_GUARD_PROBE_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        logger.warning("Cardinality probe failed: %s", e)
+        return None
+    result = (response.get("data") or {}).get("result") or []
+    try:
+        return int(float(result[0]["value"][1])) if result else 0
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def _at_end(node: Node) -> Node:
+    """Evaluate an expression at the end of the range (``@ end()``).
+
+    Selectors and subqueries are pinned, but nothing inside a subquery is:
+    its inner expression must still be evaluated at every subquery step.
+    """
+    if isinstance(node, (VectorSelector, Subquery)):
+        return node if node.at else replace(node, at="end()")
+    if isinstance(node, (Unary, Paren)):
+        return replace(node, expr=_at_end(node.expr))
+    if isinstance(node, Call):
+        return replace(node, args=tuple(_at_end(arg) for arg in node.args))
+    if isinstance(node, Aggregation):
+        return replace(node, expr=_at_end(node.expr))
+    if isinstance(node, BinaryOp):
+        return replace(node, lhs=_at_end(node.lhs), rhs=_at_end(node.rhs))
+    return node
+
+
+def _topk(node: Node, k: int, is_range: bool) -> str:
+    expr = format_promql(node)
+    if not is_range:
+        return f"topk({k}, {expr})"
+    if isinstance(node, BinaryOp) and node.op == "or":
+        expr = f"({expr})"  # "or" binds looser than "and"
+    # Per-step topk would pick a different set of series at every step
+    return f"{expr} and topk({k}, {format_promql(_at_end(node))})"
+
+
+def _suggestion(node: Node) -> str:
+    if isinstance(node, Aggregation) and node.grouping and not node.without:
+        return (
+            f"Group by fewer labels than ({', '.join(node.grouping)}), add label matchers "
+            f"(e.g. namespace), or use topk({QUERY_GUARD_TOPK}, ...)"
+        )
+    return (
+        f"Aggregate the result (e.g. sum by (namespace) ({format_promql(node)})) "
+        "or add label matchers to select fewer series"
+    )
+
+
+def plan_query(
+    query: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> QueryPlan:
+    """Plan the execution of an ad-hoc query.
+
+    Args:
+        query: PromQL expression
+        start: Range start (unix seconds); None for instant queries
+        end: Range end or instant evaluation time (unix seconds)
+    """
+    is_range = start is not None and end is not None
+    plan = QueryPlan(query, query, step_seconds=DEFAULT_STEP_SECONDS if is_range else None)
+    if not QUERY_GUARD_ENABLED:
+        plan.action = "unchecked"
+        plan.decisions.append("query guard disabled")
+        return plan
+    try:
+        node = parse_promql(query)
+    except PromQLSyntaxError as e:
+        plan.action = "unchecked"
+        plan.decisions.append(f"not parsed ({e}); executing unchanged")
+        return plan
+
+    kind = _kind(node)
+    if kind == "scalar":
+        plan.estimated_series = 1
+        plan.decisions.append("scalar expression; no cardinality probe needed")
+    else:
+        plan.estimated_series = estimate_series(node, kind, end)
+        if plan.estimated_series is None:
+            plan.action = "unchecked"
+            plan.decisions.append("cardinality probe unavailable; executing unchanged")
+        else:
+            plan.decisions.append(f"count() probe estimates {plan.estimated_series} series")
+
+    series = plan.estimated_series or 0
+    if series > QUERY_GUARD_REFUSE_SERIES or (series > QUERY_GUARD_MAX_SERIES and kind == "matrix"):
+        plan.action = "refuse"
+        plan.suggestion = _suggestion(node)
+        plan.decisions.append(
+            f"refused: {series} series exceeds the limit of "
+            f"{QUERY_GUARD_REFUSE_SERIES if kind != 'matrix' else QUERY_GUARD_MAX_SERIES}"
+        )
+        return plan
+    if series > QUERY_GUARD_MAX_SERIES:
+        plan.action = "topk"
+        plan.query = _topk(node, QUERY_GUARD_TOPK, is_range)
+        plan.decisions.append(
+            f"wrapped in topk({QUERY_GUARD_TOPK}, ...): {series} series exceeds {QUERY_GUARD_MAX_SERIES}"
+        )
+        series = QUERY_GUARD_TOPK
+
+    if is_range:
+        points = min(_MAX_POINTS_PER_SERIES, max(1, QUERY_GUARD_MAX_POINTS // max(1, series)))
+        step = choose_prometheus_step(int(start), int(end), points, DEFAULT_STEP_SECONDS)
+        plan.step_seconds = int(duration_seconds(step))
+        plan.decisions.append(f"step {step} keeps each series under {points} points")
+    return plan
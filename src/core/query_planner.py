@@ -0,0 +1,189 @@
+"""
+Time-sharded execution of long range queries.
+
+A single query_range over 7-90 days makes Thanos evaluate (and serialize)
+the whole window in one request, which is slow and often runs into the
+request timeout. The planner splits the step grid of a long window into
+contiguous shards whose boundaries sit on absolute shard multiples (UTC days
+by default), runs the shards concurrently with a per-query cap, retries only
+the shards that failed, and stitches the pieces back together.
+
+Each range-query step is evaluated independently, so a shard covering a
+disjoint slice of the same grid returns exactly the samples the full query
+would return for that slice. Absolute boundaries also keep historical shards
+byte-identical across requests, so they hit the range-query cache.
+"""
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .config import (
+    PROMETHEUS_URL,
+    QUERY_SHARD_SECONDS,
+    QUERY_SHARD_MIN_WINDOW_SECONDS,
+    QUERY_SHARD_MAX_SHARDS,
+    QUERY_SHARD_CONCURRENCY,
+    QUERY_SHARD_RETRIES,
+)
+from .fetch_engine import lend_upstream_slot, upstream_slot
+from .resilience import is_transient_error
+from .series_store import step_to_seconds
+from .timeseries import SeriesSet
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Shard = Tuple[int, int]
+
+
+def plan_shards(
+    start: int,
+    end: int,
+    step_seconds: int,
+    shard_seconds: int = QUERY_SHARD_SECONDS,
+    max_shards: int = QUERY_SHARD_MAX_SHARDS,
+) -> List[Shard]:
+    """Split the step grid start, start+step, ..., <= end into contiguous shards.
+
+    Every grid point falls into exactly one shard; shards end on the last
+    grid point before an absolute multiple of the shard length. The shard
+    length grows (in whole shard_seconds units) to keep at most max_shards.
+
+    Returns:
+        List of (shard_start, shard_end) pairs, both inclusive grid points
+    """
+    start, end = int(start), int(end)
+    step_seconds = max(1, int(step_seconds))
+    if end <= start:
+        return [(start, max(start, end))]
+    shard_len = max(int(shard_seconds), step_seconds)
+    # Absolute boundaries can add one partial shard at the start
+    full_shards = max(1, max_shards - 1)
+    if max_shards > 0 and math.ceil((end - start) / shard_len) + 1 > max_shards:
+        shard_len = math.ceil((end - start) / full_shards / shard_len) * shard_len
+
+    shards: List[Shard] = []
+    shard_start = start
+    while shard_start <= end:
+        boundary = (shard_start // shard_len + 1) * shard_len
+        # Last grid point strictly before the boundary
+        last_index = -(-(boundary - start) // step_seconds) - 1
+        shard_end = min(start + last_index * step_seconds, end)
+        shards.append((shard_start, max(shard_start, shard_end)))
+        shard_start = max(shard_start, shard_end) + step_seconds
+    return shards
+
+
+def should_shard(start: int, end: int, min_window_seconds: int = QUERY_SHARD_MIN_WINDOW_SECONDS) -> bool:
+    """Return True when a window is long enough to be split into shards."""
+    return min_window_seconds > 0 and int(end) - int(start) >= min_window_seconds
+
+
+def run_shards(
+    shards: List[Shard],
+    fetch_shard: Callable[[int, int], T],
+    max_workers: int = QUERY_SHARD_CONCURRENCY,
+    retries: int = QUERY_SHARD_RETRIES,
+    upstream: str = PROMETHEUS_URL,
+) -> List[T]:
+    """Fetch all shards concurrently, retrying only the failed ones.
+
+    Shards run on a private pool capped at max_workers, and every shard
+    request holds one of the upstream's PROMETHEUS_MAX_CONCURRENCY slots.
+    A caller already holding a slot for the logical query (such as
+    fetch_concurrently) lends it to the shards while they run. After each
+    round, shards that failed with a retryable error are fetched again, up
+    to ``retries`` extra rounds; otherwise the first error in shard order is
+    raised.
+
+    Returns:
+        Shard results in shard order
+    """
+    def fetch(shard_start: int, shard_end: int) -> T:
+        with upstream_slot(upstream):
+            return fetch_shard(shard_start, shard_end)
+
+    with lend_upstream_slot(upstream):
+        return _run_shard_rounds(shards, fetch, max_workers, retries)
+
+
+def _run_shard_rounds(
+    shards: List[Shard], fetch_shard: Callable[[int, int], T], max_workers: int, retries: int
+) -> List[T]:
+    results: List[Optional[T]] = [None] * len(shards)
+    pending = list(range(len(shards)))
+    attempt = 0
+    while True:
+        errors: Dict[int, BaseException] = {}
+        workers = max(1, min(len(pending), max_workers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {i: executor.submit(fetch_shard, *shards[i]) for i in pending}
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    errors[i] = e
+        if not errors:
+            return results  # type: ignore[return-value]
+        first = errors[min(errors)]
+        if attempt >= retries or not all(is_transient_error(e) for e in errors.values()):
+            raise first
+        attempt += 1
+        pending = sorted(errors)
+        logger.warning(
+            "Retrying %d of %d shard(s) (attempt %d): %s", len(pending), len(shards), attempt + 1, first
+        )
+
+
+def merge_matrix_payloads(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stitch per-shard query_range payloads into one matrix payload.
+
+    Series are matched by label set and keep first-seen order; samples at or
+    before a series' last stitched timestamp are dropped. A non-success shard
+    payload is returned as is.
+    """
+    merged: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+    last_ts: Dict[Tuple[Tuple[str, str], ...], float] = {}
+    for payload in payloads:
+        if not isinstance(payload, dict) or payload.get("status") != "success":
+            return payload
+        for series in payload.get("data", {}).get("result", []) or []:
+            metric = series.get("metric", {})
+            key = tuple(sorted(metric.items()))
+            values = series.get("values", []) or []
+            if key in merged:
+                cutoff = last_ts[key]
+                values = [v for v in values if float(v[0]) > cutoff]
+                merged[key]["values"].extend(values)
+            else:
+                merged[key] = {"metric": metric, "values": list(values)}
+            if merged[key]["values"]:
+                last_ts[key] = float(merged[key]["values"][-1][0])
+            else:
+                last_ts.setdefault(key, float("-inf"))
+    return {
+        "status": "success",
+        "data": {"resultType": "matrix", "result": list(merged.values())},
+    }
+
+
+def query_range_sharded(client: Any, query: str, start: int, end: int, step: str) -> Dict[str, Any]:
+    """Run query_range, sharding long windows; returns a query_range payload."""
+    if not should_shard(start, end):
+        return client.query_range(query, start, end, step)
+    shards = plan_shards(start, end, step_to_seconds(step))
+    logger.debug("Sharded %s over %d shard(s)", query, len(shards))
+    window = int(end) - int(start)
+    payloads = run_shards(shards, lambda s, e: client.query_range(query, s, e, step, window_seconds=window))
+    return merge_matrix_payloads(payloads)
+
+
+def query_range_series_sharded(client: Any, query: str, start: int, end: int, step: str) -> SeriesSet:
+    """Run a sharded, stream-decoded range query and stitch it into one SeriesSet."""
+    shards = plan_shards(start, end, step_to_seconds(step))
+    logger.debug("Sharded %s over %d shard(s)", query, len(shards))
+    window = int(end) - int(start)
+    parts = run_shards(shards, lambda s, e: client.query_range_series(query, s, e, step, window_seconds=window))
+    return SeriesSet.concat(parts)
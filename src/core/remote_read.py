@@ -0,0 +1,582 @@
+"""
+Prometheus remote-read client for bulk export of raw samples.
+
+Multi-week analyses of plain selectors (``vllm:num_requests_running{...}``)
+pull every sample through query_range JSON, the costliest representation the
+server offers. Remote read (``POST /api/v1/read``) returns the raw samples as
+snappy-compressed protobuf; Prometheus can also stream them as XOR-encoded
+chunks (``STREAMED_XOR_CHUNKS``) framed one series batch at a time, which
+keeps both server and client memory bounded.
+
+The client is optional: it is enabled by pointing ``REMOTE_READ_URL`` at an
+endpoint that serves remote read (Prometheus itself; the Thanos querier does
+not). Raw selectors over windows of at least ``REMOTE_READ_MIN_WINDOW_SECONDS``
+are then read this way and evaluated onto the query_range step grid with
+Prometheus' lookback semantics, so callers receive the same SeriesSet.
+
+Snappy, CRC-32C and the few protobuf messages involved are implemented
+here; the python-snappy and crc32c packages are used when installed, for
+speed.
+"""
+
+import json
+import logging
+import re
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from .config import (
+    REMOTE_READ_URL,
+    REMOTE_READ_MIN_WINDOW_SECONDS,
+    REMOTE_READ_LOOKBACK_SECONDS,
+    REMOTE_READ_STREAMED,
+    REQUEST_TIMEOUT_SECONDS,
+)
+from .series_store import step_to_seconds
+from .timeseries import SeriesSet
+
+try:  # Optional native codec
+    import snappy as _snappy_lib  # type: ignore
+except ImportError:  # pragma: no cover - depends on the environment
+    _snappy_lib = None
+
+try:  # Optional native checksum
+    import crc32c as _crc32c_lib  # type: ignore
+except ImportError:  # pragma: no cover - depends on the environment
+    _crc32c_lib = None
+
+logger = logging.getLogger(__name__)
+
+# ReadRequest.ResponseType
+RESPONSE_SAMPLES = 0
+RESPONSE_STREAMED_XOR_CHUNKS = 1
+
+# LabelMatcher.Type
+MATCH_EQ, MATCH_NEQ, MATCH_RE, MATCH_NRE = 0, 1, 2, 3
+_MATCH_OPS = {"=": MATCH_EQ, "!=": MATCH_NEQ, "=~": MATCH_RE, "!~": MATCH_NRE}
+
+# Chunk.Encoding
+CHUNK_XOR = 1
+
+STREAMED_CONTENT_TYPE = "application/x-streamed-protobuf; proto=prometheus.ChunkedReadResponse"
+STALE_NAN_BITS = 0x7FF0000000000002
+
+Matcher = Tuple[int, str, str]
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class RemoteReadError(requests.exceptions.RequestException):
+    """Raised for malformed or unsupported remote-read responses."""
+
+
+# --- Snappy (block format) ---
+
+def _uvarint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise RemoteReadError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_uvarint(value: int) -> bytes:
+    """Encode an unsigned (or 64-bit two's complement) integer as a varint."""
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+_CRC32C_TABLE = []
+for _n in range(256):
+    _c = _n
+    for _ in range(8):
+        _c = (_c >> 1) ^ 0x82F63B78 if _c & 1 else _c >> 1
+    _CRC32C_TABLE.append(_c)
+
+
+def crc32c(data: bytes) -> int:
+    """CRC-32C (Castagnoli), the checksum of streamed remote-read frames."""
+    if _crc32c_lib is not None:
+        return _crc32c_lib.crc32c(data)
+    crc = 0xFFFFFFFF
+    table = _CRC32C_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def snappy_decompress(data: bytes) -> bytes:
+    """Decompress a snappy block."""
+    if _snappy_lib is not None:
+        return _snappy_lib.uncompress(data)
+    length, pos = _uvarint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        kind = tag & 3
+        if kind == 0:  # literal
+            size = tag >> 2
+            if size >= 60:
+                extra = size - 59
+                size = int.from_bytes(data[pos:pos + extra], "little")
+                pos += extra
+            size += 1
+            out += data[pos:pos + size]
+            pos += size
+            continue
+        if kind == 1:
+            size = 4 + ((tag >> 2) & 7)
+            offset = ((tag >> 5) << 8) | data[pos]
+            pos += 1
+        elif kind == 2:
+            size = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos:pos + 2], "little")
+            pos += 2
+        else:
+            size = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos:pos + 4], "little")
+            pos += 4
+        if offset <= 0 or offset > len(out):
+            raise RemoteReadError("Invalid snappy copy offset")
+        start = len(out) - offset
+        if offset >= size:
+            out += out[start:start + size]
+        else:
+            for i in range(size):
+                out.append(out[start + i])
+    if len(out) != length:
+        raise RemoteReadError("Snappy length mismatch")
+    return bytes(out)
+
+
+def snappy_compress(data: bytes) -> bytes:
+    """Compress into a valid snappy block (literal-only without python-snappy)."""
+    if _snappy_lib is not None:
+        return _snappy_lib.compress(data)
+    out = bytearray(encode_uvarint(len(data)))
+    for start in range(0, len(data), 65536):
+        literal = data[start:start + 65536]
+        size = len(literal) - 1
+        if size < 60:
+            out.append(size << 2)
+        elif size < 256:
+            out += bytes([60 << 2, size])
+        else:
+            out.append(61 << 2)
+            out += size.to_bytes(2, "little")
+        out += literal
+    return bytes(out)
+
+
+# --- Protobuf wire format (only what remote read needs) ---
+
+def _field(number: int, wire_type: int) -> bytes:
+    return encode_uvarint((number << 3) | wire_type)
+
+
+def pb_varint(number: int, value: int) -> bytes:
+    return _field(number, 0) + encode_uvarint(value)
+
+
+def pb_bytes(number: int, value: bytes) -> bytes:
+    return _field(number, 2) + encode_uvarint(len(value)) + value
+
+
+def pb_string(number: int, value: str) -> bytes:
+    return pb_bytes(number, value.encode("utf-8"))
+
+
+def pb_double(number: int, value: float) -> bytes:
+    return _field(number, 1) + struct.pack("<d", value)
+
+
+def pb_fields(data: bytes) -> Iterator[Tuple[int, int, Any]]:
+    """Yield (field number, wire type, value) for each field of a message."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _uvarint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _uvarint(data, pos)
+        elif wire_type == 1:
+            value = data[pos:pos + 8]
+            pos += 8
+        elif wire_type == 2:
+            size, pos = _uvarint(data, pos)
+            value = data[pos:pos + size]
+            pos += size
+        elif wire_type == 5:
+            value = data[pos:pos + 4]
+            pos += 4
+        else:
+            raise RemoteReadError(f"Unsupported protobuf wire type {wire_type}")
+        yield number, wire_type, value
+
+
+def _signed64(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def encode_read_request(queries: List[Tuple[int, int, List[Matcher]]], response_types: List[int]) -> bytes:
+    """Encode a ReadRequest for (start_ms, end_ms, matchers) queries."""
+    body = bytearray()
+    for start_ms, end_ms, matchers in queries:
+        query = pb_varint(1, start_ms) + pb_varint(2, end_ms)
+        for match_type, name, value in matchers:
+            query += pb_bytes(3, pb_varint(1, match_type) + pb_string(2, name) + pb_string(3, value))
+        body += pb_bytes(1, query)
+    if response_types:
+        body += pb_bytes(2, b"".join(encode_uvarint(t) for t in response_types))
+    return bytes(body)
+
+
+def decode_read_request(data: bytes) -> Tuple[List[Tuple[int, int, List[Matcher]]], List[int]]:
+    """Decode a ReadRequest (used by the test double)."""
+    queries: List[Tuple[int, int, List[Matcher]]] = []
+    response_types: List[int] = []
+    for number, wire_type, value in pb_fields(data):
+        if number == 1:
+            start_ms = end_ms = 0
+            matchers: List[Matcher] = []
+            for q_number, _wt, q_value in pb_fields(value):
+                if q_number == 1:
+                    start_ms = _signed64(q_value)
+                elif q_number == 2:
+                    end_ms = _signed64(q_value)
+                elif q_number == 3:
+                    fields = {n: v for n, _w, v in pb_fields(q_value)}
+                    matchers.append((
+                        fields.get(1, 0),
+                        bytes(fields.get(2, b"")).decode(),
+                        bytes(fields.get(3, b"")).decode(),
+                    ))
+            queries.append((start_ms, end_ms, matchers))
+        elif number == 2:
+            if wire_type == 2:
+                pos = 0
+                while pos < len(value):
+                    item, pos = _uvarint(value, pos)
+                    response_types.append(item)
+            else:
+                response_types.append(value)
+    return queries, response_types
+
+
+def _decode_labels(data: bytes) -> Tuple[str, str]:
+    name = value = ""
+    for number, _wt, field in pb_fields(data):
+        if number == 1:
+            name = bytes(field).decode()
+        elif number == 2:
+            value = bytes(field).decode()
+    return name, value
+
+
+# --- XOR (Gorilla) chunks ---
+
+class _BitReader:
+    __slots__ = ("value", "remaining")
+
+    def __init__(self, data: bytes):
+        self.value = int.from_bytes(data, "big")
+        self.remaining = 8 * len(data)
+
+    def read(self, bits: int) -> int:
+        if bits > self.remaining:
+            raise RemoteReadError("Truncated XOR chunk")
+        self.remaining -= bits
+        return (self.value >> self.remaining) & ((1 << bits) - 1)
+
+    def read_uvarint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.read(8)
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+
+_DOD_BUCKETS = ((0b10, 2, 14), (0b110, 3, 17), (0b1110, 4, 20))
+
+
+def decode_xor_chunk(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode a Prometheus XOR chunk into (timestamps_ms int64, values float64)."""
+    count = int.from_bytes(data[:2], "big")
+    ts = np.empty(count, dtype=np.int64)
+    bits = np.empty(count, dtype=np.uint64)
+    if not count:
+        return ts, bits.view(np.float64)
+    reader = _BitReader(data[2:])
+    raw = reader.read_uvarint()
+    t = (raw >> 1) ^ -(raw & 1)  # zigzag
+    v = reader.read(64)
+    ts[0], bits[0] = t, v
+    delta = leading = trailing = 0
+    for i in range(1, count):
+        if i == 1:
+            delta = reader.read_uvarint()
+        else:
+            if not reader.read(1):
+                dod = 0
+            else:
+                for _prefix, _length, size in _DOD_BUCKETS:
+                    if not reader.read(1):
+                        break
+                else:
+                    size = 64
+                dod = reader.read(size)
+                if size == 64:
+                    dod = _signed64(dod)
+                elif dod > (1 << (size - 1)):
+                    dod -= 1 << size
+            delta += dod
+        t += delta
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                significant = reader.read(6) or 64
+                trailing = 64 - leading - significant
+            v ^= reader.read(64 - leading - trailing) << trailing
+        ts[i], bits[i] = t, v
+    return ts, bits.view(np.float64)
+
+
+# --- Selectors and evaluation ---
+
+_SELECTOR_RE = re.compile(r"^\s*([a-zA-Z_:][a-zA-Z0-9_:]*)?\s*(?:\{(.*)\})?\s*$", re.S)
+_MATCHER_RE = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|!=|=)\s*"((?:[^"\\]|\\.)*)"\s*(?:,|$)')
+
+
+def parse_raw_selector(query: str) -> Optional[List[Matcher]]:
+    """Return label matchers for a plain series selector, or None for any other expression."""
+    match = _SELECTOR_RE.match(query or "")
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    matchers: List[Matcher] = []
+    if match.group(1):
+        matchers.append((MATCH_EQ, "__name__", match.group(1)))
+    body = (match.group(2) or "").strip()
+    pos = 0
+    while pos < len(body):
+        item = _MATCHER_RE.match(body, pos)
+        if not item:
+            return None
+        try:
+            value = json.loads(f'"{item.group(3)}"')
+        except ValueError:
+            return None
+        matchers.append((_MATCH_OPS[item.group(2)], item.group(1), value))
+        pos = item.end()
+    if not matchers or all(m[0] in (MATCH_NEQ, MATCH_NRE) for m in matchers):
+        return None
+    return matchers
+
+
+def evaluate_on_grid(
+    ts_ms: np.ndarray, values: np.ndarray, grid_ms: np.ndarray, lookback_ms: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate raw samples at grid points like an instant-vector selector.
+
+    Each grid point takes the latest sample at or before it within the
+    lookback; stale markers end a series. Returns (grid points, values).
+    """
+    if ts_ms.size == 0:
+        return grid_ms[:0], values[:0]
+    if ts_ms.size > 1 and np.any(np.diff(ts_ms) < 0):
+        order = np.argsort(ts_ms, kind="stable")
+        ts_ms, values = ts_ms[order], values[order]
+    idx = np.searchsorted(ts_ms, grid_ms, side="right") - 1
+    safe = np.clip(idx, 0, None)
+    picked = values[safe]
+    valid = (idx >= 0) & (grid_ms - ts_ms[safe] <= lookback_ms)
+    valid &= picked.view(np.uint64) != STALE_NAN_BITS
+    return grid_ms[valid], picked[valid]
+
+
+class RemoteReadClient:
+    """Reads raw samples through the Prometheus remote-read API."""
+
+    def __init__(
+        self,
+        url: str,
+        session: Optional[requests.Session] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+        streamed: bool = REMOTE_READ_STREAMED,
+        lookback_seconds: int = REMOTE_READ_LOOKBACK_SECONDS,
+        verify_ssl: Any = True,
+    ):
+        self.url = url
+        self.session = session or requests.Session()
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.streamed = streamed
+        self.lookback_seconds = lookback_seconds
+        self.verify_ssl = verify_ssl
+
+    def read(self, matchers: List[Matcher], start_ms: int, end_ms: int) -> Dict[Labels, Tuple[np.ndarray, np.ndarray]]:
+        """Return raw samples per series: labels -> (timestamps_ms, values)."""
+        response_types = [RESPONSE_STREAMED_XOR_CHUNKS, RESPONSE_SAMPLES] if self.streamed else [RESPONSE_SAMPLES]
+        body = snappy_compress(encode_read_request([(start_ms, end_ms, matchers)], response_types))
+        headers = {
+            "Content-Encoding": "snappy",
+            "Content-Type": "application/x-protobuf",
+            "X-Prometheus-Remote-Read-Version": "0.1.0",
+            **self.headers,
+        }
+        response = self.session.post(
+            self.url, data=body, headers=headers, timeout=self.timeout, stream=True, verify=self.verify_ssl
+        )
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if content_type.startswith("application/x-streamed-protobuf"):
+                parts = self._read_streamed(response.iter_content(chunk_size=64 * 1024))
+            else:
+                parts = self._read_samples(snappy_decompress(response.content))
+        finally:
+            response.close()
+
+        series: Dict[Labels, Tuple[np.ndarray, np.ndarray]] = {}
+        for labels, pieces in parts.items():
+            ts = np.concatenate([p[0] for p in pieces]) if pieces else np.empty(0, dtype=np.int64)
+            values = np.concatenate([p[1] for p in pieces]) if pieces else np.empty(0)
+            keep = (ts >= start_ms) & (ts <= end_ms)
+            series[labels] = (ts[keep], values[keep])
+        return series
+
+    @staticmethod
+    def _read_samples(data: bytes) -> Dict[Labels, List[Tuple[np.ndarray, np.ndarray]]]:
+        parts: Dict[Labels, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        for number, _wt, result in pb_fields(data):
+            if number != 1:
+                continue
+            for r_number, _rwt, timeseries in pb_fields(result):
+                if r_number != 1:
+                    continue
+                labels: List[Tuple[str, str]] = []
+                ts: List[int] = []
+                values: List[float] = []
+                for t_number, _twt, field in pb_fields(timeseries):
+                    if t_number == 1:
+                        labels.append(_decode_labels(field))
+                    elif t_number == 2:
+                        value, stamp = 0.0, 0
+                        for s_number, _swt, s_field in pb_fields(field):
+                            if s_number == 1:
+                                value = struct.unpack("<d", s_field)[0]
+                            elif s_number == 2:
+                                stamp = _signed64(s_field)
+                        values.append(value)
+                        ts.append(stamp)
+                parts.setdefault(tuple(labels), []).append(
+                    (np.asarray(ts, dtype=np.int64), np.asarray(values, dtype=np.float64))
+                )
+        return parts
+
+    @staticmethod
+    def _read_streamed(chunks: Iterable[bytes]) -> Dict[Labels, List[Tuple[np.ndarray, np.ndarray]]]:
+        parts: Dict[Labels, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        buf = bytearray()
+        for chunk in chunks:
+            buf += chunk
+            pos = 0
+            while True:
+                try:
+                    size, header_end = _uvarint(buf, pos)
+                except RemoteReadError:
+                    break
+                frame_end = header_end + 4 + size  # 4-byte CRC32C precedes the message
+                if frame_end > len(buf):
+                    break
+                message = bytes(buf[header_end + 4:frame_end])
+                (checksum,) = struct.unpack_from(">I", buf, header_end)
+                if crc32c(message) != checksum:
+                    raise RemoteReadError("Corrupt streamed remote-read frame (CRC32C mismatch)")
+                pos = frame_end
+                for number, _wt, chunked_series in pb_fields(message):
+                    if number != 1:
+                        continue
+                    labels: List[Tuple[str, str]] = []
+                    decoded: List[Tuple[np.ndarray, np.ndarray]] = []
+                    for c_number, _cwt, field in pb_fields(chunked_series):
+                        if c_number == 1:
+                            labels.append(_decode_labels(field))
+                        elif c_number == 2:
+                            chunk_fields = {n: v for n, _w, v in pb_fields(field)}
+                            if chunk_fields.get(3, 0) != CHUNK_XOR:
+                                raise RemoteReadError("Unsupported chunk encoding")
+                            decoded.append(decode_xor_chunk(bytes(chunk_fields.get(4, b""))))
+                    parts.setdefault(tuple(labels), []).extend(decoded)
+            del buf[:pos]
+        if buf:
+            raise RemoteReadError("Truncated streamed remote-read response")
+        return parts
+
+    def query_range_series(self, query: str, start: int, end: int, step: str) -> SeriesSet:
+        """Evaluate a raw selector on the query_range grid from remote-read samples."""
+        matchers = parse_raw_selector(query)
+        if matchers is None:
+            raise ValueError(f"Not a raw series selector: {query!r}")
+        step_ms = step_to_seconds(step) * 1000
+        start_ms, end_ms = int(start) * 1000, int(end) * 1000
+        lookback_ms = self.lookback_seconds * 1000
+        grid = np.arange(start_ms, end_ms + 1, step_ms, dtype=np.int64)
+
+        label_sets: List[Dict[str, str]] = []
+        ts_parts: List[np.ndarray] = []
+        value_parts: List[np.ndarray] = []
+        for labels, (ts, values) in self.read(matchers, start_ms - lookback_ms, end_ms).items():
+            points, picked = evaluate_on_grid(ts, values, grid, lookback_ms)
+            if not points.size:
+                continue
+            picked = picked.copy()
+            picked[np.isnan(picked)] = 0.0  # NaN can't be JSON serialized
+            label_sets.append(dict(labels))
+            ts_parts.append(points / 1000.0)
+            value_parts.append(picked)
+        return SeriesSet.from_arrays(label_sets, ts_parts, value_parts)
+
+
+def use_remote_read(query: str, start: int, end: int) -> bool:
+    """Return True when a query should be served through remote read."""
+    return (
+        bool(REMOTE_READ_URL)
+        and int(end) - int(start) >= REMOTE_READ_MIN_WINDOW_SECONDS
+        and parse_raw_selector(query) is not None
+    )
+
+
+_remote_read_client: Optional[RemoteReadClient] = None
+
+
+def get_remote_read_client() -> Optional[RemoteReadClient]:
+    """Return the process-wide remote-read client, or None when not configured."""
+    global _remote_read_client
+    if not REMOTE_READ_URL:
+        return None
+    if _remote_read_client is None:
+        from .http_client import get_prometheus_client
+
+        prometheus = get_prometheus_client()
+        _remote_read_client = RemoteReadClient(
+            REMOTE_READ_URL,
+            session=prometheus.session,
+            headers=prometheus._get_prometheus_headers(),
+            verify_ssl=prometheus.verify_ssl,
+        )
+    return _remote_read_client
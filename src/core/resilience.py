@@ -0,0 +1,384 @@
+"""
+Resilience layer for the shared Prometheus/Thanos client.
+
+A fixed 30s timeout means a degraded Thanos ties up a worker for 30s per
+query, on every tool call. The client combines four mechanisms:
+
+- LatencyTracker keeps a sliding window of observed latencies per endpoint.
+- AdaptiveTimeouts derive each request's timeout from the endpoint's p99
+  and the length of the queried window, within configured bounds.
+- Hedger sends one duplicate request once a call runs past the endpoint's
+  tail latency, and returns whichever response arrives first.
+- CircuitBreaker counts consecutive upstream failures. While it is open,
+  calls fail fast with a structured PrometheusError instead of waiting.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+import numpy as np
+import requests
+
+from .config import (
+    REQUEST_TIMEOUT_SECONDS,
+    PROMETHEUS_LATENCY_WINDOW,
+    PROMETHEUS_LATENCY_MIN_SAMPLES,
+    PROMETHEUS_TIMEOUT_P99_FACTOR,
+    PROMETHEUS_TIMEOUT_MIN_SECONDS,
+    PROMETHEUS_TIMEOUT_MAX_SECONDS,
+    PROMETHEUS_TIMEOUT_PER_DAY_SECONDS,
+    PROMETHEUS_HEDGE_ENABLED,
+    PROMETHEUS_HEDGE_QUANTILE,
+    PROMETHEUS_HEDGE_MIN_DELAY_SECONDS,
+    PROMETHEUS_HEDGE_MAX_IN_FLIGHT,
+    PROMETHEUS_CIRCUIT_FAILURE_THRESHOLD,
+    PROMETHEUS_CIRCUIT_RESET_SECONDS,
+    PROMETHEUS_POOL_MAXSIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class PrometheusError(requests.exceptions.ConnectionError):
+    """Structured failure raised without contacting an unhealthy upstream.
+
+    Subclasses ConnectionError, so existing handlers for unreachable
+    Prometheus/Thanos treat it the same way.
+    """
+
+    def __init__(self, message: str, upstream: str, reason: str = "circuit_open",
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.message = message
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable description of the failure."""
+        return {
+            "error": "prometheus_unavailable",
+            "reason": self.reason,
+            "message": self.message,
+            "upstream": self.upstream,
+            "retry_after_seconds": None if self.retry_after is None else round(self.retry_after, 1),
+        }
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Return True for failures that indicate upstream trouble (timeouts, connection errors, 429/5xx)."""
+    if isinstance(error, PrometheusError):
+        return False
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = getattr(error.response, "status_code", None)
+        return status is None or status == 429 or status >= 500
+    return False
+
+
+class LatencyTracker:
+    """Sliding window of successful request latencies per endpoint."""
+
+    def __init__(self, window: int = PROMETHEUS_LATENCY_WINDOW, min_samples: int = PROMETHEUS_LATENCY_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, endpoint: str, q: float) -> Optional[float]:
+        """Return the q-quantile latency, or None until min_samples are observed."""
+        with self._lock:
+            samples = list(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.quantile(samples, q))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return count/p50/p95/p99 per endpoint."""
+        with self._lock:
+            endpoints = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+        return {
+            endpoint: {
+                "count": len(samples),
+                "p50": float(np.quantile(samples, 0.5)),
+                "p95": float(np.quantile(samples, 0.95)),
+                "p99": float(np.quantile(samples, 0.99)),
+            }
+            for endpoint, samples in endpoints.items() if samples
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+class AdaptiveTimeouts:
+    """Derives per-request timeouts from observed p99 latency and window size."""
+
+    def __init__(
+        self,
+        latency: LatencyTracker,
+        default: float = REQUEST_TIMEOUT_SECONDS,
+        p99_factor: float = PROMETHEUS_TIMEOUT_P99_FACTOR,
+        minimum: float = PROMETHEUS_TIMEOUT_MIN_SECONDS,
+        maximum: float = PROMETHEUS_TIMEOUT_MAX_SECONDS,
+        per_day: float = PROMETHEUS_TIMEOUT_PER_DAY_SECONDS,
+    ):
+        self.latency = latency
+        self.default = default
+        self.p99_factor = p99_factor
+        self.minimum = minimum
+        self.maximum = maximum
+        self.per_day = per_day
+
+    def timeout_for(self, endpoint: str, window_seconds: float = 0) -> float:
+        """Return the timeout for a request; the default applies until p99 is known.
+
+        Range queries (window_seconds > 0) never get less than the default:
+        one p99 per endpoint mixes cheap and heavy queries, and cutting a
+        heavy one short would also count against the circuit breaker.
+        """
+        p99 = self.latency.quantile(endpoint, 0.99)
+        base = self.default if p99 is None else max(self.minimum, p99 * self.p99_factor)
+        if window_seconds > 0:
+            base = max(base, self.default)
+        extra = (max(0, int(window_seconds)) // 86400) * self.per_day
+        return min(self.maximum, base + extra)
+
+
+class Hedger:
+    """Runs a call and, past a latency threshold, races one duplicate of it.
+
+    Attempts run on a pool sized to the HTTP connection pool, so hedging
+    never admits more concurrent requests than the client can serve. A call
+    that finds every worker busy runs on the caller's thread, unhedged,
+    instead of queueing behind other requests.
+    """
+
+    def __init__(self, max_in_flight: int = PROMETHEUS_HEDGE_MAX_IN_FLIGHT,
+                 max_workers: int = PROMETHEUS_POOL_MAXSIZE):
+        self.max_in_flight = max_in_flight
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prometheus-hedge")
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._in_flight = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _submit(self, call: Callable[[], T], hedge: bool = False) -> Optional[Future]:
+        """Submit an attempt if a worker is free (and, for hedges, the hedge budget allows)."""
+        with self._lock:
+            if self._busy >= self.max_workers or (hedge and self._in_flight >= self.max_in_flight):
+                return None
+            self._busy += 1
+            if hedge:
+                self._in_flight += 1
+                self.hedged += 1
+        future = self._executor.submit(call)
+        future.add_done_callback(lambda _: self._release(hedge))
+        return future
+
+    def _release(self, hedge: bool) -> None:
+        with self._lock:
+            self._busy -= 1
+            if hedge:
+                self._in_flight -= 1
+
+    def run(self, call: Callable[[], T], delay: Optional[float],
+            hedge_call: Optional[Callable[[], T]] = None) -> T:
+        """Run call, hedging after delay seconds (no hedging when delay is None).
+
+        The first successful response wins; the losing attempt is cancelled
+        if it has not started and otherwise left to finish in the background.
+        An error is raised only when every attempt has failed; the primary's
+        error takes precedence.
+
+        Args:
+            hedge_call: Callable for the duplicate attempt (defaults to call)
+        """
+        if delay is None:
+            return call()
+        primary = self._submit(call)
+        if primary is None:
+            return call()
+        done, _ = wait([primary], timeout=delay)
+        hedge = None if done else self._submit(hedge_call or call, hedge=True)
+        if hedge is None:
+            return primary.result()
+
+        logger.debug("Hedging request after %.2fs", delay)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+        return primary.result()
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(
+        self,
+        upstream: str,
+        failure_threshold: int = PROMETHEUS_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = PROMETHEUS_CIRCUIT_RESET_SECONDS,
+    ):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Admit a call or raise PrometheusError while the circuit is open."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == CIRCUIT_OPEN and remaining <= 0:
+                self.state = CIRCUIT_HALF_OPEN
+            if self.state == CIRCUIT_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise PrometheusError(
+            f"Prometheus/Thanos at {self.upstream} is unavailable "
+            f"({self.failures} consecutive failures); failing fast",
+            upstream=self.upstream,
+            retry_after=max(0.0, remaining),
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CIRCUIT_CLOSED:
+                logger.info("Circuit for %s closed", self.upstream)
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == CIRCUIT_HALF_OPEN or (
+                self.state == CIRCUIT_CLOSED and 0 < self.failure_threshold <= self.failures
+            ):
+                if self.state == CIRCUIT_CLOSED:
+                    logger.warning("Circuit for %s opened after %d failures", self.upstream, self.failures)
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+            self.rejected = 0
+            self._probe_in_flight = False
+
+
+class ResilientCaller:
+    """Applies breaker, adaptive timeout, hedging and latency tracking to calls."""
+
+    def __init__(self, upstream: str, default_timeout: float = REQUEST_TIMEOUT_SECONDS,
+                 hedging: bool = PROMETHEUS_HEDGE_ENABLED, max_workers: int = PROMETHEUS_POOL_MAXSIZE):
+        self.latency = LatencyTracker()
+        self.timeouts = AdaptiveTimeouts(self.latency, default=default_timeout)
+        self.hedger = Hedger(max_workers=max_workers)
+        self.breaker = CircuitBreaker(upstream)
+        self.hedging = hedging
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Return how long to wait before hedging, or None to not hedge."""
+        if not self.hedging or self.breaker.state != CIRCUIT_CLOSED:
+            return None
+        tail = self.latency.quantile(endpoint, PROMETHEUS_HEDGE_QUANTILE)
+        if tail is None:
+            return None
+        return max(PROMETHEUS_HEDGE_MIN_DELAY_SECONDS, tail)
+
+    def call(self, endpoint: str, send: Callable[[float], T], window_seconds: float = 0,
+             timeout: Optional[float] = None, hedge: bool = True) -> T:
+        """Run send(timeout) for an endpoint through the resilience layer.
+
+        Args:
+            endpoint: Endpoint path used to group latency statistics
+            send: Performs one request with the given timeout
+            window_seconds: Length of the queried time window (0 if none)
+            timeout: Explicit timeout overriding the adaptive one
+            hedge: Whether a duplicate request may be raced against a slow one
+
+        Raises:
+            PrometheusError: While the circuit is open
+            requests.exceptions.RequestException: Errors from the request itself
+        """
+        self.breaker.before_call()
+        effective_timeout = timeout or self.timeouts.timeout_for(endpoint, window_seconds)
+        delay = self.hedge_delay(endpoint) if hedge else None
+        started = time.monotonic()
+
+        def primary() -> T:
+            # Only the primary's latency feeds the p99; a winning hedge's
+            # shorter latency would pull the adaptive timeout down
+            result = send(effective_timeout)
+            self.latency.record(endpoint, time.monotonic() - started)
+            return result
+
+        try:
+            result = self.hedger.run(primary, delay, lambda: send(effective_timeout))
+        except Exception as e:
+            if is_transient_error(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return latency percentiles, breaker state and hedging counters."""
+        return {
+            "latency": self.latency.snapshot(),
+            "circuit": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "rejected": self.breaker.rejected,
+            },
+            "hedging": {"hedged": self.hedger.hedged, "hedge_wins": self.hedger.hedge_wins},
+        }
+
+    def reset(self) -> None:
+        """Forget latency history and close the circuit."""
+        self.latency.clear()
+        self.breaker.reset()
@@ -0,0 +1,200 @@
+"""
+Step-aligned series store for incremental (delta) range fetching.
+
+Dashboards re-analyze sliding windows such as "last 1h" every few minutes.
+With the window snapped to step boundaries, consecutive requests evaluate on
+the same timestamp grid, so only the newest samples differ. The store keeps
+the last result per (query, step) and, on a repeat request, fetches only the
+missing tail (plus a small overlap for late-arriving samples) and merges it
+with the cached head. Entries are LRU-evicted against an entry count and a
+byte budget, estimated like the range-query cache does.
+
+Snapping to step boundaries also makes identical requests byte-for-byte equal,
+which lets a Thanos query-frontend results cache hit.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from .config import SERIES_STORE_MAX_BYTES, SERIES_STORE_MAX_ENTRIES, SERIES_STORE_OVERLAP_STEPS
+from .query_cache import estimate_size, normalize_promql
+
+logger = logging.getLogger(__name__)
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw]?)$")
+_UNIT_SECONDS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def step_to_seconds(step: Any) -> int:
+    """Convert a Prometheus step ("30s", "5m", "1h" or a number) to seconds."""
+    if isinstance(step, (int, float)):
+        return max(1, int(step))
+    match = _DURATION_RE.match(str(step).strip())
+    if not match:
+        raise ValueError(f"Unsupported step: {step!r}")
+    return max(1, int(float(match.group(1)) * _UNIT_SECONDS[match.group(2)]))
+
+
+def align_window(start_ts: float, end_ts: float, step_seconds: int) -> Tuple[int, int]:
+    """Snap a window to step boundaries (floor both ends, never inverted)."""
+    aligned_start = int(math.floor(float(start_ts) / step_seconds) * step_seconds)
+    aligned_end = int(math.floor(float(end_ts) / step_seconds) * step_seconds)
+    return aligned_start, max(aligned_start, aligned_end)
+
+
+def _series_key(metric: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(metric.items()))
+
+
+def _slice_values(values: List[List[Any]], start: float, end: float) -> List[List[Any]]:
+    return [v for v in values if start <= float(v[0]) <= end]
+
+
+@dataclass
+class _StoredRange:
+    start: int
+    end: int
+    result: List[Dict[str, Any]]
+    nbytes: int
+
+
+class SeriesStore:
+    """Keeps the latest step-aligned matrix per (query, step) for delta fetches."""
+
+    def __init__(
+        self,
+        max_entries: int = SERIES_STORE_MAX_ENTRIES,
+        overlap_steps: int = SERIES_STORE_OVERLAP_STEPS,
+        max_bytes: int = SERIES_STORE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.overlap_steps = overlap_steps
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, int], _StoredRange]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.full_fetches = 0
+        self.delta_fetches = 0
+
+    def query_range(self, client: Any, query: str, start: int, end: int, step: str) -> Dict[str, Any]:
+        """Return a query_range payload, fetching only the tail when possible.
+
+        Args:
+            client: PrometheusClient used for upstream requests
+            query: PromQL expression
+            start: Step-aligned start timestamp
+            end: Step-aligned end timestamp
+            step: Prometheus step string
+
+        Returns:
+            Prometheus query_range payload ({"status", "data": {"result": ...}})
+        """
+        step_seconds = step_to_seconds(step)
+        key = (normalize_promql(query), step_seconds)
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is not None:
+                self._entries.move_to_end(key)
+
+        if stored is None or start < stored.start or start > stored.end:
+            payload = client.query_range(query, start, end, step)
+            with self._lock:
+                self.full_fetches += 1
+            self._store(key, start, end, payload)
+            return payload
+
+        # Refetch a few trailing steps so late-arriving samples are picked up
+        tail_start = max(start, stored.end - self.overlap_steps * step_seconds)
+        if tail_start > end:
+            tail_start = end
+        payload = client.query_range(query, tail_start, end, step)
+        if not isinstance(payload, dict) or payload.get("status") != "success":
+            return payload
+        with self._lock:
+            self.delta_fetches += 1
+        logger.debug("Delta fetch for %s: %s..%s (cached head %s..%s)", query, tail_start, end, stored.start, stored.end)
+
+        merged = self._merge(stored.result, payload["data"].get("result", []), start, tail_start, end)
+        merged_payload = {
+            "status": "success",
+            "data": {"resultType": "matrix", "result": merged},
+        }
+        self._store(key, start, end, merged_payload)
+        return merged_payload
+
+    @staticmethod
+    def _merge(
+        head: List[Dict[str, Any]],
+        tail: List[Dict[str, Any]],
+        start: float,
+        tail_start: float,
+        end: float,
+    ) -> List[Dict[str, Any]]:
+        """Merge cached head samples before tail_start with freshly fetched tail samples."""
+        merged: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+        for series in head:
+            values = _slice_values(series.get("values", []), start, tail_start - 1e-9)
+            if values:
+                merged[_series_key(series.get("metric", {}))] = {
+                    "metric": series.get("metric", {}),
+                    "values": values,
+                }
+        for series in tail:
+            key = _series_key(series.get("metric", {}))
+            values = _slice_values(series.get("values", []), tail_start, end)
+            if key in merged:
+                merged[key]["values"] = merged[key]["values"] + values
+            elif values:
+                merged[key] = {"metric": series.get("metric", {}), "values": values}
+        return list(merged.values())
+
+    def _store(self, key: Tuple[str, int], start: int, end: int, payload: Any) -> None:
+        if not isinstance(payload, dict) or payload.get("status") != "success":
+            return
+        result = payload.get("data", {}).get("result")
+        if not isinstance(result, list) or payload["data"].get("resultType", "matrix") != "matrix":
+            return
+        size = estimate_size(payload)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _StoredRange(start=start, end=end, result=result, nbytes=size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry/byte usage and fetch counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "full_fetches": self.full_fetches,
+                "delta_fetches": self.delta_fetches,
+            }
+
+    def clear(self) -> None:
+        """Drop all stored ranges and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.full_fetches = 0
+            self.delta_fetches = 0
+
+
+_series_store = SeriesStore()
+
+
+def get_series_store() -> SeriesStore:
+    """Return the process-wide series store."""
+    return _series_store
@@ -0,0 +1,93 @@
+"""
+In-flight request coalescing ("singleflight") for identical upstream calls.
+
+Several UI sessions or chat turns often ask Prometheus/Thanos the same thing
+at the same moment: the default vLLM metric set for a popular model, or the
+ALERTS query. The first caller for a key performs the request; callers that
+arrive with the same key while it is in flight wait for it and receive the
+same result (or the same exception). Nothing is cached once the call
+completes; that is the job of the range-query cache.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.executed = 0
+        self.deduplicated = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run fn once per key at a time and share its outcome with concurrent callers.
+
+        The shared result object is handed to every caller and must not be
+        mutated.
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently executing."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request/execution/deduplication counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "executed": self.executed,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._calls),
+                "dedup_ratio": (self.deduplicated / self.requests) if self.requests else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Reset counters (calls in flight are unaffected)."""
+        with self._lock:
+            self.requests = 0
+            self.executed = 0
+            self.deduplicated = 0
@@ -0,0 +1,116 @@
+"""
+Batched instant snapshots of many metrics in one Prometheus round trip.
+
+Overview panels only need the current value of several metrics. Instead of
+one /api/v1/query per metric, the logical queries are combined into a single
+expression and the returned vector is split back per key:
+
+- plain metric names become one ``{__name__=~"a|b|c"}`` selector and are
+  split by ``__name__``;
+- arbitrary expressions are each tagged with ``label_replace`` and joined
+  with ``or``, then split by the tag label (which is removed again).
+
+If the combined expression is rejected (e.g. one of the queries returns a
+scalar), the snapshot falls back to one request per query.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .http_client import PrometheusClient, get_prometheus_client
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_LABEL = "_snapshot_key"
+
+_METRIC_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+NAME_MODE = "name"
+TAGGED_MODE = "tagged"
+
+
+def build_snapshot_query(queries: Dict[str, str]) -> Tuple[str, str]:
+    """Combine logical queries into one instant-query expression.
+
+    Args:
+        queries: Mapping of logical key to PromQL expression
+
+    Returns:
+        Tuple of (combined PromQL, mode) where mode is NAME_MODE or TAGGED_MODE
+    """
+    exprs = [q.strip() for q in queries.values()]
+    if all(_METRIC_NAME_RE.match(e) for e in exprs):
+        names = "|".join(re.escape(e) for e in dict.fromkeys(exprs))
+        return f'{{__name__=~"{names}"}}', NAME_MODE
+
+    tagged = [
+        f'label_replace(({expr}), "{SNAPSHOT_LABEL}", "{index}", "", "")'
+        for index, expr in enumerate(exprs)
+    ]
+    return " or ".join(tagged), TAGGED_MODE
+
+
+def split_snapshot_result(
+    result: List[Dict[str, Any]],
+    queries: Dict[str, str],
+    mode: str,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Split a combined instant-vector result back into per-key results."""
+    keys = list(queries)
+    split: Dict[str, List[Dict[str, Any]]] = {key: [] for key in keys}
+    if mode == NAME_MODE:
+        by_name: Dict[str, List[str]] = {}
+        for key in keys:
+            by_name.setdefault(queries[key].strip(), []).append(key)
+        for series in result:
+            for key in by_name.get(series.get("metric", {}).get("__name__", ""), []):
+                split[key].append(series)
+        return split
+
+    for series in result:
+        metric = dict(series.get("metric", {}))
+        tag = metric.pop(SNAPSHOT_LABEL, None)
+        try:
+            key = keys[int(tag)]
+        except (TypeError, ValueError, IndexError):
+            continue
+        split[key].append({**series, "metric": metric})
+    return split
+
+
+def fetch_snapshot(
+    queries: Dict[str, str],
+    time: Optional[int] = None,
+    client: Optional[PrometheusClient] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch the current value of many queries with one instant query.
+
+    Args:
+        queries: Mapping of logical key to PromQL expression
+        time: Optional evaluation timestamp
+        client: PrometheusClient to use (defaults to the shared client)
+
+    Returns:
+        Mapping of logical key to its instant-vector series list
+
+    Raises:
+        requests.exceptions.RequestException: On connection/timeout errors
+    """
+    if not queries:
+        return {}
+    client = client or get_prometheus_client()
+    combined, mode = build_snapshot_query(queries)
+    try:
+        payload = client.query_instant(combined, time)
+    except requests.exceptions.HTTPError as e:
+        if len(queries) == 1:
+            raise
+        logger.debug("Combined snapshot query rejected, querying individually: %s", e)
+        return {
+            key: client.query_instant(query, time).get("data", {}).get("result", [])
+            for key, query in queries.items()
+        }
+    return split_snapshot_result(payload.get("data", {}).get("result", []), queries, mode)
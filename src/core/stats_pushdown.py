@@ -0,0 +1,113 @@
+"""
+Server-side statistics pushdown for prompt building.
+
+Chat prompts only print a handful of numbers per metric (mean, latest, a
+trend and an anomaly flag), yet used to download every sample of every
+series. This module asks Prometheus/Thanos for those numbers directly: one
+instant query per metric evaluates the statistics behind them over a
+subquery of the metric expression on the same step grid as the range query
+would use, tagging each result with a ``__stat__`` label so all statistics
+come back in a single response. The per-series results are combined into
+one MetricStats.
+
+Prometheus evaluates the subquery once per statistic, so the set is kept to
+what the prompts print; min/max are not pushed down. ``latest`` is the last
+value of the series seen most recently on the step grid (ties go to the
+last series in label order, as in SeriesSet.latest), so a series that
+vanished mid-window does not report a stale value.
+
+Pushdown is meant for callers that need only the numbers, such as the
+OpenShift chat prompt. analyze_openshift_metrics and analyze_vllm download
+the series for their charts anyway, so by design they compute the prompt
+statistics and health score from those chart series instead.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .http_client import get_prometheus_client
+from .timeseries import MetricStats
+
+STAT_LABEL = "__stat__"
+
+# (stat name, function template over the subquery): count and sum give the
+# mean, last/last_seen the latest value, p90/stddev the anomaly and slope the trend
+STAT_FUNCTIONS: Tuple[Tuple[str, str], ...] = (
+    ("count", "count_over_time({subquery})"),
+    ("sum", "sum_over_time({subquery})"),
+    ("last", "last_over_time({subquery})"),
+    ("last_seen", "max_over_time(timestamp({query})[{range}])"),
+    ("p90", "quantile_over_time(0.9, {subquery})"),
+    ("stddev", "stddev_over_time({subquery})"),
+    ("slope", "deriv({subquery})"),
+)
+
+
+def build_stats_query(query: str, window_seconds: int, step: str) -> str:
+    """Return one instant query evaluating every statistic of ``query`` over the window."""
+    fields = {"query": f"({query})", "range": f"{int(window_seconds)}s:{step}"}
+    fields["subquery"] = "{query}[{range}]".format(**fields)
+    return " or ".join(
+        f'label_replace({template.format(**fields)}, "{STAT_LABEL}", "{name}", "", "")'
+        for name, template in STAT_FUNCTIONS
+    )
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _reduce(func, values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return float(func(values)) if values.size else None
+
+
+def parse_stats_result(result: List[Dict[str, Any]]) -> MetricStats:
+    """Combine the per-series statistics of a stats query into one MetricStats."""
+    groups: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+    for item in result or []:
+        metric = dict(item.get("metric") or {})
+        stat = metric.pop(STAT_LABEL, None)
+        metric.pop("__name__", None)
+        if stat is None:
+            continue
+        groups.setdefault(tuple(sorted(metric.items())), {})[stat] = _float((item.get("value") or [None, None])[1])
+
+    rows = [groups[key] for key in sorted(groups) if groups[key].get("count", 0) > 0]
+    if not rows:
+        return MetricStats()
+    table = {name: np.array([row.get(name, np.nan) for row in rows]) for name, _ in STAT_FUNCTIONS}
+    counts = table["count"]
+    total = float(counts.sum())
+    avg = float(np.nansum(table["sum"]) / total)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = table["sum"] / counts
+        second_moment = np.nansum(counts * (table["stddev"] ** 2 + means ** 2)) / total
+    has_slope = ~np.isnan(table["slope"])
+    seen = np.nan_to_num(table["last_seen"], nan=-np.inf)
+    latest = table["last"][len(seen) - 1 - int(np.argmax(seen[::-1]))]
+
+    return MetricStats(
+        count=int(total),
+        avg=avg,
+        latest=None if np.isnan(latest) else float(latest),
+        p90=_reduce(np.max, table["p90"]),
+        stddev=float(np.sqrt(max(second_moment - avg ** 2, 0.0))),
+        slope=float(np.average(table["slope"][has_slope], weights=counts[has_slope])) if has_slope.any() else None,
+        series_count=len(rows),
+    )
+
+
+def fetch_metric_stats(query: str, end: int, window_seconds: int, step: str) -> MetricStats:
+    """Fetch the statistics of ``query`` over (end - window, end] in one instant query.
+
+    Raises:
+        requests.exceptions.RequestException: On Prometheus/Thanos errors
+    """
+    stats_query = build_stats_query(query, window_seconds, step)
+    response = get_prometheus_client().query_instant(stats_query, time=end)
+    return parse_stats_result((response.get("data") or {}).get("result", []))
@@ -0,0 +1,292 @@
+"""
+Incremental decoder for Prometheus query_range (matrix) response bodies.
+
+A 90-day window over many series can produce a multi-hundred-MB JSON body;
+``response.json()`` turns it into millions of small lists and strings before
+any conversion starts. MatrixStreamDecoder instead consumes the body chunk by
+chunk: label sets are decoded per series with ``json.loads`` (they are
+small), while runs of complete ``[ts,"value"]`` pairs are parsed in bulk with
+numpy and written into per-series float64 buffers preallocated from the
+expected number of steps. Only the unconsumed tail of the current chunk is
+kept as bytes, so peak memory follows the numeric data.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .timeseries import SeriesSet
+
+_RESULT_RE = re.compile(rb'"result"\s*:\s*\[')
+_STATUS_RE = re.compile(rb'"status"\s*:\s*"(\w+)"')
+_RESULT_TYPE_RE = re.compile(rb'"resultType"\s*:\s*"(\w+)"')
+_KEY_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"\s*:')
+_VALUES_END_RE = re.compile(rb"\]\s*\]")
+_WHITESPACE = b" \t\r\n"
+
+# Parser states
+_SEEK_RESULT = "seek_result"
+_SERIES_LIST = "series_list"
+_SERIES_KEY = "series_key"
+_METRIC = "metric"
+_SKIP_VALUE = "skip_value"
+_VALUES_OPEN = "values_open"
+_VALUES = "values"
+_DONE = "done"
+
+
+class StreamDecodeError(ValueError):
+    """Raised when a query_range body is not a well-formed matrix response."""
+
+
+def _value_end(buf: bytearray, pos: int) -> int:
+    """Return the index just past the JSON value starting at pos, or -1 if incomplete."""
+    first = buf[pos:pos + 1]
+    if first not in (b"{", b"[", b'"'):
+        # Scalar (number/true/false/null): ends at the next delimiter
+        for i in range(pos, len(buf)):
+            if buf[i] in b",}] \t\r\n":
+                return i
+        return -1
+    depth = 0
+    in_string = False
+    i = pos
+    while i < len(buf):
+        ch = buf[i]
+        if in_string:
+            if ch == 0x5C:  # backslash
+                i += 1
+            elif ch == 0x22:
+                in_string = False
+                if depth == 0:
+                    return i + 1
+        elif ch == 0x22:
+            in_string = True
+        elif ch in b"{[":
+            depth += 1
+        elif ch in b"}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def parse_sample_pairs(chunk: bytes) -> np.ndarray:
+    """Parse a run of complete ``[ts,"value"],...`` pairs into a flat float64 array.
+
+    The result alternates timestamp, value. "NaN", "+Inf" and "-Inf" parse
+    to their float counterparts.
+    """
+    pairs = chunk.count(b"[")
+    text = bytes(chunk).translate(None, b'[]"').strip(b" \t\r\n,")
+    if not pairs:
+        if text:
+            raise StreamDecodeError("Malformed sample values in query_range response")
+        return np.empty(0, dtype=np.float64)
+    try:
+        flat = np.fromstring(text.decode("ascii"), dtype=np.float64, sep=",")
+    except ValueError as e:
+        raise StreamDecodeError("Malformed sample values in query_range response") from e
+    if flat.size != 2 * pairs:
+        raise StreamDecodeError("Malformed sample values in query_range response")
+    return flat
+
+
+class _SeriesBuffer:
+    """Growable timestamp/value arrays for one series."""
+
+    __slots__ = ("labels", "timestamps", "values", "size")
+
+    def __init__(self, capacity: int):
+        self.labels: Optional[Dict[str, str]] = None
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def extend(self, flat: np.ndarray) -> None:
+        count = flat.size // 2
+        needed = self.size + count
+        if needed > self.timestamps.size:
+            capacity = max(needed, 2 * self.timestamps.size)
+            self.timestamps = np.resize(self.timestamps, capacity)
+            self.values = np.resize(self.values, capacity)
+        self.timestamps[self.size:needed] = flat[0::2]
+        self.values[self.size:needed] = flat[1::2]
+        self.size = needed
+
+
+class MatrixStreamDecoder:
+    """Push parser turning query_range body chunks into per-series numpy arrays.
+
+    Usage::
+
+        decoder = MatrixStreamDecoder(expected_points=steps)
+        for chunk in response.iter_content(chunk_size):
+            decoder.feed(chunk)
+        series_set = decoder.finish()
+    """
+
+    def __init__(self, expected_points: int = 0):
+        self.expected_points = max(1, int(expected_points))
+        self.status: Optional[str] = None
+        self.result_type: Optional[str] = None
+        self.bytes_read = 0
+        self._buf = bytearray()
+        self._state = _SEEK_RESULT
+        self._current: Optional[_SeriesBuffer] = None
+        self._series: List[_SeriesBuffer] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the response body."""
+        if not chunk:
+            return
+        self.bytes_read += len(chunk)
+        self._buf += chunk
+        pos = self._advance(0)
+        if pos:
+            del self._buf[:pos]
+
+    def _skip(self, pos: int, chars: bytes = _WHITESPACE) -> int:
+        buf = self._buf
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+        return pos
+
+    def _advance(self, pos: int) -> int:
+        """Run the state machine as far as the buffered bytes allow; return bytes consumed."""
+        buf = self._buf
+        while True:
+            state = self._state
+            if state == _SEEK_RESULT:
+                match = _RESULT_RE.search(buf, pos)
+                if match is None:
+                    return pos
+                header = bytes(buf[:match.start()])
+                status = _STATUS_RE.search(header)
+                result_type = _RESULT_TYPE_RE.search(header)
+                self.status = status.group(1).decode() if status else self.status
+                self.result_type = result_type.group(1).decode() if result_type else self.result_type
+                if self.result_type not in (None, "matrix"):
+                    raise StreamDecodeError(f"Expected a matrix result, got {self.result_type!r}")
+                pos = match.end()
+                self._state = _SERIES_LIST
+
+            elif state == _SERIES_LIST:
+                pos = self._skip(pos, _WHITESPACE + b",")
+                if pos >= len(buf):
+                    return pos
+                if buf[pos] == 0x5D:  # ]
+                    self._state = _DONE
+                    return len(buf)
+                if buf[pos] != 0x7B:  # {
+                    raise StreamDecodeError("Expected a series object in query_range result")
+                self._current = _SeriesBuffer(self.expected_points)
+                pos += 1
+                self._state = _SERIES_KEY
+
+            elif state == _SERIES_KEY:
+                pos = self._skip(pos, _WHITESPACE + b",")
+                if pos >= len(buf):
+                    return pos
+                if buf[pos] == 0x7D:  # }
+                    self._finish_series()
+                    pos += 1
+                    self._state = _SERIES_LIST
+                    continue
+                match = _KEY_RE.match(buf, pos)
+                if match is None:
+                    if buf.find(b":", pos) >= 0:
+                        raise StreamDecodeError("Malformed series object in query_range result")
+                    return pos
+                key = match.group(1)
+                pos = self._skip(match.end())
+                self._state = {b"metric": _METRIC, b"values": _VALUES_OPEN}.get(key, _SKIP_VALUE)
+
+            elif state in (_METRIC, _SKIP_VALUE):
+                pos = self._skip(pos)
+                if pos >= len(buf):
+                    return pos
+                end = _value_end(buf, pos)
+                if end < 0:
+                    return pos
+                if state == _METRIC:
+                    try:
+                        self._current.labels = json.loads(bytes(buf[pos:end]))
+                    except ValueError as e:
+                        raise StreamDecodeError(f"Malformed series labels: {e}") from e
+                pos = end
+                self._state = _SERIES_KEY
+
+            elif state == _VALUES_OPEN:
+                pos = self._skip(pos)
+                if pos >= len(buf):
+                    return pos
+                if buf[pos] != 0x5B:  # [
+                    raise StreamDecodeError("Expected a values array in query_range result")
+                pos += 1
+                self._state = _VALUES
+
+            elif state == _VALUES:
+                pos = self._skip(pos, _WHITESPACE + b",")
+                if pos >= len(buf):
+                    return pos
+                if buf[pos] == 0x5D:  # empty values array
+                    pos += 1
+                    self._state = _SERIES_KEY
+                    continue
+                match = _VALUES_END_RE.search(buf, pos)
+                if match is not None:
+                    self._current.extend(parse_sample_pairs(buf[pos:match.start() + 1]))
+                    pos = match.end()
+                    self._state = _SERIES_KEY
+                    continue
+                last = buf.rfind(b"]", pos)
+                if last >= 0:
+                    self._current.extend(parse_sample_pairs(buf[pos:last + 1]))
+                    pos = last + 1
+                return pos
+
+            else:  # _DONE: trailing keys (warnings, stats) are ignored
+                return len(buf)
+
+    def _finish_series(self) -> None:
+        series = self._current
+        self._current = None
+        if series is not None and series.size:
+            self._series.append(series)
+
+    def arrays(self) -> Tuple[List[Dict[str, str]], List[np.ndarray], List[np.ndarray]]:
+        """Return per-series label sets, timestamp and value arrays (NaN -> 0.0)."""
+        label_sets: List[Dict[str, str]] = []
+        ts_parts: List[np.ndarray] = []
+        value_parts: List[np.ndarray] = []
+        for series in self._series:
+            values = series.values[:series.size]
+            values[np.isnan(values)] = 0.0  # NaN can't be JSON serialized
+            label_sets.append(series.labels or {})
+            ts_parts.append(series.timestamps[:series.size])
+            value_parts.append(values)
+        return label_sets, ts_parts, value_parts
+
+    def finish(self) -> SeriesSet:
+        """Validate that the body was complete and return the decoded SeriesSet."""
+        if self._state == _SEEK_RESULT:
+            status = _STATUS_RE.search(self._buf)
+            if status and status.group(1) != b"success":
+                raise StreamDecodeError(f"query_range returned status {status.group(1).decode()!r}")
+        if self._state != _DONE:
+            raise StreamDecodeError("Truncated query_range response")
+        if self.status not in (None, "success"):
+            raise StreamDecodeError(f"query_range returned status {self.status!r}")
+        return SeriesSet.from_arrays(*self.arrays())
+
+
+def decode_matrix_stream(chunks: Iterable[bytes], expected_points: int = 0) -> SeriesSet:
+    """Decode an iterable of query_range body chunks into a SeriesSet."""
+    decoder = MatrixStreamDecoder(expected_points)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.finish()
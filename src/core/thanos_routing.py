@@ -0,0 +1,148 @@
+"""
+Thanos resolution and store-routing parameters for range queries.
+
+Thanos compacts blocks into 5m and 1h downsampled resolutions, but it only
+reads them when a query allows it through ``max_source_resolution``.
+Without that parameter every multi-week analysis reads raw samples from
+object storage, even when the step is 5m or 1h. The routing policy follows
+the Thanos querier's own auto-downsampling rule: a resolution is allowed
+only when it is at most a fifth of the step, and when every range selector
+of the query spans at least five samples at that resolution (rate() over
+too few downsampled points is wrong). Downsampled blocks also only exist for
+older data, so the window must be long enough. For downsampled reads it
+sets ``dedup``; ``partial_response`` is opt-in, since a partial result
+silently drops series from an analysis.
+
+Plain Prometheus ignores these parameters, so the policy is safe to enable
+against either backend. Every threshold and flag is configurable per
+deployment.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+from .config import (
+    PROMQL_REWRITE_CACHE_SIZE,
+    THANOS_DOWNSAMPLING_ENABLED,
+    THANOS_RESOLUTION_5M_MIN_WINDOW_SECONDS,
+    THANOS_RESOLUTION_1H_MIN_WINDOW_SECONDS,
+    THANOS_PARTIAL_RESPONSE,
+    THANOS_DEDUP,
+)
+from .promql_parser import PromQLSyntaxError, Subquery, VectorSelector, children, duration_seconds, parse_promql
+from .series_store import step_to_seconds
+
+RESOLUTION_RAW = 0
+RESOLUTION_5M = 300
+RESOLUTION_1H = 3600
+
+_RESOLUTION_NAMES = {RESOLUTION_5M: "5m", RESOLUTION_1H: "1h"}
+
+# Thanos allows a resolution only when step and range selectors span this many of its samples
+_SAMPLES_PER_RESOLUTION = 5
+
+_NO_RANGE = float("inf")
+
+
+@lru_cache(maxsize=PROMQL_REWRITE_CACHE_SIZE)
+def _shortest_range(query: str) -> Optional[float]:
+    """Return the shortest range selector of a query in seconds.
+
+    Returns infinity for queries without range selectors and None when the
+    query does not parse (its ranges are unknown).
+    """
+    try:
+        node = parse_promql(query)
+    except PromQLSyntaxError:
+        return None
+
+    def ranges(node):
+        if isinstance(node, (VectorSelector, Subquery)) and node.range:
+            yield duration_seconds(node.range)
+        for child in children(node):
+            yield from ranges(child)
+
+    return min(ranges(node), default=_NO_RANGE)
+
+
+def _flag(setting: str, auto_value: bool) -> Optional[str]:
+    """Resolve a "true"/"false"/"auto"/"off" setting to a query value (None = omit)."""
+    setting = (setting or "").strip().lower()
+    if setting in ("true", "false"):
+        return setting
+    if setting == "auto":
+        return "true" if auto_value else None
+    return None
+
+
+@dataclass(frozen=True)
+class ThanosRoutingPolicy:
+    """Chooses max_source_resolution, partial_response and dedup per query."""
+
+    enabled: bool = THANOS_DOWNSAMPLING_ENABLED
+    min_window_5m: int = THANOS_RESOLUTION_5M_MIN_WINDOW_SECONDS
+    min_window_1h: int = THANOS_RESOLUTION_1H_MIN_WINDOW_SECONDS
+    partial_response: str = THANOS_PARTIAL_RESPONSE
+    dedup: str = THANOS_DEDUP
+
+    def resolution_for(self, step_seconds: int, window_seconds: int, range_seconds: Optional[float] = _NO_RANGE) -> int:
+        """Return the coarsest allowed source resolution (seconds, 0 for raw).
+
+        Args:
+            step_seconds: Query step
+            window_seconds: Length of the queried window
+            range_seconds: Shortest range selector of the query (infinity
+                when it has none, None when unknown)
+        """
+        if not self.enabled or range_seconds is None:
+            return RESOLUTION_RAW
+        for resolution, min_window in ((RESOLUTION_1H, self.min_window_1h), (RESOLUTION_5M, self.min_window_5m)):
+            samples = _SAMPLES_PER_RESOLUTION * resolution
+            if window_seconds >= min_window and step_seconds >= samples and range_seconds >= samples:
+                return resolution
+        return RESOLUTION_RAW
+
+    def params_for(self, start: int, end: int, step: str, window_seconds: Optional[int] = None,
+                   query: Optional[str] = None) -> Dict[str, str]:
+        """Return the extra query_range parameters for a request.
+
+        Args:
+            start: Start timestamp of this request
+            end: End timestamp of this request
+            step: Prometheus step string
+            window_seconds: Length of the logical window when this request is
+                one shard of a longer query (defaults to end - start)
+            query: PromQL expression, whose range selectors limit the
+                resolution (without it, none are assumed)
+
+        Returns:
+            Parameters to add to the request (empty for short raw reads)
+        """
+        window = int(end) - int(start) if window_seconds is None else int(window_seconds)
+        try:
+            step_seconds = step_to_seconds(step)
+        except ValueError:
+            step_seconds = 0
+        ranges = _NO_RANGE if query is None else _shortest_range(query)
+        resolution = self.resolution_for(step_seconds, window, ranges)
+        downsampled = resolution != RESOLUTION_RAW
+
+        params: Dict[str, str] = {}
+        if downsampled:
+            params["max_source_resolution"] = _RESOLUTION_NAMES[resolution]
+        partial = _flag(self.partial_response, downsampled)
+        if partial is not None:
+            params["partial_response"] = partial
+        dedup = _flag(self.dedup, downsampled)
+        if dedup is not None:
+            params["dedup"] = dedup
+        return params
+
+
+_routing_policy = ThanosRoutingPolicy()
+
+
+def get_routing_policy() -> ThanosRoutingPolicy:
+    """Return the process-wide routing policy (configured from the environment)."""
+    return _routing_policy
@@ -16,8 +16,8 @@ from .metrics import choose_prometheus_step
 # Initialize structured logger once - other modules should use logging.getLogger(__name__)
 get_python_logger()
 
-# Import configuration
-from .config import PROMETHEUS_URL, THANOS_TOKEN, VERIFY_SSL as verify
+from .http_client import get_prometheus_client
+from .query_planner import query_range_sharded
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +28,7 @@ def query_thanos_with_promql(promql_queries: List[str], start_ts: int, end_ts: i
     logger.info("Querying Thanos with %d queries", len(promql_queries))
     logger.info("Time range: %s to %s", datetime.fromtimestamp(start_ts), datetime.fromtimestamp(end_ts))
     
-    headers = {"Authorization": f"Bearer {THANOS_TOKEN}"} if THANOS_TOKEN else {}
-    
+    client = get_prometheus_client()
     results = {}
     
     for i, promql in enumerate(promql_queries):
@@ -42,21 +41,7 @@ def query_thanos_with_promql(promql_queries: List[str], start_ts: int, end_ts: i
             # Query Thanos
             step = choose_prometheus_step(start_ts, end_ts)
             logger.debug("Query Prometheus: %s, start_ts: %s, end_ts: %s, step: %s", promql, start_ts, end_ts, step)
-            response = requests.get(
-                f"{PROMETHEUS_URL}/api/v1/query_range",
-                headers=headers,
-                params={
-                    "query": promql,
-                    "start": start_ts,
-                    "end": end_ts,
-                    "step": step
-                },
-                verify=verify,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
+            data = query_range_sharded(client, promql, start_ts, end_ts, step)
             
             if data.get("status") == "success":
                 result_data = data.get("data", {})
@@ -0,0 +1,341 @@
+"""
+Columnar conversion of Prometheus matrix results.
+
+Prometheus returns a matrix as a list of series, each with a label set and a
+list of [timestamp, "value"] pairs. Building one Python dict per sample (with
+a copy of the label set) is the dominant cost for long windows, so this
+module converts each series into numpy arrays and stores label columns once
+per series as categoricals.
+
+SeriesSet is the compact in-pipeline representation (shared timestamp axis,
+value matrix, interned labels); DataFrames and dict lists are produced from
+it only at the edges that need them. MetricStats holds just the summary
+statistics of a metric when they were computed server-side.
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _local_datetimes(timestamps: np.ndarray) -> pd.DatetimeIndex:
+    """Convert epoch seconds to naive local datetimes like datetime.fromtimestamp.
+
+    Uses one UTC offset when the whole range shares it (the common case) and
+    falls back to per-unique-timestamp offsets across DST transitions.
+    """
+    utc = pd.to_datetime(timestamps, unit="s")
+    if timestamps.size == 0:
+        return pd.DatetimeIndex(utc)
+
+    def _offset_seconds(ts: float) -> int:
+        return int(time.localtime(ts).tm_gmtoff)
+
+    first = _offset_seconds(float(timestamps.min()))
+    last = _offset_seconds(float(timestamps.max()))
+    if first == last:
+        return pd.DatetimeIndex(utc + pd.Timedelta(seconds=first))
+
+    unique_ts, inverse = np.unique(timestamps, return_inverse=True)
+    offsets = np.array([_offset_seconds(float(t)) for t in unique_ts], dtype="int64")
+    return pd.DatetimeIndex(utc + pd.to_timedelta(offsets[inverse], unit="s"))
+
+
+def _parse_matrix(
+    result: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, str]], List[np.ndarray], List[np.ndarray]]:
+    """Split a matrix into per-series label sets, timestamp and value arrays.
+
+    Series without samples are skipped; NaN values become 0.0 (JSON-safe).
+    """
+    label_sets: List[Dict[str, str]] = []
+    ts_parts: List[np.ndarray] = []
+    value_parts: List[np.ndarray] = []
+    for series in result or []:
+        values = series.get("values") or []
+        if not values:
+            continue
+        pairs = np.asarray(values, dtype=object)
+        series_values = pairs[:, 1].astype(np.float64)
+        series_values[np.isnan(series_values)] = 0.0  # NaN can't be JSON serialized
+        ts_parts.append(pairs[:, 0].astype(np.float64))
+        value_parts.append(series_values)
+        label_sets.append(series.get("metric") or {})
+    return label_sets, ts_parts, value_parts
+
+
+def _long_frame(
+    label_sets: Sequence[Mapping[str, str]],
+    counts: np.ndarray,
+    timestamps: np.ndarray,
+    values: np.ndarray,
+) -> pd.DataFrame:
+    """Assemble the long-format frame: label columns, "timestamp", "value".
+
+    Column order matches building one dict per sample: the first series'
+    labels, then timestamp/value, then labels first seen in later series.
+    """
+    columns: Dict[str, None] = {}
+    for labels in label_sets:
+        for name in labels:
+            columns.setdefault(name, None)
+        columns.setdefault("timestamp", None)
+        columns.setdefault("value", None)
+
+    data: Dict[str, Any] = {}
+    for name in columns:
+        if name == "timestamp":
+            data[name] = _local_datetimes(timestamps)
+        elif name == "value":
+            data[name] = values
+        else:
+            categories: Dict[str, int] = {}
+            codes = np.empty(len(label_sets), dtype=np.int32)
+            for i, labels in enumerate(label_sets):
+                if name in labels:
+                    codes[i] = categories.setdefault(labels[name], len(categories))
+                else:
+                    codes[i] = -1
+            data[name] = pd.Categorical.from_codes(np.repeat(codes, counts), categories=list(categories))
+    return pd.DataFrame(data)
+
+
+def matrix_to_dataframe(result: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build a long-format DataFrame from a Prometheus matrix result.
+
+    Produces the same columns and rows as building one dict per sample:
+    label columns (categorical), "timestamp" (naive local datetime) and
+    "value" (float, NaN replaced by 0.0 for JSON compatibility).
+
+    Args:
+        result: ``data.result`` of a query_range response
+
+    Returns:
+        DataFrame with one row per sample, or an empty DataFrame
+    """
+    label_sets, ts_parts, value_parts = _parse_matrix(result)
+    if not label_sets:
+        return pd.DataFrame()
+    counts = np.asarray([len(part) for part in ts_parts])
+    return _long_frame(label_sets, counts, np.concatenate(ts_parts), np.concatenate(value_parts))
+
+
+_LABEL_TUPLES: Dict[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]] = {}
+_LABEL_TUPLES_MAX = 100_000
+
+
+def _intern_labels(metric: Mapping[str, str]) -> Tuple[Tuple[str, str], ...]:
+    """Return a shared, string-interned label tuple for a label set."""
+    key = tuple((sys.intern(str(k)), sys.intern(str(v))) for k, v in metric.items())
+    cached = _LABEL_TUPLES.get(key)
+    if cached is None:
+        if len(_LABEL_TUPLES) >= _LABEL_TUPLES_MAX:
+            _LABEL_TUPLES.clear()
+        _LABEL_TUPLES[key] = key
+        cached = key
+    return cached
+
+
+class SeriesSet:
+    """Compact array-backed set of time series for one metric query.
+
+    Holds a shared int64 timestamp axis (epoch milliseconds), a float64 value
+    matrix of shape (series, timestamps) with NaN marking absent samples, and
+    one interned label tuple per series. Samples are ordered series-major,
+    matching the row order of the long-format DataFrame.
+    """
+
+    __slots__ = ("timestamps", "values", "labels")
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        labels: Sequence[Tuple[Tuple[str, str], ...]],
+    ):
+        self.timestamps = timestamps
+        self.values = values
+        self.labels = tuple(labels)
+
+    @classmethod
+    def empty_set(cls) -> "SeriesSet":
+        """Return a SeriesSet without series."""
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float64), ())
+
+    @classmethod
+    def from_matrix(cls, result: List[Dict[str, Any]]) -> "SeriesSet":
+        """Build a SeriesSet from the ``data.result`` of a query_range response."""
+        return cls.from_arrays(*_parse_matrix(result))
+
+    @classmethod
+    def from_arrays(
+        cls,
+        label_sets: Sequence[Mapping[str, str]],
+        ts_parts: Sequence[np.ndarray],
+        value_parts: Sequence[np.ndarray],
+    ) -> "SeriesSet":
+        """Build a SeriesSet from per-series label sets and epoch-second/value arrays."""
+        if not label_sets:
+            return cls.empty_set()
+        ms_parts = [np.rint(part * 1000).astype(np.int64) for part in ts_parts]
+        timestamps = np.unique(np.concatenate(ms_parts))
+        values = np.full((len(label_sets), timestamps.size), np.nan, dtype=np.float64)
+        for row, (ms, vals) in enumerate(zip(ms_parts, value_parts)):
+            values[row, np.searchsorted(timestamps, ms)] = vals
+        return cls(timestamps, values, [_intern_labels(labels) for labels in label_sets])
+
+    @classmethod
+    def concat(cls, parts: Sequence["SeriesSet"]) -> "SeriesSet":
+        """Stitch SeriesSets covering consecutive time ranges into one.
+
+        Series are matched by label set (first-seen order) and the timestamp
+        axes are unioned; where parts overlap, later parts win.
+        """
+        parts = [part for part in parts if part.labels]
+        if not parts:
+            return cls.empty_set()
+        if len(parts) == 1:
+            return parts[0]
+        timestamps = np.unique(np.concatenate([part.timestamps for part in parts]))
+        rows: Dict[Tuple[Tuple[str, str], ...], int] = {}
+        for part in parts:
+            for labels in part.labels:
+                rows.setdefault(labels, len(rows))
+        values = np.full((len(rows), timestamps.size), np.nan, dtype=np.float64)
+        for part in parts:
+            cols = np.searchsorted(timestamps, part.timestamps)
+            for labels, row in zip(part.labels, part.values):
+                present = ~np.isnan(row)
+                values[rows[labels], cols[present]] = row[present]
+        return cls(timestamps, values, list(rows))
+
+    @property
+    def empty(self) -> bool:
+        return self.sample_count == 0
+
+    @property
+    def sample_count(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def __len__(self) -> int:
+        return self.sample_count
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and label tuples."""
+        label_bytes = sum(64 + 16 * len(labels) for labels in self.labels)
+        return int(self.timestamps.nbytes + self.values.nbytes + label_bytes)
+
+    def label_dicts(self) -> List[Dict[str, str]]:
+        """Return the label set of each series as a dict."""
+        return [dict(labels) for labels in self.labels]
+
+    def latest(self) -> Optional[float]:
+        """Return the last sample of the last series (last long-format row)."""
+        for row in range(self.values.shape[0] - 1, -1, -1):
+            present = np.flatnonzero(~np.isnan(self.values[row]))
+            if present.size:
+                return float(self.values[row, present[-1]])
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return count/avg/min/max/latest over all samples of all series."""
+        count = self.sample_count
+        if not count:
+            return {"count": 0, "avg": None, "min": None, "max": None, "latest": None}
+        return {
+            "count": count,
+            "avg": float(np.nanmean(self.values)),
+            "min": float(np.nanmin(self.values)),
+            "max": float(np.nanmax(self.values)),
+            "latest": self.latest(),
+        }
+
+    def _present(self) -> Tuple[np.ndarray, np.ndarray]:
+        present = ~np.isnan(self.values)
+        _rows, cols = np.nonzero(present)
+        return present, cols
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Materialize the long-format DataFrame (one row per sample)."""
+        if self.empty:
+            return pd.DataFrame()
+        present, cols = self._present()
+        keep = present.any(axis=1)
+        counts = present.sum(axis=1)[keep]
+        label_sets = [dict(labels) for labels, k in zip(self.labels, keep) if k]
+        return _long_frame(label_sets, counts, self.timestamps[cols] / 1000.0, self.values[present])
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Return [{"timestamp": datetime, "value": float}] in long-format order."""
+        if self.empty:
+            return []
+        present, cols = self._present()
+        stamps = _local_datetimes(self.timestamps / 1000.0).to_pydatetime()
+        return [
+            {"timestamp": stamps[col], "value": float(value)}
+            for col, value in zip(cols.tolist(), self.values[present].tolist())
+        ]
+
+    def to_points(self) -> List[Dict[str, Any]]:
+        """Return [{"timestamp": iso_str, "value": float}] for UI consumption."""
+        return [
+            {"timestamp": record["timestamp"].isoformat(), "value": record["value"]}
+            for record in self.to_records()
+        ]
+
+
+@dataclass(frozen=True)
+class MetricStats:
+    """Summary statistics of one metric over a window, without its samples.
+
+    ``count``/``avg``/``min``/``max``/``latest`` match SeriesSet.stats()
+    (``min``/``max`` stay None when they were not fetched); ``p90`` is the
+    highest per-series 90th percentile, ``stddev`` the pooled
+    standard deviation and ``slope`` the count-weighted mean per-second
+    linear-regression slope of the series.
+    """
+
+    count: int = 0
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    latest: Optional[float] = None
+    p90: Optional[float] = None
+    stddev: Optional[float] = None
+    slope: Optional[float] = None
+    series_count: int = 0
+
+    @property
+    def empty(self) -> bool:
+        return self.count == 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return count/avg/min/max/latest like SeriesSet.stats()."""
+        return {"count": self.count, "avg": self.avg, "min": self.min, "max": self.max, "latest": self.latest}
+
+
+def summarize_metric(data: Any) -> Optional[Dict[str, Any]]:
+    """Summarize a metric held as a SeriesSet, MetricStats or long-format DataFrame.
+
+    Returns None when there is no data, otherwise a dict with count and
+    avg/min/max/latest (stats are None when a DataFrame has no "value").
+    """
+    if data is None or data.empty:
+        return None
+    if isinstance(data, (SeriesSet, MetricStats)):
+        return data.stats()
+    if "value" not in data.columns:
+        return {"count": len(data), "avg": None, "min": None, "max": None, "latest": None}
+    values = data["value"]
+    return {
+        "count": len(data),
+        "avg": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "latest": float(values.iloc[-1]),
+    }
@@ -21,7 +21,8 @@ from core.metrics import (
     get_models_helper,
     get_vllm_namespaces_helper,
     get_vllm_metrics,
-    fetch_metrics,
+    fetch_metric_series,
+    fetch_vllm_metric_series,
     get_summarization_models,
     get_cluster_gpu_info,
     get_namespace_model_deployment_info,
@@ -257,7 +258,7 @@ def analyze_vllm(
 ) -> List[Dict[str, Any]]:
     """Analyze vLLM metrics and summarize using LLM. Using the same core functions:
     - get_vllm_metrics() to discover metrics
-    - fetch_metrics() to fetch time series
+    - fetch_metric_series() to fetch time series
     - build_prompt() to build the analysis prompt
     - summarize_with_llm() to generate the summary
 
@@ -308,10 +309,11 @@ def analyze_vllm(
     # Collect metrics and perform analysis
     try:
         vllm_metrics = get_vllm_metrics()
-        metric_dfs: Dict[str, Any] = {
-            label: fetch_metrics(query, model_name, resolved_start, resolved_end)
-                for label, query in vllm_metrics.items()
-        }
+        # fetch_metric_series returns an empty SeriesSet on Prometheus errors, so
+        # one failing metric does not abort the parallel fan-out
+        metric_dfs: Dict[str, Any] = fetch_vllm_metric_series(
+            vllm_metrics, model_name, resolved_start, resolved_end, fetch=fetch_metric_series
+        )
 
         # --- Phase 1: Optional Korrel8r enrichment (logs only) ---
         korrel8r_section: Dict[str, Any] = {}
@@ -337,37 +339,20 @@ def analyze_vllm(
 
         # Create a compact metrics preview (latest values)
         preview_lines: List[str] = []
-        for label, df in metric_dfs.items():
+        for label, series in metric_dfs.items():
             try:
-                if df is not None and not df.empty and "value" in df.columns:
-                    latest_value = df["value"].iloc[-1]
-                    preview_lines.append(f"- {label}: {latest_value}")
+                if series is not None and not series.empty:
+                    preview_lines.append(f"- {label}: {series.latest()}")
                 else:
                     preview_lines.append(f"- {label}: no data")
             except Exception:
                 preview_lines.append(f"- {label}: error reading data")
 
-        # Convert DataFrame metrics to list format for UI consumption
-        metrics_for_ui = {}
-        for label, df in metric_dfs.items():
-            if df is not None and not df.empty and "timestamp" in df.columns and "value" in df.columns:
-                # Convert DataFrame to list of {timestamp, value} objects
-                data_points = []
-                for _, row in df.iterrows():
-                    try:
-                        # Convert timestamp to ISO format string
-                        timestamp_str = row["timestamp"].isoformat() if hasattr(row["timestamp"], "isoformat") else str(row["timestamp"])
-                        value = float(row["value"]) if pd.notna(row["value"]) else None
-                        if value is not None:
-                            data_points.append({
-                                "timestamp": timestamp_str,
-                                "value": value
-                            })
-                    except (ValueError, TypeError):
-                        continue
-                metrics_for_ui[label] = data_points
-            else:
-                metrics_for_ui[label] = []
+        # Convert series to list of {timestamp, value} objects for UI consumption
+        metrics_for_ui = {
+            label: series.to_points() if series is not None else []
+            for label, series in metric_dfs.items()
+        }
 
         # Create structured response with both summary and metrics data
         structured_response = {
@@ -113,10 +113,19 @@ def execute_promql(
         status = result.get("status", "unknown")
         results = result.get("results", [])
         result_type = result.get("result_type", "unknown")
+        plan = result.get("plan") or {}
+        
+        if status == "refused":
+            content = f"Query '{query}' was not executed: {'; '.join(plan.get('decisions', []))}\n"
+            if plan.get("suggestion"):
+                content += f"Suggestion: {plan['suggestion']}\n"
+            return make_mcp_text_response(content)
         
         if status == "success" and results:
             # Create human-readable summary like working tools
-            content = f"**PromQL Query Executed:** `{query}`\n\n"
+            content = f"**PromQL Query Executed:** `{plan.get('query', query)}`\n\n"
+            if plan.get("action") == "topk":
+                content += f"**Query Guard:** {'; '.join(plan.get('decisions', []))}\n"
             content += f"**Status:** {status}\n"
             content += f"**Result Type:** {result_type}\n"
             content += f"**Data Points:** {len(results)}\n\n"
@@ -1,8 +1,12 @@
 """Pytest configuration for the observability summarizer tests."""
 
+import importlib
 import sys
-import os
+from contextlib import ExitStack
 from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
 
 # Add the src directory to the Python path
 project_root = Path(__file__).parent.parent
@@ -11,3 +15,48 @@ sys.path.insert(0, str(src_path))
 
 # Also add the project root to the path for absolute imports
 sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture(autouse=True)
+def cardinality_probe():
+    """Answer the query guard's count() probe with one series.
+
+    The guard stays enabled, so chat and MCP tests run the default
+    probe-then-query path without reaching Prometheus.
+    """
+    client = MagicMock()
+    client.query_instant.return_value = {"data": {"result": [{"metric": {}, "value": [0, "1"]}]}}
+    with ExitStack() as stack:
+        for prefix in ("core", "src.core"):
+            module = importlib.import_module(f"{prefix}.query_guard")
+            stack.enter_context(patch.object(module, "get_prometheus_client", return_value=client))
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def _reset_prometheus_caches():
+    """Isolate tests from process-wide Prometheus caches."""
+    yield
+    for prefix in ("core", "src.core"):
+        query_cache = sys.modules.get(f"{prefix}.query_cache")
+        if query_cache is not None:
+            query_cache.get_query_cache().clear()
+        series_store = sys.modules.get(f"{prefix}.series_store")
+        if series_store is not None:
+            series_store.get_series_store().clear()
+        discovery_index = sys.modules.get(f"{prefix}.discovery_index")
+        if discovery_index is not None:
+            discovery_index.get_discovery_index().clear()
+        metric_catalog = sys.modules.get(f"{prefix}.metric_catalog")
+        if metric_catalog is not None:
+            metric_catalog.get_metric_names_holder().clear()
+            metric_catalog.get_metric_metadata_holder().clear()
+        promql_service = sys.modules.get(f"{prefix}.promql_service")
+        if promql_service is not None:
+            promql_service.get_categorization_cache().clear()
+        promql_eval = sys.modules.get(f"{prefix}.promql_eval")
+        if promql_eval is not None:
+            promql_eval.get_raw_series_store().clear()
+        http_client = sys.modules.get(f"{prefix}.http_client")
+        if http_client is not None and http_client._prometheus_client is not None:
+            http_client._prometheus_client.resilience.reset()
@@ -0,0 +1,203 @@
+"""
+Local remote-read test double serving synthetic series.
+
+SyntheticRemoteRead answers ``POST /api/v1/read`` from in-memory series,
+encoding either a snappy ReadResponse (SAMPLES) or streamed XOR chunks, so
+the remote-read client can be exercised without a Prometheus server. It is
+mounted on a requests.Session as a transport adapter.
+"""
+
+import io
+import re
+import struct
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+from src.core.remote_read import (
+    CHUNK_XOR,
+    MATCH_EQ,
+    MATCH_NEQ,
+    MATCH_RE,
+    RESPONSE_STREAMED_XOR_CHUNKS,
+    STREAMED_CONTENT_TYPE,
+    Labels,
+    Matcher,
+    crc32c,
+    decode_read_request,
+    encode_uvarint,
+    pb_bytes,
+    pb_double,
+    pb_string,
+    pb_varint,
+    snappy_compress,
+    snappy_decompress,
+)
+
+SAMPLES_PER_CHUNK = 120  # Prometheus' default head chunk size
+
+class _BitWriter:
+    def __init__(self) -> None:
+        self.value = 0
+        self.bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        self.value = (self.value << bits) | (value & ((1 << bits) - 1))
+        self.bits += bits
+
+    def write_uvarint(self, value: int) -> None:
+        for byte in encode_uvarint(value):
+            self.write(byte, 8)
+
+    def to_bytes(self) -> bytes:
+        pad = -self.bits % 8
+        return (self.value << pad).to_bytes((self.bits + pad) // 8, "big")
+
+
+_DOD_BUCKETS = ((0b10, 2, 14), (0b110, 3, 17), (0b1110, 4, 20))
+
+
+def encode_xor_chunk(ts_ms: Sequence[int], values: Sequence[float]) -> bytes:
+    """Encode samples as a Prometheus XOR chunk (inverse of decode_xor_chunk)."""
+    writer = _BitWriter()
+    raw_values = np.asarray(values, dtype=np.float64).view(np.uint64)
+    prev_t = prev_delta = 0
+    prev_v = 0
+    for i, (t, v) in enumerate(zip(ts_ms, raw_values)):
+        t, v = int(t), int(v)
+        if i == 0:
+            writer.write_uvarint((t << 1) ^ (t >> 63))  # zigzag
+            writer.write(v, 64)
+        else:
+            delta = t - prev_t
+            if i == 1:
+                writer.write_uvarint(delta)
+            else:
+                dod = delta - prev_delta
+                if dod == 0:
+                    writer.write(0, 1)
+                else:
+                    for prefix, length, size in _DOD_BUCKETS:
+                        if -((1 << (size - 1)) - 1) <= dod <= 1 << (size - 1):
+                            writer.write(prefix, length)
+                            writer.write(dod, size)
+                            break
+                    else:
+                        writer.write(0b1111, 4)
+                        writer.write(dod, 64)
+            prev_delta = delta
+            xor = v ^ prev_v
+            if xor == 0:
+                writer.write(0, 1)
+            else:
+                leading = min(64 - xor.bit_length(), 31)
+                trailing = (xor & -xor).bit_length() - 1
+                significant = 64 - leading - trailing
+                writer.write(0b11, 2)
+                writer.write(leading, 5)
+                writer.write(significant, 6)  # 64 wraps to 0
+                writer.write(xor >> trailing, significant)
+        prev_t, prev_v = t, v
+    return len(ts_ms).to_bytes(2, "big") + writer.to_bytes()
+
+
+def _matches(labels: Dict[str, str], matchers: List[Matcher]) -> bool:
+    for match_type, name, value in matchers:
+        actual = labels.get(name, "")
+        if match_type in (MATCH_EQ, MATCH_NEQ):
+            hit = actual == value
+        else:
+            hit = re.fullmatch(value, actual) is not None
+        if hit != (match_type in (MATCH_EQ, MATCH_RE)):
+            return False
+    return True
+
+
+def _encode_labels(labels: Labels) -> bytes:
+    return b"".join(pb_bytes(1, pb_string(1, name) + pb_string(2, value)) for name, value in labels)
+
+
+def synthetic_series(
+    name: str, label_sets: List[Dict[str, str]], start_ms: int, end_ms: int, interval_ms: int = 15000, seed: int = 0
+) -> List[Tuple[Dict[str, str], np.ndarray, np.ndarray]]:
+    """Generate scrape-like series (a noisy sine per label set) for the double."""
+    rng = np.random.default_rng(seed)
+    ts = np.arange(start_ms, end_ms + 1, interval_ms, dtype=np.int64)
+    series = []
+    for i, labels in enumerate(label_sets):
+        values = 10 + i + np.sin(ts / 3.6e6) + rng.normal(0, 0.1, ts.size).round(3)
+        series.append(({"__name__": name, **labels}, ts, values))
+    return series
+
+
+class SyntheticRemoteRead:
+    """Serves remote-read requests from in-memory (labels, timestamps_ms, values) series."""
+
+    def __init__(self, series: List[Tuple[Dict[str, str], np.ndarray, np.ndarray]], streamed: bool = True):
+        self.series = [
+            (tuple(sorted(labels.items())), np.asarray(ts, dtype=np.int64), np.asarray(values, dtype=np.float64))
+            for labels, ts, values in series
+        ]
+        self.streamed = streamed
+        self.requests: List[Tuple[List[Tuple[int, int, List[Matcher]]], List[int]]] = []
+
+    def _select(self, start_ms: int, end_ms: int, matchers: List[Matcher]):
+        for labels, ts, values in self.series:
+            if not _matches(dict(labels), matchers):
+                continue
+            keep = (ts >= start_ms) & (ts <= end_ms)
+            if keep.any():
+                yield labels, ts[keep], values[keep]
+
+    def handle(self, body: bytes) -> Tuple[str, bytes]:
+        """Return (content type, payload) for a snappy-compressed ReadRequest."""
+        queries, response_types = decode_read_request(snappy_decompress(body))
+        self.requests.append((queries, response_types))
+        if self.streamed and RESPONSE_STREAMED_XOR_CHUNKS in response_types:
+            frames = bytearray()
+            for index, (start_ms, end_ms, matchers) in enumerate(queries):
+                for labels, ts, values in self._select(start_ms, end_ms, matchers):
+                    chunks = b""
+                    for i in range(0, ts.size, SAMPLES_PER_CHUNK):
+                        part_ts, part_values = ts[i:i + SAMPLES_PER_CHUNK], values[i:i + SAMPLES_PER_CHUNK]
+                        chunks += pb_bytes(2, pb_varint(1, int(part_ts[0])) + pb_varint(2, int(part_ts[-1]))
+                                           + pb_varint(3, CHUNK_XOR)
+                                           + pb_bytes(4, encode_xor_chunk(part_ts, part_values)))
+                    message = pb_bytes(1, _encode_labels(labels) + chunks) + pb_varint(2, index)
+                    frames += encode_uvarint(len(message)) + struct.pack(">I", crc32c(message)) + message
+            return STREAMED_CONTENT_TYPE, bytes(frames)
+
+        results = b""
+        for start_ms, end_ms, matchers in queries:
+            result = b""
+            for labels, ts, values in self._select(start_ms, end_ms, matchers):
+                samples = b"".join(pb_bytes(2, pb_double(1, float(v)) + pb_varint(2, int(t))) for t, v in zip(ts, values))
+                result += pb_bytes(1, _encode_labels(labels) + samples)
+            results += pb_bytes(1, result)
+        return "application/x-protobuf", snappy_compress(results)
+
+
+class SyntheticRemoteReadAdapter(BaseAdapter):
+    """requests transport adapter answering every request from a SyntheticRemoteRead."""
+
+    def __init__(self, backend: SyntheticRemoteRead):
+        super().__init__()
+        self.backend = backend
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        content_type, payload = self.backend.handle(request.body)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = content_type
+        if content_type == "application/x-protobuf":
+            response.headers["Content-Encoding"] = "snappy"
+        response.raw = io.BytesIO(payload)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
@@ -20,7 +20,7 @@ from src.core.alerts import (
 class TestAlertFetching:
     """Test alert fetching functionality"""
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_success(self, mock_get):
         """Should fetch alerts successfully from Prometheus"""
         # Mock successful response
@@ -59,7 +59,7 @@ class TestAlertFetching:
         assert alert["alertstate"] == "firing"
         assert alert["is_firing"] == 1
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_empty_response(self, mock_get):
         """Should handle empty alert response"""
         # Mock empty response
@@ -77,7 +77,7 @@ class TestAlertFetching:
         # Should return empty list
         assert alerts == []
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_http_error(self, mock_get):
         """Should handle HTTP errors gracefully"""
         # Mock HTTP error
@@ -90,7 +90,7 @@ class TestAlertFetching:
         promql_query, alerts = fetch_alerts_from_prometheus(1640995200, 1640995260)
         assert alerts == []
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_connection_error(self, mock_get):
         """Should handle connection errors gracefully"""
         # Mock connection error
@@ -100,7 +100,7 @@ class TestAlertFetching:
         promql_query, alerts = fetch_alerts_from_prometheus(1640995200, 1640995260)
         assert alerts == []
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_with_namespace(self, mock_get):
         """Should apply namespace filter to alert query"""
         # Mock successful response
@@ -120,7 +120,7 @@ class TestAlertFetching:
         call_args = mock_get.call_args
         assert "namespace=\"test-ns\"" in call_args[1]["params"]["query"]
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_alerts_without_namespace(self, mock_get):
         """Should use global alerts query when no namespace specified"""
         # Mock successful response
@@ -144,7 +144,7 @@ class TestAlertFetching:
 class TestRuleDefinitions:
     """Test rule definition fetching"""
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_all_rule_definitions_success(self, mock_get):
         """Should fetch rule definitions successfully"""
         # Mock successful response
@@ -184,7 +184,7 @@ class TestRuleDefinitions:
         assert rule["expression"] == "cpu_usage > 80"
         assert rule["labels"]["severity"] == "warning"
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_all_rule_definitions_empty(self, mock_get):
         """Should handle empty rule definitions"""
         # Mock empty response
@@ -202,7 +202,7 @@ class TestRuleDefinitions:
         # Should return empty dict
         assert rules == {}
     
-    @patch('src.core.alerts.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_fetch_all_rule_definitions_error(self, mock_get):
         """Should handle errors gracefully"""
         # Mock error response
@@ -0,0 +1,76 @@
+"""
+Tests for batch trend and anomaly analysis.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import linregress
+
+from src.core.analysis import analyze_metrics, describe_trend, series_statistics
+from src.core.llm_client import build_openshift_metrics_context, build_openshift_prompt
+from src.core.timeseries import MetricStats, SeriesSet
+
+
+def _series(*rows, step=60.0):
+    return SeriesSet.from_arrays(
+        [{"pod": f"p{i}"} for i in range(len(rows))],
+        [np.arange(len(row)) * step for row in rows],
+        [np.asarray(row, dtype=float) for row in rows],
+    )
+
+
+def test_series_statistics_match_reference():
+    """Should match linregress, quantiles and z-scores per row despite NaN gaps"""
+    rng = np.random.default_rng(7)
+    matrix = rng.normal(5, 1, (3, 50)) + np.arange(50) * [[0.02], [0.0], [-0.05]]
+    matrix[1, 40:] = np.nan
+    seconds = np.arange(50) * 60.0
+
+    stats = series_statistics(seconds, matrix)
+
+    for row in range(3):
+        present = ~np.isnan(matrix[row])
+        values = matrix[row, present]
+        assert stats["slope"][row] == pytest.approx(linregress(seconds[present], values).slope)
+        assert stats["p90"][row] == pytest.approx(np.quantile(values, 0.9))
+        assert stats["zscore"][row] == pytest.approx((values[-1] - values.mean()) / values.std())
+
+
+def test_batch_insights_for_sets_frames_and_stats():
+    """Should flag trends and anomalies for every input kind in one call"""
+    rising = _series(np.arange(30) * 6.0)
+    spiky = _series([1.0] * 29 + [9.0], [1.0] * 30, [1.0] * 30)
+    start = datetime(2024, 1, 1)
+    frame = pd.DataFrame({
+        "timestamp": [start + timedelta(minutes=i) for i in range(10)],
+        "value": [5.0] * 9 + [1.0],
+    })
+
+    insights = analyze_metrics({
+        "Rising": rising,
+        "Spiky": spiky,
+        "Frame": frame,
+        "Stats": MetricStats(count=10, avg=5.0, latest=1.0, p90=8.0, stddev=2.0, slope=-0.5),
+        "Empty": SeriesSet.empty_set(),
+    })
+
+    assert insights["Rising"].trend == "increasing" == describe_trend(rising.to_dataframe())
+    assert insights["Spiky"].anomaly == "⚠️ spike in 1 of 3 series (latest >90th pct)"
+    assert insights["Frame"].trend == "stable" and insights["Frame"].anomaly.startswith("⚠️ unusually low")
+    assert insights["Stats"].trend == "decreasing" and "unusually low" in insights["Stats"].anomaly
+    assert insights["Empty"].anomaly == "No data"
+
+
+def test_prompt_builders_use_batch_insights():
+    """Should print real trend and anomaly lines instead of placeholders"""
+    metrics = {"CPU": _series(np.arange(30) * 6.0), "Memory": MetricStats()}
+
+    prompt = build_openshift_prompt(metrics, "Fleet Overview")
+    context = build_openshift_metrics_context(metrics, "Fleet Overview")
+
+    for text in (prompt, context):
+        assert "- CPU: Avg=87.00, Latest=174.00, Trend=increasing, ⚠️ spike" in text
+        assert "- Memory: No data" in text
@@ -180,35 +180,46 @@ class TestQueryGeneration:
 class TestPrometheusIntegration:
     """Test Prometheus integration functions (with mocking)."""
     
+    @patch('core.chat_with_prometheus.get_metric_metadata_map')
+    @patch('core.chat_with_prometheus.get_metric_catalog')
     @patch('core.chat_with_prometheus.make_prometheus_request')
-    def test_search_metrics_by_pattern(self, mock_request):
+    def test_search_metrics_by_pattern(self, mock_request, mock_catalog, mock_metadata):
         """Test metric search functionality."""
         from core.chat_with_prometheus import search_metrics_by_pattern
+        from core.metric_catalog import MetricNameCatalog
         
         # Mock Prometheus response
-        mock_request.side_effect = [
-            {"data": ["metric1", "metric2", "gpu_temp"]},  # Metric names
-            {"data": {"metric1": [{"type": "gauge", "help": "Test metric"}]}},  # Metadata
-            {"data": {"metric2": [{"type": "counter", "help": "Another metric"}]}},
-            {"data": {"gpu_temp": [{"type": "gauge", "help": "GPU temperature"}]}},
-        ]
+        mock_catalog.return_value = MetricNameCatalog(["metric1", "metric2", "gpu_temp"])
+        mock_metadata.return_value = {
+            "metric1": [{"type": "gauge", "help": "Test metric"}],
+            "metric2": [{"type": "counter", "help": "Another metric"}],
+            "gpu_temp": [{"type": "gauge", "help": "GPU temperature"}],
+        }
         
         result = search_metrics_by_pattern("gpu", 5)
         
+        # Metadata comes from the bulk map, not per-metric requests
+        mock_request.assert_not_called()
+        assert result["metrics"][0] == {
+            "name": "gpu_temp", "type": "gauge", "help": "GPU temperature", "unit": ""
+        }
         assert isinstance(result, dict)
         assert "total_found" in result
         assert "metrics" in result
         assert result["pattern"] == "gpu"
         assert result["limit"] == 5
     
+    @patch('core.chat_with_prometheus.get_metric_metadata_map')
     @patch('core.chat_with_prometheus.make_prometheus_request')
-    def test_get_metric_metadata(self, mock_request):
+    def test_get_metric_metadata(self, mock_request, mock_metadata):
         """Test metric metadata retrieval."""
         from core.chat_with_prometheus import get_metric_metadata
         
         # Mock responses
+        mock_metadata.return_value = {
+            "test_metric": [{"type": "gauge", "help": "Test metric", "unit": "bytes"}]
+        }
         mock_request.side_effect = [
-            {"data": {"test_metric": [{"type": "gauge", "help": "Test metric", "unit": "bytes"}]}},
             {"data": ["instance", "job", "namespace"]},
             {"data": ["host1", "host2"]},  # instance values
             {"data": ["job1", "job2"]},    # job values
@@ -225,7 +236,7 @@ class TestPrometheusIntegration:
         assert "query_examples" in result
     
     @patch('core.chat_with_prometheus.make_prometheus_request')
-    def test_execute_promql_query_instant(self, mock_request):
+    def test_execute_promql_query_instant(self, mock_request, cardinality_probe):
         """Test instant PromQL query execution."""
         from core.chat_with_prometheus import execute_promql_query
         
@@ -247,8 +258,10 @@ class TestPrometheusIntegration:
         assert result["result_type"] == "vector"
         assert len(result["results"]) == 1
         
-        # Should use instant query endpoint
+        # Should use instant query endpoint after the cardinality probe
         mock_request.assert_called_with("/api/v1/query", {"query": "up"})
+        assert cardinality_probe.query_instant.call_args[0][0] == "count(up)"
+        assert result["plan"]["action"] == "execute"
     
     @patch('core.chat_with_prometheus.make_prometheus_request')
     def test_execute_promql_query_range(self, mock_request):
@@ -282,7 +295,8 @@ class TestErrorHandling:
         """Test handling of non-existent metrics."""
         from core.chat_with_prometheus import get_metric_metadata
         
-        with patch('core.chat_with_prometheus.make_prometheus_request') as mock_request:
+        with patch('core.chat_with_prometheus.make_prometheus_request') as mock_request, \
+                patch('core.chat_with_prometheus.get_metric_metadata_map', return_value={}):
             mock_request.return_value = {"data": {}}  # No metric found
             
             with pytest.raises(ValueError, match="not found"):
@@ -292,12 +306,25 @@ class TestErrorHandling:
         """Test handling when no metrics are found."""
         from core.chat_with_prometheus import find_best_metric_with_metadata
         
-        with patch('core.chat_with_prometheus.make_prometheus_request') as mock_request:
-            mock_request.return_value = {"data": []}  # No metrics available
+        from core.metric_catalog import MetricNameCatalog
+        
+        with patch('core.chat_with_prometheus.get_metric_catalog') as mock_catalog:
+            mock_catalog.return_value = MetricNameCatalog([])  # No metrics available
             
             with pytest.raises(ValueError, match="No relevant metrics found"):
                 find_best_metric_with_metadata("test question")
 
+    def test_range_request_without_step_uses_default(self):
+        """Test that range requests without a step use query_range's default instead of failing."""
+        from core.chat_with_prometheus import make_prometheus_request
+        
+        with patch('core.chat_with_prometheus.get_prometheus_client') as mock_client:
+            make_prometheus_request("/api/v1/query_range", {"query": "up", "start": 0, "end": 3600})
+            make_prometheus_request("/api/v1/query_range", {"query": "up"})
+        
+        mock_client.return_value.query_range.assert_called_once_with("up", 0, 3600, "15m")
+        mock_client.return_value.get_sync.assert_called_once_with("/api/v1/query_range", params={"query": "up"})
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
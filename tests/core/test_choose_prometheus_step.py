@@ -2,7 +2,7 @@ import re
 
 import pytest
 
-from core.metrics import choose_prometheus_step
+from core.metrics import choose_prometheus_step, choose_aligned_prometheus_window
 
 
 def parse_step_to_seconds(step: str) -> int:
@@ -81,3 +81,13 @@ def test_edge_cases_non_positive_duration(start: int, end: int) -> None:
     assert parse_step_to_seconds(step) >= 30
 
 
+def test_aligned_window_snaps_to_chosen_step() -> None:
+    start = 1_700_000_123
+    end = start + 6 * 24 * 3600 + 17
+    aligned_start, aligned_end, step = choose_aligned_prometheus_window(start, end)
+    step_seconds = parse_step_to_seconds(step)
+    assert step == choose_prometheus_step(start, end)
+    assert aligned_start % step_seconds == 0
+    assert aligned_end % step_seconds == 0
+    assert start - step_seconds < aligned_start <= start
+    assert end - step_seconds < aligned_end <= end
@@ -0,0 +1,71 @@
+"""
+Tests for the shared vLLM series discovery index.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.core.discovery_index import SeriesDiscoveryIndex, build_discovery_selector
+from src.core.metrics import get_models_helper, get_vllm_namespaces_helper
+
+
+SERIES = [
+    {"__name__": "vllm:num_requests_running", "namespace": "ns1", "model_name": "llama"},
+    {"__name__": "vllm:gpu_cache_usage_perc", "namespace": "ns1", "model_name": "llama"},
+    {"__name__": "vllm:num_requests_running", "namespace": "ns2", "model_name": "granite"},
+    {"__name__": "vllm:num_requests_running", "namespace": "ns3", "model_name": " "},
+]
+
+
+def _client(series=SERIES):
+    client = Mock()
+    client.series.return_value = {"status": "success", "data": series}
+    return client
+
+
+def test_selector_combines_metrics_and_requires_labels():
+    """Should match all discovery metrics in one selector"""
+    assert build_discovery_selector(["a", "b"]) == '{__name__=~"a|b",namespace!="",model_name!=""}'
+
+
+class TestSeriesDiscoveryIndex:
+    """Test loading, listing and refresh behavior"""
+
+    def test_one_series_request_serves_both_listings(self):
+        """Should derive models and namespaces from a single series scan"""
+        client = _client()
+        index = SeriesDiscoveryIndex(client_factory=lambda: client, background=False, refresh_interval=60)
+
+        assert index.models() == ["ns1 | llama", "ns2 | granite"]
+        assert index.namespaces() == ["ns1", "ns2"]
+        assert client.series.call_count == 1
+
+    def test_refresh_failure_keeps_previous_index(self):
+        """Should keep serving the last good pairs when a refresh fails"""
+        client = _client()
+        index = SeriesDiscoveryIndex(client_factory=lambda: client, background=False, refresh_interval=0)
+        index.refresh()
+        client.series.side_effect = RuntimeError("down")
+
+        assert index.namespaces() == ["ns1", "ns2"]
+
+    def test_initial_failure_raises(self):
+        """Should surface errors when nothing has been loaded yet"""
+        client = Mock()
+        client.series.side_effect = RuntimeError("down")
+        index = SeriesDiscoveryIndex(client_factory=lambda: client, background=False)
+
+        with pytest.raises(RuntimeError):
+            index.pairs()
+
+
+@patch("src.core.discovery_index.get_prometheus_client")
+def test_helpers_share_the_index(mock_get_client):
+    """Should answer both helpers from one upstream request"""
+    client = _client()
+    mock_get_client.return_value = client
+
+    assert get_models_helper() == ["ns1 | llama", "ns2 | granite"]
+    assert get_vllm_namespaces_helper() == ["ns1", "ns2"]
+    assert client.series.call_count == 1
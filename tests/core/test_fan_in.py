@@ -0,0 +1,88 @@
+"""
+Tests for group-by fan-in of per-entity queries.
+"""
+
+import numpy as np
+import pytest
+
+from src.core.fan_in import FanInUnsupported, fan_in_query, group_query, split_series
+from src.core.metrics import LATENCY_BUCKET_METRIC, P95_LATENCY_QUERY
+from src.core.timeseries import SeriesSet
+
+BY = ("namespace", "model_name")
+
+
+class TestGroupQuery:
+    """Test rewriting per-entity queries into one grouped query"""
+
+    def test_groups_every_aggregation_and_scopes_entities(self):
+        """Should keep entity labels through nested aggregations and scope selectors"""
+        query = fan_in_query(P95_LATENCY_QUERY, BY, [("a", "m1"), ("b", "m2")], metric_prefix="vllm:")
+
+        assert query == (
+            "histogram_quantile(0.95, sum by (le, namespace, model_name) "
+            f'(rate({LATENCY_BUCKET_METRIC}{{namespace=~"a|b", model_name=~"m1|m2"}}[5m])))'
+        )
+
+    def test_shared_side_matches_every_entity(self):
+        """Should match unlabelled (e.g. GPU) sides one-to-many"""
+        query = group_query("sum(rate(vllm:a[5m])) / avg(DCGM_FI_DEV_GPU_UTIL)", BY, metric_prefix="vllm:")
+
+        assert query == (
+            "sum by (namespace, model_name) (rate(vllm:a[5m])) / on() group_left avg(DCGM_FI_DEV_GPU_UTIL)"
+        )
+
+    def test_without_and_unsupported(self):
+        """Should drop entity labels from without() and refuse label-dropping functions"""
+        assert group_query("sum without (namespace, pod) (x)", BY) == "sum without (pod) (x)"
+        with pytest.raises(FanInUnsupported):
+            group_query("scalar(sum(x))", BY)
+
+
+def test_split_series_assigns_shared_series_to_every_entity():
+    """Should split by entity labels and share series without them"""
+    series = SeriesSet.from_arrays(
+        [{"namespace": "a", "model_name": "m1"}, {"namespace": "b", "model_name": "m2"}, {}],
+        [np.array([0.0, 60.0])] * 3,
+        [np.array([1.0, 2.0]), np.array([3.0, 4.0]), np.array([5.0, 6.0])],
+    )
+
+    parts = split_series(series, "sum(vllm:x)", BY, [("a", "m1"), ("b", "m2"), ("c", "m3")])
+
+    assert parts[("a", "m1")].label_dicts() == [{"model_name": "m1", "namespace": "a"}, {}]
+    assert parts[("b", "m2")].values[0].tolist() == [3.0, 4.0]
+    assert parts[("c", "m3")].label_dicts() == [{}]
+
+
+
+def test_split_series_reaggregates_entities_without_namespace():
+    """Should sum the per-namespace rows of a model selected without its namespace"""
+    query = "sum(rate(vllm:num_requests_total[5m]))"
+    entities = [(None, "llama"), ("a", "m1")]
+    series = SeriesSet.from_arrays(
+        [{"namespace": "a", "model_name": "llama"}, {"namespace": "b", "model_name": "llama"},
+         {"namespace": "a", "model_name": "m1"}],
+        [np.array([0.0, 60.0])] * 3,
+        [np.array([1.0, 1.0]), np.array([2.0, 2.0]), np.array([5.0, np.nan])],
+    )
+
+    assert fan_in_query(query, BY, entities) == (
+        'sum by (namespace, model_name) (rate(vllm:num_requests_total{model_name=~"llama|m1"}[5m]))'
+    )
+    parts = split_series(series, query, BY, entities)
+
+    assert parts[(None, "llama")].label_dicts() == [{"model_name": "llama"}]
+    assert parts[(None, "llama")].values.tolist() == [[3.0, 3.0]]
+    assert parts[("a", "m1")].values.tolist() == [[5.0]]
+
+
+def test_open_labels_need_a_recombinable_aggregation():
+    """Should refuse open-label entities when the grouped rows cannot be recombined"""
+    entities = [(None, "llama")]
+
+    with pytest.raises(FanInUnsupported):
+        fan_in_query("avg(vllm:num_requests_running)", BY, entities)
+    with pytest.raises(FanInUnsupported):
+        fan_in_query(P95_LATENCY_QUERY, BY, entities)
+    assert fan_in_query("max(vllm:num_requests_running)", BY, entities)
+    assert fan_in_query("vllm:num_requests_running", BY, entities)
@@ -0,0 +1,58 @@
+"""
+Tests for the bounded-concurrency fetch engine.
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from src.core.fetch_engine import fetch_concurrently
+
+
+class TestFetchConcurrently:
+    """Test parallel fan-out of per-metric fetches"""
+
+    def test_results_keep_key_order(self):
+        """Should return results in the order the calls were given"""
+        calls = {
+            "slow": lambda: (time.sleep(0.05), "a")[1],
+            "fast": lambda: "b",
+            "medium": lambda: (time.sleep(0.01), "c")[1],
+        }
+
+        result = fetch_concurrently(calls)
+
+        assert list(result.keys()) == ["slow", "fast", "medium"]
+        assert list(result.values()) == ["a", "b", "c"]
+
+    def test_runs_in_parallel_with_cap(self):
+        """Should overlap calls but never exceed max_workers in flight"""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def _call():
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return True
+
+        fetch_concurrently({f"m{i}": _call for i in range(10)}, max_workers=3)
+
+        assert 1 < state["peak"] <= 3
+
+    def test_request_exception_propagates(self):
+        """Should re-raise request errors so callers can surface them"""
+        def _boom():
+            raise requests.exceptions.ConnectionError("down")
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            fetch_concurrently({"ok": lambda: 1, "bad": _boom})
+
+    def test_empty_calls(self):
+        """Should return empty dict without spawning workers"""
+        assert fetch_concurrently({}) == {}
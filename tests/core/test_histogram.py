@@ -0,0 +1,135 @@
+"""
+Tests for client-side histogram quantiles.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.core.histogram import LatencyHistogram, bucket_quantiles
+from src.core.metrics import (
+    LATENCY_BUCKET_METRIC,
+    P95_LATENCY_QUERY,
+    fetch_vllm_metric_series,
+)
+from src.core.timeseries import SeriesSet
+
+BOUNDS = ["0.1", "0.5", "1", "2.5", "+Inf"]
+
+
+def _reference_quantile(q, bounds, counts):
+    """Scalar port of Prometheus' bucketQuantile."""
+    counts = list(np.maximum.accumulate(counts))
+    if counts[-1] == 0:
+        return math.nan
+    rank = q * counts[-1]
+    b = next((i for i in range(len(counts) - 1) if counts[i] >= rank), len(counts) - 1)
+    if b == len(counts) - 1:
+        return bounds[-2]
+    if b == 0 and bounds[0] <= 0:
+        return bounds[0]
+    start, count = 0.0, counts[b]
+    if b > 0:
+        start = bounds[b - 1]
+        count -= counts[b - 1]
+        rank -= counts[b - 1]
+    with np.errstate(invalid="ignore"):
+        return start + (bounds[b] - start) * (rank / count)
+
+
+def _bucket_series(rows):
+    """rows: {(pod, le): [rate per timestamp]} -> SeriesSet of bucket rates."""
+    labels = [{"model_name": "m", "pod": pod, "le": le} for pod, le in rows]
+    timestamps = [np.arange(len(values), dtype=np.float64) * 60 for values in rows.values()]
+    return SeriesSet.from_arrays(labels, timestamps, [np.asarray(v, dtype=np.float64) for v in rows.values()])
+
+
+class TestBucketQuantiles:
+    """Test the vectorized interpolation against Prometheus' rules"""
+
+    def test_matches_reference_implementation(self):
+        """Should agree with bucketQuantile for random cumulative counts"""
+        rng = np.random.default_rng(7)
+        bounds = np.array([0.05, 0.1, 0.5, 1, 2.5, 5, np.inf])
+        counts = np.cumsum(rng.integers(0, 20, size=(bounds.size, 50)), axis=0).astype(float)
+        quantiles = [0.0, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0]
+
+        result = bucket_quantiles(quantiles, bounds, counts)
+
+        for qi, q in enumerate(quantiles):
+            for col in range(counts.shape[1]):
+                expected = _reference_quantile(q, bounds, counts[:, col])
+                assert result[qi, col] == pytest.approx(expected, nan_ok=True)
+
+    def test_edge_cases(self):
+        """Should handle empty histograms, the +Inf bucket and out-of-range quantiles"""
+        bounds = np.array([1.0, 2.0, np.inf])
+        counts = np.array([[0.0, 0.0, 1.0], [0.0, 2.0, 1.0], [0.0, 2.0, 5.0]])
+
+        result = bucket_quantiles([0.5, 1.5, -1], bounds, counts)
+
+        assert math.isnan(result[0, 0])
+        assert result[0, 1] == pytest.approx(1.5)
+        assert result[0, 2] == 2.0  # rank falls into +Inf -> highest finite bound
+        assert np.isposinf(result[1]).all() and np.isneginf(result[2]).all()
+
+    def test_requires_inf_bucket(self):
+        """Should return NaN without a +Inf bucket"""
+        assert np.isnan(bucket_quantiles([0.5], np.array([1.0, 2.0]), np.ones((2, 3)))).all()
+
+
+class TestLatencyHistogram:
+    """Test grouping and quantile series"""
+
+    def test_per_pod_and_regrouped_quantiles(self):
+        """Should compute per-pod quantiles and the aggregate from the same data"""
+        rows = {}
+        for pod, scale in (("a", 1.0), ("b", 3.0)):
+            for i, le in enumerate(BOUNDS):
+                rows[(pod, le)] = [scale * (i + 1), scale * (i + 1)]
+        histogram = LatencyHistogram.from_series(_bucket_series(rows), by=("pod",))
+
+        per_pod = histogram.quantiles([0.5, 0.99])
+        total = histogram.regroup(()).quantile(0.5)
+
+        assert per_pod[0.5].label_dicts() == [{"pod": "a"}, {"pod": "b"}]
+        bounds = np.array([0.1, 0.5, 1, 2.5, np.inf])
+        expected = _reference_quantile(0.5, bounds, 4 * np.arange(1.0, 6.0))
+        assert total.label_dicts() == [{}]
+        np.testing.assert_allclose(total.values[0], [expected, expected])
+
+    def test_no_observations_yield_zero_and_missing_data_is_absent(self):
+        """Should mirror the decoded server-side result"""
+        rows = {("a", le): [0.0, np.nan] for le in BOUNDS}
+        series = LatencyHistogram.from_series(_bucket_series(rows)).quantile(0.95)
+
+        assert series.values[0, 0] == 0.0
+        assert np.isnan(series.values[0, 1])
+
+
+def test_vllm_metric_set_derives_latency_percentiles_from_one_fetch():
+    """Should replace the P95 query with one bucket fetch and several percentiles"""
+    rows = {("a", le): [float(i + 1)] for i, le in enumerate(BOUNDS)}
+    queries = []
+
+    def fake_fetch(query, model_name, start, end, namespace=None):
+        queries.append(query)
+        if LATENCY_BUCKET_METRIC in query:
+            return _bucket_series(rows)
+        return SeriesSet.from_arrays([{}], [np.array([0.0])], [np.array([1.0])])
+
+    result = fetch_vllm_metric_series(
+        {"Requests Running": "vllm:num_requests_running", "P95 Latency (s)": P95_LATENCY_QUERY},
+        "m", 0, 3600, fetch=fake_fetch,
+    )
+
+    assert list(result) == ["Requests Running", "P50 Latency (s)", "P95 Latency (s)", "P99 Latency (s)"]
+    assert sorted(queries) == sorted([
+        "vllm:num_requests_running",
+        f"sum(rate({LATENCY_BUCKET_METRIC}[5m])) by (le)",
+    ])
+    bounds = np.array([0.1, 0.5, 1, 2.5, np.inf])
+    assert result["P95 Latency (s)"].latest() == pytest.approx(
+        _reference_quantile(0.95, bounds, np.arange(1.0, 6.0))
+    )
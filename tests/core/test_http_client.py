@@ -0,0 +1,69 @@
+"""
+Tests for the pooled Prometheus/Thanos HTTP client.
+"""
+
+import pytest
+import requests
+from unittest.mock import patch, Mock
+
+from src.core.http_client import PrometheusClient, get_prometheus_client
+
+
+def _ok_response(payload):
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = payload
+    return response
+
+
+class TestPrometheusClient:
+    """Test the shared pooled Prometheus client"""
+
+    def test_session_is_pooled_and_requests_gzip(self):
+        """Should mount a pooled adapter and request compressed responses"""
+        client = PrometheusClient("http://prom:9090", pool_maxsize=7)
+
+        adapter = client.session.get_adapter("https://thanos")
+        assert adapter._pool_maxsize == 7
+        assert "gzip" in client.session.headers["Accept-Encoding"]
+
+    def test_auth_header_from_token(self):
+        """Should send bearer token when a real token is configured"""
+        client = PrometheusClient("http://prom:9090", token="abc")
+        assert client._get_prometheus_headers() == {"Authorization": "Bearer abc"}
+
+    def test_path_like_token_is_not_sent(self):
+        """Should skip tokens that look like an unresolved file path"""
+        client = PrometheusClient("http://prom:9090", token="/var/run/secrets/token")
+        assert client._get_prometheus_headers() == {}
+
+    @patch('src.core.http_client.requests.Session.get')
+    def test_query_range_reuses_session(self, mock_get):
+        """Should issue all queries through the same session"""
+        mock_get.return_value = _ok_response({"status": "success", "data": {"result": []}})
+        client = PrometheusClient("http://prom:9090/", token="abc", timeout=5)
+
+        client.query_range("up", 1, 2, "30s")
+        client.query_instant("up")
+
+        assert mock_get.call_count == 2
+        url = mock_get.call_args_list[0][0][0]
+        kwargs = mock_get.call_args_list[0][1]
+        assert url == "http://prom:9090/api/v1/query_range"
+        assert kwargs["params"] == {"query": "up", "start": 1, "end": 2, "step": "30s"}
+        assert kwargs["headers"]["Authorization"] == "Bearer abc"
+        assert kwargs["timeout"] == 5
+
+    @patch('src.core.http_client.requests.Session.get')
+    def test_http_error_is_raised(self, mock_get):
+        """Should surface HTTP errors as requests exceptions"""
+        response = Mock()
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError("500")
+        mock_get.return_value = response
+
+        with pytest.raises(requests.exceptions.RequestException):
+            PrometheusClient("http://prom:9090").label_values("__name__")
+
+    def test_get_prometheus_client_is_singleton(self):
+        """Should return the same process-wide instance"""
+        assert get_prometheus_client() is get_prometheus_client()
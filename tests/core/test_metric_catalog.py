@@ -0,0 +1,119 @@
+"""
+Tests for the process-wide metric-name catalog.
+"""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.core.metric_catalog import (
+    MetricNameCatalog,
+    StaleWhileRevalidate,
+    get_metric_catalog,
+    get_metric_metadata_map,
+    metric_family,
+)
+
+
+NAMES = ["vllm:num_requests_running", "kube_pod_info", "DCGM_FI_DEV_GPU_TEMP", "kube_node_info", "up", "upstream_x"]
+
+
+class TestMetricNameCatalog:
+    """Test membership and prefix indexes"""
+
+    def test_family_prefix(self):
+        """Should cut names after the first separator"""
+        assert metric_family("vllm:num_requests_running") == "vllm:"
+        assert metric_family("kube_pod_info") == "kube_"
+        assert metric_family("up") == "up"
+
+    def test_prefix_lookups(self):
+        """Should answer family and arbitrary prefixes in sorted order"""
+        catalog = MetricNameCatalog(NAMES)
+        assert catalog.with_prefix("kube_") == ("kube_node_info", "kube_pod_info")
+        assert catalog.with_prefix("kube_pod") == ("kube_pod_info",)
+        assert catalog.with_prefix("up") == ("up", "upstream_x")
+        assert catalog.with_prefix("habanalabs_") == ()
+
+    def test_membership_and_order(self):
+        """Should behave like a sorted, de-duplicated name set"""
+        catalog = MetricNameCatalog(NAMES + ["up"])
+        assert "up" in catalog
+        assert "missing" not in catalog
+        assert list(catalog) == sorted(set(NAMES))
+
+
+class TestStaleWhileRevalidate:
+    """Test lazy load and background revalidation"""
+
+    def test_loads_once_within_ttl(self):
+        """Should load on first use and then serve from memory"""
+        loader = Mock(return_value="v1")
+        holder = StaleWhileRevalidate(loader, ttl=60)
+
+        assert holder.get() == "v1"
+        assert holder.get() == "v1"
+        assert loader.call_count == 1
+
+    def test_serves_stale_while_refreshing(self):
+        """Should return the stale value and refresh in the background"""
+        release = threading.Event()
+        values = iter(["v1", "v2"])
+
+        def loader():
+            value = next(values)
+            if value == "v2":
+                release.wait(1)
+            return value
+
+        holder = StaleWhileRevalidate(loader, ttl=0)
+        assert holder.get() == "v1"
+        assert holder.get() == "v1"  # stale value while v2 loads
+        release.set()
+        for _ in range(100):
+            if holder.version == 2:
+                break
+            threading.Event().wait(0.01)
+        assert holder.get() in ("v1", "v2")
+        assert holder.version == 2
+
+    def test_initial_failure_raises(self):
+        """Should surface errors when nothing has been loaded yet"""
+        holder = StaleWhileRevalidate(Mock(side_effect=RuntimeError("down")), ttl=60)
+        with pytest.raises(RuntimeError):
+            holder.get()
+
+
+@patch("src.core.metric_catalog.get_prometheus_client")
+def test_callers_share_one_names_request(mock_get_client):
+    """Should fetch __name__ values once for all discovery callers"""
+    from src.core.metrics import discover_dcgm_metrics, discover_cluster_metrics_dynamically
+    from src.core.promql_service import discover_available_metrics_from_thanos
+
+    client = Mock()
+    client.label_values.return_value = {"status": "success", "data": NAMES}
+    mock_get_client.return_value = client
+
+    discover_dcgm_metrics()
+    cluster = discover_cluster_metrics_dynamically()
+    discover_available_metrics_from_thanos("ns", "model", False)
+
+    assert client.label_values.call_count == 1
+    assert list(cluster.values()) == ["sum(kube_node_info)", "sum(kube_pod_info)"]
+    assert "up" in get_metric_catalog()
+
+
+@patch("src.core.metric_catalog.get_prometheus_client")
+def test_metadata_is_loaded_in_bulk(mock_get_client):
+    """Should fetch all metric metadata with one request and reuse it"""
+    client = Mock()
+    client.get_sync.return_value = {
+        "status": "success",
+        "data": {"up": [{"type": "gauge", "help": "Target is up", "unit": ""}]},
+    }
+    mock_get_client.return_value = client
+
+    assert get_metric_metadata_map()["up"][0]["type"] == "gauge"
+    assert get_metric_metadata_map().get("missing") is None
+    client.get_sync.assert_called_once_with("/api/v1/metadata", params={"limit_per_metric": 1})
@@ -0,0 +1,73 @@
+"""
+Tests for the inverted-index metric ranking.
+"""
+
+import random
+
+from src.core.metric_ranking import (
+    MetricRankingIndex,
+    calculate_semantic_score,
+    calculate_specificity_score,
+    calculate_type_relevance,
+    get_ranking_index,
+    tokenize,
+)
+
+
+def _legacy_rank(search_term, all_metrics):
+    """Reference implementation: score every metric on every call"""
+    scored = []
+    intent_lower = search_term.lower()
+    for metric in all_metrics:
+        metric_lower = metric.lower()
+        score = len(tokenize(intent_lower) & tokenize(metric_lower)) * 10
+        score += calculate_semantic_score(intent_lower, metric_lower)
+        score += calculate_type_relevance(intent_lower, metric_lower)
+        score += calculate_specificity_score(metric_lower)
+        if score > 0:
+            scored.append((metric, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return [metric for metric, _score in scored]
+
+
+def _synthetic_metrics(n, seed=7):
+    rng = random.Random(seed)
+    prefixes = ["vllm:", "DCGM_FI_DEV_", "kube_pod_", "node_", "container_", "up", "nvidia_", "apiserver_"]
+    words = ["gpu", "temp", "memory", "bytes", "total", "count", "latency", "seconds", "bucket",
+             "error", "util", "usage", "network", "packets", "ready", "info", "cpu", "time", "status"]
+    return [
+        rng.choice(prefixes) + "_".join(rng.sample(words, rng.randint(1, 4))) + f"_{i % 13}"
+        for i in range(n)
+    ]
+
+
+QUESTIONS = [
+    "gpu temperature",
+    "pod status",
+    "What is the p95 latency?",
+    "memory usage bytes",
+    "error rate total",
+    "how are my nodes doing",
+    "unrelated words only",
+]
+
+
+class TestMetricRankingIndex:
+    """Test parity with scoring every metric"""
+
+    def test_matches_full_scan(self):
+        """Should return exactly the same ranking as the per-metric scan"""
+        metrics = _synthetic_metrics(3000)
+        index = MetricRankingIndex(metrics)
+        for question in QUESTIONS:
+            assert index.rank(question) == _legacy_rank(question, metrics), question
+
+    def test_mixed_case_names(self):
+        """Should score names case-insensitively like the scan"""
+        metrics = ["DCGM_FI_DEV_GPU_TEMP", "kube_pod_status_phase", "Up", "cpu_usage_total"]
+        assert MetricRankingIndex(metrics).rank("gpu temperature") == _legacy_rank("gpu temperature", metrics)
+
+    def test_index_is_cached_per_metric_list(self):
+        """Should reuse the index for the same metric list"""
+        metrics = _synthetic_metrics(50)
+        assert get_ranking_index(metrics) is get_ranking_index(list(metrics))
@@ -0,0 +1,221 @@
+"""
+Tests for the PromQL parser and the local evaluator over cached raw series.
+"""
+
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.core import promql_eval
+from src.core.promql_eval import (
+    CacheMiss,
+    RawSeriesStore,
+    UnsupportedExpression,
+    evaluate_instant,
+    evaluate_or_fetch,
+    evaluate_range,
+    prime_raw_series,
+)
+from src.core.promql_parser import (
+    PromQLSyntaxError,
+    duration_seconds,
+    format_promql,
+    iter_selectors,
+    parse_promql,
+)
+
+END = 3600
+TS = np.arange(0, END * 1000 + 1, 15000, dtype=np.int64)
+
+
+def _store():
+    """Three counters growing 1, 2 and 3 per second, scraped every 15s."""
+    store = RawSeriesStore()
+    series = [
+        ((("__name__", "reqs"), ("job", "api"), ("pod", f"p{i}")), TS, TS / 1000.0 * (i + 1))
+        for i in range(3)
+    ]
+    store.put("reqs", 0, END * 1000, series)
+    return store
+
+
+def _values(response):
+    return {tuple(sorted(item["metric"].items())): float(item["value"][1]) for item in response["data"]["result"]}
+
+
+class TestParser:
+    """Test parsing and canonical formatting"""
+
+    @pytest.mark.parametrize("query", [
+        'sum by (pod) (rate(reqs{job="api",code=~"5.."}[5m]))',
+        "topk(3, max_over_time(up[1h] offset 5m))",
+        "a / on(pod) b > bool 0.5",
+        "-a ^ 2",
+        "histogram_quantile(0.95, sum by (le) (rate(x_bucket[5m])))",
+        "max_over_time((sum(rate(a:b[5m])))[1h:5m])",
+    ])
+    def test_round_trip(self, query):
+        """Should format to text that parses back to the same tree"""
+        tree = parse_promql(query)
+        assert parse_promql(format_promql(tree)) == tree
+
+    def test_selectors_and_durations(self):
+        """Should find every selector and parse composite durations"""
+        tree = parse_promql('sum(rate(a{x="1"}[5m])) / sum(b)')
+        assert [s.name for s in iter_selectors(tree)] == ["a", "b"]
+        assert duration_seconds("1h30m") == 5400
+
+    def test_syntax_error(self):
+        """Should raise PromQLSyntaxError on malformed input"""
+        with pytest.raises(PromQLSyntaxError):
+            parse_promql("sum(rate(x[5m])")
+
+
+class TestEvaluator:
+    """Test local evaluation of the supported subset"""
+
+    def test_rate_and_aggregations(self):
+        """Should match Prometheus results for rate, sum by, topk and arithmetic"""
+        store = _store()
+
+        assert _values(evaluate_instant("rate(reqs[5m])", END, store)) == {
+            (("job", "api"), ("pod", f"p{i}")): pytest.approx(i + 1) for i in range(3)
+        }
+        assert _values(evaluate_instant("sum by (job) (increase(reqs[10m]))", END, store)) == {
+            (("job", "api"),): pytest.approx(3600)
+        }
+        assert _values(evaluate_instant("topk(1, reqs)", END, store)) == {
+            (("__name__", "reqs"), ("job", "api"), ("pod", "p2")): 10800
+        }
+        assert _values(evaluate_instant("rate(reqs[5m]) * 100 > 150", END, store)) == {
+            (("job", "api"), ("pod", "p1")): pytest.approx(200),
+            (("job", "api"), ("pod", "p2")): pytest.approx(300),
+        }
+
+    def test_counter_reset(self):
+        """Should correct counter resets inside the window"""
+        store = RawSeriesStore()
+        ts = np.arange(0, 600_001, 60_000, dtype=np.int64)
+        values = np.array([0, 60, 120, 180, 240, 0, 60, 120, 180, 240, 300], dtype=float)
+        store.put("c", 0, 600_000, [((("__name__", "c"),), ts, values)])
+
+        assert _values(evaluate_instant("increase(c[10m])", 600, store)) == {(): pytest.approx(540)}
+
+    def test_vector_matching(self):
+        """Should divide one-to-one matched vectors and refuse many-to-many"""
+        store = _store()
+        with pytest.raises(UnsupportedExpression):
+            evaluate_instant("reqs / ignoring(pod) reqs", END, store)
+        assert _values(evaluate_instant("reqs / on(pod) reqs", END, store)) == {
+            (("pod", f"p{i}"),): 1.0 for i in range(3)
+        }
+
+    def test_range_query_format(self):
+        """Should return a sorted matrix with Prometheus value formatting"""
+        response = evaluate_range("max by (pod) (max_over_time(reqs[1m]))", 3000, 3120, 60, _store())
+
+        assert response["data"]["resultType"] == "matrix"
+        assert [s["metric"] for s in response["data"]["result"]] == [{"pod": f"p{i}"} for i in range(3)]
+        assert response["data"]["result"][0]["values"] == [[3000, "3000"], [3060, "3060"], [3120, "3120"]]
+
+    def test_unsupported_and_missing(self):
+        """Should raise for unsupported expressions and uncached selectors"""
+        store = _store()
+        with pytest.raises(UnsupportedExpression):
+            evaluate_instant("histogram_quantile(0.9, reqs)", END, store)
+        with pytest.raises(CacheMiss):
+            evaluate_instant('reqs{pod="p0"}', END, store)
+        with pytest.raises(CacheMiss):
+            evaluate_instant("rate(reqs[5m])", END + 3600, store)
+
+
+def test_miss_primes_store_and_follow_up_is_local(monkeypatch):
+    """Should fetch upstream on a miss, prime raw samples, then answer locally"""
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_ENABLED", True)
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_PRIME_ON_MISS", True)
+    store = RawSeriesStore()
+    monkeypatch.setattr(promql_eval, "_raw_series_store", store)
+    raw_queries = []
+
+    def fetch_raw(query, at):
+        raw_queries.append((query, at))
+        if query.startswith("sum(count_over_time("):
+            return {"data": {"resultType": "vector", "result": [{"metric": {}, "value": [at, str(TS.size)]}]}}
+        values = [[t / 1000.0, str(t / 1000.0)] for t in TS]
+        return {"data": {"resultType": "matrix", "result": [{"metric": {"__name__": "reqs"}, "values": values}]}}
+
+    fetch = MagicMock(return_value={"status": "success", "data": {"resultType": "vector", "result": []}})
+
+    first = evaluate_or_fetch("sum(rate(reqs[5m]))", fetch, fetch_raw, end=END)
+    second = evaluate_or_fetch("max(increase(reqs[10m]))", fetch, fetch_raw, end=END)
+
+    assert first is fetch.return_value
+    assert fetch.call_count == 1
+    assert raw_queries == [("sum(count_over_time(reqs[3900s]))", END), ("reqs[3900s]", END)]
+    assert _values(second) == {(): pytest.approx(600)}
+
+
+def test_prime_skips_long_windows(monkeypatch):
+    """Should not fetch raw samples beyond LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS"""
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_MAX_RAW_WINDOW_SECONDS", 3600)
+    fetch_raw = MagicMock()
+
+    assert prime_raw_series("rate(reqs[1d])", END, END, fetch_raw, RawSeriesStore()) == 0
+    fetch_raw.assert_not_called()
+
+
+def test_prime_probes_sample_count_before_fetching(monkeypatch):
+    """Should not download selectors whose sample count exceeds LOCAL_EVAL_MAX_SAMPLES"""
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_MAX_SAMPLES", 1000)
+    fetch_raw = MagicMock(return_value={"data": {"resultType": "vector", "result": [{"value": [END, "5000000"]}]}})
+    store = RawSeriesStore()
+
+    assert prime_raw_series("sum(container_cpu_usage_seconds_total)", END, END, fetch_raw, store) == 0
+    fetch_raw.assert_called_once_with("sum(count_over_time(container_cpu_usage_seconds_total[3900s]))", END)
+    assert store.stats()["entries"] == 0
+
+
+def test_local_eval_is_opt_in():
+    """Should leave local evaluation and priming off unless LOCAL_EVAL_ENABLED is set"""
+    from src.core import config
+
+    assert config.LOCAL_EVAL_ENABLED is False
+    assert config.LOCAL_EVAL_PRIME_ON_MISS is False
+
+
+def test_priming_is_skipped_when_disabled_or_not_requested(monkeypatch):
+    """Should only fetch raw samples on a miss when priming is enabled and requested"""
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_ENABLED", True)
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_PRIME_ON_MISS", False)
+    monkeypatch.setattr(promql_eval, "_raw_series_store", RawSeriesStore())
+    fetch = MagicMock(return_value={"status": "success"})
+    fetch_raw = MagicMock()
+
+    evaluate_or_fetch("sum(reqs)", fetch, fetch_raw, end=END)
+    monkeypatch.setattr(promql_eval, "LOCAL_EVAL_PRIME_ON_MISS", True)
+    evaluate_or_fetch("sum(reqs)", fetch, fetch_raw, end=END, prime=False)
+
+    assert fetch.call_count == 2
+    fetch_raw.assert_not_called()
+
+
+def test_vanished_series_go_stale():
+    """Should drop a series one scrape interval after its last sample, as Prometheus does"""
+    store = RawSeriesStore()
+    ended = TS[TS <= 3000 * 1000]
+    series = [
+        ((("__name__", "up"), ("pod", "live")), TS, np.ones(TS.size)),
+        ((("__name__", "up"), ("pod", "gone")), ended, np.ones(ended.size)),
+    ]
+    store.put("up", 0, END * 1000, promql_eval.mark_stale(series, END * 1000))
+
+    assert _values(evaluate_instant("up", 3010, store)) == {
+        (("__name__", "up"), ("pod", "gone")): 1.0,
+        (("__name__", "up"), ("pod", "live")): 1.0,
+    }
+    assert _values(evaluate_instant("up", 3060, store)) == {(("__name__", "up"), ("pod", "live")): 1.0}
+    assert _values(evaluate_instant("count_over_time(up[5m])", 3060, store)) == {
+        (("pod", "gone"),): 17.0,
+        (("pod", "live"),): 21.0,
+    }
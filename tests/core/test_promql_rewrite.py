@@ -0,0 +1,74 @@
+"""
+Tests for AST-based label injection and generated-PromQL repair.
+"""
+
+from unittest.mock import patch
+
+from src.core.llm_client import add_namespace_filter, fix_promql_syntax
+from src.core.metrics import fetch_metric_series, fetch_openshift_series
+from src.core.promql_rewrite import _inject, inject_matchers
+from src.core.timeseries import SeriesSet
+
+
+class TestInjectMatchers:
+    """Test scoping every selector of an expression"""
+
+    def test_scopes_every_selector(self):
+        """Should scope both sides of a binary expression, not just the first aggregation"""
+        result = inject_matchers("sum(rate(a[5m])) / sum(b)", {"namespace": "ns"})
+
+        assert result == 'sum(rate(a{namespace="ns"}[5m])) / sum(b{namespace="ns"})'
+
+    def test_replaces_conflicting_matchers(self):
+        """Should enforce the injected value over existing matchers on the same label"""
+        result = inject_matchers('up{namespace=~"a|b", job="x"}', {"namespace": "a"})
+
+        assert result == 'up{job="x", namespace="a"}'
+
+    def test_metric_prefix_and_labelled_selectors(self):
+        """Should scope only matching metrics, including ones that already have labels"""
+        result = inject_matchers(
+            'sum(rate(vllm:x_bucket{le!=""}[5m])) by (le) + DCGM_FI_DEV_GPU_UTIL',
+            {"model_name": "m"},
+            metric_prefix="vllm:",
+        )
+
+        assert result == 'sum by (le) (rate(vllm:x_bucket{le!="", model_name="m"}[5m])) + DCGM_FI_DEV_GPU_UTIL'
+
+    def test_unparseable_query_scoped_on_text_and_cached(self):
+        """Should still scope every selector of PromQL the parser rejects, and reuse cached rewrites"""
+        _inject.cache_clear()
+
+        assert inject_matchers("sum by(namespace)(kube_pod_info) limit 5", {"namespace": "ns"}) == (
+            'sum by(namespace)(kube_pod_info{namespace="ns"}) limit{namespace="ns"} 5'
+        )
+        assert inject_matchers(
+            'sum(rate(a{namespace=~"x|y", job="j"}[$__rate_interval])) / on(pod) group_left(node) {__name__="b"}',
+            {"namespace": "ns"},
+        ) == (
+            'sum(rate(a{job="j", namespace="ns"}[$__rate_interval])) / on(pod) group_left(node) '
+            '{__name__="b", namespace="ns"}'
+        )
+        inject_matchers("up", {"namespace": "ns"})
+        inject_matchers("up", {"namespace": "ns"})
+        assert _inject.cache_info().hits == 1
+
+
+def test_llm_client_helpers():
+    """Should enforce namespaces and repair generated PromQL via the AST"""
+    assert add_namespace_filter("count(a) + count(b)", "ns") == 'count(a{namespace="ns"}) + count(b{namespace="ns"})'
+    assert fix_promql_syntax("rate(vllm:num_requests_running)", "15m") == "rate(vllm:num_requests_running[15m])"
+    assert fix_promql_syntax("vllm:x{namespace='a', }[5m") == 'rate(vllm:x{namespace="a"}[5m])'
+
+
+@patch("src.core.metrics._query_range_series", return_value=SeriesSet.empty_set())
+def test_fetch_paths_scope_queries(mock_query):
+    """Should scope OpenShift queries by namespace and vLLM selectors by model"""
+    fetch_openshift_series("sum(rate(a[5m])) / sum(b)", 0, 3600, namespace="ns")
+    fetch_metric_series("vllm:num_requests_running", "dev | llama", 0, 3600)
+
+    queries = [call.args[0] for call in mock_query.call_args_list]
+    assert queries == [
+        'sum(rate(a{namespace="ns"}[5m])) / sum(b{namespace="ns"})',
+        'vllm:num_requests_running{model_name="llama", namespace="dev"}',
+    ]
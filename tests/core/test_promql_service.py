@@ -16,10 +16,63 @@ from src.core.promql_service import (
     intelligent_metric_selection,
     select_queries_directly,
     generate_promql_from_discovered_metric,
-    extract_time_period_from_question
+    extract_time_period_from_question,
+    categorize_any_metric,
+    MetricCategorizationCache,
 )
 
 
+class TestMetricCategorization:
+    """Test the dispatch table and the categorization cache"""
+
+    @pytest.mark.parametrize("metric_name,expected_type", [
+        ("vllm:num_requests_running", "vllm"),
+        ("prometheus_http_requests_total", "monitoring"),
+        ("ALERTS", "alerts"),
+        ("kube_pod_status_phase", "kubernetes"),
+        ("DCGM_FI_DEV_GPU_TEMP", "gpu"),
+        ("habanalabs_utilization", "gpu"),
+        ("container_cpu_usage_seconds_total", "container"),
+        ("node_load1", "node"),
+        ("apiserver_tcp_connections", "network"),
+        ("csi_volume_ops", "storage"),
+        ("app_request_count", "application"),
+        ("go_goroutines", "generic"),
+    ])
+    def test_dispatch_priority(self, metric_name, expected_type):
+        """Should route each metric family to its categorizer"""
+        assert categorize_any_metric(metric_name, "ns", "m", False)["type"] == expected_type
+
+    def test_unmatched_kube_metric_is_skipped(self):
+        """Should keep returning None for kube metrics without a resource type"""
+        assert categorize_any_metric("kube_lease_owner", "ns", "m", False) is None
+
+    def test_only_new_names_are_categorized(self):
+        """Should reuse results and process only names added to the catalog"""
+        cache = MetricCategorizationCache()
+        names = ["vllm:num_requests_running", "node_load1", "kube_lease_owner"]
+
+        first = cache.categorize_all(names, "ns", "m", False, catalog_version=1)
+        assert [m["name"] for m in first] == ["vllm:num_requests_running", "node_load1"]
+        assert cache.categorized == 3
+
+        assert cache.categorize_all(names, "ns", "m", False, catalog_version=1) is first
+        cache.categorize_all(names + ["go_goroutines"], "ns", "m", False, catalog_version=2)
+        assert cache.categorized == 4
+
+    def test_categories_are_shared_across_contexts(self):
+        """Should categorize each name once and keep per-context results in a bounded LRU"""
+        cache = MetricCategorizationCache()
+        cache.max_results = 2
+        first = cache.categorize_all(["node_load1"], "ns1", "m", False, catalog_version=1)
+        cache.categorize_all(["node_load1"], "ns2", "m", False, catalog_version=1)
+        cache.categorize_all(["node_load1"], "ns3", "m", True, catalog_version=1)
+
+        assert cache.categorized == 1
+        assert len(cache._results) == 2
+        assert cache.categorize_all(["node_load1"], "ns1", "m", False, catalog_version=1) == first
+
+
 class TestGeneratePromQLFromQuestion:
     """Test PromQL generation from natural language questions"""
     
@@ -112,7 +165,7 @@ class TestGeneratePromQLFromQuestion:
 class TestDiscoverAvailableMetrics:
     """Test metric discovery functionality"""
     
-    @patch('src.core.promql_service.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_discover_metrics_success(self, mock_get):
         """Should discover metrics successfully"""
         # Mock successful response
@@ -131,7 +184,7 @@ class TestDiscoverAvailableMetrics:
         # Should return list of metrics
         assert isinstance(result, list)
     
-    @patch('src.core.promql_service.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_discover_metrics_connection_error(self, mock_get):
         """Should handle connection errors gracefully"""
         # Mock connection error
@@ -142,7 +195,7 @@ class TestDiscoverAvailableMetrics:
         # Should return empty list on error
         assert result == []
     
-    @patch('src.core.promql_service.requests.get')
+    @patch('src.core.http_client.requests.Session.get')
     def test_discover_metrics_http_error(self, mock_get):
         """Should handle HTTP errors gracefully"""
         # Mock HTTP error
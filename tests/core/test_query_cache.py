@@ -0,0 +1,103 @@
+"""
+Tests for the process-wide range-query result cache.
+"""
+
+import time
+from unittest.mock import patch, Mock
+
+from src.core.query_cache import RangeQueryCache, normalize_promql, get_query_cache
+from src.core.http_client import PrometheusClient
+
+
+def _payload(n_values=10):
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": [{"metric": {"pod": "p1"}, "values": [[i, "1"] for i in range(n_values)]}],
+        },
+    }
+
+
+class TestNormalizePromql:
+    """Test PromQL whitespace canonicalization"""
+
+    def test_collapses_whitespace(self):
+        """Should treat formatting variants as the same query"""
+        assert normalize_promql("sum by (pod) ( rate(x[5m]) )") == normalize_promql("sum by(pod)(rate(x[5m]))")
+
+    def test_keeps_quoted_values(self):
+        """Should not touch whitespace inside label values"""
+        assert normalize_promql('x{a="b  c"}') == 'x{a="b  c"}'
+
+    def test_keeps_operator_spacing(self):
+        """Should keep a single space between operands and operators"""
+        assert normalize_promql("a   -   b") == "a - b"
+
+
+class TestRangeQueryCache:
+    """Test TTL, LRU and counters"""
+
+    def test_hit_and_miss_counters(self):
+        """Should count misses then hits"""
+        cache = RangeQueryCache(max_bytes=10**6)
+        key = cache.make_key("up", 0, 60, "30s")
+
+        assert cache.get(key) is None
+        cache.put(key, _payload(), ttl=60)
+        assert cache.get(key) == _payload()
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_ttl_depends_on_window_recency(self):
+        """Should use short TTLs for live windows and long ones for history"""
+        cache = RangeQueryCache(live_ttl=5, recent_ttl=50, historical_ttl=500)
+        now = 1_000_000
+
+        assert cache.ttl_for_window(now, now=now) == 5
+        assert cache.ttl_for_window(now - 3600, now=now) == 50
+        assert cache.ttl_for_window(now - 7 * 86400, now=now) == 500
+
+    def test_expired_entries_miss(self):
+        """Should drop entries past their TTL"""
+        cache = RangeQueryCache()
+        key = cache.make_key("up", 0, 60, "30s")
+        cache.put(key, _payload(), ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get(key) is None
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """Should evict least recently used entries when over budget"""
+        cache = RangeQueryCache(max_bytes=5000)
+        keys = [cache.make_key(f"m{i}", 0, 60, "30s") for i in range(3)]
+        for key in keys[:2]:
+            cache.put(key, _payload(10), ttl=60)
+        cache.get(keys[0])  # keys[1] is now least recently used
+        cache.put(keys[2], _payload(10), ttl=60)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.stats()["bytes"] <= 5000
+        assert cache.stats()["evictions"] >= 1
+
+
+class TestClientIntegration:
+    """Test query_range caching through the shared client"""
+
+    @patch('src.core.http_client.requests.Session.get')
+    def test_repeated_query_range_hits_cache(self, mock_get):
+        """Should issue one upstream request for identical historical queries"""
+        response = Mock()
+        response.json.return_value = _payload()
+        mock_get.return_value = response
+        client = PrometheusClient("http://prom:9090")
+
+        first = client.query_range("sum(up)", 1000, 2000, "30s")
+        second = client.query_range("sum( up )", 1000, 2000, "30s")
+
+        assert first == second
+        assert mock_get.call_count == 1
+        assert get_query_cache().stats()["hits"] == 1
@@ -0,0 +1,101 @@
+"""
+Tests for the pre-execution cardinality guard.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.core.promql_parser import parse_promql
+from src.core.query_guard import plan_query
+
+
+@pytest.fixture
+def probe():
+    """Enable the guard and answer count() probes with a configurable series count."""
+    client = MagicMock()
+
+    def respond(count):
+        client.query_instant.return_value = {"data": {"result": [{"metric": {}, "value": [0, str(count)]}]}}
+        return client
+
+    with patch("src.core.query_guard.QUERY_GUARD_ENABLED", True), \
+            patch("src.core.query_guard.get_prometheus_client", return_value=client):
+        yield respond
+
+
+def test_small_query_runs_unchanged(probe):
+    """Should execute small queries as-is at the default step"""
+    client = probe(12)
+
+    plan = plan_query("sum by (pod) (rate(x[5m]))", 0, 3600)
+
+    assert plan.action == "execute" and plan.query == "sum by (pod) (rate(x[5m]))"
+    assert plan.estimated_series == 12 and plan.step_seconds == 60
+    assert client.query_instant.call_args[0][0] == "count(sum by (pod) (rate(x[5m])))"
+
+
+def test_over_budget_wrapped_in_stable_topk(probe):
+    """Should bound large results with topk ranked at the end of the range and coarsen the step"""
+    probe(5000)
+
+    instant = plan_query("container_memory_usage_bytes")
+    ranged = plan_query("sum by (pod) (container_memory_usage_bytes)", 0, 7 * 86400)
+
+    assert instant.action == "topk" and instant.query == "topk(50, container_memory_usage_bytes)"
+    assert ranged.query == (
+        "sum by (pod) (container_memory_usage_bytes) and "
+        "topk(50, sum by (pod) (container_memory_usage_bytes @ end()))"
+    )
+    parse_promql(ranged.query)
+    assert plan_query("a or b", 0, 3600).query.startswith("(a or b) and topk(50, ")
+    assert ranged.step_seconds == 10 * 60
+    assert any("topk" in decision for decision in ranged.decisions)
+
+
+def test_refuses_huge_results_and_skips_scalars(probe):
+    """Should refuse queries above the hard limit with a suggestion, without probing scalars"""
+    client = probe(50000)
+
+    plan = plan_query("sum by (pod, container) (x)")
+    scalar = plan_query("scalar(sum(x)) * 2")
+
+    assert plan.refused and "Group by fewer labels" in plan.suggestion
+    assert scalar.action == "execute" and client.query_instant.call_count == 1
+
+
+@patch("core.chat_with_prometheus.make_prometheus_request")
+@patch("core.query_guard.get_prometheus_client")
+def test_execute_promql_query_records_plan(mock_client, mock_request):
+    """Should report refusals without querying and record the plan of executed queries"""
+    from core.chat_with_prometheus import execute_promql_query
+
+    client = MagicMock()
+    client.query_instant.side_effect = ConnectionError("down")
+    mock_client.return_value = client
+    mock_request.return_value = {"status": "success", "data": {"resultType": "vector", "result": []}}
+
+    with patch("core.query_guard.QUERY_GUARD_ENABLED", True):
+        result = execute_promql_query("up")
+        assert result["plan"]["action"] == "unchecked" and result["status"] == "success"
+
+        client.query_instant.side_effect = None
+        client.query_instant.return_value = {"data": {"result": [{"value": [0, "99999"]}]}}
+        mock_request.reset_mock()
+        result = execute_promql_query("up")
+
+    assert result["status"] == "refused" and result["plan"]["suggestion"]
+    mock_request.assert_not_called()
+
+
+def test_subquery_pinned_without_pinning_its_inner_steps(probe):
+    """Should rank by the subquery statistic, not by the inner expression frozen at one instant"""
+    probe(5000)
+
+    plan = plan_query("max_over_time(rate(x[5m])[1h:1m])", 0, 3600)
+
+    assert plan.query == (
+        "max_over_time(rate(x[5m])[1h:1m]) and "
+        "topk(50, max_over_time(rate(x[5m])[1h:1m] @ end()))"
+    )
+    parse_promql(plan.query)
@@ -0,0 +1,169 @@
+"""
+Tests for time-sharded execution of long range queries.
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+import requests
+
+from src.core.fetch_engine import fetch_concurrently
+from src.core.query_planner import (
+    merge_matrix_payloads,
+    plan_shards,
+    query_range_sharded,
+    query_range_series_sharded,
+    run_shards,
+)
+from src.core.timeseries import SeriesSet
+
+DAY = 86400
+
+
+class FakeClient:
+    """Evaluates a range query on the step grid; series "b" only exists after start + 2 days."""
+
+    def __init__(self, fail=None):
+        self.fail = dict(fail or {})
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def query_range(self, query, start, end, step, window_seconds=None):
+        with self._lock:
+            self.calls.append((start, end))
+            remaining = self.fail.get(start, 0)
+            if remaining:
+                self.fail[start] = remaining - 1
+                raise requests.exceptions.Timeout("shard timed out")
+        step_seconds = int(step[:-1]) * 3600
+        grid = range(start, end + 1, step_seconds)
+        result = [{"metric": {"job": "a"}, "values": [[t, str(t % 97)] for t in grid]}]
+        late = [[t, "1"] for t in grid if t >= 1_700_006_400 + 2 * DAY]
+        if late:
+            result.append({"metric": {"job": "b"}, "values": late})
+        return {"status": "success", "data": {"resultType": "matrix", "result": result}}
+
+    def query_range_series(self, query, start, end, step, window_seconds=None):
+        return SeriesSet.from_matrix(self.query_range(query, start, end, step)["data"]["result"])
+
+
+START = 1_700_006_400  # midnight UTC
+END = START + 7 * DAY
+
+
+class TestPlanShards:
+    """Test splitting the step grid"""
+
+    def test_shards_partition_the_grid(self):
+        """Should cover every grid point exactly once on day boundaries"""
+        start, step = START + 1800, 3600
+        shards = plan_shards(start, END, step, shard_seconds=DAY)
+
+        points = [t for s, e in shards for t in range(s, e + 1, step)]
+        assert points == list(range(start, END + 1, step))
+        assert all((e + step) % DAY < step for s, e in shards[:-1])
+
+    def test_shard_count_is_capped(self):
+        """Should widen shards in whole days to stay under max_shards"""
+        shards = plan_shards(START, START + 90 * DAY, 3600, shard_seconds=DAY, max_shards=10)
+        assert len(shards) <= 10
+        assert all((e + 3600 - s) % DAY == 0 for s, e in shards[1:-1])
+
+    def test_short_window_is_one_shard(self):
+        """Should keep a window inside one shard as a single request"""
+        assert plan_shards(START, START + 3600, 60, shard_seconds=DAY) == [(START, START + 3600)]
+
+
+class TestShardedQueries:
+    """Test stitching and retries"""
+
+    def test_matrix_stitching_matches_single_query(self):
+        """Should produce the same matrix as one unsharded request"""
+        client = FakeClient()
+        sharded = query_range_sharded(client, "up", START, END, "1h")
+
+        assert len(client.calls) == 8
+        assert sharded == FakeClient().query_range("up", START, END, "1h")
+
+    def test_series_stitching_matches_single_query(self):
+        """Should stitch SeriesSets into the unsharded result"""
+        sharded = query_range_series_sharded(FakeClient(), "up", START, END, "1h")
+        expected = FakeClient().query_range_series("up", START, END, "1h")
+
+        assert sharded.labels == expected.labels
+        np.testing.assert_array_equal(sharded.timestamps, expected.timestamps)
+        np.testing.assert_array_equal(sharded.values, expected.values)
+
+    def test_only_failed_shards_are_retried(self):
+        """Should refetch just the shard that timed out"""
+        client = FakeClient(fail={START + 3 * DAY: 1})
+
+        query_range_sharded(client, "up", START, END, "1h")
+
+        starts = [s for s, _e in client.calls]
+        assert len(starts) == 9
+        assert starts.count(START + 3 * DAY) == 2
+        assert all(starts.count(s) == 1 for s in starts if s != START + 3 * DAY)
+
+    def test_exhausted_retries_raise(self):
+        """Should raise once a shard keeps failing"""
+        client = FakeClient(fail={START: 5})
+        with pytest.raises(requests.exceptions.Timeout):
+            query_range_sharded(client, "up", START, END, "1h")
+
+    def test_client_errors_are_not_retried(self):
+        """Should not retry 4xx responses"""
+        response = Mock(status_code=400)
+        fetch = Mock(side_effect=requests.exceptions.HTTPError("bad_data", response=response))
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            run_shards([(0, 10), (20, 30)], fetch, retries=3)
+        assert fetch.call_count == 2
+
+    def test_sharded_fan_out_respects_upstream_cap(self):
+        """Should hold an upstream slot per shard request, lending the caller's slot to its shards"""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def fetch(s, e):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return s
+
+        upstream = "http://shard-cap-test"
+        shards = [(0, 10), (20, 30), (40, 50), (60, 70)]
+        with patch("src.core.fetch_engine.PROMETHEUS_MAX_CONCURRENCY", 2):
+            results = fetch_concurrently(
+                {f"m{i}": lambda: run_shards(shards, fetch, max_workers=4, upstream=upstream) for i in range(4)},
+                upstream=upstream,
+            )
+
+        assert all(result == [0, 20, 40, 60] for result in results.values())
+        assert state["peak"] == 2
+
+    def test_error_payload_is_returned(self):
+        """Should pass a non-success shard payload through"""
+        error = {"status": "error", "error": "boom"}
+        assert merge_matrix_payloads([FakeClient().query_range("up", START, START, "1h"), error]) == error
+
+
+@patch("src.core.metrics.get_prometheus_client")
+def test_fetch_openshift_metrics_shards_long_windows(mock_get_client):
+    """Should shard multi-day windows transparently for fetch_openshift_metrics"""
+    from src.core.metrics import fetch_openshift_metrics
+
+    client = FakeClient()
+    client.query_range_series = Mock(wraps=client.query_range_series)
+    mock_get_client.return_value = client
+
+    df = fetch_openshift_metrics("up", START, END)
+
+    assert client.query_range_series.call_count > 1
+    assert set(df["job"]) == {"a", "b"}
@@ -0,0 +1,165 @@
+"""
+Tests for the remote-read client against the synthetic remote-read double.
+"""
+
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+import requests
+
+from src.core.remote_read import (
+    MATCH_EQ,
+    MATCH_NRE,
+    MATCH_RE,
+    RESPONSE_STREAMED_XOR_CHUNKS,
+    STALE_NAN_BITS,
+    RemoteReadClient,
+    RemoteReadError,
+    crc32c,
+    decode_xor_chunk,
+    evaluate_on_grid,
+    parse_raw_selector,
+    snappy_compress,
+    snappy_decompress,
+)
+from tests.core.remote_read_double import (
+    SyntheticRemoteRead,
+    SyntheticRemoteReadAdapter,
+    encode_xor_chunk,
+    synthetic_series,
+)
+
+DAY = 86400
+END = 1_700_000_000
+START = END - 8 * DAY
+URL = "http://remote-read.test/api/v1/read"
+
+
+def _client(streamed=True):
+    backend = SyntheticRemoteRead(
+        synthetic_series("vllm:num_requests_running", [{"model_name": "a"}, {"model_name": "b"}],
+                         START * 1000 - 600_000, END * 1000),
+        streamed=streamed,
+    )
+    session = requests.Session()
+    session.mount("http://remote-read.test", SyntheticRemoteReadAdapter(backend))
+    return RemoteReadClient(URL, session=session), backend
+
+
+class TestCodecs:
+    """Test the snappy, XOR chunk and selector helpers"""
+
+    def test_snappy_round_trip(self):
+        """Should decompress what it compresses, including multi-block input"""
+        data = bytes(range(256)) * 600
+        assert snappy_decompress(snappy_compress(data)) == data
+
+    def test_snappy_decodes_copies(self):
+        """Should expand back-references, including overlapping ones"""
+        # "ab" literal followed by a copy of length 6 at offset 2
+        block = bytes([8, 1 << 2]) + b"ab" + bytes([((6 - 4) << 2) | 1, 2])
+        assert snappy_decompress(block) == b"abababab"
+
+    def test_xor_chunk_round_trip(self):
+        """Should restore irregular timestamps and arbitrary float values exactly"""
+        ts = np.array([1000, 16000, 31000, 46005, 61000, 900_000, 900_001, 10**10], dtype=np.int64)
+        values = np.array([1.0, 1.0, 2.5, -3.25, 1e300, 0.0, np.nan, 7.0])
+
+        decoded_ts, decoded_values = decode_xor_chunk(encode_xor_chunk(ts, values))
+
+        np.testing.assert_array_equal(decoded_ts, ts)
+        np.testing.assert_array_equal(decoded_values, values)
+
+    def test_crc32c(self):
+        """Should match the CRC-32C check value"""
+        assert crc32c(b"123456789") == 0xE3069283
+
+    def test_parse_raw_selector(self):
+        """Should only accept plain selectors"""
+        assert parse_raw_selector('vllm:x{model_name="m", pod=~"p-.*", ns!~"kube"}') == [
+            (MATCH_EQ, "__name__", "vllm:x"),
+            (MATCH_EQ, "model_name", "m"),
+            (MATCH_RE, "pod", "p-.*"),
+            (MATCH_NRE, "ns", "kube"),
+        ]
+        assert parse_raw_selector("rate(vllm:x[5m])") is None
+        assert parse_raw_selector('vllm:x{a="1"} offset 1h') is None
+        assert parse_raw_selector('{ns!="a"}') is None
+
+    def test_evaluate_on_grid_uses_lookback_and_staleness(self):
+        """Should pick the latest sample within the lookback and stop at stale markers"""
+        stale = np.array([STALE_NAN_BITS], dtype=np.uint64).view(np.float64)[0]
+        ts = np.array([0, 60_000, 120_000, 600_000], dtype=np.int64)
+        values = np.array([1.0, 2.0, stale, 4.0])
+        grid = np.array([30_000, 90_000, 150_000, 480_000, 660_000], dtype=np.int64)
+
+        points, picked = evaluate_on_grid(ts, values, grid, lookback_ms=300_000)
+
+        np.testing.assert_array_equal(points, [30_000, 90_000, 660_000])
+        np.testing.assert_array_equal(picked, [1.0, 2.0, 4.0])
+
+
+@pytest.mark.parametrize("streamed", [True, False])
+def test_query_range_series_from_double(streamed):
+    """Should return the step-grid evaluation of the selected series"""
+    client, backend = _client(streamed)
+
+    series = client.query_range_series('vllm:num_requests_running{model_name="a"}', START, END, "1h")
+
+    assert series.label_dicts() == [{"__name__": "vllm:num_requests_running", "model_name": "a"}]
+    grid_ms = np.arange(START, END + 1, 3600) * 1000
+    _labels, ts, values = backend.series[0]
+    expected = values[np.searchsorted(ts, grid_ms, side="right") - 1]
+    np.testing.assert_array_equal(series.timestamps, grid_ms)
+    np.testing.assert_allclose(series.values[0], expected)
+    queries, response_types = backend.requests[0]
+    assert queries[0][0] == (START - 300) * 1000
+    assert response_types[0] == RESPONSE_STREAMED_XOR_CHUNKS
+
+
+def test_corrupt_streamed_frame_is_rejected():
+    """Should raise RemoteReadError when a frame's CRC32C does not match"""
+    client, backend = _client()
+    handle = backend.handle
+
+    def corrupt(body):
+        content_type, payload = handle(body)
+        return content_type, payload[:-1] + bytes([payload[-1] ^ 0xFF])
+
+    backend.handle = corrupt
+
+    with pytest.raises(RemoteReadError, match="CRC32C"):
+        client.query_range_series('vllm:num_requests_running{model_name="a"}', START, END, "1h")
+
+
+def test_fetch_path_uses_remote_read_for_long_raw_selectors():
+    """Should route long raw selectors to remote read and everything else to query_range"""
+    from src.core import metrics
+
+    client, backend = _client()
+    prometheus = Mock()
+    with patch("src.core.remote_read.REMOTE_READ_URL", URL), \
+            patch("src.core.metrics.get_remote_read_client", return_value=client), \
+            patch("src.core.metrics.query_range_series_sharded") as sharded:
+        series = metrics._query_range_series('vllm:num_requests_running{model_name="b"}', START, END, "1h")
+        with patch("src.core.metrics.get_prometheus_client", return_value=prometheus):
+            metrics._query_range_series("sum(rate(vllm:num_requests_running[5m]))", START, END, "1h")
+
+    assert series.label_dicts()[0]["model_name"] == "b"
+    assert len(backend.requests) == 1
+    assert sharded.call_count == 1
+
+
+def test_fetch_path_falls_back_when_remote_read_fails():
+    """Should use query_range if the remote-read request fails"""
+    from src.core import metrics
+
+    client = Mock()
+    client.query_range_series.side_effect = requests.exceptions.ConnectionError("refused")
+    with patch("src.core.remote_read.REMOTE_READ_URL", URL), \
+            patch("src.core.metrics.get_remote_read_client", return_value=client), \
+            patch("src.core.metrics.get_prometheus_client"), \
+            patch("src.core.metrics.query_range_series_sharded", return_value="fallback") as sharded:
+        assert metrics._query_range_series("vllm:x", START, END, "1h") == "fallback"
+    assert sharded.call_count == 1
@@ -0,0 +1,224 @@
+"""
+Tests for the Prometheus client resilience layer.
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from src.core.http_client import PrometheusClient
+from src.core.resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_OPEN,
+    AdaptiveTimeouts,
+    CircuitBreaker,
+    Hedger,
+    LatencyTracker,
+    PrometheusError,
+    ResilientCaller,
+)
+
+DAY = 86400
+
+
+def _tracker(*latencies, min_samples=3):
+    tracker = LatencyTracker(window=100, min_samples=min_samples)
+    for latency in latencies:
+        tracker.record("/api/v1/query", latency)
+    return tracker
+
+
+class TestAdaptiveTimeouts:
+    """Test timeouts derived from p99 and window length"""
+
+    def test_default_until_enough_samples(self):
+        """Should use the configured default before p99 is known"""
+        timeouts = AdaptiveTimeouts(_tracker(0.1), default=30, minimum=1, maximum=120, per_day=1)
+        assert timeouts.timeout_for("/api/v1/query") == 30
+
+    def test_timeout_follows_p99_and_window(self):
+        """Should scale p99 and add an allowance per day of window on top of the range floor"""
+        timeouts = AdaptiveTimeouts(_tracker(1.0, 1.0, 2.0), default=30, p99_factor=3, minimum=1, maximum=120, per_day=2)
+
+        assert timeouts.timeout_for("/api/v1/query") == pytest.approx(3 * 1.98, rel=0.01)
+        assert timeouts.timeout_for("/api/v1/query", 10 * DAY) == pytest.approx(30 + 20, rel=0.01)
+
+    def test_range_queries_keep_default_as_floor(self):
+        """Should not cut range queries below the default timeout however fast the endpoint is"""
+        timeouts = AdaptiveTimeouts(_tracker(0.1, 0.1, 0.1), default=30, p99_factor=3, minimum=1, maximum=120, per_day=0)
+
+        assert timeouts.timeout_for("/api/v1/query") == pytest.approx(1)
+        assert timeouts.timeout_for("/api/v1/query", 3600) == 30
+
+    def test_timeout_is_clamped(self):
+        """Should respect the minimum and maximum"""
+        fast = AdaptiveTimeouts(_tracker(0.01, 0.01, 0.01), p99_factor=3, minimum=5, maximum=120)
+        slow = AdaptiveTimeouts(_tracker(100, 100, 100), p99_factor=3, minimum=5, maximum=120)
+        assert fast.timeout_for("/api/v1/query") == 5
+        assert slow.timeout_for("/api/v1/query") == 120
+
+
+class TestCircuitBreaker:
+    """Test failing fast while the upstream is unhealthy"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Should reject calls with a structured error once open"""
+        breaker = CircuitBreaker("http://thanos", failure_threshold=2, reset_seconds=60)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        with pytest.raises(PrometheusError) as excinfo:
+            breaker.before_call()
+        assert breaker.state == CIRCUIT_OPEN
+        assert excinfo.value.to_dict()["reason"] == "circuit_open"
+        assert excinfo.value.to_dict()["upstream"] == "http://thanos"
+
+    def test_half_open_probe_closes_on_success(self):
+        """Should let one probe through after the reset period"""
+        breaker = CircuitBreaker("http://thanos", failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+
+        breaker.before_call()  # probe admitted
+        with pytest.raises(PrometheusError):
+            breaker.before_call()  # concurrent calls still rejected
+        breaker.record_success()
+
+        assert breaker.state == CIRCUIT_CLOSED
+        breaker.before_call()
+
+
+class TestHedger:
+    """Test racing a duplicate request"""
+
+    def test_fast_hedge_beats_slow_primary(self):
+        """Should return the duplicate's response when it arrives before a slow but successful primary"""
+        hedger = Hedger(max_in_flight=2, max_workers=4)
+
+        def primary():
+            time.sleep(0.5)
+            return "primary"
+
+        started = time.monotonic()
+        assert hedger.run(primary, delay=0.01, hedge_call=lambda: "hedge") == "hedge"
+        assert time.monotonic() - started < 0.4
+        assert hedger.hedged == 1 and hedger.hedge_wins == 1
+
+    def test_hedge_covers_failed_primary(self):
+        """Should use the duplicate's response when the slow primary fails"""
+        hedger = Hedger(max_in_flight=2, max_workers=4)
+
+        def primary():
+            time.sleep(0.1)
+            raise requests.exceptions.Timeout("slow")
+
+        def hedge():
+            time.sleep(0.2)
+            return "hedge"
+
+        assert hedger.run(primary, delay=0.01, hedge_call=hedge) == "hedge"
+
+    def test_busy_pool_runs_inline_without_hedging(self):
+        """Should run on the caller's thread when no worker is free"""
+        hedger = Hedger(max_workers=1)
+        release = threading.Event()
+        blocker = threading.Thread(target=hedger.run, args=(release.wait, 10.0))
+        blocker.start()
+        time.sleep(0.05)
+        caller = threading.current_thread()
+        hedge_call = Mock()
+
+        assert hedger.run(lambda: threading.current_thread() is caller, delay=0.01, hedge_call=hedge_call)
+        hedge_call.assert_not_called()
+        release.set()
+        blocker.join()
+
+    def test_fast_primary_is_not_hedged(self):
+        """Should not start a duplicate when the primary answers within the delay"""
+        hedger = Hedger()
+        hedge_call = Mock()
+
+        assert hedger.run(lambda: "primary", delay=0.05, hedge_call=hedge_call) == "primary"
+        time.sleep(0.1)
+        hedge_call.assert_not_called()
+
+    def test_no_hedge_without_delay(self):
+        """Should call directly when no latency threshold is known"""
+        call = Mock(return_value=1)
+        assert Hedger().run(call, delay=None) == 1
+        assert call.call_count == 1
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_fails_fast_when_circuit_is_open(mock_get):
+    """Should stop contacting the upstream after repeated timeouts"""
+    mock_get.side_effect = requests.exceptions.Timeout("timed out")
+    client = PrometheusClient("http://prom:9090")
+    client.resilience.breaker.failure_threshold = 3
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.Timeout):
+            client.query_instant("up")
+    with pytest.raises(PrometheusError):
+        client.query_instant("up")
+
+    assert mock_get.call_count == 3
+    assert client.resilience_stats()["circuit"]["state"] == CIRCUIT_OPEN
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_errors_do_not_open_circuit(mock_get):
+    """Should not count 4xx responses as upstream failures"""
+    response = Mock()
+    response.raise_for_status.side_effect = requests.exceptions.HTTPError("400", response=Mock(status_code=400))
+    mock_get.return_value = response
+    client = PrometheusClient("http://prom:9090")
+    client.resilience.breaker.failure_threshold = 1
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.query_instant("bad(")
+
+    assert client.resilience.breaker.state == CIRCUIT_CLOSED
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_tracks_latency_and_adapts_timeout(mock_get):
+    """Should record latencies and derive timeouts from them"""
+    response = Mock()
+    response.json.return_value = {"status": "success", "data": {"result": []}}
+    mock_get.return_value = response
+    client = PrometheusClient("http://prom:9090", timeout=30)
+    client.resilience.latency.min_samples = 2
+    client.resilience.hedging = False
+
+    client.query_instant("up")
+    client.query_instant("up")
+    client.query_instant("up")
+
+    assert client.resilience_stats()["latency"]["/api/v1/query"]["count"] == 3
+    assert mock_get.call_args[1]["timeout"] < 30
+
+
+@patch('src.core.resilience.PROMETHEUS_HEDGE_MIN_DELAY_SECONDS', 0.01)
+def test_latency_recorded_for_primary_not_winning_hedge():
+    """Should feed only the primary attempt's latency into the p99"""
+    caller = ResilientCaller("http://prom:9090")
+    caller.latency.min_samples = 1
+    caller.latency.record("/api/v1/query", 0.01)
+    attempts = []
+
+    def send(timeout):
+        attempts.append(threading.current_thread())
+        if len(attempts) == 1:
+            time.sleep(0.2)
+        return "ok"
+
+    assert caller.call("/api/v1/query", send) == "ok"
+    time.sleep(0.4)
+    assert len(attempts) == 2
+    assert caller.latency.snapshot()["/api/v1/query"]["count"] == 2
+    assert caller.latency.quantile("/api/v1/query", 1.0) >= 0.2
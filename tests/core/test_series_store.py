@@ -0,0 +1,110 @@
+"""
+Tests for the step-aligned series store (incremental delta fetching).
+"""
+
+from unittest.mock import Mock
+
+from src.core.series_store import SeriesStore, align_window, step_to_seconds
+
+
+def _matrix(metric, start, end, step, value=lambda t: t):
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": [
+                {"metric": metric, "values": [[t, str(value(t))] for t in range(start, end + 1, step)]}
+            ],
+        },
+    }
+
+
+class FakeClient:
+    """Serves synthetic matrices and records requested windows"""
+
+    def __init__(self):
+        self.calls = []
+
+    def query_range(self, query, start, end, step):
+        self.calls.append((start, end))
+        return _matrix({"pod": "p1"}, start, end, step_to_seconds(step))
+
+
+class TestAlignment:
+    """Test step parsing and window alignment"""
+
+    def test_step_to_seconds(self):
+        assert step_to_seconds("30s") == 30
+        assert step_to_seconds("5m") == 300
+        assert step_to_seconds("1h") == 3600
+        assert step_to_seconds(60) == 60
+
+    def test_align_window_floors_both_ends(self):
+        assert align_window(125, 619, 60) == (120, 600)
+        assert align_window(125, 130, 60) == (120, 120)
+
+
+class TestSeriesStore:
+    """Test tail-only fetching and merging"""
+
+    def test_repeat_request_fetches_only_tail(self):
+        """Should refetch only the overlap plus new tail"""
+        client = FakeClient()
+        store = SeriesStore(overlap_steps=2)
+
+        store.query_range(client, "up", 0, 3600, "60s")
+        payload = store.query_range(client, "up", 300, 3900, "60s")
+
+        assert client.calls == [(0, 3600), (3480, 3900)]
+        values = payload["data"]["result"][0]["values"]
+        timestamps = [v[0] for v in values]
+        assert timestamps == list(range(300, 3901, 60))
+        assert store.delta_fetches == 1
+
+    def test_non_overlapping_window_refetches_fully(self):
+        """Should fall back to a full fetch when the head is unusable"""
+        client = FakeClient()
+        store = SeriesStore()
+
+        store.query_range(client, "up", 0, 600, "60s")
+        store.query_range(client, "up", 1200, 1800, "60s")
+
+        assert client.calls == [(0, 600), (1200, 1800)]
+        assert store.full_fetches == 2
+
+    def test_new_series_in_tail_is_added(self):
+        """Should include series that only appear in the tail"""
+        store = SeriesStore(overlap_steps=1)
+        client = Mock()
+        client.query_range.side_effect = [
+            _matrix({"pod": "a"}, 0, 600, 60),
+            {
+                "status": "success",
+                "data": {
+                    "resultType": "matrix",
+                    "result": _matrix({"pod": "a"}, 540, 900, 60)["data"]["result"]
+                    + _matrix({"pod": "b"}, 840, 900, 60)["data"]["result"],
+                },
+            },
+        ]
+
+        store.query_range(client, "up", 0, 600, "60s")
+        payload = store.query_range(client, "up", 0, 900, "60s")
+
+        pods = {s["metric"]["pod"]: s["values"] for s in payload["data"]["result"]}
+        assert [v[0] for v in pods["a"]] == list(range(0, 901, 60))
+        assert [v[0] for v in pods["b"]] == [840, 900]
+
+    def test_evicts_least_recent_entries_over_byte_budget(self):
+        """Should keep stored matrices within max_bytes, dropping the oldest first"""
+        client = FakeClient()
+        store = SeriesStore(max_bytes=20000)
+
+        store.query_range(client, "a", 0, 3600, "60s")
+        store.query_range(client, "b", 0, 3600, "60s")
+        store.query_range(client, "c", 0, 3600, "60s")
+        store.query_range(client, "a", 0, 3600, "60s")
+
+        stats = store.stats()
+        assert 0 < stats["bytes"] <= 20000
+        assert stats["full_fetches"] == 4
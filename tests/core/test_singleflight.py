@@ -0,0 +1,102 @@
+"""
+Tests for in-flight request coalescing.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.core.http_client import PrometheusClient
+from src.core.singleflight import SingleFlight
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.005)
+
+
+class TestSingleFlight:
+    """Test sharing one execution between concurrent callers"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Should run the function once and hand every caller its result"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return {"value": 42}
+
+        def caller():
+            return flight.do("key", slow)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(caller) for _ in range(4)]
+            _wait_for(lambda: flight.requests == 4)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats()["deduplicated"] == 3
+
+    def test_errors_are_shared(self):
+        """Should raise the leader's exception in every waiting caller"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(2)
+            raise RuntimeError("upstream down")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(flight.do, "key", failing) for _ in range(2)]
+            _wait_for(lambda: flight.requests == 2)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result()
+        assert flight.executed == 1
+
+    def test_completed_calls_are_not_cached(self):
+        """Should execute again once the previous call finished"""
+        flight = SingleFlight()
+        fn = Mock(return_value=1)
+
+        flight.do("key", fn)
+        flight.do("key", fn)
+
+        assert fn.call_count == 2
+        assert flight.in_flight() == 0
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_coalesces_identical_queries(mock_get):
+    """Should send one upstream request for concurrent identical instant queries"""
+    release = threading.Event()
+    response = Mock()
+    response.json.return_value = {"status": "success", "data": {"result": []}}
+
+    def slow_get(*args, **kwargs):
+        release.wait(2)
+        return response
+
+    mock_get.side_effect = slow_get
+    client = PrometheusClient("http://prom:9090")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        same = [executor.submit(client.query_instant, "ALERTS") for _ in range(2)]
+        other = executor.submit(client.query_instant, "up")
+        _wait_for(lambda: client.inflight.requests == 3)
+        release.set()
+        results = [future.result() for future in same + [other]]
+
+    assert mock_get.call_count == 2
+    assert results[0] is results[1]
+    assert client.coalescing_stats()["deduplicated"] == 1
@@ -0,0 +1,108 @@
+"""
+Tests for batched instant snapshots.
+"""
+
+from unittest.mock import Mock, patch
+
+import requests
+
+from src.core.snapshot import (
+    NAME_MODE,
+    SNAPSHOT_LABEL,
+    TAGGED_MODE,
+    build_snapshot_query,
+    fetch_snapshot,
+)
+from src.core.metrics import get_cluster_gpu_info
+
+
+def _vector(*series):
+    return {"status": "success", "data": {"resultType": "vector", "result": list(series)}}
+
+
+def _sample(value, **labels):
+    return {"metric": labels, "value": [1700000000, str(value)]}
+
+
+class TestBuildSnapshotQuery:
+    """Test combining logical queries into one expression"""
+
+    def test_plain_names_use_name_regex(self):
+        """Should select all plain metric names with one __name__ matcher"""
+        query, mode = build_snapshot_query({"a": "up", "b": "node_load1"})
+        assert mode == NAME_MODE
+        assert query == '{__name__=~"up|node_load1"}'
+
+    def test_expressions_are_tagged_and_joined(self):
+        """Should tag each expression with label_replace and join with or"""
+        query, mode = build_snapshot_query({"a": "sum(up)", "b": "node_load1"})
+        assert mode == TAGGED_MODE
+        assert query == (
+            f'label_replace((sum(up)), "{SNAPSHOT_LABEL}", "0", "", "") or '
+            f'label_replace((node_load1), "{SNAPSHOT_LABEL}", "1", "", "")'
+        )
+
+
+class TestFetchSnapshot:
+    """Test splitting the combined result back per key"""
+
+    def test_splits_by_metric_name(self):
+        """Should issue one request and group series by __name__"""
+        client = Mock()
+        client.query_instant.return_value = _vector(
+            _sample(1, __name__="up", job="a"),
+            _sample(2, __name__="node_load1"),
+            _sample(3, __name__="up", job="b"),
+        )
+
+        snapshot = fetch_snapshot({"targets": "up", "load": "node_load1", "mem": "node_mem"}, client=client)
+
+        assert client.query_instant.call_count == 1
+        assert [s["metric"]["job"] for s in snapshot["targets"]] == ["a", "b"]
+        assert len(snapshot["load"]) == 1
+        assert snapshot["mem"] == []
+
+    def test_splits_by_tag_and_strips_it(self):
+        """Should route tagged series to their key without the tag label"""
+        client = Mock()
+        client.query_instant.return_value = _vector(
+            _sample(5, **{SNAPSHOT_LABEL: "1"}),
+            _sample(7, pod="p", **{SNAPSHOT_LABEL: "0"}),
+        )
+
+        snapshot = fetch_snapshot({"a": "sum by (pod) (x)", "b": "sum(y)"}, client=client)
+
+        assert snapshot["a"] == [_sample(7, pod="p")]
+        assert snapshot["b"] == [_sample(5)]
+
+    def test_falls_back_to_individual_queries(self):
+        """Should query each expression separately when the batch is rejected"""
+        client = Mock()
+        client.query_instant.side_effect = [
+            requests.exceptions.HTTPError("400 bad_data"),
+            _vector(_sample(1)),
+            _vector(_sample(2)),
+        ]
+
+        snapshot = fetch_snapshot({"a": "scalar(x)", "b": "sum(y)"}, client=client)
+
+        assert client.query_instant.call_count == 3
+        assert snapshot["b"] == [_sample(2)]
+
+
+@patch("src.core.snapshot.get_prometheus_client")
+def test_cluster_gpu_info_uses_one_request(mock_get_client):
+    """Should read all vendor temperature metrics in one round trip"""
+    client = Mock()
+    client.query_instant.return_value = _vector(
+        _sample(60, __name__="DCGM_FI_DEV_GPU_TEMP", gpu="0"),
+        _sample(70, __name__="habanalabs_temperature_onchip"),
+    )
+    mock_get_client.return_value = client
+
+    info = get_cluster_gpu_info()
+
+    assert client.query_instant.call_count == 1
+    assert info["total_gpus"] == 2
+    assert info["temperatures"] == [60.0, 70.0]
+    assert info["mixed"] is True
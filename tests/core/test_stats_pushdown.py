@@ -0,0 +1,91 @@
+"""
+Tests for server-side statistics pushdown.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.core.analysis import compute_health_score
+from src.core.promql_parser import parse_promql
+from src.core.stats_pushdown import STAT_FUNCTIONS, build_stats_query, parse_stats_result
+from src.core.timeseries import MetricStats, SeriesSet, summarize_metric
+
+
+def _stats_result(series, last_seen=None):
+    """Emulate the stats query response for {pod: values} sampled once per minute."""
+    result = []
+    for pod, values in series.items():
+        x = np.arange(len(values)) * 60.0
+        stats = {
+            "count": len(values), "sum": values.sum(), "last": values[-1], "p90": np.quantile(values, 0.9), "stddev": values.std(),
+            "slope": np.polyfit(x, values, 1)[0], "last_seen": (last_seen or {}).get(pod, x[-1]),
+        }
+        for name, value in stats.items():
+            result.append({"metric": {"pod": pod, "__stat__": name}, "value": [0, str(value)]})
+    return result
+
+
+def test_stats_query_is_one_valid_expression():
+    """Should build a single parseable query covering every statistic"""
+    query = build_stats_query('sum(rate(x{namespace="a"}[5m]))', 3600, "1m")
+
+    parse_promql(query)
+    assert query.count("[3600s:1m]") == len(STAT_FUNCTIONS)
+    assert "min_over_time" not in query
+    assert 'max_over_time(timestamp((sum(rate(x{namespace="a"}[5m]))))[3600s:1m])' in query
+
+
+def test_parse_stats_matches_full_series_stats():
+    """Should combine per-series stats into the same numbers as the full series"""
+    rng = np.random.default_rng(3)
+    series = {"a": rng.normal(10, 2, 60), "b": rng.normal(20, 5, 60) + np.arange(60) * 0.1}
+    full = SeriesSet.from_arrays(
+        [{"pod": pod} for pod in series], [np.arange(60) * 60.0] * 2, list(series.values())
+    )
+
+    stats = parse_stats_result(_stats_result(series))
+
+    expected = full.stats()
+    assert (stats.count, stats.avg, stats.latest) == pytest.approx(
+        (expected["count"], expected["avg"], expected["latest"])
+    )
+    assert stats.stddev == pytest.approx(np.concatenate(list(series.values())).std())
+    assert stats.series_count == 2 and stats.slope > 0
+
+
+def test_latest_comes_from_most_recently_seen_series():
+    """Should take latest from the series seen last, not the last one in label order"""
+    series = {"a": np.array([1.0, 2.0]), "z-gone": np.array([7.0, 8.0])}
+
+    assert parse_stats_result(_stats_result(series, last_seen={"z-gone": 30.0})).latest == 2.0
+    assert parse_stats_result(_stats_result(series)).latest == 8.0
+
+
+def test_empty_result_and_health_score():
+    """Should report no data for empty results and score health from means"""
+    assert parse_stats_result([]).empty
+    assert summarize_metric(MetricStats()) is None
+
+    score, reasons = compute_health_score({"P95 Latency (s)": MetricStats(count=10, avg=3.0)})
+    assert score == -2 and reasons == ["High Latency (avg=3.00s)"]
+
+
+@patch("src.core.metrics.summarize_with_llm", return_value="summary")
+@patch("src.core.metrics._query_range_series")
+@patch("src.core.stats_pushdown.get_prometheus_client")
+@patch("src.core.metrics.get_openshift_metrics", return_value={"Fleet Overview": {"Pods Running": "sum(up)"}})
+def test_analyze_openshift_prompts_from_coarse_chart_series(_metrics, mock_client, mock_query, _llm):
+    """Should build the prompt from the coarse chart series without a separate stats query"""
+    from src.core.metrics import analyze_openshift_metrics
+
+    mock_query.return_value = SeriesSet.from_arrays([{}], [np.array([0.0, 1.0, 2.0]) * 1e6], [np.array([1.0, 2.0, 3.0])])
+
+    result = analyze_openshift_metrics("Fleet Overview", "cluster_wide", None, 0, 7 * 86400, "m", None)
+
+    assert "Pods Running: Avg=2.00, Latest=3.00" in result["health_prompt"]
+    mock_client.assert_not_called()
+    assert mock_query.call_count == 1
+    step = mock_query.call_args[0][3]
+    assert step in ("30m", "1h")
@@ -0,0 +1,110 @@
+"""
+Tests for incremental query_range body decoding.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+import requests
+
+from src.core.http_client import PrometheusClient
+from src.core.stream_decode import StreamDecodeError, decode_matrix_stream, parse_sample_pairs
+from src.core.timeseries import SeriesSet
+
+
+RESULT = [
+    {"metric": {"__name__": "up", "job": "a{b}", "note": "quote \" and ]]"}, "values": [
+        [1700000000, "1"], [1700000030, "NaN"], [1700000060.5, "2.5e3"],
+    ]},
+    {"metric": {}, "values": []},
+    {"values": [[1700000030, "+Inf"], [1700000060, "-4"]], "metric": {"job": "b"}},
+]
+
+
+def _body(result=RESULT, **extra):
+    payload = {"status": "success", "data": {"resultType": "matrix", "result": result}}
+    payload.update(extra)
+    return json.dumps(payload).encode()
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _assert_same(actual, expected):
+    assert actual.labels == expected.labels
+    np.testing.assert_array_equal(actual.timestamps, expected.timestamps)
+    np.testing.assert_array_equal(actual.values, expected.values)
+
+
+class TestDecodeMatrixStream:
+    """Test decoding bodies split at arbitrary chunk boundaries"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 20])
+    def test_matches_json_decoding(self, chunk_size):
+        """Should produce the same SeriesSet as decoding the full JSON"""
+        series = decode_matrix_stream(_chunks(_body(), chunk_size), expected_points=2)
+
+        _assert_same(series, SeriesSet.from_matrix(RESULT))
+
+    def test_ignores_unknown_keys_and_trailers(self):
+        """Should skip extra series keys, warnings and stats"""
+        result = [{"metric": {"job": "a"}, "histograms": [[1, {"count": "1"}]], "values": [[1, "2"]]}]
+        body = _body(result, warnings=["partial"], stats={"timings": {"x": 1}})
+
+        series = decode_matrix_stream(_chunks(body, 5))
+
+        assert series.labels == ((("job", "a"),),)
+        assert series.values.tolist() == [[2.0]]
+
+    def test_empty_result(self):
+        """Should return an empty set for an empty matrix"""
+        assert decode_matrix_stream([_body([])]).empty
+
+    def test_non_matrix_result_raises(self):
+        """Should reject vector results"""
+        body = json.dumps({"status": "success", "data": {"resultType": "vector", "result": []}}).encode()
+        with pytest.raises(StreamDecodeError):
+            decode_matrix_stream([body])
+
+    def test_truncated_body_raises(self):
+        """Should reject a body that ends mid-result"""
+        body = _body()
+        with pytest.raises(StreamDecodeError):
+            decode_matrix_stream([body[: len(body) // 2]])
+
+    def test_malformed_samples_raise(self):
+        """Should reject sample values that are not numbers"""
+        with pytest.raises(StreamDecodeError):
+            parse_sample_pairs(b'[1,"x"],[2,"3"]')
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_streams_and_caches(mock_get):
+    """Should request a streamed body and serve repeats from the cache"""
+    response = Mock()
+    response.iter_content.return_value = _chunks(_body(), 16)
+    mock_get.return_value = response
+    client = PrometheusClient("http://prom:9090")
+
+    first = client.query_range_series("up", 1700000000, 1700000060, "30s")
+    second = client.query_range_series("up", 1700000000, 1700000060, "30s")
+
+    assert mock_get.call_count == 1
+    assert mock_get.call_args[1]["stream"] is True
+    assert second is first
+    _assert_same(first, SeriesSet.from_matrix(RESULT))
+    response.close.assert_called_once()
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_reports_malformed_body_as_request_error(mock_get):
+    """Should surface decode failures as requests exceptions"""
+    response = Mock()
+    response.iter_content.return_value = [b'{"status":"success","data":{"resultType":"matrix","result":[{"values":[[1,"x"]]}]}}']
+    mock_get.return_value = response
+
+    with pytest.raises(requests.exceptions.RequestException):
+        PrometheusClient("http://prom:9090").query_range_series("up", 1, 2, "1s")
@@ -0,0 +1,68 @@
+"""
+Tests for Thanos resolution and store-routing parameters.
+"""
+
+from unittest.mock import Mock, patch
+
+from src.core.http_client import PrometheusClient
+from src.core.thanos_routing import ThanosRoutingPolicy
+
+DAY = 86400
+
+
+class TestThanosRoutingPolicy:
+    """Test choosing max_source_resolution/partial_response/dedup"""
+
+    def test_short_window_reads_raw_without_extra_params(self):
+        """Should leave short queries untouched"""
+        assert ThanosRoutingPolicy().params_for(0, 3600, "30s") == {}
+
+    def test_multi_week_window_uses_5m_resolution(self):
+        """Should allow 5m blocks once the step spans five of their samples"""
+        params = ThanosRoutingPolicy().params_for(0, 30 * DAY, "30m")
+        assert params == {"max_source_resolution": "5m", "dedup": "true"}
+
+    def test_step_must_span_five_samples(self):
+        """Should follow Thanos' auto rule: resolution at most step / 5"""
+        policy = ThanosRoutingPolicy()
+        assert "max_source_resolution" not in policy.params_for(0, 30 * DAY, "5m")
+        assert policy.params_for(0, 30 * DAY, "1h")["max_source_resolution"] == "5m"
+        assert policy.params_for(0, 30 * DAY, "6h")["max_source_resolution"] == "1h"
+
+    def test_range_selectors_must_span_five_samples(self):
+        """Should not downsample below a fifth of the query's shortest range selector"""
+        policy = ThanosRoutingPolicy()
+        assert "max_source_resolution" not in policy.params_for(0, 30 * DAY, "1h", query="rate(x[5m])")
+        assert policy.params_for(0, 30 * DAY, "6h", query="rate(x[30m])")["max_source_resolution"] == "5m"
+        assert policy.params_for(0, 30 * DAY, "6h", query="max_over_time(rate(x[5h])[1d:1h])")["max_source_resolution"] == "1h"
+        assert "max_source_resolution" not in policy.params_for(0, 30 * DAY, "1h", query="rate(x[")
+
+    def test_partial_response_is_opt_in(self):
+        """Should only request partial responses when configured"""
+        assert "partial_response" not in ThanosRoutingPolicy().params_for(0, 30 * DAY, "1h")
+        assert ThanosRoutingPolicy(partial_response="auto").params_for(0, 30 * DAY, "1h")["partial_response"] == "true"
+
+    def test_shard_uses_logical_window(self):
+        """Should route a one-day shard by the length of the whole query"""
+        policy = ThanosRoutingPolicy()
+        assert policy.params_for(0, DAY, "30m") == {}
+        assert policy.params_for(0, DAY, "30m", window_seconds=30 * DAY)["max_source_resolution"] == "5m"
+
+    def test_flags_are_configurable(self):
+        """Should honor forced, disabled and omitted flags"""
+        policy = ThanosRoutingPolicy(enabled=False, partial_response="false", dedup="off")
+        assert policy.params_for(0, 30 * DAY, "1h") == {"partial_response": "false"}
+
+
+@patch('src.core.http_client.requests.Session.get')
+def test_client_sends_routing_params(mock_get):
+    """Should add routing parameters to long range queries"""
+    response = Mock()
+    response.json.return_value = {"status": "success", "data": {"result": []}}
+    mock_get.return_value = response
+
+    PrometheusClient("http://prom:9090").query_range("up", 0, 30 * DAY, "30m")
+
+    params = mock_get.call_args[1]["params"]
+    assert params["max_source_resolution"] == "5m"
+    assert params["dedup"] == "true"
@@ -0,0 +1,119 @@
+"""
+Tests for columnar Prometheus matrix conversion.
+"""
+
+import math
+from datetime import datetime
+
+import pandas as pd
+
+from src.core.timeseries import SeriesSet, matrix_to_dataframe, summarize_metric
+
+
+def _legacy_rows_to_dataframe(result):
+    """Reference implementation: one dict per sample"""
+    rows = []
+    for series in result:
+        for val in series["values"]:
+            value = float(val[1])
+            if value != value:
+                value = 0.0
+            row = dict(series["metric"])
+            row["timestamp"] = datetime.fromtimestamp(float(val[0]))
+            row["value"] = value
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _labels(column):
+    return [None if pd.isna(v) else v for v in column]
+
+
+RESULT = [
+    {"metric": {"namespace": "ns1", "pod": "a"}, "values": [[1700000000, "1.5"], [1700000030, "NaN"]]},
+    {"metric": {"namespace": "ns2"}, "values": [[1700000000, "2"], [1700000030, "+Inf"]]},
+    {"metric": {"namespace": "ns1", "job": "j"}, "values": []},
+    {"metric": {"namespace": "ns1", "model_name": "m"}, "values": [[1700000060, "3"]]},
+]
+
+
+class TestMatrixToDataFrame:
+    """Test parity with the per-sample dict path"""
+
+    def test_matches_legacy_output(self):
+        """Should produce the same columns, timestamps and values"""
+        new = matrix_to_dataframe(RESULT)
+        legacy = _legacy_rows_to_dataframe(RESULT)
+
+        assert list(new.columns) == list(legacy.columns)
+        assert list(new["timestamp"]) == list(legacy["timestamp"])
+        assert list(new["value"]) == list(legacy["value"])
+        for label in ("namespace", "pod", "model_name"):
+            assert _labels(new[label]) == _labels(legacy[label])
+
+    def test_nan_becomes_zero_and_inf_kept(self):
+        """Should zero NaN for JSON but keep infinities as-is"""
+        df = matrix_to_dataframe(RESULT)
+        assert df["value"].iloc[1] == 0.0
+        assert math.isinf(df["value"].iloc[3])
+
+    def test_labels_are_categorical(self):
+        """Should store label columns as categoricals"""
+        df = matrix_to_dataframe(RESULT)
+        assert isinstance(df["namespace"].dtype, pd.CategoricalDtype)
+
+    def test_empty_result(self):
+        """Should return an empty DataFrame"""
+        assert matrix_to_dataframe([]).empty
+        assert matrix_to_dataframe([{"metric": {}, "values": []}]).empty
+
+
+class TestSeriesSet:
+    """Test the compact array-backed series representation"""
+
+    def test_shares_timestamp_axis(self):
+        """Should hold one timestamp axis and a series x timestamp matrix"""
+        series = SeriesSet.from_matrix(RESULT)
+        assert list(series.timestamps) == [1700000000000, 1700000030000, 1700000060000]
+        assert series.values.shape == (3, 3)
+        assert len(series) == 5
+
+    def test_dataframe_matches_matrix_conversion(self):
+        """Should materialize the same long-format frame as matrix_to_dataframe"""
+        new = SeriesSet.from_matrix(RESULT).to_dataframe()
+        expected = matrix_to_dataframe(RESULT)
+
+        assert list(new.columns) == list(expected.columns)
+        assert list(new["timestamp"]) == list(expected["timestamp"])
+        assert list(new["value"]) == list(expected["value"])
+        assert _labels(new["pod"]) == _labels(expected["pod"])
+
+    def test_labels_are_interned(self):
+        """Should reuse one label tuple for identical label sets"""
+        a = SeriesSet.from_matrix(RESULT)
+        b = SeriesSet.from_matrix(RESULT)
+        assert a.labels[0] is b.labels[0]
+        assert a.label_dicts()[0] == {"namespace": "ns1", "pod": "a"}
+
+    def test_stats_match_dataframe_summary(self):
+        """Should summarize SeriesSet and DataFrame identically"""
+        result = [r for r in RESULT if r["metric"].get("namespace") == "ns1"]
+        from_series = summarize_metric(SeriesSet.from_matrix(result))
+        from_frame = summarize_metric(matrix_to_dataframe(result))
+        assert from_series == from_frame
+        assert from_series["latest"] == 3.0
+
+    def test_records_and_points(self):
+        """Should serialize to datetime records and ISO points in row order"""
+        series = SeriesSet.from_matrix(RESULT[:1])
+        records = series.to_records()
+        assert records[0] == {"timestamp": datetime.fromtimestamp(1700000000), "value": 1.5}
+        assert series.to_points()[1]["timestamp"] == datetime.fromtimestamp(1700000030).isoformat()
+
+    def test_empty_set(self):
+        """Should behave as empty everywhere"""
+        series = SeriesSet.from_matrix([])
+        assert series.empty
+        assert series.to_dataframe().empty
+        assert series.to_records() == []
+        assert summarize_metric(series) is None
@@ -1,12 +1,19 @@
 from unittest.mock import patch
 
 import src.mcp_server.tools.observability_vllm_tools as tools
+from src.core.timeseries import SeriesSet
 
 
 def _texts(result):
     return [part.get("text") for part in result]
 
 
+def _series(*values):
+    return SeriesSet.from_matrix([
+        {"metric": {"pod": "p1"}, "values": [[1704103200 + 60 * i, str(v)] for i, v in enumerate(values)]}
+    ])
+
+
 @patch("src.mcp_server.tools.observability_vllm_tools.get_models_helper", return_value=["a", "b"])  # type: ignore[arg-type]
 def test_list_models_success(_):
     out = tools.list_models()
@@ -54,26 +61,12 @@ def test_get_model_config_empty(_):
     texts = _texts(out)
     assert any("No LLM models configured" in t for t in texts)
 @patch("src.mcp_server.tools.observability_vllm_tools.get_vllm_metrics", return_value={"latency": "q1", "tps": "q2"})
-@patch("src.mcp_server.tools.observability_vllm_tools.fetch_metrics")
+@patch("src.mcp_server.tools.observability_vllm_tools.fetch_metric_series")
 @patch("src.mcp_server.tools.observability_vllm_tools.build_prompt", return_value="PROMPT")
 @patch("src.mcp_server.tools.observability_vllm_tools.summarize_with_llm", return_value="SUMMARY")
 @patch("src.mcp_server.tools.observability_vllm_tools.extract_time_range_with_info", return_value=(1, 2, {}))
 def test_analyze_vllm_success(_, __, ___, mock_fetch, ____):
-    # Create proper DataFrame-like mock objects
-    import pandas as pd
-    from datetime import datetime
-    
-    # Mock DataFrame with required columns
-    mock_df1 = pd.DataFrame({
-        "timestamp": [datetime.now(), datetime.now()],
-        "value": [1.0, 2.0]
-    })
-    mock_df2 = pd.DataFrame({
-        "timestamp": [datetime.now(), datetime.now()],
-        "value": [3.0, 4.0]
-    })
-    
-    mock_fetch.side_effect = [mock_df1, mock_df2]
+    mock_fetch.side_effect = [_series(1.0, 2.0), _series(3.0, 4.0)]
     
     out = tools.analyze_vllm("model", "summarizer", time_range="last 1h")
     text = "\n".join(_texts(out))
@@ -186,20 +179,13 @@ def test_calculate_metrics_invalid_data_format():
 
 def test_analyze_vllm_with_structured_data():
     """Test that analyze_vllm returns structured data in the response"""
-    import pandas as pd
-    from datetime import datetime
-    
     with patch("src.mcp_server.tools.observability_vllm_tools.get_vllm_metrics", return_value={"GPU Temperature (°C)": "query1"}):
         with patch("src.mcp_server.tools.observability_vllm_tools.extract_time_range_with_info", return_value=(1, 2, {})):
             with patch("src.mcp_server.tools.observability_vllm_tools.build_prompt", return_value="TEST_PROMPT"):
                 with patch("src.mcp_server.tools.observability_vllm_tools.summarize_with_llm", return_value="TEST_SUMMARY"):
-                    with patch("src.mcp_server.tools.observability_vllm_tools.fetch_metrics") as mock_fetch:
-                        # Create mock DataFrame with realistic data
-                        mock_df = pd.DataFrame({
-                            "timestamp": [datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 1, 10, 1)],
-                            "value": [45.2, 46.1]
-                        })
-                        mock_fetch.return_value = mock_df
+                    with patch("src.mcp_server.tools.observability_vllm_tools.fetch_metric_series") as mock_fetch:
+                        # Create mock series with realistic data
+                        mock_fetch.return_value = _series(45.2, 46.1)
                         
                         result = tools.analyze_vllm("test-model", "test-summarizer", time_range="last 1h")
                         